@@ -0,0 +1,57 @@
+"""Add precomputed provider series matches
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add provider_series_matches table."""
+
+    op.create_table(
+        'provider_series_matches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now(), nullable=False),
+
+        # Series and provider copy
+        sa.Column('manga_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('manga.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('provider', sa.String(100), nullable=False),
+        sa.Column('external_id', sa.String(255), nullable=False),
+        sa.Column('external_url', sa.String(500), nullable=True),
+        sa.Column('matched_title', sa.String(500), nullable=True),
+
+        # Match quality
+        sa.Column('confidence', sa.Float, nullable=False, server_default='0'),
+        sa.Column('match_method', sa.String(50), nullable=False, server_default='title_fuzzy'),
+        sa.Column('chapter_count', sa.Integer, nullable=True),
+
+        # Verification tracking
+        sa.Column('last_verified', sa.DateTime(timezone=True), nullable=True),
+
+        sa.UniqueConstraint('manga_id', 'provider', name='uq_provider_series_match'),
+    )
+
+    op.create_index('ix_provider_series_matches_manga_id', 'provider_series_matches', ['manga_id'])
+    op.create_index('ix_provider_series_matches_provider', 'provider_series_matches', ['provider'])
+    op.create_index('ix_provider_series_matches_last_verified', 'provider_series_matches', ['last_verified'])
+
+
+def downgrade() -> None:
+    """Remove provider_series_matches table."""
+
+    op.drop_index('ix_provider_series_matches_last_verified')
+    op.drop_index('ix_provider_series_matches_provider')
+    op.drop_index('ix_provider_series_matches_manga_id')
+    op.drop_table('provider_series_matches')
@@ -0,0 +1,48 @@
+"""Add perceptual page fingerprints
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add page_fingerprints table."""
+
+    op.create_table(
+        'page_fingerprints',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now(), nullable=False),
+
+        # Where the page repeats, and its dHash
+        sa.Column('scope', sa.String(150), nullable=False),
+        sa.Column('hash', sa.BigInteger, nullable=False),
+
+        # Repetition tracking
+        sa.Column('sightings', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('last_seen_in', sa.String(64), nullable=False),
+        sa.Column('url', sa.String(1000), nullable=True),
+        sa.Column('blocked', sa.Boolean, nullable=False, server_default=sa.false()),
+
+        sa.UniqueConstraint('scope', 'hash', name='uq_page_fingerprint'),
+    )
+
+    op.create_index('ix_page_fingerprints_scope', 'page_fingerprints', ['scope'])
+
+
+def downgrade() -> None:
+    """Remove page_fingerprints table."""
+
+    op.drop_index('ix_page_fingerprints_scope')
+    op.drop_table('page_fingerprints')
@@ -0,0 +1,26 @@
+"""Track background optimization of chapter images
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add images_optimized_at to the chapter table."""
+    op.add_column('chapter', sa.Column('images_optimized_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove images_optimized_at from the chapter table."""
+    op.drop_column('chapter', 'images_optimized_at')
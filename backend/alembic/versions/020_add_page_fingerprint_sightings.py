@@ -0,0 +1,65 @@
+"""Count page fingerprint sightings per distinct chapter or series
+
+Revision ID: 020
+Revises: 019
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '020'
+down_revision = '019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add page_fingerprint_sightings, replacing page_fingerprints.last_seen_in."""
+
+    op.create_table(
+        'page_fingerprint_sightings',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now(), nullable=False),
+
+        # Fingerprint, and the chapter or series it was seen in
+        sa.Column('scope', sa.String(150), nullable=False),
+        sa.Column('hash', sa.BigInteger, nullable=False),
+        sa.Column('seen_in', sa.String(64), nullable=False),
+
+        sa.UniqueConstraint('scope', 'hash', 'seen_in', name='uq_page_fingerprint_sighting'),
+    )
+
+    # Only the last sighting was kept; counts are rebuilt from here on
+    op.execute(
+        """
+        INSERT INTO page_fingerprint_sightings (id, scope, hash, seen_in)
+        SELECT id, scope, hash, last_seen_in FROM page_fingerprints
+        """
+    )
+
+    op.drop_column('page_fingerprints', 'last_seen_in')
+
+
+def downgrade() -> None:
+    """Restore page_fingerprints.last_seen_in and drop page_fingerprint_sightings."""
+
+    op.add_column('page_fingerprints', sa.Column('last_seen_in', sa.String(64), nullable=False, server_default=''))
+    op.execute(
+        """
+        UPDATE page_fingerprints AS f SET last_seen_in = s.seen_in
+        FROM (
+            SELECT DISTINCT ON (scope, hash) scope, hash, seen_in
+            FROM page_fingerprint_sightings
+            ORDER BY scope, hash, created_at DESC
+        ) AS s
+        WHERE f.scope = s.scope AND f.hash = s.hash
+        """
+    )
+    op.alter_column('page_fingerprints', 'last_seen_in', server_default=None)
+
+    op.drop_table('page_fingerprint_sightings')
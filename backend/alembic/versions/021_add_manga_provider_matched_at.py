@@ -0,0 +1,41 @@
+"""Track when the series matcher last searched for each series
+
+Revision ID: 021
+Revises: 020
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '021'
+down_revision = '020'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add provider_matched_at to the manga table."""
+    op.add_column('manga', sa.Column('provider_matched_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_manga_provider_matched_at'), 'manga', ['provider_matched_at'], unique=False)
+
+    # Series with matches were last searched when they were last verified
+    op.execute(
+        """
+        UPDATE manga SET provider_matched_at = m.last_verified
+        FROM (
+            SELECT manga_id, MAX(last_verified) AS last_verified
+            FROM provider_series_matches
+            GROUP BY manga_id
+        ) AS m
+        WHERE manga.id = m.manga_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Remove provider_matched_at from the manga table."""
+    op.drop_index(op.f('ix_manga_provider_matched_at'), table_name='manga')
+    op.drop_column('manga', 'provider_matched_at')
@@ -14,6 +14,8 @@ from sqlalchemy.orm import selectinload
 
 from app.core.config import settings
 from app.core.deps import get_current_user, get_db
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.page_store import page_store
 from app.models.library import MangaUserLibrary
 from app.models.manga import Chapter, Manga
 from app.models.user import User
@@ -70,10 +72,18 @@ async def delete_chapter(
         chapter_path = get_chapter_storage_path(chapter.manga_id, chapter.id)
         if os.path.exists(chapter_path):
             shutil.rmtree(chapter_path)
+        for archive_path in (f"{chapter_path}.cbz", f"{chapter_path}.cbz.part"):
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
 
         # Delete chapter from database
+        page_paths = [page.file_path for page in chapter.pages]
         await db.delete(chapter)
         await db.commit()
+        await chapter_manifest_cache.invalidate(chapter.id)
+
+        # Remove page images no other chapter shares
+        await page_store.collect_unreferenced(db, page_paths)
 
     except Exception as e:
         await db.rollback()
@@ -145,6 +155,9 @@ async def redownload_chapter(
         chapter_path = get_chapter_storage_path(chapter.manga_id, chapter.id)
         if os.path.exists(chapter_path):
             shutil.rmtree(chapter_path)
+        for archive_path in (f"{chapter_path}.cbz", f"{chapter_path}.cbz.part"):
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
 
         # Reset chapter status to trigger re-download
         chapter.download_status = "not_downloaded"
@@ -8,6 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.deps import get_current_user, get_db
+from app.core.services.autocomplete import autocomplete_index
 from app.core.services.enhanced_search import enhanced_search_service
 from app.core.services.mangaupdates import mangaupdates_service
 from app.core.services.tiered_indexing import tiered_search_service
@@ -181,7 +182,7 @@ async def enhanced_search(
                             "calling find_provider_matches"
                         )
                         provider_matches = await matcher.find_provider_matches(
-                            mu_entry, max_providers=5
+                            mu_entry, max_providers=5, db=db
                         )
                         print(
                             f"[DEBUG] Provider matching returned "
@@ -329,7 +330,7 @@ async def get_mangaupdates_details(
 
         matcher = ProviderMatcher()
         provider_matches = await matcher.find_provider_matches(
-            mu_entry, max_providers=10
+            mu_entry, max_providers=10, db=db
         )
 
         # Check library status
@@ -443,7 +444,9 @@ async def get_provider_matches(
         from app.core.services.enhanced_search import ProviderMatcher
 
         matcher = ProviderMatcher()
-        provider_matches = await matcher.find_provider_matches(mu_entry, max_providers)
+        provider_matches = await matcher.find_provider_matches(
+            mu_entry, max_providers, db=db
+        )
 
         return {
             "mu_entry_id": str(mu_entry_id),
@@ -525,39 +528,21 @@ async def get_search_suggestions(
     query: str = Query(..., min_length=2, description="Partial search query"),
     limit: int = Query(10, ge=1, le=20, description="Maximum suggestions"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get search suggestions based on partial query.
 
-    This endpoint provides autocomplete suggestions from MangaUpdates
-    to help users find content more easily.
+    Suggestions are served from the local autocomplete index over known
+    MangaUpdates entries, indexer entries and the user's library, so this
+    endpoint never calls out to MangaUpdates. Until the index is first built
+    in the background, no suggestions are returned.
     """
     try:
-        # For now, return a simple search to get suggestions
-        # In the future, this could use a dedicated autocomplete API
-        search_results = await enhanced_search_service.search(
-            query=query,
-            db=db,
-            page=1,
-            limit=limit,
-            user_id=str(current_user.id),
-            include_provider_matches=False,  # Skip provider matching for suggestions
+        autocomplete_index.ensure_built()
+        suggestions = autocomplete_index.suggest(
+            query, limit=limit, user_id=str(current_user.id)
         )
 
-        # Extract just the titles for suggestions
-        suggestions = []
-        for result in search_results.results:
-            suggestions.append(
-                {
-                    "title": result.title,
-                    "mu_entry_id": result.id,
-                    "year": result.year,
-                    "type": result.type,
-                    "cover_image": result.cover_image,
-                }
-            )
-
         return {"query": query, "suggestions": suggestions}
 
     except Exception as e:
@@ -10,6 +10,7 @@ from fastapi import (
     Form,
     HTTPException,
     Query,
+    Response,
     status,
 )
 from sqlalchemy import func, insert, select
@@ -17,6 +18,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.deps import get_current_user, get_db
+from app.core.services.autocomplete import autocomplete_index
 from app.models.library import (
     Bookmark,
 )
@@ -36,6 +38,7 @@ from app.schemas.library import (
     BulkMarkReadRequest,
     BulkMarkUnreadRequest,
     BulkOperationResponse,
+    BulkRefreshRequest,
     BulkUpdateMetadataRequest,
     BulkUpdateTagsRequest,
     DownloadChapterRequest,
@@ -330,6 +333,11 @@ async def add_to_library(
         )
         library_item_with_relationships = result.scalars().first()
 
+        if library_item_with_relationships:
+            autocomplete_index.add_library_manga(
+                current_user.id, library_item_with_relationships.manga
+            )
+
         return library_item_with_relationships
 
     except HTTPException:
@@ -359,10 +367,10 @@ async def get_download_tasks(
     Get all download tasks for the current user.
     """
     try:
-        from app.core.services.background import get_user_download_tasks
+        from app.core.services.background import find_user_download_tasks
 
-        # Get user's download tasks
-        user_tasks = get_user_download_tasks(current_user.id)
+        # Get user's download tasks, wherever they run
+        user_tasks = await find_user_download_tasks(current_user.id)
 
         # Convert to list format expected by frontend
         tasks_list = []
@@ -388,10 +396,13 @@ async def get_download_task(
     """
     Get a specific download task by ID.
     """
-    from app.core.services.background import get_download_task
+    from app.core.services.background import (
+        can_view_download_task,
+        find_download_task,
+    )
 
-    # Get task
-    task = get_download_task(task_id)
+    # Get task, also when another worker process runs it
+    task = await find_download_task(task_id)
 
     if not task:
         raise HTTPException(
@@ -399,8 +410,8 @@ async def get_download_task(
             detail="Download task not found",
         )
 
-    # Check if task belongs to user
-    if task["user_id"] != str(current_user.id):
+    # Check if task belongs to user or the user follows it
+    if not can_view_download_task(task, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -493,10 +504,20 @@ async def pause_download_task(
             detail="Not enough permissions",
         )
 
-    # Update task status to paused
-    from app.core.services.background import update_download_task_status
+    # Cancel the running download; its checkpoint keeps the saved pages
+    from app.core.services.background import pause_download_task as pause_task
 
-    update_download_task_status(task_id, "paused")
+    if task.get("type") != "chapter":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only chapter downloads can be paused",
+        )
+
+    if not pause_task(task_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Download is not running",
+        )
 
     return {"message": "Download paused successfully", "task_id": task_id}
 
@@ -509,10 +530,10 @@ async def resume_download_task(
     """
     Resume a paused download task.
     """
-    from app.core.services.background import get_download_task
+    from app.core.services.background import find_download_task
 
-    # Get task
-    task = get_download_task(task_id)
+    # Get task, also when another worker process paused it
+    task = await find_download_task(task_id)
 
     if not task:
         raise HTTPException(
@@ -527,12 +548,17 @@ async def resume_download_task(
             detail="Not enough permissions",
         )
 
-    # Update task status to downloading
-    from app.core.services.background import update_download_task_status
+    # Download the rest of the chapter from its checkpoint
+    from app.core.services.background import resume_download_task as resume_task
 
-    update_download_task_status(task_id, "downloading")
+    resumed_task_id = await resume_task(task_id)
+    if resumed_task_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Download is not paused",
+        )
 
-    return {"message": "Download resumed successfully", "task_id": task_id}
+    return {"message": "Download resumed successfully", "task_id": resumed_task_id}
 
 
 @router.get("/{library_item_id}", response_model=MangaUserLibrarySchema)
@@ -783,9 +809,12 @@ async def remove_from_library(
         )
 
     # Delete library item
+    manga_id = library_item.manga_id
     await db.delete(library_item)
     await db.commit()
 
+    autocomplete_index.remove_library_manga(current_user.id, manga_id)
+
 
 @router.post("/{library_item_id}/download", response_model=Dict[str, Any])
 async def download_manga(
@@ -1119,23 +1148,69 @@ async def download_chapter_endpoint(
     try:
         # Import download function
 
-        # Create task ID
-        chapter_id_for_task = chapter.id if chapter else "new"
-        task_id = f"{current_user.id}_{library_item.manga_id}_{chapter_id_for_task}"
+        from app.core.services.download_coordinator import (
+            chapter_download_key,
+            download_coordinator,
+            pending_chapter_id,
+        )
 
         # If no existing chapter, handle it in the download service
         if not chapter:
-            # For new chapters from provider, let download service handle creation
-            # Create a placeholder chapter ID for the task
-            from uuid import uuid4
-
-            chapter_id_for_download = uuid4()
+            # For new chapters from provider, let download service handle creation.
+            # The ID is derived from the provider chapter, so repeated requests
+            # for it collapse into one download
+            chapter_id_for_download = pending_chapter_id(
+                library_item.manga_id, request.provider, request.external_chapter_id
+            )
         else:
             chapter_id_for_download = chapter.id
 
-        # Add download task to background tasks
-        from app.core.services.background import download_chapter_task
+        # Create task ID with timestamp to match background service
+        import time
+
+        task_id = (
+            f"{current_user.id}_{library_item.manga_id}_"
+            f"{chapter_id_for_download}_{int(time.time())}"
+        )
 
+        from app.core.services.background import (
+            attach_to_download_task,
+            download_chapter_task,
+            download_tasks,
+            publish_download_task,
+        )
+
+        # Follow a download of this chapter that is already running
+        running_task_id = await download_coordinator.claim(
+            chapter_download_key(chapter_id_for_download), task_id
+        )
+        if running_task_id:
+            await attach_to_download_task(running_task_id, current_user.id)
+            return {
+                "task_id": running_task_id,
+                "manga_id": str(library_item.manga_id),
+                "chapter_id": str(chapter_id_for_download),
+                "user_id": str(current_user.id),
+                "provider": request.provider,
+                "status": "already_downloading",
+                "message": "Chapter is already being downloaded",
+            }
+
+        # Publish the task right away, so followers on other workers can poll
+        # it before the background task starts
+        download_tasks[task_id] = {
+            "task_id": task_id,
+            "manga_id": str(library_item.manga_id),
+            "chapter_id": str(chapter_id_for_download),
+            "user_id": str(current_user.id),
+            "provider": request.provider,
+            "type": "chapter",
+            "status": "queued",
+            "progress": 0,
+        }
+        await publish_download_task(task_id)
+
+        # Add download task to background tasks
         background_tasks.add_task(
             download_chapter_task,
             manga_id=library_item.manga_id,
@@ -1144,6 +1219,7 @@ async def download_chapter_endpoint(
             external_manga_id=request.external_manga_id,
             external_chapter_id=request.external_chapter_id,
             user_id=current_user.id,
+            task_id=task_id,
         )
 
         # Return task information
@@ -1625,6 +1701,95 @@ async def bulk_update_metadata(
         )
 
 
+# Provider fields a refresh copies onto the series, by Manga attribute
+REFRESHED_DETAIL_FIELDS = {
+    "title": "title",
+    "alternative_titles": "alternative_titles",
+    "description": "description",
+    "year": "year",
+    "cover_image": "cover_image",
+    "external_url": "url",
+}
+
+
+@router.post("/bulk/refresh", response_model=BulkOperationResponse)
+async def bulk_refresh(
+    request: BulkRefreshRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    Refresh provider metadata for multiple manga in bulk.
+
+    Series are grouped by provider and looked up with the provider's batched
+    details lookup, so refreshing MangaDex series costs one request per
+    hundred series instead of one per series.
+    """
+    from app.core.providers.registry import provider_registry
+
+    result = await db.execute(
+        select(MangaUserLibrary)
+        .options(selectinload(MangaUserLibrary.manga))
+        .where(
+            MangaUserLibrary.id.in_(request.manga_ids),
+            MangaUserLibrary.user_id == current_user.id,
+        )
+    )
+    library_items = {item.id: item for item in result.scalars().all()}
+    failed_items = [
+        str(library_item_id)
+        for library_item_id in request.manga_ids
+        if library_item_id not in library_items
+    ]
+
+    # provider name -> external ID -> library items of that series
+    by_provider: Dict[str, Dict[str, List[MangaUserLibrary]]] = {}
+    for item in library_items.values():
+        if not item.manga.provider or not item.manga.external_id:
+            failed_items.append(str(item.id))
+            continue
+        by_provider.setdefault(item.manga.provider.lower(), {}).setdefault(
+            item.manga.external_id, []
+        ).append(item)
+
+    updated_count = 0
+    try:
+        for provider_name, series in by_provider.items():
+            provider = provider_registry.get_provider(provider_name)
+            details = {}
+            if provider:
+                try:
+                    details = await provider.get_manga_details_batch(list(series))
+                except Exception as e:
+                    logger.error(f"Error refreshing series from {provider_name}: {e}")
+
+            for external_id, items in series.items():
+                if external_id not in details:
+                    failed_items.extend(str(item.id) for item in items)
+                    continue
+                for field, key in REFRESHED_DETAIL_FIELDS.items():
+                    if details[external_id].get(key):
+                        setattr(items[0].manga, field, details[external_id][key])
+                updated_count += len(items)
+
+        await db.commit()
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error in bulk refresh operation: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to refresh manga",
+        )
+
+    return BulkOperationResponse(
+        message=f"Successfully refreshed {updated_count} manga",
+        updated_count=updated_count,
+        total_requested=len(request.manga_ids),
+        failed_items=failed_items,
+    )
+
+
 @router.post("/read-external-chapter")
 async def read_external_chapter(
     provider: str = Form(...),
@@ -1636,7 +1801,9 @@ async def read_external_chapter(
     Read an external chapter without downloading it (temporary reading).
     """
     try:
+        from app.core.providers.page_manifest import page_manifest_cache
         from app.core.providers.registry import provider_registry
+        from app.core.services.read_ahead import read_ahead_service
 
         # Get the provider
         provider_instance = provider_registry.get_provider(provider)
@@ -1646,19 +1813,32 @@ async def read_external_chapter(
                 detail=f"Provider {provider} not found",
             )
 
-        # Fetch chapter pages directly from provider
-        pages = await provider_instance.get_pages(manga_id, chapter_id)
+        # Fetch chapter pages from the provider, or reuse a recent resolution
+        pages = await page_manifest_cache.get_pages(
+            provider_instance, manga_id, chapter_id
+        )
 
         if not pages:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Chapter pages not found"
             )
 
+        # Start fetching the first pages before the reader asks for them
+        read_ahead_service.read_ahead_external(
+            provider_instance, manga_id, chapter_id, pages, 0
+        )
+
         # Return temporary chapter data for the reader
         return {
             "id": f"temp_{chapter_id}",
             "title": f"Chapter from {provider}",
             "pages": pages,
+            # Served through the read-ahead cache instead of from upstream
+            "page_urls": [
+                f"/api/v1/library/read-external/{provider}/{manga_id}/{chapter_id}"
+                f"/pages/{number}"
+                for number in range(1, len(pages) + 1)
+            ],
             "is_temporary": True,
             "provider": provider,
             "external_manga_id": manga_id,
@@ -1671,3 +1851,51 @@ async def read_external_chapter(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to read external chapter",
         )
+
+
+@router.get("/read-external/{provider}/{manga_id}/{chapter_id}/pages/{page_number}")
+async def get_external_chapter_page(
+    provider: str,
+    manga_id: str,
+    chapter_id: str,
+    page_number: int,
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """
+    Get a page of an external chapter being read without downloading it.
+
+    Pages are fetched through the provider and the following pages are read
+    ahead into memory, so page turns are usually served without waiting on
+    the upstream site.
+    """
+    from app.core.providers.registry import provider_registry
+    from app.core.services.read_ahead import read_ahead_service
+
+    provider_instance = provider_registry.get_provider(provider)
+    if not provider_instance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Provider {provider} not found",
+        )
+
+    try:
+        page = await read_ahead_service.get_external_page(
+            provider_instance, manga_id, chapter_id, page_number
+        )
+    except Exception as e:
+        logging.error(f"Error fetching external page {page_number}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Failed to fetch page from provider",
+        )
+
+    if not page:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Page not found"
+        )
+
+    return Response(
+        content=page.content,
+        media_type=page.media_type,
+        headers={"ETag": page.etag, "Cache-Control": "private, max-age=3600"},
+    )
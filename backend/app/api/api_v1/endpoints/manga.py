@@ -1,7 +1,11 @@
+import json
 import logging
+import mimetypes
 import os
+import time
 import uuid
-from typing import Any, Dict, List
+import zipfile
+from typing import Any, Dict, List, Optional
 
 from fastapi import (
     APIRouter,
@@ -10,17 +14,33 @@ from fastapi import (
     File,
     HTTPException,
     Query,
+    Request,
     UploadFile,
     status,
 )
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.deps import get_current_user, get_db
 from app.core.providers.registry import provider_registry
+from app.core.services.archive_pages import (
+    archive_page_reader,
+    count_archive_pages,
+    is_page_archive,
+)
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.page_store import page_store
 from app.core.services.provider_matching import provider_matching_service
+from app.core.services.read_ahead import read_ahead_service
+from app.core.services.series_matcher import series_matcher
+from app.core.services.thumbnails import (
+    COVER_SIZES,
+    THUMBNAIL_FORMATS,
+    thumbnail_service,
+)
 from app.core.utils import (
     get_cover_storage_path,
     get_manga_storage_path,
@@ -234,9 +254,16 @@ async def delete_manga(
             detail="Manga not found",
         )
 
+    # Images of its pages, unless other chapters share them, go with it
+    result = await db.execute(
+        select(Page.file_path).join(Chapter).where(Chapter.manga_id == manga.id)
+    )
+    page_paths = result.scalars().all()
+
     # Delete manga
     await db.delete(manga)
     await db.commit()
+    await page_store.collect_unreferenced(db, page_paths)
 
 
 @router.post("/{manga_id}/cover", response_model=MangaSchema)
@@ -385,10 +412,8 @@ async def refresh_manga_chapters(
         )
 
     try:
-        # Fetch chapters from provider
-        chapters_data, total_chapters, has_more = await provider.get_chapters(
-            external_id
-        )
+        # Fetch every page of the chapter list from the provider
+        chapters_data = await provider.get_all_chapters(external_id)
 
         if not chapters_data:
             return {
@@ -538,6 +563,12 @@ async def sync_chapter_download_status(
                         if any(file.lower().endswith(ext) for ext in image_extensions):
                             has_images = True
                             break
+                elif is_page_archive(chapter.file_path):
+                    # Downloads are stored as CBZ archives
+                    has_images = (
+                        await run_in_threadpool(count_archive_pages, chapter.file_path)
+                        > 0
+                    )
 
                 # Update status if needed
                 if has_images and chapter.download_status != "downloaded":
@@ -549,11 +580,9 @@ async def sync_chapter_download_status(
                 elif has_images and chapter.download_status == "downloaded":
                     already_correct += 1
                 elif not has_images and chapter.download_status == "downloaded":
-                    # Directory exists but no images - mark as error
+                    # Directory or archive exists but no images - mark as error
                     chapter.download_status = "error"
-                    chapter.download_error = (
-                        "Chapter directory exists but contains no images"
-                    )
+                    chapter.download_error = "Chapter files exist but contain no images"
                     updated_count += 1
                     logger.warning(
                         f"Chapter {chapter.number} directory exists but has no images"
@@ -607,7 +636,7 @@ async def get_external_manga_details(
         manga_details = await provider_instance.get_manga_details(manga_id)
 
         # Get chapters from the provider
-        chapters, _, _ = await provider_instance.get_chapters(manga_id)
+        chapters = await provider_instance.get_all_chapters(manga_id)
 
         # Add chapters to the manga details
         manga_details["chapters"] = chapters
@@ -620,13 +649,86 @@ async def get_external_manga_details(
         )
 
 
+# Covers can be rewritten in place, so cached copies are revalidated by ETag
+COVER_CACHE_SECONDS = 3600
+
+
+def _file_etag(path: str) -> str:
+    """An ETag that changes whenever the file is rewritten."""
+    info = os.stat(path)
+    return f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
+
+def _cover_file_response(
+    request: Request, path: str, headers: Dict[str, str], **kwargs
+) -> Response:
+    """Serve a cover file, or 304 if the client's copy is still current."""
+    headers = {**headers, "ETag": _file_etag(path)}
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path=path, headers=headers, **kwargs)
+
+
+async def _cover_response(
+    request: Request,
+    manga_id: uuid.UUID,
+    cover_path: str,
+    media_type: str,
+    size: Optional[str],
+) -> Response:
+    """Serve a cover, or one of its thumbnails when a size is requested."""
+    headers = {"Cache-Control": f"public, max-age={COVER_CACHE_SECONDS}"}
+
+    if size:
+        extension = (
+            "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+        )
+        headers["Vary"] = "Accept"
+
+        variant_path = thumbnail_service.get_cover_variant_path(
+            manga_id, size, extension
+        )
+        if not variant_path:
+            await thumbnail_service.generate_cover_thumbnails(manga_id)
+            variant_path = thumbnail_service.get_cover_variant_path(
+                manga_id, size, extension
+            )
+        if variant_path:
+            return _cover_file_response(
+                request,
+                variant_path,
+                headers,
+                media_type=THUMBNAIL_FORMATS[extension],
+            )
+
+    return _cover_file_response(
+        request,
+        cover_path,
+        headers,
+        media_type=media_type,
+        filename=f"cover_{manga_id}.jpg",
+    )
+
+
 @router.get("/{manga_id}/cover")
 async def get_manga_cover(
     manga_id: str,
+    request: Request,
+    size: Optional[str] = Query(
+        None,
+        pattern=f"^({'|'.join(COVER_SIZES)})$",
+        description="Thumbnail size; the original cover is served if omitted",
+    ),
+    v: Optional[str] = Query(
+        None, description="Manga version, changes the URL when the manga is updated"
+    ),
     db: AsyncSession = Depends(get_db),
 ) -> FileResponse:
     """
     Get the cover image for a manga.
+
+    With ``size``, a resized thumbnail is served as WebP to clients that
+    accept it and as JPEG otherwise.
     """
     # Check if manga exists
     manga = await db.get(Manga, uuid.UUID(manga_id))
@@ -641,9 +743,7 @@ async def get_manga_cover(
 
     if os.path.exists(cover_path):
         # Return local cover file
-        return FileResponse(
-            path=cover_path, media_type="image/jpeg", filename=f"cover_{manga_id}.jpg"
-        )
+        return await _cover_response(request, manga.id, cover_path, "image/jpeg", size)
 
     # If no local file, check if we have an external cover URL
     if manga.cover_image and (
@@ -651,8 +751,6 @@ async def get_manga_cover(
         or manga.cover_image.startswith("https://")
     ):
         # Download and cache the external cover
-        pass
-
         import httpx
 
         try:
@@ -672,15 +770,14 @@ async def get_manga_cover(
                 media_type = response.headers.get("content-type", "image/jpeg")
                 if not media_type.startswith("image/"):
                     media_type = "image/jpeg"
-
-                return FileResponse(
-                    path=cover_path,
-                    media_type=media_type,
-                    filename=f"cover_{manga_id}.jpg",
-                )
         except Exception:
             # If download fails, fall through to 404
             pass
+        else:
+            await thumbnail_service.generate_cover_thumbnails(manga.id)
+            return await _cover_response(
+                request, manga.id, cover_path, media_type, size
+            )
 
     # No cover available
     raise HTTPException(
@@ -694,63 +791,90 @@ async def get_manga_page(
     manga_id: str,
     chapter_id: str,
     page_number: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> FileResponse:
     """
     Get a specific page from a manga chapter.
+
+    Pages are resolved through the chapter's cached manifest, so serving a
+    page needs no database queries once the chapter has been opened.
     """
-    # Check if manga exists
-    manga = await db.get(Manga, uuid.UUID(manga_id))
-    if not manga:
+    manifest = await chapter_manifest_cache.get(
+        db, uuid.UUID(manga_id), uuid.UUID(chapter_id)
+    )
+    if not manifest:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Manga not found",
+            detail="Chapter not found",
         )
 
-    # Check if chapter exists
-    chapter = await db.get(Chapter, uuid.UUID(chapter_id))
-    if not chapter or chapter.manga_id != uuid.UUID(manga_id):
+    entry = manifest.pages.get(page_number)
+    if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chapter not found",
+            detail="Page not found",
         )
 
-    # Get page from database
-    result = await db.execute(
-        select(Page).where(
-            (Page.chapter_id == uuid.UUID(chapter_id)) & (Page.number == page_number)
-        )
+    headers = {"ETag": entry.etag}
+    if entry.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # Warm the next pages while this one is sent; page turns usually hit memory
+    hot_page = read_ahead_service.get_local_page(
+        manifest.chapter_id, page_number, entry.etag
     )
-    page = result.scalars().first()
+    read_ahead_service.read_ahead_local(manifest, page_number)
+    if hot_page:
+        return Response(
+            content=hot_page.content, media_type=hot_page.media_type, headers=headers
+        )
 
-    if not page:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Page not found",
+    file_ext = mimetypes.guess_extension(entry.media_type) or ".jpg"
+    filename = f"page_{page_number}{file_ext}"
+
+    # Loose page files are served as they are
+    if entry.file_path:
+        if not await run_in_threadpool(os.path.isfile, entry.file_path):
+            # The chapter was reorganized since the manifest was built
+            await chapter_manifest_cache.invalidate(manifest.chapter_id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Page file not found",
+            )
+        return FileResponse(
+            path=entry.file_path,
+            media_type=entry.media_type,
+            filename=filename,
+            headers=headers,
+        )
+
+    # Organized chapters keep their pages inside a CBZ
+    try:
+        archive_page = await run_in_threadpool(
+            archive_page_reader.open_page, entry.archive_path, page_number
         )
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.error(f"Could not read chapter archive {entry.archive_path}: {e}")
+        archive_page = None
 
-    # Check if page file exists
-    if not os.path.exists(page.file_path):
+    if not archive_page:
+        await chapter_manifest_cache.invalidate(manifest.chapter_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Page file not found",
         )
 
-    # Determine media type based on file extension
-    file_ext = os.path.splitext(page.file_path)[1].lower()
-    media_type = "image/jpeg"
-    if file_ext == ".png":
-        media_type = "image/png"
-    elif file_ext == ".gif":
-        media_type = "image/gif"
-    elif file_ext == ".webp":
-        media_type = "image/webp"
-
-    return FileResponse(
-        path=page.file_path,
-        media_type=media_type,
-        filename=f"page_{page_number}{file_ext}",
+    member, content = archive_page
+    return StreamingResponse(
+        content,
+        media_type=member.media_type,
+        headers={
+            **headers,
+            "Content-Length": str(member.size),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
     )
 
 
@@ -823,6 +947,26 @@ async def get_chapter_pages(
     )
     pages = result.scalars().all()
 
+    # Chapters imported or organized as a CBZ may have no page rows
+    if not pages and is_page_archive(chapter.file_path):
+        try:
+            archive_pages = await run_in_threadpool(
+                archive_page_reader.get_pages, chapter.file_path
+            )
+        except (OSError, zipfile.BadZipFile) as e:
+            logger.error(f"Could not read chapter archive {chapter.file_path}: {e}")
+            archive_pages = []
+
+        return [
+            {
+                "id": None,
+                "number": number,
+                "url": f"/api/v1/manga/{manga_id}/chapters/{chapter_id}/pages/{number}",
+                "file_path": None,
+            }
+            for number in range(1, len(archive_pages) + 1)
+        ]
+
     # Return page data with URLs
     page_data = []
     for page in pages:
@@ -1102,17 +1246,24 @@ async def get_chapter_alternatives(
                 detail="Manga or chapter not found",
             )
 
-        # Find alternatives with optimized settings
-        alternatives = await provider_matching_service.find_chapter_alternatives(
-            manga_title=manga.title,
-            chapter_number=chapter.number,
-            original_provider=manga.provider
-            or "mangadex",  # Fixed: mangadex not mangadx
-            max_alternatives=3,  # Reduced for speed
-            timeout_per_provider=8,  # 8 second timeout per provider
-            max_providers_to_search=6,  # Only search top 6 providers
+        # Use precomputed provider matches when the series has been matched
+        alternatives = await series_matcher.get_known_alternatives(
+            db, manga, chapter, max_alternatives=3
         )
 
+        if not alternatives:
+            # Fall back to live search with optimized settings
+            alternatives = await provider_matching_service.find_chapter_alternatives(
+                manga_title=manga.title,
+                chapter_number=chapter.number,
+                original_provider=manga.provider
+                or "mangadex",  # Fixed: mangadex not mangadx
+                max_alternatives=3,  # Reduced for speed
+                timeout_per_provider=8,  # 8 second timeout per provider
+                max_providers_to_search=6,  # Only search top 6 providers
+                total_timeout=15,  # Deadline for the whole search
+            )
+
         # Format response
         alternative_list = []
         for alt in alternatives:
@@ -1140,6 +1291,67 @@ async def get_chapter_alternatives(
         )
 
 
+@router.get("/{manga_id}/chapters/{chapter_id}/alternatives/stream")
+async def stream_chapter_alternatives(
+    manga_id: str,
+    chapter_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """
+    Stream alternative sources for a chapter as newline-delimited JSON.
+
+    Known alternatives are sent first; live search results follow as each
+    provider confirms the chapter.
+    """
+    manga = await db.get(Manga, uuid.UUID(manga_id))
+    chapter = await db.get(Chapter, uuid.UUID(chapter_id))
+
+    if not manga or not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Manga or chapter not found",
+        )
+
+    known_alternatives = await series_matcher.get_known_alternatives(db, manga, chapter)
+
+    def format_alternative(alt) -> str:
+        return (
+            json.dumps(
+                {
+                    "provider_name": alt.provider_name,
+                    "external_manga_id": alt.external_manga_id,
+                    "external_chapter_id": alt.external_chapter_id,
+                    "confidence": alt.confidence,
+                    "chapter_title": alt.chapter_title,
+                    "chapter_number": alt.chapter_number,
+                }
+            )
+            + "\n"
+        )
+
+    async def generate():
+        for alt in known_alternatives:
+            yield format_alternative(alt)
+
+        remaining = 5 - len(known_alternatives)
+        if remaining <= 0:
+            return
+
+        async for alt in provider_matching_service.iter_chapter_alternatives(
+            manga_title=manga.title,
+            chapter_number=chapter.number,
+            original_provider=manga.provider or "mangadex",
+            exclude_providers=[alt.provider_name for alt in known_alternatives],
+            max_alternatives=remaining,
+            timeout_per_provider=8,
+            total_timeout=20,
+        ):
+            yield format_alternative(alt)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @router.post("/{manga_id}/chapters/{chapter_id}/download-from-provider")
 async def download_chapter_from_specific_provider(
     manga_id: str,
@@ -1241,48 +1453,35 @@ async def discover_chapter_alternatives(
                 "status": "completed",
             }
 
+        from app.core.services.background import discover_alternatives_task
+
         # For small number of chapters (< 10), process immediately
         if len(chapters) < 10:
-            discovered_count = 0
-
-            for chapter in chapters:
-                try:
-                    # Find alternatives for this chapter with optimized settings
-                    alternatives = (
-                        await provider_matching_service.find_chapter_alternatives(
-                            manga_title=manga.title,
-                            chapter_number=chapter.number,
-                            original_provider=manga.provider or "mangadex",
-                            max_alternatives=2,  # Reduced for speed
-                            timeout_per_provider=5,  # 5 second timeout per provider
-                            max_providers_to_search=4,  # Only search top 4 providers
-                        )
-                    )
-
-                    if alternatives:
-                        # Store provider external IDs
-                        if not chapter.provider_external_ids:
-                            chapter.provider_external_ids = {}
-
-                        # Store fallback providers
-                        fallback_providers = []
-
-                        for alt in alternatives:
-                            chapter.provider_external_ids[alt.provider_name.lower()] = (
-                                alt.external_chapter_id
-                            )
-                            fallback_providers.append(alt.provider_name)
-
-                        chapter.fallback_providers = fallback_providers
-                        discovered_count += 1
-
-                except Exception as e:
-                    logger.warning(
-                        f"Error discovering alternatives for chapter {chapter.id}: {e}"
-                    )
-                    continue
+            # Search each provider once and map its chapters onto ours, but
+            # never hold the request longer than the inline deadline. Matches
+            # from the providers that answered in time are stored either way.
+            started = time.monotonic()
+            await series_matcher.match_series(
+                db, manga, timeout=series_matcher.inline_timeout
+            )
+            discovered_count = sum(
+                1 for chapter in chapters if chapter.fallback_providers
+            )
 
-            await db.commit()
+            if time.monotonic() - started >= series_matcher.inline_timeout:
+                # Providers cut off at the deadline get the full matching time
+                background_tasks.add_task(
+                    discover_alternatives_task,
+                    manga_id=uuid.UUID(manga_id),
+                    manga_title=manga.title,
+                    provider=manga.provider or "mangadex",
+                )
+                return {
+                    "message": "Alternative discovery is taking longer and continues in the background.",
+                    "discovered_count": discovered_count,
+                    "total_chapters": len(chapters),
+                    "status": "queued",
+                }
 
             return {
                 "message": f"Discovered alternatives for {discovered_count} chapters",
@@ -1293,9 +1492,6 @@ async def discover_chapter_alternatives(
 
         # For large number of chapters, queue as background task
         else:
-            # Add background task
-            from app.core.services.background import discover_alternatives_task
-
             background_tasks.add_task(
                 discover_alternatives_task,
                 manga_id=uuid.UUID(manga_id),
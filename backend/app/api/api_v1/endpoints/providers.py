@@ -3,8 +3,16 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List
 
 import httpx
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
-from fastapi.responses import Response
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -16,7 +24,12 @@ from app.core.providers.base import (
     ProviderError,
     RateLimitError,
 )
+from app.core.providers.page_manifest import (
+    EXPIRED_PAGE_STATUS_CODES,
+    page_manifest_cache,
+)
 from app.core.providers.registry import provider_registry
+from app.core.services.image_proxy_cache import CachedImage, image_proxy_cache
 from app.core.services.provider_monitor import provider_monitor
 from app.db.session import AsyncSessionLocal
 from app.models.provider import ProviderStatus
@@ -501,18 +514,16 @@ async def get_provider_manga_details(
         # Get manga details
         manga_details = await provider.get_manga_details(manga_id)
 
-        # Get chapters
-        chapters, total_chapters, has_more_chapters = await provider.get_chapters(
-            manga_id
-        )
+        # Get every page of the chapter list
+        chapters = await provider.get_all_chapters(manga_id)
 
         return {
             "provider_id": provider_id,
             "provider_name": provider.name,
             "manga": manga_details,
             "chapters": chapters,
-            "total_chapters": total_chapters,
-            "has_more_chapters": has_more_chapters,
+            "total_chapters": len(chapters),
+            "has_more_chapters": False,
         }
 
     except AntiBotError as e:
@@ -730,14 +741,37 @@ async def manually_disable_provider(
         )
 
 
+IMAGE_PROXY_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET",
+    "Cache-Control": "public, max-age=86400",  # Cache for 1 day
+}
+
+
+def _cached_image_response(request: Request, image: CachedImage) -> Response:
+    """Serve a cached image from disk, answering 304 if the client has it."""
+    headers = {**IMAGE_PROXY_HEADERS, "ETag": image.etag}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if image.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(image.path, media_type=image.content_type, headers=headers)
+
+
 @router.get("/image-proxy")
 async def proxy_image(
+    request: Request,
     url: str = Query(..., description="Image URL to proxy"),
 ):
     """
     Proxy external images to avoid CORS issues.
     This endpoint fetches images from external providers and serves them
     with proper CORS headers so the frontend can display them.
+
+    Images are cached on disk: hits are served from the file with an ETag,
+    misses are streamed to the client while being written to the cache, and
+    concurrent requests for the same URL share a single upstream fetch.
     """
     try:
         # Validate URL
@@ -747,6 +781,39 @@ async def proxy_image(
                 detail="Invalid URL format",
             )
 
+        # Validate the URL to prevent SSRF attacks
+        parsed_url = httpx.URL(url)
+
+        # Block internal/private networks
+        if (
+            parsed_url.host in ["localhost", "127.0.0.1", "0.0.0.0"]
+            or parsed_url.host.startswith("192.168.")
+            or parsed_url.host.startswith("10.")
+            or parsed_url.host.startswith("172.")
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Access to internal networks is not allowed",
+            )
+
+        # Only allow HTTP/HTTPS
+        if parsed_url.scheme not in ["http", "https"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only HTTP and HTTPS schemes are allowed",
+            )
+
+        # Only allow standard HTTP/HTTPS ports
+        if parsed_url.port and parsed_url.port not in [80, 443, 8080, 8443]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only standard HTTP ports are allowed",
+            )
+
+        cached = await image_proxy_cache.lookup(url)
+        if cached:
+            return _cached_image_response(request, cached)
+
         # Set headers to mimic browser request and avoid hotlinking protection
         user_agent = (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -762,64 +829,48 @@ async def proxy_image(
             "Accept-Language": "en-US,en;q=0.9",
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Validate the URL to prevent SSRF attacks
-            parsed_url = httpx.URL(url)
-
-            # Block internal/private networks
-            if (
-                parsed_url.host in ["localhost", "127.0.0.1", "0.0.0.0"]
-                or parsed_url.host.startswith("192.168.")
-                or parsed_url.host.startswith("10.")
-                or parsed_url.host.startswith("172.")
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Access to internal networks is not allowed",
-                )
+        fetch, is_leader = image_proxy_cache.fetch(url, headers)
+        if not is_leader:
+            # Another request is already fetching this URL; serve its result
+            cached = await fetch.done
+            if cached:
+                return _cached_image_response(request, cached)
+            if fetch.error is None and fetch.ready.result()[0] == 200:
+                # Fetched fine but not stored (cache disabled or full disk)
+                fetch, is_leader = image_proxy_cache.fetch(url, headers)
 
-            # Only allow HTTP/HTTPS
-            if parsed_url.scheme not in ["http", "https"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Only HTTP and HTTPS schemes are allowed",
-                )
+        status_code, content_type = await fetch.ready
 
-            # Only allow standard HTTP/HTTPS ports
-            if parsed_url.port and parsed_url.port not in [80, 443, 8080, 8443]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Only standard HTTP ports are allowed",
-                )
+        if status_code != 200:
+            # The reader will resolve fresh page URLs next time
+            if status_code in EXPIRED_PAGE_STATUS_CODES:
+                page_manifest_cache.invalidate_url(url)
 
-            response = await client.get(url, headers=headers, follow_redirects=False)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Image not found (HTTP {status_code})",
+            )
 
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "image/jpeg")
+        # Ensure it's an image
+        if not content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="URL does not point to an image",
+            )
 
-                # Ensure it's an image
-                if not content_type.startswith("image/"):
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="URL does not point to an image",
-                    )
+        if not is_leader:
+            # Only reached when the shared fetch failed midway
+            raise fetch.error or httpx.RequestError("Upstream fetch failed")
 
-                # Return image with proper CORS headers
-                return Response(
-                    content=response.content,
-                    media_type=content_type,
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Methods": "GET",
-                        "Cache-Control": "public, max-age=3600",  # Cache for 1 hour
-                    },
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Image not found (HTTP {response.status_code})",
-                )
+        # Stream the image while the cache writes it to disk
+        return StreamingResponse(
+            fetch.stream(),
+            media_type=content_type,
+            headers=IMAGE_PROXY_HEADERS,
+        )
 
+    except HTTPException:
+        raise
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=status.HTTP_408_REQUEST_TIMEOUT,
@@ -1,13 +1,16 @@
 import asyncio
 import logging
+import time
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.deps import get_current_user, get_db
 from app.core.providers.registry import provider_registry
+from app.core.providers.search_planner import search_planner
 from app.core.providers.user_preferences import (
     apply_fallback_prioritization,
     get_user_provider_preferences,
@@ -327,6 +330,10 @@ async def search_manga(
     # Get user's provider preferences
     user_preferences = await get_user_provider_preferences(db, current_user.id)
 
+    # Every provider must answer within the search budget
+    search_budget = settings.PROVIDER_SEARCH_BUDGET_SECONDS
+    search_deadline = time.monotonic() + search_budget
+
     if user_preferences:
         # Use user preferences for prioritization
         priority_providers, regular_providers = (
@@ -334,27 +341,33 @@ async def search_manga(
         )
         # Limit regular providers to avoid too many requests
         max_regular_providers = 20
-        selected_providers = (
-            priority_providers + regular_providers[:max_regular_providers]
+        planned_providers = search_planner.plan(
+            priority_providers,
+            regular_providers,
+            budget=search_budget,
+            max_other_providers=max_regular_providers,
         )
 
-        regular_count = min(len(regular_providers), max_regular_providers)
         logger.info(
             f"Using user preferences: {len(priority_providers)} favorite providers, "
-            f"{regular_count} regular providers"
+            f"{len(planned_providers) - len(priority_providers)} regular providers"
         )
     else:
         # Fallback to hardcoded prioritization for users without preferences
         priority_providers, generic_providers = apply_fallback_prioritization(
             all_providers
         )
-        selected_providers = priority_providers + generic_providers
+        planned_providers = search_planner.plan(
+            priority_providers, generic_providers, budget=search_budget
+        )
 
         logger.info(
             f"Using fallback prioritization: {len(priority_providers)} priority providers, "
             f"{len(generic_providers)} generic providers"
         )
 
+    selected_providers = [planned.provider for planned in planned_providers]
+
     # Calculate pagination for multi-provider search
     # We need to gather enough results to satisfy the requested page
     # Strategy: Get multiple pages from providers to ensure we have enough results
@@ -375,22 +388,25 @@ async def search_manga(
     # Calculate which page to request from each provider
     # For multi-provider search, we'll request multiple pages if needed
     max_pages_per_provider = max(
-        1, (total_needed // len(selected_providers) // results_per_provider) + 1
+        1, (total_needed // max(1, len(selected_providers)) // results_per_provider) + 1
     )
     max_pages_per_provider = min(
         max_pages_per_provider, 3
     )  # Limit to 3 pages per provider
 
     logger.info(f"Total providers to search: {len(selected_providers)}")
-    logger.info(f"Selected providers: {[p.name for p in selected_providers]}")
+    logger.info(
+        f"Selected providers: {[(p.provider.name, round(p.timeout, 1)) for p in planned_providers]}"
+    )
     logger.info(f"Results per provider: {results_per_provider}")
     logger.info(f"Max pages per provider: {max_pages_per_provider}")
     logger.info(
         f"Requested page: {query.page}, offset: {offset}, total needed: {total_needed}"
     )
 
-    # Search with all selected providers concurrently with timeout
-    async def search_with_provider(provider):
+    # Search with all selected providers concurrently with planned timeouts
+    async def search_with_provider(planned):
+        provider = planned.provider
         try:
             logger.info(
                 f"Starting search with provider {provider.name} (class: {provider.__class__.__name__})"
@@ -401,6 +417,12 @@ async def search_manga(
 
             # Get multiple pages from this provider if needed
             for page_num in range(1, max_pages_per_provider + 1):
+                # Never wait past the overall search deadline
+                timeout = min(planned.timeout, search_deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+
+                started_at = time.monotonic()
                 try:
                     # Add timeout to prevent slow providers from blocking
                     results, total, has_next = await asyncio.wait_for(
@@ -409,8 +431,12 @@ async def search_manga(
                             page=page_num,
                             limit=results_per_provider,
                         ),
-                        timeout=15.0,  # Increased timeout to 15 seconds
+                        timeout=timeout,
                     )
+                    if page_num == 1:
+                        search_planner.record_result(
+                            provider.name, True, time.monotonic() - started_at
+                        )
 
                     all_results.extend(results)
                     provider_has_more = has_next
@@ -424,6 +450,10 @@ async def search_manga(
                         break
 
                 except Exception as e:
+                    if page_num == 1:
+                        search_planner.record_result(
+                            provider.name, False, time.monotonic() - started_at
+                        )
                     logger.warning(
                         f"Error getting page {page_num} from {provider.name}: {e}"
                     )
@@ -445,7 +475,9 @@ async def search_manga(
                 )
             return results, provider_has_more
         except asyncio.TimeoutError:
-            logger.warning(f"Provider {provider.name} timed out after 15 seconds")
+            logger.warning(
+                f"Provider {provider.name} timed out after {planned.timeout:.1f} seconds"
+            )
             return [], False
         except Exception as e:
             logger.error(f"Error searching with provider {provider.name}: {e}")
@@ -455,7 +487,7 @@ async def search_manga(
             return [], False
 
     # Run searches concurrently
-    search_tasks = [search_with_provider(provider) for provider in selected_providers]
+    search_tasks = [search_with_provider(planned) for planned in planned_providers]
     all_results = await asyncio.gather(*search_tasks, return_exceptions=True)
 
     # Flatten results and handle exceptions
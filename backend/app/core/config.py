@@ -52,6 +52,7 @@ class Settings(BaseSettings):
 
     # Storage settings
     STORAGE_PATH: str = "/app/storage"
+    PAGE_DEDUP_ENABLED: bool = False  # Store identical page images only once
 
     # Backup settings
     BACKUP_PATH: str = "/app/backups"
@@ -73,6 +74,63 @@ class Settings(BaseSettings):
     PROVIDER_AUTO_DISABLE_ENABLED: bool = True
     PROVIDER_AUTO_ENABLE_ENABLED: bool = True
 
+    # Background provider series matching
+    PROVIDER_MATCHING_ENABLED: bool = True
+    PROVIDER_MATCHING_REVERIFY_HOURS: int = 72  # Re-verify matches every 3 days
+    PROVIDER_MATCHING_BATCH_SIZE: int = 10  # Series matched per cycle
+
+    # Multi-provider search deadline
+    PROVIDER_SEARCH_BUDGET_SECONDS: float = 15.0  # Total time budget per search
+    PROVIDER_SEARCH_MIN_TIMEOUT_SECONDS: float = 3.0  # Floor for per-provider timeouts
+
+    # Provider HTTP response cache (ETag / Last-Modified revalidation)
+    PROVIDER_HTTP_CACHE_ENABLED: bool = True
+    PROVIDER_HTTP_CACHE_MAX_MB: int = 256  # Disk space for cached responses
+
+    # Image proxy disk cache
+    IMAGE_PROXY_CACHE_ENABLED: bool = True
+    IMAGE_PROXY_CACHE_MAX_MB: int = 1024  # Disk space for proxied images
+
+    # Cover thumbnails
+    THUMBNAIL_WORKERS: int = 2  # Processes used to resize covers
+
+    # CBZ conversion
+    CBZ_CONVERSION_WORKERS: int = 4  # Processes repacking chapters into CBZ files
+
+    # Recurring credit/ad page filtering: "off", "learn" or "skip"
+    PAGE_FILTER_MODE: str = "off"
+    PAGE_FILTER_WORKERS: int = 2  # Processes fingerprinting pages
+    PAGE_FILTER_EDGE_PAGES: int = 3  # Pages checked at each end of a chapter
+    PAGE_FILTER_SERIES_REPEATS: int = 3  # Chapters of a series a page recurs in
+    PAGE_FILTER_PROVIDER_REPEATS: int = 3  # Series of a provider a page recurs in
+
+    # Background re-encoding of stored pages: "lossless", "webp" or "avif"
+    IMAGE_OPTIMIZATION_ENABLED: bool = False
+    IMAGE_OPTIMIZATION_MODE: str = "lossless"
+    IMAGE_OPTIMIZATION_QUALITY: int = 80  # Quality of lossy re-encodes
+    IMAGE_OPTIMIZATION_MIN_SAVING: float = 0.1  # Keep re-encodes this much smaller
+    IMAGE_OPTIMIZATION_WORKERS: int = 1  # Low-priority processes re-encoding pages
+    IMAGE_OPTIMIZATION_MAX_LOAD: float = 0.75  # Pause above this load per CPU
+    IMAGE_OPTIMIZATION_BATCH_SIZE: int = 20  # Chapters per cycle
+
+    # Reader read-ahead
+    READ_AHEAD_CACHE_MB: int = 256  # Memory for prefetched page images
+    READ_AHEAD_PAGES: int = 4  # Pages warmed after the one being read
+    READ_AHEAD_NEXT_CHAPTER_PAGES: int = 3  # Pages of the next chapter to warm
+
+    # Series downloads
+    DOWNLOAD_CONCURRENT_CHAPTERS: int = 3  # Chapters of one series in parallel
+    DOWNLOAD_MAX_REQUESTS: int = 8  # Page requests in flight across all series
+    DOWNLOAD_MAX_REQUESTS_PER_PROVIDER: int = 4  # Page requests per provider
+    DOWNLOAD_BYTES_PER_SECOND: int = 0  # Page download budget, 0 for unlimited
+    # Store chapters only as a CBZ with no Page rows; off keeps loose pages
+    DOWNLOAD_CHAPTERS_AS_CBZ: bool = False
+
+    # Hedged chapter downloads
+    DOWNLOAD_HEDGING_ENABLED: bool = True  # Race a second source if one is slow
+    DOWNLOAD_HEDGE_FIRST_PAGES: int = 3  # Pages the primary must deliver in time
+    DOWNLOAD_HEDGE_DEFAULT_SECONDS: float = 20.0  # Wait before latency is known
+
     # Email
     MAIL_MAILER: str = "smtp"
     MAIL_HOST: str = "mailhog"
@@ -7,8 +7,19 @@ from redis.asyncio import Redis
 from app.core.config import settings
 from app.core.deps import set_redis_client
 from app.core.jobs import queue_manager
+from app.core.providers.flaresolverr import close_session_pools
+from app.core.services.archive_pages import archive_page_reader
 from app.core.services.backup import scheduled_backup_service
+from app.core.services.cbz_converter import cbz_converter
+from app.core.services.file_index import close_file_indexes
+from app.core.services.image_optimizer import image_optimizer
+from app.core.services.image_proxy_cache import image_proxy_cache
+from app.core.services.page_filter import page_filter
+from app.core.services.page_store import page_store
 from app.core.services.provider_monitor import provider_monitor
+from app.core.services.read_ahead import read_ahead_service
+from app.core.services.series_matcher import series_matcher
+from app.core.services.thumbnails import thumbnail_service
 from app.db.init_db import init_db
 from app.db.session import engine
 
@@ -98,6 +109,32 @@ def startup_event_handler(app: FastAPI) -> Callable:
             logger.error(f"Error starting download queue manager: {e}")
             # Don't raise here as download queue is not critical for app startup
 
+        # Start background re-encoding of stored pages
+        if settings.IMAGE_OPTIMIZATION_ENABLED:
+            try:
+                await image_optimizer.start()
+                logger.info("Image optimizer started successfully")
+            except Exception as e:
+                logger.error(f"Error starting image optimizer: {e}")
+
+        # Start sweeping unreferenced page blobs
+        if settings.PAGE_DEDUP_ENABLED:
+            try:
+                await page_store.start()
+                logger.info("Page store sweep started successfully")
+            except Exception as e:
+                logger.error(f"Error starting page store sweep: {e}")
+
+        # Start background provider series matcher
+        if settings.PROVIDER_MATCHING_ENABLED:
+            try:
+                await series_matcher.start()
+                logger.info("Series matcher started successfully")
+            except Exception as e:
+                logger.error(f"Error starting series matcher: {e}")
+        else:
+            logger.info("Series matcher disabled by configuration")
+
         logger.info("Application startup complete")
 
     return start_app
@@ -119,6 +156,27 @@ def shutdown_event_handler(app: FastAPI) -> Callable:
         except Exception as e:
             logger.warning(f"Error stopping provider monitoring: {e}")
 
+        # Stop series matcher
+        try:
+            await series_matcher.stop()
+            logger.info("Series matcher stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping series matcher: {e}")
+
+        # Stop image optimizer
+        try:
+            await image_optimizer.stop()
+            logger.info("Image optimizer stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping image optimizer: {e}")
+
+        # Stop page store sweep
+        try:
+            await page_store.stop()
+            logger.info("Page store sweep stopped")
+        except Exception as e:
+            logger.warning(f"Error stopping page store sweep: {e}")
+
         # Stop download queue manager
         try:
             await queue_manager.stop()
@@ -126,6 +184,54 @@ def shutdown_event_handler(app: FastAPI) -> Callable:
         except Exception as e:
             logger.warning(f"Error stopping download queue manager: {e}")
 
+        # Close pooled FlareSolverr sessions and clients
+        try:
+            await close_session_pools()
+        except Exception as e:
+            logger.warning(f"Error closing FlareSolverr session pools: {e}")
+
+        # Close the image proxy's upstream client
+        try:
+            await image_proxy_cache.close()
+        except Exception as e:
+            logger.warning(f"Error closing image proxy client: {e}")
+
+        # Stop the thumbnail worker processes
+        try:
+            thumbnail_service.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping thumbnail workers: {e}")
+
+        # Stop the CBZ conversion worker processes
+        try:
+            cbz_converter.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping CBZ conversion workers: {e}")
+
+        # Stop the page fingerprinting worker processes
+        try:
+            page_filter.shutdown()
+        except Exception as e:
+            logger.warning(f"Error stopping page fingerprinting workers: {e}")
+
+        # Close chapter archives held open for page serving
+        try:
+            archive_page_reader.close()
+        except Exception as e:
+            logger.warning(f"Error closing chapter archives: {e}")
+
+        # Close the storage file indexes
+        try:
+            close_file_indexes()
+        except Exception as e:
+            logger.warning(f"Error closing file indexes: {e}")
+
+        # Stop reader prefetches
+        try:
+            await read_ahead_service.close()
+        except Exception as e:
+            logger.warning(f"Error stopping reader read-ahead: {e}")
+
         # Close Redis connection
         if hasattr(app.state, "redis") and app.state.redis:
             try:
@@ -0,0 +1,139 @@
+"""
+Per-domain memory of which anti-bot route gets through.
+
+A request to a protected domain can go out directly, directly with a stored
+Cloudflare clearance, or through FlareSolverr. The memory keeps decaying
+success and failure counts for each route per domain so callers can skip a
+route that keeps getting challenged instead of paying a wasted round-trip on
+every request. Because the counts decay, a skipped route is probed again once
+its failures have aged out, so a site that drops its protection is noticed.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AntiBotRoute(str, Enum):
+    """Ways a request can reach a domain."""
+
+    DIRECT = "direct"
+    CLEARANCE = "clearance"  # Direct, with cookies from a solved challenge
+    FLARESOLVERR = "flaresolverr"
+
+
+@dataclass
+class RouteStats:
+    """Exponentially decaying outcome counts for one route on one domain."""
+
+    successes: float = 0.0
+    failures: float = 0.0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def decay(self, now: float, half_life: float) -> None:
+        factor = 0.5 ** (max(0.0, now - self.updated_at) / half_life)
+        self.successes *= factor
+        self.failures *= factor
+        self.updated_at = now
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        total = self.successes + self.failures
+        if total <= 0:
+            return None
+        return self.successes / total
+
+
+class AntiBotRouteMemory:
+    """Learn per domain which anti-bot routes succeed."""
+
+    HALF_LIFE_SECONDS = 1800
+    MIN_FAILURES = 1.5  # About two recent failures before a route is skipped
+    MAX_SUCCESS_RATE = 0.2  # Routes doing better than this are kept
+
+    def __init__(self, half_life_seconds: Optional[float] = None):
+        self.half_life_seconds = half_life_seconds or self.HALF_LIFE_SECONDS
+        self._routes: Dict[Tuple[str, AntiBotRoute], RouteStats] = {}
+
+    def record(self, domain: str, route: AntiBotRoute, success: bool) -> None:
+        """
+        Record whether a request over a route got past the domain's protection.
+
+        Args:
+            domain: Host the request was sent to
+            route: Route the request took
+            success: False if the request was challenged or blocked
+        """
+        stats = self._get_stats(domain, route)
+        was_doomed = self._is_doomed(stats)
+
+        if success:
+            stats.successes += 1
+        else:
+            stats.failures += 1
+
+        if was_doomed != self._is_doomed(stats):
+            state = "skipping" if not was_doomed else "using again"
+            logger.info(f"Anti-bot routing for {domain}: {state} {route.value} route")
+
+    def is_doomed(self, domain: str, route: AntiBotRoute) -> bool:
+        """Whether recent requests over a route to a domain keep failing."""
+        key = (domain, route)
+        if key not in self._routes:
+            return False
+        return self._is_doomed(self._get_stats(domain, route))
+
+    def forget(self, domain: str) -> None:
+        """Drop everything learned about a domain."""
+        for key in [key for key in self._routes if key[0] == domain]:
+            del self._routes[key]
+
+    def get_domain_routes(self, domain: str) -> Dict[str, Dict[str, Any]]:
+        """Get the learned state of each route tried for a domain."""
+        routes = {}
+        for route_domain, route in list(self._routes):
+            if route_domain != domain:
+                continue
+            stats = self._get_stats(domain, route)
+            routes[route.value] = {
+                "successes": round(stats.successes, 2),
+                "failures": round(stats.failures, 2),
+                "success_rate": stats.success_rate,
+                "doomed": self._is_doomed(stats),
+            }
+        return routes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory statistics."""
+        doomed = [
+            f"{domain}:{route.value}"
+            for domain, route in list(self._routes)
+            if self.is_doomed(domain, route)
+        ]
+        return {
+            "domains": len({domain for domain, _ in self._routes}),
+            "tracked_routes": len(self._routes),
+            "doomed_routes": doomed,
+        }
+
+    def _get_stats(self, domain: str, route: AntiBotRoute) -> RouteStats:
+        stats = self._routes.get((domain, route))
+        if stats is None:
+            stats = RouteStats()
+            self._routes[(domain, route)] = stats
+        else:
+            stats.decay(time.monotonic(), self.half_life_seconds)
+        return stats
+
+    def _is_doomed(self, stats: RouteStats) -> bool:
+        if stats.failures < self.MIN_FAILURES:
+            return False
+        return stats.success_rate < self.MAX_SUCCESS_RATE
+
+
+# Global instance
+anti_bot_routes = AntiBotRouteMemory()
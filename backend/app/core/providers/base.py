@@ -214,6 +214,10 @@ class AgentStatus(Enum):
 class BaseProvider(ABC):
     """Base class for manga providers."""
 
+    # Seconds a resolved chapter page list stays usable; providers serving
+    # expiring page URLs should lower this
+    page_manifest_ttl: int = 6 * 3600
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -361,6 +365,63 @@ class BaseProvider(ABC):
             - Whether there are more chapters
         """
 
+    async def get_all_chapters(
+        self, manga_id: str, max_pages: Optional[int] = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Get every chapter of a manga.
+
+        Default implementation walks get_chapters page by page. Providers
+        that can list chapters in fewer or concurrent requests should
+        override this method.
+
+        Args:
+            manga_id: The ID of the manga
+            max_pages: Maximum number of pages to request, or None for no limit
+
+        Returns:
+            List of chapters
+        """
+        chapters: List[Dict[str, Any]] = []
+        page = 1
+
+        while max_pages is None or page <= max_pages:
+            page_chapters, _, has_next = await self.get_chapters(
+                manga_id, page=page, limit=100
+            )
+            chapters.extend(page_chapters)
+            if not page_chapters or not has_next:
+                break
+            page += 1
+
+        return chapters
+
+    async def get_manga_details_batch(
+        self, manga_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get details for several manga at once.
+
+        Default implementation fetches each manga in turn. Providers with a
+        bulk lookup should override this method.
+
+        Args:
+            manga_ids: The IDs of the manga
+
+        Returns:
+            Manga details keyed by ID; manga that could not be fetched are
+            left out
+        """
+        details = {}
+        for manga_id in manga_ids:
+            try:
+                details[manga_id] = await self.get_manga_details(manga_id)
+            except Exception as e:
+                logger.warning(
+                    f"Error getting details for {manga_id} from {self.name}: {e}"
+                )
+        return details
+
     @abstractmethod
     async def get_pages(self, manga_id: str, chapter_id: str) -> List[str]:
         """
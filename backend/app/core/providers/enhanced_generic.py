@@ -4,12 +4,13 @@ Enhanced Generic Provider with Cloudflare bypass support.
 
 import logging
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 
 import httpx
 from bs4 import BeautifulSoup
 
 from app.core.providers.base import BaseProvider
+from app.core.providers.flaresolverr import get_session_pool
 from app.models.manga import MangaStatus, MangaType
 from app.schemas.search import SearchResult
 
@@ -17,7 +18,11 @@ logger = logging.getLogger(__name__)
 
 
 class FlareSolverrClient:
-    """Simplified FlareSolverr client for the enhanced provider."""
+    """Simplified FlareSolverr client for the enhanced provider.
+
+    Requests go through the shared per-domain session pool, so a challenge is
+    solved once and later requests reuse the clearance cookies directly.
+    """
 
     def __init__(self, flaresolverr_url: str = "http://flaresolverr:8191"):
         self.flaresolverr_url = flaresolverr_url
@@ -26,27 +31,23 @@ class FlareSolverrClient:
     async def get(
         self, url: str, headers: Optional[Dict[str, str]] = None
     ) -> Optional[Dict[str, Any]]:
-        """Make a GET request through FlareSolverr."""
+        """Make a GET request, solving through FlareSolverr only when challenged."""
         try:
-            request_data = {"cmd": "request.get", "url": url, "maxTimeout": 60000}
-
-            if headers:
-                request_data["headers"] = headers
-
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.post(
-                    f"{self.flaresolverr_url}/v1", json=request_data
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("status") == "ok":
-                        solution = data.get("solution", {})
-                        return {
-                            "status_code": solution.get("status"),
-                            "content": solution.get("response"),
-                            "url": solution.get("url"),
-                        }
+            pool = get_session_pool(self.flaresolverr_url)
+            result = await pool.fetch(url, headers)
+            if result:
+                clearance = pool.get_clearance(urlparse(url).netloc)
+                return {
+                    "status_code": result.status_code,
+                    "content": result.text,
+                    "url": result.url,
+                    "cookies": [
+                        {"name": name, "value": value}
+                        for name, value in (
+                            clearance.cookies if clearance else {}
+                        ).items()
+                    ],
+                }
 
         except Exception as e:
             logger.error(f"FlareSolverr request failed for {url}: {e}")
@@ -204,6 +205,13 @@ class EnhancedGenericProvider(BaseProvider):
     async def _make_request(self, url: str) -> Optional[str]:
         """Make a request with Cloudflare bypass if needed."""
 
+        # Protected sites go through the session pool, which reuses clearance
+        if self._use_flaresolverr and self._flaresolverr:
+            result = await self._flaresolverr.get(url, self._headers)
+            if result and result.get("status_code") == 200:
+                return result.get("content")
+            return None
+
         # Try normal request first
         try:
             async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
@@ -0,0 +1,379 @@
+"""
+Per-domain FlareSolverr session pool with clearance-cookie reuse.
+
+Solving a Cloudflare challenge in FlareSolverr starts a headless browser and
+takes several seconds. The pool solves it once per domain inside a persistent
+FlareSolverr session, keeps the resulting ``cf_clearance`` cookie and the
+browser's user agent, and sends later requests for that domain straight
+through a pooled httpx client. FlareSolverr is only used again when a
+challenge reappears or the clearance expires.
+
+Outcomes are fed to the anti-bot route memory, so a domain that challenges
+every direct request is sent straight to FlareSolverr, and a domain whose
+clearance never works outside the browser is fetched through FlareSolverr
+without the direct attempt.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.providers.anti_bot_routing import AntiBotRoute, anti_bot_routes
+
+logger = logging.getLogger(__name__)
+
+CHALLENGE_STATUS_CODES = (403, 503, 521)
+CHALLENGE_MARKERS = ("cloudflare", "checking your browser", "just a moment")
+
+
+def is_challenge_response(response: httpx.Response) -> bool:
+    """Check whether a response is a Cloudflare challenge page."""
+    if response.headers.get("cf-mitigated") == "challenge":
+        return True
+
+    if response.status_code not in CHALLENGE_STATUS_CODES:
+        return False
+
+    content_type = response.headers.get("content-type", "")
+    if content_type and "text/html" not in content_type:
+        return False
+
+    text = response.text.lower()
+    return any(marker in text for marker in CHALLENGE_MARKERS)
+
+
+@dataclass
+class DomainClearance:
+    """Solved challenge state for one domain."""
+
+    cookies: Dict[str, str]
+    user_agent: Optional[str]
+    expires_at: float
+    solved_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def is_valid(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+@dataclass
+class FetchResult:
+    """Text response fetched through the pool."""
+
+    status_code: int
+    text: str
+    url: str
+    from_flaresolverr: bool = False
+
+
+class FlareSolverrSessionPool:
+    """Solve Cloudflare challenges once per domain and reuse the clearance."""
+
+    CLEARANCE_TTL_SECONDS = 1800  # Upper bound when cookies carry no expiry
+    SOLVE_TIMEOUT_MS = 60000
+
+    def __init__(self, flaresolverr_url: str):
+        self.flaresolverr_url = flaresolverr_url.rstrip("/")
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._sessions: Dict[str, str] = {}
+        self._clearances: Dict[str, DomainClearance] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._stats = {"direct": 0, "solves": 0, "challenges": 0, "skipped": 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Optional[FetchResult]:
+        """
+        Fetch a page as text, solving a challenge only when one is served.
+
+        Returns:
+            The fetch result, or None if FlareSolverr could not solve the
+            challenge
+        """
+        domain = urlparse(url).netloc
+        if self._should_try_direct(domain):
+            response = await self._direct_get(domain, url, headers)
+            if not is_challenge_response(response):
+                return FetchResult(
+                    response.status_code, response.text, str(response.url)
+                )
+
+        solution = await self._solve(domain, url, headers)
+        if not solution:
+            return None
+
+        return FetchResult(
+            solution.get("status") or 200,
+            solution.get("response") or "",
+            solution.get("url") or url,
+            from_flaresolverr=True,
+        )
+
+    async def get(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Fetch a URL (e.g. a page image) with the domain's clearance cookies.
+
+        If a challenge is served the domain is solved in FlareSolverr and the
+        request is retried directly with the new clearance, so binary content
+        is always returned by httpx.
+        """
+        domain = urlparse(url).netloc
+        response = None
+        if self.get_clearance(domain) or self._should_try_direct(domain):
+            response = await self._direct_get(domain, url, headers)
+            if not is_challenge_response(response):
+                return response
+
+        # Domains known to challenge uncleared requests are solved up front
+        if await self._solve(domain, url, headers) or response is None:
+            response = await self._direct_get(domain, url, headers)
+
+        return response
+
+    def get_clearance(self, domain: str) -> Optional[DomainClearance]:
+        """Get the current clearance for a domain if it is still valid."""
+        clearance = self._clearances.get(domain)
+        return clearance if clearance and clearance.is_valid else None
+
+    def invalidate(self, domain: str) -> None:
+        """Forget the clearance for a domain."""
+        self._clearances.pop(domain, None)
+        client = self._clients.get(domain)
+        if client:
+            client.cookies.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            **self._stats,
+            "domains": len(self._clients),
+            "valid_clearances": sum(
+                1 for clearance in self._clearances.values() if clearance.is_valid
+            ),
+            "sessions": len(self._sessions),
+        }
+
+    async def close(self) -> None:
+        """Close pooled clients and destroy FlareSolverr sessions."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+        if self._sessions:
+            try:
+                async with httpx.AsyncClient(timeout=30) as client:
+                    for session_id in self._sessions.values():
+                        await client.post(
+                            f"{self.flaresolverr_url}/v1",
+                            json={"cmd": "sessions.destroy", "session": session_id},
+                        )
+            except Exception as e:
+                logger.warning(f"Error destroying FlareSolverr sessions: {e}")
+        self._sessions.clear()
+        self._clearances.clear()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _get_client(self, domain: str) -> httpx.AsyncClient:
+        client = self._clients.get(domain)
+        if client is None:
+            client = httpx.AsyncClient(follow_redirects=True, timeout=30.0)
+            self._clients[domain] = client
+        return client
+
+    def _should_try_direct(self, domain: str) -> bool:
+        """Whether a direct request to a domain is worth its round-trip."""
+        route = (
+            AntiBotRoute.CLEARANCE
+            if self.get_clearance(domain)
+            else AntiBotRoute.DIRECT
+        )
+        if anti_bot_routes.is_doomed(domain, route):
+            self._stats["skipped"] += 1
+            return False
+        return True
+
+    async def _direct_get(
+        self, domain: str, url: str, headers: Optional[Dict[str, str]]
+    ) -> httpx.Response:
+        request_headers = dict(headers or {})
+
+        # cf_clearance is bound to the user agent that solved the challenge
+        clearance = self.get_clearance(domain)
+        if clearance and clearance.user_agent:
+            request_headers["User-Agent"] = clearance.user_agent
+
+        response = await self._get_client(domain).get(url, headers=request_headers)
+        challenged = is_challenge_response(response)
+        if challenged:
+            self._stats["challenges"] += 1
+        else:
+            self._stats["direct"] += 1
+
+        route = AntiBotRoute.CLEARANCE if clearance else AntiBotRoute.DIRECT
+        anti_bot_routes.record(domain, route, not challenged)
+        return response
+
+    async def _solve(
+        self, domain: str, url: str, headers: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Solve a challenge for a domain, one solve at a time per domain."""
+        requested_at = time.monotonic()
+        lock = self._locks.setdefault(domain, asyncio.Lock())
+
+        async with lock:
+            # Another request may have solved the domain while we waited
+            clearance = self.get_clearance(domain)
+            if clearance and clearance.solved_at > requested_at:
+                response = await self._direct_get(domain, url, headers)
+                if not is_challenge_response(response):
+                    return {
+                        "status": response.status_code,
+                        "response": response.text,
+                        "url": str(response.url),
+                    }
+
+            self.invalidate(domain)
+            solution = await self._request_solution(domain, url, headers)
+            anti_bot_routes.record(domain, AntiBotRoute.FLARESOLVERR, bool(solution))
+            if solution:
+                self._store_clearance(domain, solution)
+            return solution
+
+    async def _request_solution(
+        self, domain: str, url: str, headers: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, Any]]:
+        logger.info(f"Solving Cloudflare challenge for {domain} via FlareSolverr")
+        self._stats["solves"] += 1
+
+        try:
+            async with httpx.AsyncClient(timeout=120) as client:
+                session_id = await self._get_session(client, domain)
+
+                request_data = {
+                    "cmd": "request.get",
+                    "url": url,
+                    "maxTimeout": self.SOLVE_TIMEOUT_MS,
+                }
+                if session_id:
+                    request_data["session"] = session_id
+                if headers:
+                    request_data["headers"] = headers
+
+                response = await client.post(
+                    f"{self.flaresolverr_url}/v1", json=request_data
+                )
+                if response.status_code != 200:
+                    logger.warning(
+                        f"FlareSolverr returned HTTP {response.status_code} for {url}"
+                    )
+                    return None
+
+                data = response.json()
+                if data.get("status") != "ok":
+                    logger.warning(
+                        f"FlareSolverr error for {url}: {data.get('message', 'Unknown error')}"
+                    )
+                    # The session may have been lost; recreate it next time
+                    self._sessions.pop(domain, None)
+                    return None
+
+                return data.get("solution", {})
+
+        except Exception as e:
+            logger.warning(f"FlareSolverr request failed for {url}: {e}")
+            return None
+
+    async def _get_session(
+        self, client: httpx.AsyncClient, domain: str
+    ) -> Optional[str]:
+        """Get or create the persistent FlareSolverr session for a domain."""
+        session_id = self._sessions.get(domain)
+        if session_id:
+            return session_id
+
+        try:
+            response = await client.post(
+                f"{self.flaresolverr_url}/v1",
+                json={"cmd": "sessions.create", "session": f"kuroibara_{domain}"},
+            )
+            data = response.json()
+            if data.get("status") == "ok":
+                session_id = data.get("session")
+            elif "already exists" in data.get("message", "").lower():
+                # Left over from a previous run; reuse it
+                session_id = f"kuroibara_{domain}"
+        except Exception as e:
+            logger.warning(f"Could not create FlareSolverr session for {domain}: {e}")
+            return None
+
+        if session_id:
+            self._sessions[domain] = session_id
+            logger.info(f"Created FlareSolverr session {session_id}")
+        return session_id
+
+    def _store_clearance(self, domain: str, solution: Dict[str, Any]) -> None:
+        """Copy solved cookies and user agent into the domain's client."""
+        now = time.monotonic()
+        expires_at = now + self.CLEARANCE_TTL_SECONDS
+        cookies = {}
+        client = self._get_client(domain)
+
+        for cookie in solution.get("cookies") or []:
+            name = cookie.get("name")
+            if not name:
+                continue
+
+            cookies[name] = cookie.get("value", "")
+            client.cookies.set(
+                name,
+                cookie.get("value", ""),
+                domain=cookie.get("domain", ""),
+                path=cookie.get("path", "/"),
+            )
+
+            expiry = cookie.get("expiry") or cookie.get("expires")
+            if name == "cf_clearance" and expiry and expiry > 0:
+                expires_at = min(expires_at, now + (expiry - time.time()))
+
+        self._clearances[domain] = DomainClearance(
+            cookies=cookies,
+            user_agent=solution.get("userAgent"),
+            expires_at=expires_at,
+        )
+
+        if "cf_clearance" in cookies:
+            logger.info(f"Stored Cloudflare clearance for {domain}")
+
+
+_pools: Dict[str, FlareSolverrSessionPool] = {}
+
+
+def get_session_pool(flaresolverr_url: str) -> FlareSolverrSessionPool:
+    """Get the shared session pool for a FlareSolverr instance."""
+    key = flaresolverr_url.rstrip("/")
+    pool = _pools.get(key)
+    if pool is None:
+        pool = FlareSolverrSessionPool(key)
+        _pools[key] = pool
+    return pool
+
+
+async def close_session_pools() -> None:
+    """Close every session pool."""
+    for pool in _pools.values():
+        await pool.close()
+    _pools.clear()
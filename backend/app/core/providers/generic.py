@@ -4,11 +4,12 @@ import os
 import random
 import re
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 
 import httpx
 from bs4 import BeautifulSoup
 
+from app.core.providers.anti_bot_routing import AntiBotRoute, anti_bot_routes
 from app.core.providers.base import (
     AntiBotError,
     BaseProvider,
@@ -17,6 +18,8 @@ from app.core.providers.base import (
     ProviderError,
     RateLimitError,
 )
+from app.core.providers.flaresolverr import get_session_pool
+from app.core.providers.http_cache import provider_http_cache
 from app.models.manga import MangaStatus, MangaType
 from app.schemas.search import SearchResult
 
@@ -240,6 +243,11 @@ class GenericProvider(BaseProvider):
     ) -> Optional[str]:
         """Make HTTP request with retry logic and anti-bot protection."""
         last_error = None
+        domain = urlparse(url).netloc
+
+        cached = await provider_http_cache.lookup(url)
+        if provider_http_cache.serve_fresh(cached):
+            return cached.to_response().text
 
         for attempt in range(max_retries):
             try:
@@ -248,42 +256,41 @@ class GenericProvider(BaseProvider):
                     delay = random.uniform(1, 3)
                     await asyncio.sleep(delay)
 
-                # Try FlareSolverr first if available
+                # Go through the FlareSolverr session pool if available; it reuses
+                # the domain's clearance and only solves when challenged
                 if self.use_flaresolverr and self.flaresolverr_url:
                     try:
-                        async with httpx.AsyncClient() as client:
-                            payload = {
-                                "cmd": "request.get",
-                                "url": url,
-                                "maxTimeout": 60000,
-                                "headers": self._headers,
-                            }
-
-                            response = await client.post(
-                                f"{self.flaresolverr_url}/v1",
-                                json=payload,
-                                timeout=60.0,
-                            )
-
-                            if response.status_code == 200:
-                                data = response.json()
-                                if data.get("status") == "ok":
-                                    return data["solution"]["response"]
-                                else:
-                                    logger.warning(
-                                        f"FlareSolverr error for {url}: {data.get('message', 'Unknown error')}"
-                                    )
+                        result = await get_session_pool(self.flaresolverr_url).fetch(
+                            url, self._headers
+                        )
+                        if result and result.status_code < 400:
+                            return result.text
                     except Exception as e:
                         logger.warning(f"FlareSolverr request failed for {url}: {e}")
 
+                # A plain request to a domain that keeps challenging them would
+                # only fetch another challenge page
+                if anti_bot_routes.is_doomed(domain, AntiBotRoute.DIRECT):
+                    raise AntiBotError(
+                        f"Cloudflare protection known on {domain}, skipping direct request",
+                        self._name,
+                        protection_type="cloudflare",
+                        context={"url": url, "routing": "direct_skipped"},
+                    )
+
                 # Fallback to regular HTTP request
                 async with httpx.AsyncClient() as client:
                     # Refresh headers for each attempt
                     headers = self._get_random_headers()
+                    if cached:
+                        headers.update(cached.conditional_headers())
 
                     response = await client.get(
                         url, headers=headers, follow_redirects=True, timeout=30.0
                     )
+                    response = await provider_http_cache.resolve(
+                        url, None, cached, response
+                    )
 
                     # Check for Cloudflare or anti-bot protection
                     if response.status_code in [403, 503, 521]:
@@ -293,6 +300,7 @@ class GenericProvider(BaseProvider):
                             or "checking your browser" in response_text
                             or "just a moment" in response_text
                         ):
+                            anti_bot_routes.record(domain, AntiBotRoute.DIRECT, False)
                             raise AntiBotError(
                                 f"Cloudflare protection detected on {url}",
                                 self._name,
@@ -303,6 +311,7 @@ class GenericProvider(BaseProvider):
                                 },
                             )
 
+                    anti_bot_routes.record(domain, AntiBotRoute.DIRECT, True)
                     response.raise_for_status()
                     return response.text
 
@@ -1113,6 +1122,21 @@ class GenericProvider(BaseProvider):
 
         return None
 
+    async def _get_page_response(
+        self, page_url: str, headers: Dict[str, str]
+    ) -> httpx.Response:
+        """Fetch a page image, reusing Cloudflare clearance when available."""
+        if self.use_flaresolverr and self.flaresolverr_url:
+            return await get_session_pool(self.flaresolverr_url).get(page_url, headers)
+
+        async with httpx.AsyncClient() as client:
+            return await client.get(
+                page_url,
+                headers=headers,
+                follow_redirects=True,
+                timeout=30.0,
+            )
+
     async def download_page(
         self, page_url: str, referer: Optional[str] = None
     ) -> bytes:
@@ -1148,52 +1172,46 @@ class GenericProvider(BaseProvider):
                     delay = random.uniform(1, 2)
                     await asyncio.sleep(delay)
 
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        page_url,
-                        headers=headers,
-                        follow_redirects=True,
-                        timeout=30.0,
-                    )
-
-                    # Check for anti-bot protection
-                    if response.status_code in [403, 503, 521]:
-                        response_text = response.text.lower()
-                        if (
-                            "cloudflare" in response_text
-                            or "checking your browser" in response_text
-                            or "just a moment" in response_text
-                        ):
-                            raise AntiBotError(
-                                f"Cloudflare protection detected downloading page: {page_url}",
-                                self._name,
-                                protection_type="cloudflare",
-                                context={"url": page_url, "referer": referer_url},
-                            )
-
-                    response.raise_for_status()
+                response = await self._get_page_response(page_url, headers)
 
-                    # Check if we got actual image data (not empty or error page)
-                    content = response.content
-                    if len(content) == 0:
-                        raise ContentError(
-                            f"Empty content received for page: {page_url}",
+                # Check for anti-bot protection
+                if response.status_code in [403, 503, 521]:
+                    response_text = response.text.lower()
+                    if (
+                        "cloudflare" in response_text
+                        or "checking your browser" in response_text
+                        or "just a moment" in response_text
+                    ):
+                        raise AntiBotError(
+                            f"Cloudflare protection detected downloading page: {page_url}",
                             self._name,
-                            error_type="empty_content",
-                            context={"url": page_url, "size": 0},
+                            protection_type="cloudflare",
+                            context={"url": page_url, "referer": referer_url},
                         )
 
-                    # Check content type to ensure it's an image
-                    content_type = response.headers.get("content-type", "").lower()
-                    if content_type and not any(
-                        img_type in content_type
-                        for img_type in ["image/", "application/octet-stream"]
-                    ):
-                        logger.warning(
-                            f"Unexpected content type '{content_type}' for page: {page_url}"
-                        )
+                response.raise_for_status()
+
+                # Check if we got actual image data (not empty or error page)
+                content = response.content
+                if len(content) == 0:
+                    raise ContentError(
+                        f"Empty content received for page: {page_url}",
+                        self._name,
+                        error_type="empty_content",
+                        context={"url": page_url, "size": 0},
+                    )
+
+                # Check content type to ensure it's an image
+                content_type = response.headers.get("content-type", "").lower()
+                if content_type and not any(
+                    img_type in content_type
+                    for img_type in ["image/", "application/octet-stream"]
+                ):
+                    logger.warning(
+                        f"Unexpected content type '{content_type}' for page: {page_url}"
+                    )
 
-                    return content
+                return content
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 429:
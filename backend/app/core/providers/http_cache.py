@@ -0,0 +1,396 @@
+"""
+Disk-backed HTTP response cache for provider requests.
+
+Manga detail pages, chapter lists and API responses rarely change between
+library refreshes. Responses are kept on disk together with their
+``ETag``/``Last-Modified`` validators. Later fetches send
+``If-None-Match``/``If-Modified-Since``, and a ``304 Not Modified`` answer is
+turned back into the cached response, so providers parse the same body they
+would have downloaded. Responses that are still fresh under ``Cache-Control``
+or ``Expires`` are served without a request at all. The cache is bounded by
+size and evicts the least recently used entries first.
+
+Every read, write and directory scan runs in a worker thread, since
+lookups sit on the request path of every provider call. The size/recency
+index itself is only updated from the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Headers describing the transfer rather than the stored (decoded) body
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "transfer-encoding",
+}
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: httpx.Headers) -> Optional[float]:
+    """
+    Seconds a response may be reused without revalidation.
+
+    Returns:
+        The explicit freshness lifetime, 0 if the response must always be
+        revalidated, or None if the server gave no freshness information
+    """
+    directives = _parse_cache_control(headers.get("cache-control"))
+    if "no-cache" in directives:
+        return 0
+
+    max_age = directives.get("max-age")
+    if max_age is not None:
+        try:
+            return max(0, int(max_age) - int(headers.get("age", 0)))
+        except ValueError:
+            return 0
+
+    expires = _parse_http_date(headers.get("expires"))
+    if expires is not None:
+        date = _parse_http_date(headers.get("date")) or time.time()
+        return max(0, expires - date)
+
+    return None
+
+
+def is_storable(response: httpx.Response) -> bool:
+    """Whether a response may be stored and is worth storing."""
+    if response.status_code != 200:
+        return False
+
+    directives = _parse_cache_control(response.headers.get("cache-control"))
+    if "no-store" in directives or response.headers.get("vary") == "*":
+        return False
+
+    has_validator = "etag" in response.headers or "last-modified" in response.headers
+    return has_validator or bool(freshness_lifetime(response.headers))
+
+
+@dataclass
+class CachedResponse:
+    """Metadata for a stored response; the body lives in a sibling file."""
+
+    key: str
+    url: str
+    headers: Dict[str, str]
+    stored_at: float
+    fresh_for: Optional[float] = None
+    body: bytes = b""
+
+    @property
+    def is_fresh(self) -> bool:
+        return bool(self.fresh_for) and time.time() - self.stored_at < self.fresh_for
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators to send so the server can answer 304."""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self, request: Optional[httpx.Request] = None) -> httpx.Response:
+        """Rebuild the stored 200 response."""
+        return httpx.Response(
+            200,
+            headers=self.headers,
+            content=self.body,
+            request=request or httpx.Request("GET", self.url),
+        )
+
+
+class ProviderHTTPCache:
+    """Size-bounded on-disk cache of provider GET responses."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def lookup(
+        self, url: str, params: Optional[Dict[str, Any]] = None
+    ) -> Optional[CachedResponse]:
+        """Get the stored response for a GET request, if any."""
+        if not self.enabled:
+            return None
+
+        key = self._key(url, params)
+        await self._ensure_index()
+        try:
+            entry = await asyncio.to_thread(self._read, key)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"Discarding unreadable HTTP cache entry {key}: {e}")
+            await self._remove_entries([key])
+            return None
+
+        self._touch(key, len(entry.body))
+        return entry
+
+    async def resolve(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        cached: Optional[CachedResponse],
+        response: httpx.Response,
+    ) -> httpx.Response:
+        """
+        Reconcile a network response with the stored one.
+
+        A 304 is answered from the cache (with the stored headers refreshed
+        from the 304), and a storable 200 replaces the stored entry.
+
+        Args:
+            url: Requested URL
+            params: Query parameters the request was sent with
+            cached: Entry returned by lookup for this request
+            response: Response to the (conditional) request
+
+        Returns:
+            The response the caller should use
+        """
+        if not self.enabled:
+            return response
+
+        if response.status_code == 304 and cached:
+            self._stats["revalidated"] += 1
+            cached.headers.update(
+                {
+                    name.lower(): value
+                    for name, value in response.headers.items()
+                    if name.lower() not in HOP_BY_HOP_HEADERS
+                }
+            )
+            cached.stored_at = time.time()
+            cached.fresh_for = freshness_lifetime(httpx.Headers(cached.headers))
+            await self._store(cached)
+            return cached.to_response(response.request)
+
+        self._stats["misses"] += 1
+        if is_storable(response):
+            await self._store(
+                CachedResponse(
+                    key=self._key(url, params),
+                    url=url,
+                    headers={
+                        name.lower(): value
+                        for name, value in response.headers.items()
+                        if name.lower() not in HOP_BY_HOP_HEADERS
+                    },
+                    stored_at=time.time(),
+                    fresh_for=freshness_lifetime(response.headers),
+                    body=response.content,
+                )
+            )
+        return response
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a GET through the cache using the given client."""
+        cached = await self.lookup(url, params)
+        if self.serve_fresh(cached):
+            return cached.to_response()
+
+        request_headers = dict(headers or {})
+        if cached:
+            request_headers.update(cached.conditional_headers())
+
+        response = await client.get(
+            url, params=params, headers=request_headers, **kwargs
+        )
+        return await self.resolve(url, params, cached, response)
+
+    def serve_fresh(self, cached: Optional[CachedResponse]) -> bool:
+        """Whether a looked-up entry can be used without a request."""
+        if cached and cached.is_fresh:
+            self._stats["hits"] += 1
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Remove every stored response."""
+        for key in list(self._load_index()):
+            self._remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        index = self._load_index()
+        return {
+            **self._stats,
+            "entries": len(index),
+            "size_bytes": sum(size for size, _ in index.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        full_url = str(httpx.URL(url, params=params)) if params else url
+        return hashlib.sha256(full_url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def _read(self, key: str) -> CachedResponse:
+        """Read a stored entry; blocking."""
+        meta_path, body_path = self._paths(key)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        return CachedResponse(body=body, **meta)
+
+    async def _store(self, entry: CachedResponse) -> None:
+        await self._ensure_index()
+        if not await asyncio.to_thread(self._write, entry):
+            return
+
+        self._stats["stored"] += 1
+        self._touch(entry.key, len(entry.body))
+        await self._evict()
+
+    def _write(self, entry: CachedResponse) -> bool:
+        """Write an entry's files; blocking. Returns whether it was stored."""
+        meta_path, body_path = self._paths(entry.key)
+        meta = asdict(entry)
+        del meta["body"]
+        # Concurrent writes of the same entry run in different threads
+        suffix = f".{threading.get_ident()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            with open(f"{body_path}{suffix}", "wb") as f:
+                f.write(entry.body)
+            os.replace(f"{body_path}{suffix}", body_path)
+            with open(f"{meta_path}{suffix}", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(f"{meta_path}{suffix}", meta_path)
+        except OSError as e:
+            logger.warning(f"Could not write HTTP cache entry for {entry.url}: {e}")
+            return False
+        return True
+
+    def _remove(self, key: str) -> None:
+        self._remove_files([key])
+        if self._index is not None:
+            self._index.pop(key, None)
+
+    async def _remove_entries(self, keys: List[str]) -> None:
+        for key in keys:
+            self._index.pop(key, None)
+        await asyncio.to_thread(self._remove_files, keys)
+
+    def _remove_files(self, keys: List[str]) -> None:
+        for key in keys:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.debug(f"Could not remove HTTP cache file {path}: {e}")
+
+    async def _ensure_index(self) -> None:
+        """Scan the cache directory in a thread on first use."""
+        if self._index is None:
+            index = await asyncio.to_thread(self._scan_index)
+            if self._index is None:
+                self._index = index
+
+    def _load_index(self) -> Dict[str, Tuple[int, float]]:
+        """Build the size/recency index from disk on first use; blocking."""
+        if self._index is None:
+            self._index = self._scan_index()
+        return self._index
+
+    def _scan_index(self) -> Dict[str, Tuple[int, float]]:
+        index: Dict[str, Tuple[int, float]] = {}
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(".body"):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    index[name[: -len(".body")]] = (stat.st_size, stat.st_mtime)
+        return index
+
+    def _touch(self, key: str, size: int) -> None:
+        self._load_index()[key] = (size, time.time())
+
+    async def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits its budget."""
+        index = self._load_index()
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, (size, _) in sorted(index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes * 0.9:
+                break
+            evicted.append(key)
+            total -= size
+        await self._remove_entries(evicted)
+
+
+# Global instance
+provider_http_cache = ProviderHTTPCache(
+    os.path.join(settings.STORAGE_PATH, "cache", "http"),
+    settings.PROVIDER_HTTP_CACHE_MAX_MB * 1024 * 1024,
+    enabled=settings.PROVIDER_HTTP_CACHE_ENABLED,
+)
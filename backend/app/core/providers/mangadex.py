@@ -13,6 +13,7 @@ from app.core.providers.base import (
     ProviderError,
     RateLimitError,
 )
+from app.core.providers.http_cache import provider_http_cache
 from app.models.manga import MangaStatus, MangaType
 from app.schemas.search import SearchResult
 
@@ -22,6 +23,14 @@ logger = logging.getLogger(__name__)
 class MangaDexProvider(BaseProvider):
     """MangaDex provider with improved rate limiting and error handling."""
 
+    FEED_PAGE_LIMIT = 500  # Largest page the chapter feed accepts
+    FEED_MAX_WINDOW = 10000  # offset + limit may not exceed this
+    FEED_CONCURRENCY = 4
+    MANGA_IDS_LIMIT = 100  # Most ids[] accepted by one /manga lookup
+
+    # At-home server URLs are only valid for about 15 minutes
+    page_manifest_ttl = 10 * 60
+
     def __init__(self, **kwargs):
         self._base_url = "https://api.mangadex.org"
         self._timeout = httpx.Timeout(30.0)
@@ -30,7 +39,9 @@ class MangaDexProvider(BaseProvider):
         )  # Option for compressed images
         self._max_retries = 4
         self._retry_delay = 1.0  # 1 second base delay (more conservative)
-        self._request_delay = 0.5  # Minimum delay between requests
+        self._request_delay = 0.2  # 5 requests/second, MangaDex's global limit
+        self._throttle_lock = asyncio.Lock()
+        self._next_request_at = 0.0
         self._provider_id = "mangadex"  # Provider ID for API calls
         self._last_rate_limit = None  # Track last rate limit time
         self._rate_limit_reset = None  # Track when rate limit resets
@@ -79,18 +90,54 @@ class MangaDexProvider(BaseProvider):
                 "seconds_remaining": 0,
             }
 
+    async def _throttle(self) -> None:
+        """Wait for a request slot so concurrent requests stay under the limit."""
+        async with self._throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + self._request_delay
+
+        wait = slot - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+
     async def _make_request_with_retry(
-        self, client: httpx.AsyncClient, method: str, url: str, **kwargs
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        use_cache: bool = False,
+        **kwargs,
     ) -> httpx.Response:
-        """Make HTTP request with rate limiting and retry logic."""
-        # Add delay before each request to respect rate limits
-        await asyncio.sleep(self._request_delay)
+        """
+        Make HTTP request with rate limiting and retry logic.
+
+        With use_cache, the GET is revalidated against the provider HTTP
+        cache, so an unchanged resource costs a 304 instead of a full body.
+        """
+        cached = None
+        if use_cache:
+            cached = await provider_http_cache.lookup(url, kwargs.get("params"))
+            if provider_http_cache.serve_fresh(cached):
+                return cached.to_response()
+            if cached:
+                kwargs["headers"] = {
+                    **kwargs.get("headers", {}),
+                    **cached.conditional_headers(),
+                }
+
+        # Space requests out to respect rate limits
+        await self._throttle()
 
         for attempt in range(self._max_retries):
             try:
                 response = await client.request(
                     method, url, timeout=self._timeout, **kwargs
                 )
+                if use_cache:
+                    response = await provider_http_cache.resolve(
+                        url, kwargs.get("params"), cached, response
+                    )
 
                 # Handle rate limiting (429 Too Many Requests)
                 if response.status_code == 429:
@@ -142,6 +189,115 @@ class MangaDexProvider(BaseProvider):
 
         raise Exception(f"Request failed after {self._max_retries} attempts")
 
+    def _parse_manga(self, manga: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a manga entity fetched with its cover, authors and artists."""
+        attributes = manga["attributes"]
+
+        # Get cover
+        cover_url = None
+        for relationship in manga["relationships"]:
+            if relationship["type"] == "cover_art":
+                cover_filename = relationship["attributes"]["fileName"]
+                cover_url = f"https://uploads.mangadex.org/covers/{manga['id']}/{cover_filename}"
+                break
+
+        # Get authors
+        authors = []
+        for relationship in manga["relationships"]:
+            if relationship["type"] in ["author", "artist"]:
+                if (
+                    "attributes" in relationship
+                    and "name" in relationship["attributes"]
+                ):
+                    authors.append(relationship["attributes"]["name"])
+
+        # Get genres
+        genres = []
+        if "tags" in attributes:
+            for tag in attributes["tags"]:
+                # MangaDex uses type "tag" for all tags, not "genre"
+                if (
+                    tag["type"] == "tag"
+                    and "attributes" in tag
+                    and "name" in tag["attributes"]
+                    and "en" in tag["attributes"]["name"]
+                ):
+                    genres.append(tag["attributes"]["name"]["en"])
+
+        # Determine manga type
+        manga_type = MangaType.MANGA
+        if "publicationDemographic" in attributes:
+            demographic = attributes["publicationDemographic"]
+            if demographic == "josei" or demographic == "shoujo":
+                manga_type = MangaType.MANGA
+            elif demographic == "seinen" or demographic == "shounen":
+                manga_type = MangaType.MANGA
+
+        # Determine manga status
+        manga_status = MangaStatus.UNKNOWN
+        if "status" in attributes:
+            status = attributes["status"]
+            if status == "ongoing":
+                manga_status = MangaStatus.ONGOING
+            elif status == "completed":
+                manga_status = MangaStatus.COMPLETED
+            elif status == "hiatus":
+                manga_status = MangaStatus.HIATUS
+            elif status == "cancelled":
+                manga_status = MangaStatus.CANCELLED
+
+        # Determine if manga is NSFW
+        is_nsfw = False
+        if "contentRating" in attributes:
+            content_rating = attributes["contentRating"]
+            if content_rating in ["erotica", "pornographic"]:
+                is_nsfw = True
+
+        # Get title
+        title = ""
+        if "title" in attributes:
+            if "en" in attributes["title"]:
+                title = attributes["title"]["en"]
+            elif attributes["title"]:
+                # Get first available title
+                title = next(iter(attributes["title"].values()))
+
+        # Get alternative titles
+        alternative_titles = {}
+        if "altTitles" in attributes:
+            for alt_title in attributes["altTitles"]:
+                for lang, title_text in alt_title.items():
+                    alternative_titles[lang] = title_text
+
+        # Get description
+        description = ""
+        if "description" in attributes:
+            if "en" in attributes["description"]:
+                description = attributes["description"]["en"]
+            elif attributes["description"]:
+                # Get first available description
+                description = next(iter(attributes["description"].values()))
+
+        # Get year
+        year = None
+        if "year" in attributes:
+            year = attributes["year"]
+
+        return {
+            "id": manga["id"],
+            "title": title,
+            "alternative_titles": alternative_titles,
+            "description": description,
+            "cover_image": cover_url,
+            "type": manga_type,
+            "status": manga_status,
+            "year": year,
+            "is_nsfw": is_nsfw,
+            "genres": genres,
+            "authors": authors,
+            "url": f"https://mangadex.org/title/{manga['id']}",
+        }
+
     async def search(
         self, query: str, page: int = 1, limit: int = 20
     ) -> Tuple[List[SearchResult], int, bool]:
@@ -168,118 +324,10 @@ class MangaDexProvider(BaseProvider):
             # Parse results
             results = []
             for manga in data["data"]:
-                # Get manga attributes
-                attributes = manga["attributes"]
-
-                # Get cover
-                cover_url = None
-                for relationship in manga["relationships"]:
-                    if relationship["type"] == "cover_art":
-                        cover_filename = relationship["attributes"]["fileName"]
-                        cover_url = f"https://uploads.mangadex.org/covers/{manga['id']}/{cover_filename}"
-                        break
-
-                # Get authors
-                authors = []
-                for relationship in manga["relationships"]:
-                    if relationship["type"] in ["author", "artist"]:
-                        if (
-                            "attributes" in relationship
-                            and "name" in relationship["attributes"]
-                        ):
-                            authors.append(relationship["attributes"]["name"])
-
-                # Get genres
-                genres = []
-                if "tags" in attributes:
-                    for tag in attributes["tags"]:
-                        # MangaDex uses type "tag" for all tags, not "genre"
-                        if (
-                            tag["type"] == "tag"
-                            and "attributes" in tag
-                            and "name" in tag["attributes"]
-                            and "en" in tag["attributes"]["name"]
-                        ):
-                            genres.append(tag["attributes"]["name"]["en"])
-
-                # Determine manga type
-                manga_type = MangaType.MANGA
-                if "publicationDemographic" in attributes:
-                    demographic = attributes["publicationDemographic"]
-                    if demographic == "josei" or demographic == "shoujo":
-                        manga_type = MangaType.MANGA
-                    elif demographic == "seinen" or demographic == "shounen":
-                        manga_type = MangaType.MANGA
-
-                # Determine manga status
-                manga_status = MangaStatus.UNKNOWN
-                if "status" in attributes:
-                    status = attributes["status"]
-                    if status == "ongoing":
-                        manga_status = MangaStatus.ONGOING
-                    elif status == "completed":
-                        manga_status = MangaStatus.COMPLETED
-                    elif status == "hiatus":
-                        manga_status = MangaStatus.HIATUS
-                    elif status == "cancelled":
-                        manga_status = MangaStatus.CANCELLED
-
-                # Determine if manga is NSFW
-                is_nsfw = False
-                if "contentRating" in attributes:
-                    content_rating = attributes["contentRating"]
-                    if content_rating in ["erotica", "pornographic"]:
-                        is_nsfw = True
-
-                # Get title
-                title = ""
-                if "title" in attributes:
-                    if "en" in attributes["title"]:
-                        title = attributes["title"]["en"]
-                    elif attributes["title"]:
-                        # Get first available title
-                        title = next(iter(attributes["title"].values()))
-
-                # Get alternative titles
-                alternative_titles = {}
-                if "altTitles" in attributes:
-                    for alt_title in attributes["altTitles"]:
-                        for lang, title_text in alt_title.items():
-                            alternative_titles[lang] = title_text
-
-                # Get description
-                description = ""
-                if "description" in attributes:
-                    if "en" in attributes["description"]:
-                        description = attributes["description"]["en"]
-                    elif attributes["description"]:
-                        # Get first available description
-                        description = next(iter(attributes["description"].values()))
-
-                # Get year
-                year = None
-                if "year" in attributes:
-                    year = attributes["year"]
-
-                # Create search result
-                result = SearchResult(
-                    id=manga["id"],
-                    title=title,
-                    alternative_titles=alternative_titles,
-                    description=description,
-                    cover_image=cover_url,
-                    type=manga_type,
-                    status=manga_status,
-                    year=year,
-                    is_nsfw=is_nsfw,
-                    genres=genres,
-                    authors=authors,
-                    provider=self.provider_id,
-                    url=f"https://mangadex.org/title/{manga['id']}",
+                results.append(
+                    SearchResult(**self._parse_manga(manga), provider=self.provider_id)
                 )
 
-                results.append(result)
-
             # Determine if there are more results
             total = data["total"]
             has_next = (offset + limit) < total
@@ -294,129 +342,124 @@ class MangaDexProvider(BaseProvider):
                 client,
                 "GET",
                 f"{self.url}/manga/{manga_id}",
+                use_cache=True,
                 params={"includes[]": ["cover_art", "author", "artist", "tag"]},
             )
             data = response.json()
 
-            # Parse manga details
-            manga = data["data"]
-            attributes = manga["attributes"]
-
-            # Get cover
-            cover_url = None
-            for relationship in manga["relationships"]:
-                if relationship["type"] == "cover_art":
-                    cover_filename = relationship["attributes"]["fileName"]
-                    cover_url = f"https://uploads.mangadex.org/covers/{manga['id']}/{cover_filename}"
-                    break
-
-            # Get authors
-            authors = []
-            for relationship in manga["relationships"]:
-                if relationship["type"] in ["author", "artist"]:
-                    if (
-                        "attributes" in relationship
-                        and "name" in relationship["attributes"]
-                    ):
-                        authors.append(relationship["attributes"]["name"])
-
-            # Get genres
-            genres = []
-            if "tags" in attributes:
-                for tag in attributes["tags"]:
-                    # MangaDex uses type "tag" for all tags, not "genre"
-                    if (
-                        tag["type"] == "tag"
-                        and "attributes" in tag
-                        and "name" in tag["attributes"]
-                        and "en" in tag["attributes"]["name"]
-                    ):
-                        genres.append(tag["attributes"]["name"]["en"])
-
-            # Determine manga type
-            manga_type = MangaType.MANGA
-            if "publicationDemographic" in attributes:
-                demographic = attributes["publicationDemographic"]
-                if demographic == "josei" or demographic == "shoujo":
-                    manga_type = MangaType.MANGA
-                elif demographic == "seinen" or demographic == "shounen":
-                    manga_type = MangaType.MANGA
-
-            # Determine manga status
-            manga_status = MangaStatus.UNKNOWN
-            if "status" in attributes:
-                status = attributes["status"]
-                if status == "ongoing":
-                    manga_status = MangaStatus.ONGOING
-                elif status == "completed":
-                    manga_status = MangaStatus.COMPLETED
-                elif status == "hiatus":
-                    manga_status = MangaStatus.HIATUS
-                elif status == "cancelled":
-                    manga_status = MangaStatus.CANCELLED
-
-            # Determine if manga is NSFW
-            is_nsfw = False
-            if "contentRating" in attributes:
-                content_rating = attributes["contentRating"]
-                if content_rating in ["erotica", "pornographic"]:
-                    is_nsfw = True
-
-            # Get title
-            title = ""
-            if "title" in attributes:
-                if "en" in attributes["title"]:
-                    title = attributes["title"]["en"]
-                elif attributes["title"]:
-                    # Get first available title
-                    title = next(iter(attributes["title"].values()))
-
-            # Get alternative titles
-            alternative_titles = {}
-            if "altTitles" in attributes:
-                for alt_title in attributes["altTitles"]:
-                    for lang, title_text in alt_title.items():
-                        alternative_titles[lang] = title_text
-
-            # Get description
-            description = ""
-            if "description" in attributes:
-                if "en" in attributes["description"]:
-                    description = attributes["description"]["en"]
-                elif attributes["description"]:
-                    # Get first available description
-                    description = next(iter(attributes["description"].values()))
-
-            # Get year
-            year = None
-            if "year" in attributes:
-                year = attributes["year"]
-
-            # Return manga details
             return {
-                "id": manga["id"],
-                "title": title,
-                "alternative_titles": alternative_titles,
-                "description": description,
-                "cover_image": cover_url,
-                "type": manga_type,
-                "status": manga_status,
-                "year": year,
-                "is_nsfw": is_nsfw,
-                "genres": genres,
-                "authors": authors,
+                **self._parse_manga(data["data"]),
                 "provider": self.name,
-                "url": f"https://mangadex.org/title/{manga['id']}",
             }
 
+    async def get_manga_details_batch(
+        self, manga_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get details for many manga with batched ``/manga?ids[]=`` lookups.
+
+        Covers, authors and artists come back in the same responses, so a
+        library refresh costs one request per MANGA_IDS_LIMIT series.
+        """
+        chunks = [
+            manga_ids[i : i + self.MANGA_IDS_LIMIT]
+            for i in range(0, len(manga_ids), self.MANGA_IDS_LIMIT)
+        ]
+
+        async def fetch(chunk: List[str]) -> List[Dict[str, Any]]:
+            response = await self._make_request_with_retry(
+                client,
+                "GET",
+                f"{self.url}/manga",
+                params={
+                    "ids[]": chunk,
+                    "limit": len(chunk),
+                    "includes[]": ["cover_art", "author", "artist"],
+                    "contentRating[]": [
+                        "safe",
+                        "suggestive",
+                        "erotica",
+                        "pornographic",
+                    ],
+                },
+            )
+            return response.json()["data"]
+
+        details = {}
+        async with httpx.AsyncClient() as client:
+            for mangas in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+                for manga in mangas:
+                    details[manga["id"]] = {
+                        **self._parse_manga(manga),
+                        "provider": self.name,
+                    }
+
+        return details
+
     async def get_chapters(
         self, manga_id: str, page: int = 1, limit: int = 100
     ) -> Tuple[List[Dict[str, Any]], int, bool]:
         """Get chapters for a manga on MangaDex."""
-        # Calculate offset
+        limit = min(limit, self.FEED_PAGE_LIMIT)
         offset = (page - 1) * limit
 
-        # Build query parameters
+        async with httpx.AsyncClient() as client:
+            chapters, total = await self._get_feed_page(client, manga_id, offset, limit)
+
+        # Determine if there are more chapters
+        has_next = (offset + limit) < total
+
+        return chapters, total, has_next
+
+    async def get_all_chapters(
+        self, manga_id: str, max_pages: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get every chapter of a manga from the feed in as few requests as possible.
+
+        The first FEED_PAGE_LIMIT-sized page reports the total; the remaining
+        offsets are fetched concurrently over one client, paced by the
+        request throttle.
+        """
+        async with httpx.AsyncClient() as client:
+            chapters, total = await self._get_feed_page(
+                client, manga_id, 0, self.FEED_PAGE_LIMIT
+            )
+
+            if total > self.FEED_MAX_WINDOW:
+                logger.warning(
+                    f"MangaDex feed for {manga_id} has {total} chapters; "
+                    f"only the first {self.FEED_MAX_WINDOW} can be listed"
+                )
+
+            offsets = list(
+                range(
+                    self.FEED_PAGE_LIMIT,
+                    min(total, self.FEED_MAX_WINDOW),
+                    self.FEED_PAGE_LIMIT,
+                )
+            )
+            if max_pages is not None:
+                offsets = offsets[: max(0, max_pages - 1)]
+
+            semaphore = asyncio.Semaphore(self.FEED_CONCURRENCY)
+
+            async def fetch(offset: int) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    page_chapters, _ = await self._get_feed_page(
+                        client, manga_id, offset, self.FEED_PAGE_LIMIT
+                    )
+                    return page_chapters
+
+            for page_chapters in await asyncio.gather(*(fetch(o) for o in offsets)):
+                chapters.extend(page_chapters)
+
+        return chapters
+
+    async def _get_feed_page(
+        self, client: httpx.AsyncClient, manga_id: str, offset: int, limit: int
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Fetch one page of a manga's English chapter feed."""
         params = {
             "limit": limit,
             "offset": offset,
@@ -425,54 +468,34 @@ class MangaDexProvider(BaseProvider):
         }
 
         # Make request with retry logic
-        async with httpx.AsyncClient() as client:
-            response = await self._make_request_with_retry(
-                client, "GET", f"{self.url}/manga/{manga_id}/feed", params=params
-            )
-            data = response.json()
-
-            # Parse chapters
-            chapters = []
-            for chapter in data["data"]:
-                attributes = chapter["attributes"]
-
-                # Get chapter number
-                chapter_number = attributes.get("chapter", "")
-
-                # Get chapter title
-                chapter_title = attributes.get("title", "")
-
-                # Get volume
-                volume = attributes.get("volume", "")
-
-                # Get language
-                language = attributes.get("translatedLanguage", "en")
-
-                # Get dates
-                publish_at = attributes.get("publishAt")
-                readable_at = attributes.get("readableAt")
-
-                # Create chapter
-                chapters.append(
-                    {
-                        "id": chapter["id"],
-                        "title": chapter_title,
-                        "number": chapter_number,
-                        "volume": volume,
-                        "language": language,
-                        "pages_count": attributes.get("pages", 0),
-                        "manga_id": manga_id,
-                        "publish_at": publish_at,
-                        "readable_at": readable_at,
-                        "source": "MangaDex",
-                    }
-                )
-
-            # Determine if there are more chapters
-            total = data["total"]
-            has_next = (offset + limit) < total
-
-            return chapters, total, has_next
+        response = await self._make_request_with_retry(
+            client,
+            "GET",
+            f"{self.url}/manga/{manga_id}/feed",
+            use_cache=True,
+            params=params,
+        )
+        data = response.json()
+
+        chapters = [self._parse_chapter(chapter, manga_id) for chapter in data["data"]]
+        return chapters, data["total"]
+
+    def _parse_chapter(self, chapter: Dict[str, Any], manga_id: str) -> Dict[str, Any]:
+        """Parse a chapter entity from the feed."""
+        attributes = chapter["attributes"]
+
+        return {
+            "id": chapter["id"],
+            "title": attributes.get("title", ""),
+            "number": attributes.get("chapter", ""),
+            "volume": attributes.get("volume", ""),
+            "language": attributes.get("translatedLanguage", "en"),
+            "pages_count": attributes.get("pages", 0),
+            "manga_id": manga_id,
+            "publish_at": attributes.get("publishAt"),
+            "readable_at": attributes.get("readableAt"),
+            "source": "MangaDex",
+        }
 
     async def get_pages(self, manga_id: str, chapter_id: str) -> List[str]:
         """Get pages for a chapter on MangaDex with improved error handling."""
@@ -0,0 +1,154 @@
+"""
+Cache of resolved chapter page lists.
+
+Resolving a chapter's page URLs costs an API call (MangaDex ``/at-home``)
+or a reader-page scrape, and it happens again on every reader open, download
+retry and fallback attempt. Resolved lists are kept per
+(provider, manga_id, chapter_id) for the provider's ``page_manifest_ttl``,
+and an entry is dropped as soon as one of its page URLs answers 403/404.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.providers.base import ContentError, ProviderError
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses meaning a resolved page URL is no longer valid
+EXPIRED_PAGE_STATUS_CODES = (403, 404, 410)
+
+ManifestKey = Tuple[str, str, str]
+
+
+def is_expired_page_error(error: Exception) -> bool:
+    """Whether a page download error means the page URL has gone stale."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in EXPIRED_PAGE_STATUS_CODES
+    if isinstance(error, ContentError) and error.error_type == "not_found":
+        return True
+    if isinstance(error, ProviderError):
+        return error.context.get("status_code") in EXPIRED_PAGE_STATUS_CODES
+    return False
+
+
+@dataclass
+class PageManifest:
+    """Resolved page URLs for one chapter."""
+
+    pages: List[str]
+    expires_at: float
+
+    @property
+    def is_valid(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class PageManifestCache:
+    """Remember resolved page lists until they expire or go stale."""
+
+    DEFAULT_TTL_SECONDS = 6 * 3600
+    MAX_ENTRIES = 1000
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._manifests: "OrderedDict[ManifestKey, PageManifest]" = OrderedDict()
+        self._url_index: Dict[str, ManifestKey] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get_pages(
+        self, provider: Any, manga_id: str, chapter_id: str
+    ) -> List[str]:
+        """
+        Get a chapter's page URLs, resolving them through the provider only
+        when no valid manifest is cached.
+
+        Args:
+            provider: Provider to resolve pages with
+            manga_id: The provider's ID of the manga
+            chapter_id: The provider's ID of the chapter
+
+        Returns:
+            A list of page URLs
+        """
+        key = self._key(provider.name, manga_id, chapter_id)
+        manifest = self._manifests.get(key)
+        if manifest and manifest.is_valid:
+            self._manifests.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(manifest.pages)
+
+        self._stats["misses"] += 1
+        pages = await provider.get_pages(manga_id, chapter_id)
+        if pages:
+            ttl = getattr(provider, "page_manifest_ttl", self.DEFAULT_TTL_SECONDS)
+            self.store(provider.name, manga_id, chapter_id, pages, ttl)
+        return pages
+
+    def store(
+        self,
+        provider_name: str,
+        manga_id: str,
+        chapter_id: str,
+        pages: List[str],
+        ttl: float,
+    ) -> None:
+        """Cache a resolved page list for ttl seconds."""
+        key = self._key(provider_name, manga_id, chapter_id)
+        self._drop(key)
+        if ttl <= 0:
+            return
+
+        self._manifests[key] = PageManifest(list(pages), time.monotonic() + ttl)
+        for page_url in pages:
+            self._url_index[page_url] = key
+
+        while len(self._manifests) > self.max_entries:
+            self._drop(next(iter(self._manifests)))
+
+    def invalidate(self, provider_name: str, manga_id: str, chapter_id: str) -> None:
+        """Forget a chapter's page list."""
+        key = self._key(provider_name, manga_id, chapter_id)
+        if key in self._manifests:
+            self._stats["invalidations"] += 1
+        self._drop(key)
+
+    def invalidate_url(self, page_url: str) -> bool:
+        """
+        Forget the page list a page URL came from.
+
+        Returns:
+            True if a cached manifest was dropped
+        """
+        key = self._url_index.get(page_url)
+        if not key:
+            return False
+
+        logger.info(f"Page URL went stale, dropping page list for {key}")
+        self._stats["invalidations"] += 1
+        self._drop(key)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {**self._stats, "entries": len(self._manifests)}
+
+    @staticmethod
+    def _key(provider_name: str, manga_id: str, chapter_id: str) -> ManifestKey:
+        return (provider_name.lower(), str(manga_id), str(chapter_id))
+
+    def _drop(self, key: ManifestKey) -> None:
+        manifest = self._manifests.pop(key, None)
+        if manifest:
+            for page_url in manifest.pages:
+                if self._url_index.get(page_url) == key:
+                    del self._url_index[page_url]
+
+
+# Global instance
+page_manifest_cache = PageManifestCache()
@@ -0,0 +1,200 @@
+"""
+Deadline-aware provider planning for multi-provider search.
+
+Ranks providers by the latency and success rate observed on recent searches,
+the health monitor's status and the rate limiter's circuit state, and gives
+each provider a timeout derived from its own latency distribution instead of
+a flat per-provider wait.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from app.core.agents.rate_limiting import CircuitState, rate_limiter_manager
+from app.core.config import settings
+from app.core.jobs.health_monitor import ProviderHealthStatus, health_monitor
+from app.core.providers.base import BaseProvider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderLatencyStats:
+    """Rolling latency and outcome window for one provider's searches."""
+
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+    outcomes: Deque[bool] = field(default_factory=lambda: deque(maxlen=50))
+
+    def record(self, success: bool, elapsed: float) -> None:
+        self.samples.append(elapsed)
+        self.outcomes.append(success)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Nearest-rank percentile of recent latencies, in seconds."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1)
+        return ordered[max(0, index)]
+
+    @property
+    def success_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+
+@dataclass
+class PlannedProvider:
+    """A provider selected for a search, with the timeout it is allowed."""
+
+    provider: BaseProvider
+    timeout: float
+    is_favorite: bool = False
+
+
+class ProviderSearchPlanner:
+    """Choose, order and time-box providers for a search deadline."""
+
+    MIN_SAMPLES = 5  # Searches observed before latency data is trusted
+    TIMEOUT_P95_MULTIPLIER = 1.5  # Headroom over the observed p95
+
+    def __init__(self):
+        self._stats: Dict[str, ProviderLatencyStats] = {}
+
+    def record_result(self, provider_name: str, success: bool, elapsed: float) -> None:
+        """Record the outcome of one provider search."""
+        stats = self._stats.setdefault(provider_name, ProviderLatencyStats())
+        stats.record(success, elapsed)
+
+    def get_provider_stats(self, provider_name: str) -> Dict[str, Optional[float]]:
+        """Get observed search statistics for a provider."""
+        stats = self._stats.get(provider_name)
+        if not stats:
+            return {"samples": 0, "p50": None, "p95": None, "success_rate": None}
+
+        return {
+            "samples": len(stats.samples),
+            "p50": stats.percentile(50),
+            "p95": stats.percentile(95),
+            "success_rate": stats.success_rate,
+        }
+
+    def plan(
+        self,
+        favorite_providers: List[BaseProvider],
+        other_providers: List[BaseProvider],
+        budget: Optional[float] = None,
+        max_other_providers: Optional[int] = None,
+    ) -> List[PlannedProvider]:
+        """
+        Plan which providers to search and how long to wait for each.
+
+        Favorites are always searched, in the given order. Other providers
+        are skipped when their circuit is open, the health monitor reports
+        them unhealthy or their median latency exceeds the budget; the rest
+        are ordered by health and speed, with providers whose p95 exceeds the
+        budget moved to the back before max_other_providers is applied.
+
+        Args:
+            favorite_providers: Providers the user prefers, in priority order
+            other_providers: Remaining candidate providers
+            budget: Total time budget in seconds for the search
+            max_other_providers: Maximum number of non-favorite providers
+
+        Returns:
+            Planned providers, favorites first
+        """
+        if budget is None:
+            budget = settings.PROVIDER_SEARCH_BUDGET_SECONDS
+
+        plan = [
+            PlannedProvider(provider, self._get_timeout(provider, budget), True)
+            for provider in favorite_providers
+        ]
+
+        ranked = []
+        skipped = []
+        for provider in other_providers:
+            if not self._can_answer(provider, budget):
+                skipped.append(provider.name)
+                continue
+
+            p95 = self._trusted_percentile(provider, 95)
+            within_budget = p95 is None or p95 <= budget
+            ranked.append((within_budget, self._score(provider, budget), provider))
+
+        ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        if max_other_providers is not None:
+            ranked = ranked[:max_other_providers]
+
+        plan.extend(
+            PlannedProvider(provider, self._get_timeout(provider, budget))
+            for _, _, provider in ranked
+        )
+
+        if skipped:
+            logger.info(f"Search planner skipped providers: {skipped}")
+
+        return plan
+
+    def _trusted_percentile(
+        self, provider: BaseProvider, percent: float
+    ) -> Optional[float]:
+        stats = self._stats.get(provider.name)
+        if not stats or len(stats.samples) < self.MIN_SAMPLES:
+            return None
+        return stats.percentile(percent)
+
+    def _get_timeout(self, provider: BaseProvider, budget: float) -> float:
+        """Timeout from the provider's p95 with headroom, clamped to the budget."""
+        p95 = self._trusted_percentile(provider, 95)
+        if p95 is None:
+            return budget
+
+        return max(
+            settings.PROVIDER_SEARCH_MIN_TIMEOUT_SECONDS,
+            min(budget, p95 * self.TIMEOUT_P95_MULTIPLIER),
+        )
+
+    def _can_answer(self, provider: BaseProvider, budget: float) -> bool:
+        """Whether a provider is worth waiting on within the budget."""
+        limiter = rate_limiter_manager.limiters.get(provider.name)
+        if limiter and limiter.circuit_state == CircuitState.OPEN:
+            reopens_in = limiter.config.circuit_breaker_timeout - (
+                time.time() - limiter.circuit_opened_at
+            )
+            if reopens_in > 0:
+                return False
+
+        metrics = health_monitor.get_provider_health(provider.name)
+        if metrics and metrics.status in (
+            ProviderHealthStatus.DISABLED,
+            ProviderHealthStatus.UNHEALTHY,
+        ):
+            return False
+
+        p50 = self._trusted_percentile(provider, 50)
+        return p50 is None or p50 <= budget
+
+    def _score(self, provider: BaseProvider, budget: float) -> float:
+        """Rank score (higher is better) from health, success rate and latency."""
+        health_score = 50.0  # Neutral for providers without health checks
+        metrics = health_monitor.get_provider_health(provider.name)
+        if metrics and metrics.total_successes + metrics.total_failures > 0:
+            health_score = metrics.get_health_score()
+
+        stats = self._stats.get(provider.name)
+        if not stats or len(stats.samples) < self.MIN_SAMPLES:
+            return health_score
+
+        p50 = stats.percentile(50)
+        latency_penalty = 40 * min(1.0, p50 / budget)
+        return (health_score + stats.success_rate * 100) / 2 - latency_penalty
+
+
+# Global instance
+search_planner = ProviderSearchPlanner()
@@ -0,0 +1,280 @@
+"""
+Serve chapter pages straight out of CBZ archives.
+
+Organized chapters live in CBZ files, so their pages have no loose image on
+disk. Rather than extracting, archives are opened once and kept in a small
+LRU: the central directory is parsed on open, and the archive is memory
+mapped. Pages stored without compression (the usual case for already
+compressed images) are served as slices of the mapping without copying;
+deflated members are inflated from the mapping in chunks as they are
+streamed. An archive that changes on disk is reopened on its next use.
+"""
+
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Archive formats that can be read in place
+ARCHIVE_EXTENSIONS = (".cbz", ".zip")
+
+# Size of each slice yielded while streaming a page
+CHUNK_SIZE = 64 * 1024
+
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def is_page_archive(path: Optional[str]) -> bool:
+    """Whether a chapter path is an archive pages can be served from."""
+    return bool(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_page_member(info: zipfile.ZipInfo) -> bool:
+    """Whether an archive member is a page image."""
+    media_type = mimetypes.guess_type(info.filename)[0]
+    return not info.is_dir() and bool(media_type) and media_type.startswith("image/")
+
+
+def count_archive_pages(path: str) -> int:
+    """
+    Count the page images in an archive from its member list.
+
+    Args:
+        path: Path to the CBZ file
+
+    Returns:
+        Number of image members, 0 if the archive cannot be read
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return sum(1 for info in archive.infolist() if is_page_member(info))
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.warning(f"Could not read archive {path}: {e}")
+        return 0
+
+
+def _natural_key(name: str) -> List:
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", name)
+    ]
+
+
+@dataclass
+class ArchivePage:
+    """One image inside an archive."""
+
+    name: str
+    media_type: str
+    size: int
+    compress_type: int = zipfile.ZIP_STORED
+    compress_size: int = 0
+    # Where the member's (possibly compressed) bytes start in the archive
+    data_offset: Optional[int] = None
+
+
+class OpenArchive:
+    """An open archive with its parsed page list."""
+
+    def __init__(self, path: str):
+        stat = os.stat(path)
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self._file = open(path, "rb")
+        try:
+            self.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.zip = zipfile.ZipFile(self._file)
+        except Exception:
+            self._file.close()
+            raise
+        self.pages = self._index_pages()
+
+    def _index_pages(self) -> List[ArchivePage]:
+        pages = []
+        for info in self.zip.infolist():
+            if not is_page_member(info):
+                continue
+            pages.append(
+                ArchivePage(
+                    name=info.filename,
+                    media_type=mimetypes.guess_type(info.filename)[0],
+                    size=info.file_size,
+                    compress_type=info.compress_type,
+                    compress_size=info.compress_size,
+                    data_offset=self._data_offset(info),
+                )
+            )
+        pages.sort(key=lambda page: _natural_key(page.name))
+        return pages
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> Optional[int]:
+        """Locate a member's bytes, or None if zipfile has to read it."""
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return None
+        if info.flag_bits & 0x1:  # Encrypted
+            return None
+
+        start = info.header_offset
+        try:
+            signature, name_length, extra_length = _LOCAL_HEADER.unpack_from(
+                self.mmap, start
+            )
+        except struct.error:
+            return None
+        if signature != _LOCAL_HEADER_SIGNATURE:
+            return None
+
+        offset = start + _LOCAL_HEADER.size + name_length + extra_length
+        if offset + info.compress_size > len(self.mmap):
+            return None
+        return offset
+
+    def iter_page(self, page: ArchivePage) -> Iterator[bytes]:
+        """Yield a page's bytes in chunks."""
+        if page.data_offset is not None:
+            # The views keep the mapping alive even if the archive is evicted
+            view = memoryview(self.mmap)
+            end = page.data_offset + page.compress_size
+            inflater = (
+                zlib.decompressobj(-zlib.MAX_WBITS)
+                if page.compress_type == zipfile.ZIP_DEFLATED
+                else None
+            )
+            try:
+                for start in range(page.data_offset, end, CHUNK_SIZE):
+                    chunk = view[start : min(start + CHUNK_SIZE, end)]
+                    if inflater:
+                        chunk = inflater.decompress(chunk)
+                    if chunk:
+                        yield chunk
+                if inflater and (tail := inflater.flush()):
+                    yield tail
+            finally:
+                view.release()
+            return
+
+        with self.zip.open(page.name) as member:
+            while chunk := member.read(CHUNK_SIZE):
+                yield chunk
+
+    def close(self) -> None:
+        self.zip.close()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # A page is still streaming; the mapping goes away with its views
+            pass
+        self._file.close()
+
+
+class ArchivePageReader:
+    """Keep recently used archives open and serve their pages."""
+
+    MAX_OPEN_ARCHIVES = 32
+
+    def __init__(self, max_open: Optional[int] = None):
+        self.max_open = max_open or self.MAX_OPEN_ARCHIVES
+        self._archives: "OrderedDict[str, OpenArchive]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "opens": 0, "evictions": 0}
+
+    def get_pages(self, archive_path: str) -> List[ArchivePage]:
+        """
+        List the pages of an archive in reading order.
+
+        Args:
+            archive_path: Path to the CBZ file
+
+        Returns:
+            Image members, naturally sorted by name
+        """
+        return list(self._get_archive(archive_path).pages)
+
+    def open_page(
+        self, archive_path: str, page_number: int
+    ) -> Optional[Tuple[ArchivePage, Iterator[bytes]]]:
+        """
+        Look up a page by its 1-based number.
+
+        Returns:
+            The page and an iterator over its bytes, or None if the archive
+            has no such page
+        """
+        archive = self._get_archive(archive_path)
+        if not 1 <= page_number <= len(archive.pages):
+            return None
+        page = archive.pages[page_number - 1]
+        return page, archive.iter_page(page)
+
+    def invalidate(self, archive_path: str) -> None:
+        """Close an archive so its next use reopens it."""
+        with self._lock:
+            archive = self._archives.pop(os.path.abspath(archive_path), None)
+        if archive:
+            archive.close()
+
+    def close(self) -> None:
+        """Close every open archive."""
+        with self._lock:
+            archives = list(self._archives.values())
+            self._archives.clear()
+        for archive in archives:
+            archive.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get reader statistics."""
+        return {**self._stats, "open_archives": len(self._archives)}
+
+    def _get_archive(self, archive_path: str) -> OpenArchive:
+        key = os.path.abspath(archive_path)
+        stat = os.stat(key)
+        stale = None
+
+        with self._lock:
+            archive = self._archives.get(key)
+            if archive and archive.signature == (stat.st_mtime_ns, stat.st_size):
+                self._archives.move_to_end(key)
+                self._stats["hits"] += 1
+                return archive
+            if archive:
+                stale = self._archives.pop(key)
+
+        if stale:
+            logger.debug(f"Archive changed on disk, reopening: {key}")
+            stale.close()
+
+        archive = OpenArchive(key)
+        evicted = []
+        with self._lock:
+            self._stats["opens"] += 1
+            existing = self._archives.get(key)
+            if existing and existing.signature == archive.signature:
+                # Opened concurrently by another request; keep theirs
+                evicted.append(archive)
+                archive = existing
+            else:
+                if existing:
+                    evicted.append(existing)
+                self._archives[key] = archive
+            while len(self._archives) > self.max_open:
+                evicted.append(self._archives.popitem(last=False)[1])
+                self._stats["evictions"] += 1
+
+        for old in evicted:
+            old.close()
+        return archive
+
+
+# Global instance
+archive_page_reader = ArchivePageReader()
@@ -0,0 +1,411 @@
+"""Local prefix index for search-as-you-type suggestions.
+
+Titles and alternative titles of every known series (MangaUpdates entries,
+universal indexer entries and manga in user libraries) are kept in a sorted
+array of normalized keys, so a prefix lookup is two binary searches and never
+touches the network or the database.
+
+Full rebuilds run in the background: they load only the columns the index
+needs, then normalize and sort every term at once in a worker thread.
+Entries added or removed while a rebuild runs are replayed onto the new
+index before it is swapped in.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.library import MangaUserLibrary
+from app.models.manga import Manga
+from app.models.mangaupdates import MangaUpdatesEntry, UniversalMangaEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_title(text: Optional[str]) -> str:
+    """Normalize a title for prefix matching (case, accents, punctuation)."""
+    if not text:
+        return ""
+
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = "".join(ch if ch.isalnum() else " " for ch in stripped.casefold())
+    return " ".join(cleaned.split())
+
+
+def _iter_alternative_titles(alternative_titles) -> Iterable[str]:
+    """Yield alternative titles from the dict or list shapes stored in JSONB."""
+    if not alternative_titles:
+        return
+    if isinstance(alternative_titles, dict):
+        values = alternative_titles.values()
+    elif isinstance(alternative_titles, list):
+        values = []
+        for item in alternative_titles:
+            if isinstance(item, dict):
+                values.extend(item.values())
+            else:
+                values.append(item)
+    else:
+        return
+
+    for value in values:
+        if isinstance(value, str) and value:
+            yield value
+
+
+@dataclass
+class SuggestionEntry:
+    """A single suggestable series."""
+
+    key: str  # "<source>:<id>", unique within the index
+    title: str
+    source: str  # "mangaupdates", an indexer name, or "library"
+    entry_id: str
+    year: Optional[int] = None
+    type: Optional[str] = None
+    cover_image: Optional[str] = None
+    score: float = 0.0  # Popularity score, higher is better
+    terms: Set[str] = field(default_factory=set)
+
+    def to_dict(self, in_library: bool = False) -> Dict:
+        return {
+            "title": self.title,
+            "mu_entry_id": self.entry_id if self.source == "mangaupdates" else None,
+            "entry_id": self.entry_id,
+            "source": self.source,
+            "year": self.year,
+            "type": self.type,
+            "cover_image": self.cover_image,
+            "in_library": in_library,
+        }
+
+
+def popularity_score(
+    popularity_rank: Optional[int] = None,
+    rating_count: Optional[int] = None,
+    follows: Optional[int] = None,
+) -> float:
+    """Combine the popularity signals indexers expose into one sortable score."""
+    score = 0.0
+    if popularity_rank and popularity_rank > 0:
+        score += 10.0 / math.log10(popularity_rank + 9)
+    if rating_count:
+        score += math.log10(rating_count + 1)
+    if follows:
+        score += math.log10(follows + 1)
+    return score
+
+
+def _mangaupdates_suggestion(mu_entry: Any) -> Tuple[SuggestionEntry, List[str]]:
+    """Suggestion and titles of a MangaUpdates entry or row."""
+    return (
+        SuggestionEntry(
+            key=f"mangaupdates:{mu_entry.id}",
+            title=mu_entry.title,
+            source="mangaupdates",
+            entry_id=str(mu_entry.id),
+            year=mu_entry.year,
+            type=mu_entry.type,
+            cover_image=mu_entry.cover_image_url,
+            score=popularity_score(mu_entry.popularity_rank, mu_entry.rating_count),
+        ),
+        [mu_entry.title, *_iter_alternative_titles(mu_entry.alternative_titles)],
+    )
+
+
+def _universal_suggestion(entry: Any) -> Tuple[SuggestionEntry, List[str]]:
+    """Suggestion and titles of a universal entry or row."""
+    return (
+        SuggestionEntry(
+            key=f"{entry.source_indexer}:{entry.source_id}",
+            title=entry.title,
+            source=entry.source_indexer,
+            entry_id=str(entry.id),
+            year=entry.year,
+            type=entry.type,
+            cover_image=entry.cover_image_url,
+            score=popularity_score(
+                entry.popularity_rank, entry.rating_count, entry.follows
+            ),
+        ),
+        [entry.title, *_iter_alternative_titles(entry.alternative_titles)],
+    )
+
+
+def _library_suggestion(manga: Any) -> Tuple[SuggestionEntry, List[str]]:
+    """Suggestion and titles of a library manga or row."""
+    return (
+        SuggestionEntry(
+            key=f"library:{manga.id}",
+            title=manga.title,
+            source="library",
+            entry_id=str(manga.id),
+            year=manga.year,
+            type=getattr(manga.type, "value", manga.type),
+            cover_image=manga.cover_image,
+        ),
+        [manga.title, *_iter_alternative_titles(manga.alternative_titles)],
+    )
+
+
+class AutocompleteIndex:
+    """Sorted-array prefix index over series titles."""
+
+    # Full rebuilds pick up library changes made through paths that don't
+    # notify the index (imports, external sync, bulk deletes).
+    REBUILD_INTERVAL_SECONDS = 30 * 60
+
+    # Upper bound on terms examined per lookup so very short prefixes on a
+    # large catalogue stay within the latency budget.
+    MAX_SCANNED_TERMS = 2000
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []  # (normalized term, entry key)
+        self._entries: Dict[str, SuggestionEntry] = {}
+        self._user_library: Dict[str, Set[str]] = {}  # user_id -> manga ids
+        self._built_at: Optional[float] = None
+        self._build_lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+        # Changes made while a rebuild runs, replayed onto the new index
+        self._journal: Optional[List[Callable[["AutocompleteIndex"], None]]] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: SuggestionEntry, titles: Iterable[str]) -> None:
+        """Insert or replace an entry, indexing all of its titles."""
+        titles = list(titles)
+        self.remove(entry.key)
+        self._record(lambda index: index.add(entry, titles))
+
+        entry.terms = {term for term in map(normalize_title, titles) if term}
+        if not entry.terms:
+            return
+
+        self._entries[entry.key] = entry
+        for term in entry.terms:
+            bisect.insort(self._keys, (term, entry.key))
+
+    def remove(self, key: str) -> None:
+        """Remove an entry and all of its indexed terms."""
+        self._record(lambda index: index.remove(key))
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+
+        for term in entry.terms:
+            pos = bisect.bisect_left(self._keys, (term, key))
+            if pos < len(self._keys) and self._keys[pos] == (term, key):
+                del self._keys[pos]
+
+    def add_mangaupdates_entry(self, mu_entry: MangaUpdatesEntry) -> None:
+        """Index a MangaUpdates entry."""
+        self.add(*_mangaupdates_suggestion(mu_entry))
+
+    def add_universal_entry(self, entry: UniversalMangaEntry) -> None:
+        """Index a universal (tiered indexer) entry."""
+        self.add(*_universal_suggestion(entry))
+
+    def add_library_manga(self, user_id, manga: Manga) -> None:
+        """Index a manga and record that it is in the given user's library."""
+        self.add(*_library_suggestion(manga))
+        self._add_library_member(str(user_id), str(manga.id))
+
+    def remove_library_manga(self, user_id, manga_id) -> None:
+        """Forget that a manga is in the given user's library."""
+        self._record(lambda index: index.remove_library_manga(user_id, manga_id))
+        manga_ids = self._user_library.get(str(user_id))
+        if manga_ids:
+            manga_ids.discard(str(manga_id))
+
+        if not any(str(manga_id) in ids for ids in self._user_library.values()):
+            self.remove(f"library:{manga_id}")
+
+    def suggest(
+        self, query: str, limit: int = 10, user_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Return up to ``limit`` suggestions whose titles start with ``query``."""
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+
+        library_ids = self._user_library.get(str(user_id), set()) if user_id else set()
+
+        start = bisect.bisect_left(self._keys, (prefix, ""))
+        end = bisect.bisect_left(self._keys, (prefix + "\U0010ffff", ""), lo=start)
+
+        ranked: Dict[str, Tuple] = {}
+        for pos in range(start, min(end, start + self.MAX_SCANNED_TERMS)):
+            term, key = self._keys[pos]
+            entry = self._entries[key]
+            if entry.source == "library" and entry.entry_id not in library_ids:
+                # Other users' libraries are not suggested
+                continue
+
+            # Library titles first, then exact matches, then popularity
+            rank = (
+                entry.source == "library",
+                term == prefix,
+                entry.score,
+                -len(entry.title),
+            )
+            if rank > ranked.get(key, ()):
+                ranked[key] = rank
+
+        ordered = heapq.nlargest(limit * 3, ranked.items(), key=lambda item: item[1])
+
+        suggestions = []
+        seen_titles: Set[str] = set()
+        for key, rank in ordered:
+            entry = self._entries[key]
+            in_library = rank[0]
+            title_key = normalize_title(entry.title)
+            if title_key in seen_titles:
+                continue
+            seen_titles.add(title_key)
+            suggestions.append(entry.to_dict(in_library=in_library))
+            if len(suggestions) >= limit:
+                break
+
+        return suggestions
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Rebuild the whole index from the database."""
+        started = time.monotonic()
+        self._journal = []
+        try:
+            result = await db.execute(
+                select(
+                    MangaUpdatesEntry.id,
+                    MangaUpdatesEntry.title,
+                    MangaUpdatesEntry.alternative_titles,
+                    MangaUpdatesEntry.year,
+                    MangaUpdatesEntry.type,
+                    MangaUpdatesEntry.cover_image_url,
+                    MangaUpdatesEntry.popularity_rank,
+                    MangaUpdatesEntry.rating_count,
+                )
+            )
+            mu_rows = result.all()
+
+            result = await db.execute(
+                select(
+                    UniversalMangaEntry.id,
+                    UniversalMangaEntry.source_indexer,
+                    UniversalMangaEntry.source_id,
+                    UniversalMangaEntry.title,
+                    UniversalMangaEntry.alternative_titles,
+                    UniversalMangaEntry.year,
+                    UniversalMangaEntry.type,
+                    UniversalMangaEntry.cover_image_url,
+                    UniversalMangaEntry.popularity_rank,
+                    UniversalMangaEntry.rating_count,
+                    UniversalMangaEntry.follows,
+                )
+            )
+            universal_rows = result.all()
+
+            result = await db.execute(
+                select(
+                    MangaUserLibrary.user_id,
+                    Manga.id,
+                    Manga.title,
+                    Manga.alternative_titles,
+                    Manga.year,
+                    Manga.type,
+                    Manga.cover_image,
+                ).join(Manga, MangaUserLibrary.manga_id == Manga.id)
+            )
+            library_rows = result.all()
+
+            index = await asyncio.to_thread(
+                self._build, mu_rows, universal_rows, library_rows
+            )
+
+            # Keep what was added or removed meanwhile, then swap in one step
+            for change in self._journal:
+                change(index)
+            self._keys = index._keys
+            self._entries = index._entries
+            self._user_library = index._user_library
+            self._built_at = time.monotonic()
+        finally:
+            self._journal = None
+
+        logger.info(
+            f"Built autocomplete index with {len(self._entries)} entries and "
+            f"{len(self._keys)} terms in {(self._built_at - started) * 1000:.0f}ms"
+        )
+
+    def ensure_built(self) -> None:
+        """Build the index in the background on first use and when it is stale."""
+        stale = (
+            not self.is_built
+            or time.monotonic() - self._built_at > self.REBUILD_INTERVAL_SECONDS
+        )
+        if stale and (self._rebuild_task is None or self._rebuild_task.done()):
+            self._rebuild_task = asyncio.create_task(self._background_rebuild())
+
+    async def _background_rebuild(self) -> None:
+        from app.db.session import AsyncSessionLocal
+
+        try:
+            async with self._build_lock:
+                async with AsyncSessionLocal() as db:
+                    await self.rebuild(db)
+        except Exception as e:
+            logger.error(f"Error rebuilding autocomplete index: {e}")
+
+    @staticmethod
+    def _build(
+        mu_rows: List[Any], universal_rows: List[Any], library_rows: List[Any]
+    ) -> "AutocompleteIndex":
+        """Build a new index from database rows, sorting its terms once."""
+        index = AutocompleteIndex()
+        suggestions = chain(
+            map(_mangaupdates_suggestion, mu_rows),
+            map(_universal_suggestion, universal_rows),
+            map(_library_suggestion, library_rows),
+        )
+        for entry, titles in suggestions:
+            # A later entry with the same key replaces the earlier one
+            entry.terms = {term for term in map(normalize_title, titles) if term}
+            if entry.terms:
+                index._entries[entry.key] = entry
+            else:
+                index._entries.pop(entry.key, None)
+
+        for row in library_rows:
+            index._add_library_member(str(row.user_id), str(row.id))
+
+        index._keys = sorted(
+            (term, key) for key, entry in index._entries.items() for term in entry.terms
+        )
+        return index
+
+    def _add_library_member(self, user_id: str, manga_id: str) -> None:
+        self._record(lambda index: index._add_library_member(user_id, manga_id))
+        self._user_library.setdefault(user_id, set()).add(manga_id)
+
+    def _record(self, change: Callable[["AutocompleteIndex"], None]) -> None:
+        if self._journal is not None:
+            self._journal.append(change)
+
+
+# Global index instance
+autocomplete_index = AutocompleteIndex()
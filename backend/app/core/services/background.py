@@ -1,10 +1,15 @@
+import asyncio
 import logging
 import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set
 from uuid import UUID
 
 from app.core.services.download import download_chapter_with_fallback, download_manga
+from app.core.services.download_coordinator import (
+    chapter_download_key,
+    download_coordinator,
+)
 from app.db.session import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
@@ -13,6 +18,12 @@ logger = logging.getLogger(__name__)
 # Dictionary to store download tasks
 download_tasks: Dict[str, Dict[str, Any]] = {}
 
+# Chapter downloads in progress, by task ID, so they can be paused
+_running_downloads: Dict[str, asyncio.Task] = {}
+
+# Resumed chapter downloads, kept referenced until they finish
+_resumed_downloads: Set[asyncio.Task] = set()
+
 
 async def download_manga_task(
     manga_id,
@@ -106,10 +117,14 @@ async def download_chapter_task(
     external_manga_id: str,
     external_chapter_id: str,
     user_id,
+    task_id: Optional[str] = None,
 ) -> str:
     """
     Background task to download a single chapter.
 
+    If the chapter is already being downloaded, no second download is
+    started and the ID of the running task is returned instead.
+
     Args:
         manga_id: The ID of the manga
         chapter_id: The ID of the chapter
@@ -117,6 +132,7 @@ async def download_chapter_task(
         external_manga_id: The external ID of the manga
         external_chapter_id: The external ID of the chapter
         user_id: The ID of the user
+        task_id: Optional task ID, already claimed for the chapter
 
     Returns:
         The task ID
@@ -129,8 +145,15 @@ async def download_chapter_task(
     if isinstance(user_id, str):
         user_id = UUID(user_id)
 
-    # Create a unique task ID
-    task_id = f"{user_id}_{manga_id}_{chapter_id}_{int(time.time())}"
+    # Use provided task ID or create a unique one
+    if task_id is None:
+        task_id = f"{user_id}_{manga_id}_{chapter_id}_{int(time.time())}"
+
+    download_key = chapter_download_key(chapter_id)
+    owner = await download_coordinator.claim(download_key, task_id)
+    if owner:
+        await attach_to_download_task(owner, user_id)
+        return owner
 
     # Get manga and chapter details for better task info
     manga_title = "Unknown Manga"
@@ -161,7 +184,8 @@ async def download_chapter_task(
     except Exception as e:
         logger.error(f"Could not get chapter details for task: {e}", exc_info=True)
 
-    # Update task status
+    # Update task status, keeping the followers of a resumed task
+    subscribers = download_tasks.get(task_id, {}).get("subscribers", [])
     download_tasks[task_id] = {
         "task_id": task_id,
         "manga_id": str(manga_id),
@@ -181,35 +205,36 @@ async def download_chapter_task(
         "started_at": datetime.now().isoformat(),
         "error": None,
     }
+    if subscribers:
+        download_tasks[task_id]["subscribers"] = subscribers
+    await publish_download_task(task_id)
 
     try:
-        # Create a new database session
-        async with AsyncSessionLocal() as db:
-            # Get chapter to check for fallback providers
-            from app.models.manga import Chapter
-
-            chapter = await db.get(Chapter, chapter_id)
-            fallback_providers = None
-
-            if chapter and chapter.fallback_providers:
-                fallback_providers = chapter.fallback_providers
-
-            # Download chapter with fallback support
-            await download_chapter_with_fallback(
-                manga_id=manga_id,
-                chapter_id=chapter_id,
-                primary_provider=provider_name,
-                external_manga_id=external_manga_id,
-                external_chapter_id=external_chapter_id,
-                db=db,
-                fallback_providers=fallback_providers,
-                auto_discover_alternatives=True,
-                task_id=task_id,
+        async with download_coordinator.hold(download_key, task_id):
+            # Run the download as its own task, so pausing cancels only it
+            download = asyncio.create_task(
+                _run_chapter_download(
+                    manga_id,
+                    chapter_id,
+                    provider_name,
+                    external_manga_id,
+                    external_chapter_id,
+                    task_id,
+                )
             )
+            _running_downloads[task_id] = download
+            try:
+                await download
+            finally:
+                _running_downloads.pop(task_id, None)
 
             # Update task status
             download_tasks[task_id]["status"] = "completed"
             download_tasks[task_id]["progress"] = 100
+    except asyncio.CancelledError:
+        if download_tasks[task_id]["status"] != "paused":
+            raise
+        logger.info(f"Paused chapter download {task_id}")
     except Exception as e:
         # Log error
         logger.error(f"Error downloading chapter: {e}")
@@ -231,6 +256,110 @@ async def download_chapter_task(
         except Exception as ws_error:
             logger.error(f"Error sending download failed event: {ws_error}")
 
+    await publish_download_task(task_id)
+    return task_id
+
+
+async def _run_chapter_download(
+    manga_id: UUID,
+    chapter_id: UUID,
+    provider_name: str,
+    external_manga_id: str,
+    external_chapter_id: str,
+    task_id: str,
+) -> None:
+    """Download a chapter in a new database session."""
+    async with AsyncSessionLocal() as db:
+        # Get chapter to check for fallback providers
+        from app.models.manga import Chapter
+
+        chapter = await db.get(Chapter, chapter_id)
+        fallback_providers = None
+
+        if chapter and chapter.fallback_providers:
+            fallback_providers = chapter.fallback_providers
+
+        # Download chapter with fallback support
+        await download_chapter_with_fallback(
+            manga_id=manga_id,
+            chapter_id=chapter_id,
+            primary_provider=provider_name,
+            external_manga_id=external_manga_id,
+            external_chapter_id=external_chapter_id,
+            db=db,
+            fallback_providers=fallback_providers,
+            auto_discover_alternatives=True,
+            task_id=task_id,
+        )
+
+
+def pause_download_task(task_id: str) -> bool:
+    """
+    Pause a running chapter download.
+
+    The download is cancelled. Pages saved so far stay in the chapter's
+    checkpoint, so resuming only fetches the rest.
+
+    Args:
+        task_id: The ID of the task
+
+    Returns:
+        True if the download was paused, False if it was not running
+    """
+    download = _running_downloads.get(task_id)
+    if download is None or download.done():
+        return False
+
+    download_tasks[task_id]["status"] = "paused"
+    download.cancel()
+    return True
+
+
+async def resume_download_task(task_id: str) -> Optional[str]:
+    """
+    Resume a paused chapter download from its checkpoint.
+
+    If another task started downloading the chapter in the meantime, the
+    paused task is cancelled and its users follow the other one instead.
+
+    Args:
+        task_id: The ID of the paused task
+
+    Returns:
+        The ID of the task now downloading the chapter, or None if the task
+        is not paused
+    """
+    task = await find_download_task(task_id)
+    if task is None or task["status"] != "paused":
+        return None
+
+    # A task paused by another worker is resumed in this one
+    task = download_tasks.setdefault(task_id, task)
+    owner = await download_coordinator.claim(
+        chapter_download_key(task["chapter_id"]), task_id
+    )
+    if owner:
+        for user_id in [task["user_id"], *task.get("subscribers", [])]:
+            await attach_to_download_task(owner, user_id)
+        task["status"] = "cancelled"
+        await publish_download_task(task_id)
+        return owner
+
+    task["status"] = "queued"
+    await publish_download_task(task_id)
+    resumed = asyncio.create_task(
+        download_chapter_task(
+            manga_id=task["manga_id"],
+            chapter_id=task["chapter_id"],
+            provider_name=task["provider"],
+            external_manga_id=task["external_manga_id"],
+            external_chapter_id=task["external_chapter_id"],
+            user_id=task["user_id"],
+            task_id=task_id,
+        )
+    )
+    _resumed_downloads.add(resumed)
+    resumed.add_done_callback(_resumed_downloads.discard)
     return task_id
 
 
@@ -247,6 +376,44 @@ def get_download_task(task_id: str) -> Optional[Dict[str, Any]]:
     return download_tasks.get(task_id)
 
 
+async def find_download_task(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a download task by ID, wherever it runs.
+
+    Tasks of other worker processes are read from the state they publish
+    to Valkey. Followers recorded by any worker are included.
+
+    Args:
+        task_id: The ID of the task
+
+    Returns:
+        The task or None if not found
+    """
+    task = download_tasks.get(task_id) or await download_coordinator.get_task(task_id)
+    if task is None:
+        return None
+
+    subscribers = list(task.get("subscribers", []))
+    for user_id in await download_coordinator.get_subscribers(task_id):
+        if user_id not in subscribers:
+            subscribers.append(user_id)
+    if not subscribers:
+        return task
+    return {**task, "subscribers": subscribers}
+
+
+async def publish_download_task(task_id: str) -> None:
+    """
+    Share the state of a download task run by this process.
+
+    Args:
+        task_id: The ID of the task
+    """
+    task = download_tasks.get(task_id)
+    if task is not None:
+        await download_coordinator.publish_task(task)
+
+
 def get_user_download_tasks(user_id) -> Dict[str, Dict[str, Any]]:
     """
     Get all download tasks for a user.
@@ -259,12 +426,72 @@ def get_user_download_tasks(user_id) -> Dict[str, Dict[str, Any]]:
     """
     user_tasks = {}
     for task_id, task in download_tasks.items():
-        if task["user_id"] == str(user_id):
+        if can_view_download_task(task, user_id):
+            user_tasks[task_id] = task
+
+    return user_tasks
+
+
+async def find_user_download_tasks(user_id) -> Dict[str, Dict[str, Any]]:
+    """
+    Get all download tasks for a user, including followed tasks that run
+    in other worker processes.
+
+    Args:
+        user_id: The ID of the user
+
+    Returns:
+        A dictionary of tasks
+    """
+    user_tasks = get_user_download_tasks(user_id)
+    for task_id in await download_coordinator.get_followed_tasks(str(user_id)):
+        if task_id in user_tasks:
+            continue
+        task = await find_download_task(task_id)
+        if task and can_view_download_task(task, user_id):
             user_tasks[task_id] = task
 
     return user_tasks
 
 
+def can_view_download_task(task: Dict[str, Any], user_id) -> bool:
+    """
+    Check whether a user may see a download task.
+
+    Args:
+        task: The task
+        user_id: The ID of the user
+
+    Returns:
+        True for the user who started the task and users following it
+    """
+    return task["user_id"] == str(user_id) or str(user_id) in task.get(
+        "subscribers", ()
+    )
+
+
+async def attach_to_download_task(task_id: str, user_id) -> None:
+    """
+    Let a user follow a download another request already started.
+
+    The running task may belong to another worker process, or not have
+    started yet, so the follower is also recorded in Valkey.
+
+    Args:
+        task_id: The ID of the running task
+        user_id: The ID of the user who asked for the same download
+    """
+    task = download_tasks.get(task_id) or await download_coordinator.get_task(task_id)
+    if task is not None and task["user_id"] == str(user_id):
+        return
+
+    if task_id in download_tasks:
+        subscribers = download_tasks[task_id].setdefault("subscribers", [])
+        if str(user_id) not in subscribers:
+            subscribers.append(str(user_id))
+    await download_coordinator.add_subscriber(task_id, str(user_id))
+
+
 def cancel_download_task(task_id: str, user_id: UUID = None) -> bool:
     """
     Cancel a download task.
@@ -371,85 +598,31 @@ async def discover_alternatives_task(
     """
     Background task to discover alternative sources for all chapters in a manga.
 
+    Each provider is searched once for the series and its chapter list is mapped
+    onto every local chapter, instead of searching all providers per chapter.
+
     Args:
         manga_id: The ID of the manga
         manga_title: The title of the manga
         provider: The original provider name
     """
-    from app.core.services.provider_matching import provider_matching_service
-    from app.models.manga import Chapter
+    from app.core.services.series_matcher import series_matcher
+    from app.models.manga import Manga
 
     logger.info(f"Starting alternative discovery for manga {manga_id} ({manga_title})")
 
     try:
         # Create a new database session
         async with AsyncSessionLocal() as db:
-            # Get all chapters
-            from sqlalchemy import select
+            manga = await db.get(Manga, manga_id)
+            if not manga:
+                logger.warning(f"Manga {manga_id} not found for alternative discovery")
+                return
 
-            result = await db.execute(
-                select(Chapter).where(Chapter.manga_id == manga_id)
-            )
-            chapters = result.scalars().all()
-
-            discovered_count = 0
-            total_chapters = len(chapters)
-
-            logger.info(f"Discovering alternatives for {total_chapters} chapters")
-
-            for idx, chapter in enumerate(chapters, 1):
-                try:
-                    logger.info(
-                        f"Processing chapter {idx}/{total_chapters}: {chapter.number}"
-                    )
-
-                    # Find alternatives for this chapter with optimized settings
-                    alternatives = (
-                        await provider_matching_service.find_chapter_alternatives(
-                            manga_title=manga_title,
-                            chapter_number=chapter.number,
-                            original_provider=provider,
-                            max_alternatives=2,  # Reduced for speed
-                            timeout_per_provider=5,  # 5 second timeout per provider
-                            max_providers_to_search=4,  # Only search top 4 providers
-                        )
-                    )
-
-                    if alternatives:
-                        # Store provider external IDs
-                        if not chapter.provider_external_ids:
-                            chapter.provider_external_ids = {}
-
-                        # Store fallback providers
-                        fallback_providers = []
-
-                        for alt in alternatives:
-                            chapter.provider_external_ids[alt.provider_name.lower()] = (
-                                alt.external_chapter_id
-                            )
-                            fallback_providers.append(alt.provider_name)
-
-                        chapter.fallback_providers = fallback_providers
-                        discovered_count += 1
-
-                        logger.info(
-                            f"Found {len(alternatives)} alternatives for chapter {chapter.number}"
-                        )
-                    else:
-                        logger.info(
-                            f"No alternatives found for chapter {chapter.number}"
-                        )
-
-                except Exception as e:
-                    logger.warning(
-                        f"Error discovering alternatives for chapter {chapter.id}: {e}"
-                    )
-                    continue
-
-            await db.commit()
+            matched_providers = await series_matcher.match_series(db, manga)
 
             logger.info(
-                f"Alternative discovery completed: {discovered_count}/{total_chapters} chapters"
+                f"Alternative discovery completed: {manga_title} found on {matched_providers} providers"
             )
 
     except Exception as e:
@@ -5,9 +5,11 @@ This module provides functionality to organize multiple manga and chapters
 in batch operations with progress tracking and error handling.
 """
 
+import asyncio
 import logging
+import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from uuid import UUID
 
 from sqlalchemy import select, update
@@ -136,6 +138,50 @@ class BatchOrganizer:
         started_at = result.scalar_one_or_none()
         return started_at is not None
 
+    async def _convert_chapter_directories(
+        self, manga: Manga, chapters: Sequence[Chapter], user: User
+    ) -> Tuple[Dict[UUID, str], Optional[Dict[str, Any]]]:
+        """
+        Repack a manga's loose-page chapters into CBZs across the converter's workers.
+
+        Args:
+            manga: The manga
+            chapters: Its chapters
+            user: The user whose preferences apply
+
+        Returns:
+            The repacked CBZ of every chapter that converted, by chapter ID,
+            and the conversion summary, None if nothing needed converting
+        """
+        if not user.create_cbz_files:
+            return {}, None
+
+        def find_directories() -> List[Chapter]:
+            return [
+                chapter
+                for chapter in chapters
+                if chapter.file_path and os.path.isdir(chapter.file_path)
+            ]
+
+        directories = await asyncio.to_thread(find_directories)
+        if not directories:
+            return {}, None
+
+        conversions = [
+            (manga, chapter, f"{chapter.file_path.rstrip(os.sep)}.repacked.cbz")
+            for chapter in directories
+        ]
+        summary = await self.cbz_converter.convert_chapters(conversions)
+
+        def find_converted() -> Dict[UUID, str]:
+            return {
+                chapter.id: output_path
+                for _, chapter, output_path in conversions
+                if os.path.exists(output_path)
+            }
+
+        return await asyncio.to_thread(find_converted), summary
+
     async def organize_manga_batch(
         self,
         manga_ids: List[UUID],
@@ -166,6 +212,7 @@ class BatchOrganizer:
                 successful_chapters = 0
                 failed_chapters = 0
                 errors = []
+                conversion = {"converted": 0, "failed": 0, "elapsed_seconds": 0.0}
 
                 # Count total chapters first
                 for manga_id in manga_ids:
@@ -197,6 +244,16 @@ class BatchOrganizer:
                         )
                         chapters = result.scalars().all()
 
+                        # Repack loose pages in parallel, then organize in order
+                        converted, conversion_summary = (
+                            await self._convert_chapter_directories(
+                                manga, chapters, user
+                            )
+                        )
+                        if conversion_summary:
+                            for key in conversion:
+                                conversion[key] += conversion_summary[key]
+
                         # Organize each chapter
                         for chapter in chapters:
                             try:
@@ -205,6 +262,7 @@ class BatchOrganizer:
                                     chapter=chapter,
                                     user=user,
                                     preserve_original=preserve_original,
+                                    converted_path=converted.get(chapter.id),
                                 )
 
                                 if result.success:
@@ -278,6 +336,9 @@ class BatchOrganizer:
                                 errors.append(error_msg)
                                 logger.error(error_msg)
 
+                        # Repacked archives of chapters that failed to organize
+                        await asyncio.to_thread(_remove_files, converted.values())
+
                         await db.commit()
 
                     except Exception as e:
@@ -303,6 +364,16 @@ class BatchOrganizer:
                     "failed_chapters": failed_chapters,
                     "errors": errors[:50],  # Limit errors to prevent huge payloads
                 }
+                if conversion["converted"] or conversion["failed"]:
+                    elapsed = conversion["elapsed_seconds"]
+                    summary["cbz_conversion"] = {
+                        **conversion,
+                        "chapters_per_second": (
+                            round(conversion["converted"] / elapsed, 2)
+                            if elapsed > 0
+                            else 0.0
+                        ),
+                    }
 
                 await db.execute(
                     update(OrganizationJob)
@@ -356,5 +427,15 @@ class BatchOrganizer:
             )
 
 
+def _remove_files(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+
+
 # Global instance
 batch_organizer = BatchOrganizer()
@@ -3,33 +3,274 @@ CBZ conversion service for manga chapters.
 
 This module handles the conversion of various manga formats (directories, archives)
 into standardized CBZ files with proper organization and metadata.
+
+Pages are copied member by member: ZIP and 7z sources are read straight from the
+archive without extracting them to disk first. JPEG, PNG, WebP and the like are
+already compressed and are stored; only formats that still shrink, such as BMP
+scans or metadata, are deflated. Whole libraries are converted across a process
+pool, so a batch is bound by disk rather than by one core.
 """
 
-import json
+import asyncio
+import io
 import logging
+import mimetypes
+import multiprocessing
 import os
+import re
 import shutil
 import tempfile
+import threading
+import time
 import zipfile
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import py7zr
+from PIL import Image
+from py7zr.io import Py7zIO, WriterFactory
 from pyunpack import Archive
 
+from app.core.config import settings
+from app.core.services.cbz_sink import CBZPageSink
 from app.core.services.naming import naming_engine
 from app.core.utils import get_image_dimensions, is_image_file
 from app.models.manga import Chapter, Manga
 
 logger = logging.getLogger(__name__)
 
+# Image formats that are already compressed and gain nothing from deflate
+COMPRESSED_MEDIA_TYPES = {
+    "image/avif",
+    "image/gif",
+    "image/heic",
+    "image/jpeg",
+    "image/jxl",
+    "image/png",
+    "image/webp",
+}
+
+ZIP_EXTENSIONS = (".zip", ".cbz")
+RAR_EXTENSIONS = (".rar", ".cbr")
+SEVEN_ZIP_EXTENSIONS = (".7z", ".cb7")
+
+
+def member_compress_type(name: str) -> int:
+    """Store already compressed images, deflate everything else."""
+    media_type, _ = mimetypes.guess_type(name)
+    if media_type in COMPRESSED_MEDIA_TYPES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def natural_sort_key(path: str) -> List:
+    """Sort key putting 2 before 10 in file names."""
+    filename = os.path.basename(path)
+    numbers = re.findall(r"\d+", filename)
+    return [int(num) for num in numbers] + [filename]
+
+
+def is_page_name(name: str) -> bool:
+    """Whether an archive member or file name looks like a page image."""
+    if name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+        return False
+    media_type, _ = mimetypes.guess_type(name)
+    return bool(media_type and media_type.startswith("image/"))
+
+
+def list_pages(source_path: str) -> List[str]:
+    """
+    List a chapter's page images in reading order.
+
+    Args:
+        source_path: A directory of images, or a ZIP/CBZ or 7z archive
+
+    Returns:
+        File paths for a directory, member names for an archive
+    """
+    if os.path.isdir(source_path):
+        names = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(source_path)
+            for file in files
+        ]
+    elif source_path.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(source_path) as archive:
+            names = archive.namelist()
+    elif source_path.lower().endswith(SEVEN_ZIP_EXTENSIONS):
+        with py7zr.SevenZipFile(source_path) as archive:
+            names = archive.getnames()
+    else:
+        raise ValueError(f"Unsupported archive format: {source_path}")
+
+    return sorted((name for name in names if is_page_name(name)), key=natural_sort_key)
+
+
+class _PageWriter(Py7zIO):
+    """Collects one 7z member and hands it on once it is decompressed."""
+
+    def __init__(self, name: str, deliver: Callable[[str, bytes], None]):
+        self.name = name
+        self.deliver = deliver
+        self.buffer = io.BytesIO()
+        self.delivered = False
+
+    def write(self, s) -> int:
+        return self.buffer.write(s)
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        return self.buffer.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.buffer.seek(offset, whence)
+
+    def flush(self) -> None:
+        pass
+
+    def size(self) -> int:
+        return self.buffer.getbuffer().nbytes
+
+    def close(self) -> None:
+        if not self.delivered:
+            self.delivered = True
+            self.deliver(self.name, self.buffer.getvalue())
+            self.buffer = io.BytesIO()
+
+
+class _PageWriterFactory(WriterFactory):
+    def __init__(self, deliver: Callable[[str, bytes], None]):
+        self.deliver = deliver
+        self.writers: List[_PageWriter] = []
+
+    def create(self, filename: str) -> Py7zIO:
+        writer = _PageWriter(filename, self.deliver)
+        self.writers.append(writer)
+        return writer
+
+
+def read_pages(
+    source_path: str, names: List[str], deliver: Callable[[str, bytes], None]
+) -> None:
+    """
+    Read a chapter's pages one at a time, handing each to ``deliver``.
+
+    7z members may be delivered out of order, and from several threads.
+    """
+    if os.path.isdir(source_path):
+        for name in names:
+            with open(name, "rb") as f:
+                deliver(name, f.read())
+    elif source_path.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(source_path) as archive:
+            for name in names:
+                deliver(name, archive.read(name))
+    else:
+        factory = _PageWriterFactory(deliver)
+        with py7zr.SevenZipFile(source_path) as archive:
+            archive.extract(targets=names, factory=factory)
+        # Older py7zr releases do not close writers as members finish
+        for writer in factory.writers:
+            writer.close()
+
+
+def get_image_size(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Read an image's dimensions from its header."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def repack_to_cbz(
+    source_path: str, output_path: str, metadata: Optional[Dict] = None
+) -> Dict[str, int]:
+    """
+    Repack a chapter directory or archive into a CBZ.
+
+    Runs in a worker process. Pages are renumbered in reading order; RAR
+    sources have no streaming reader here and are extracted to a temporary
+    directory first.
+
+    Args:
+        source_path: A directory of images, or a ZIP/CBZ, RAR/CBR or 7z archive
+        output_path: Output CBZ file path
+        metadata: Chapter metadata to complete with the pages and include
+
+    Returns:
+        The number of pages and their total size in bytes
+
+    Raises:
+        ValueError: If the source holds no images or is not supported
+    """
+    if source_path.lower().endswith(RAR_EXTENSIONS):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            Archive(source_path).extractall(temp_dir)
+            return repack_to_cbz(temp_dir, output_path, metadata)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    names = list_pages(source_path)
+    if not names:
+        raise ValueError(f"No image files found in {source_path}")
+    numbers = {name: number for number, name in enumerate(names, start=1)}
+    pages: Dict[int, Dict[str, Any]] = {}
+    lock = threading.Lock()
+
+    sink = CBZPageSink(output_path)
+    sink.open()
+
+    def add_page(name: str, data: bytes) -> None:
+        number = numbers[name]
+        width, height = get_image_size(data)
+        with lock:
+            sink.add_page(
+                number, os.path.splitext(name)[1], data, member_compress_type(name)
+            )
+        pages[number] = {
+            "number": number,
+            "filename": os.path.basename(name),
+            "width": width,
+            "height": height,
+        }
+
+    try:
+        read_pages(source_path, names, add_page)
+        if metadata is not None:
+            metadata = dict(metadata)
+            metadata["chapter"] = {
+                **metadata.get("chapter", {}),
+                "pages_count": len(names),
+            }
+            metadata["pages"] = [pages[number] for number in sorted(pages)]
+        sink.finalize(metadata)
+    except BaseException:
+        sink.discard()
+        raise
+
+    return {"pages": len(pages), "bytes": sink.bytes_written}
+
 
 class CBZConverter:
     """
     Service for converting manga chapters to CBZ format with proper organization.
     """
 
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         """Initialize the CBZ converter."""
         self.naming_engine = naming_engine
+        self.max_workers = max_workers or settings.CBZ_CONVERSION_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop or open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
 
     def get_image_files_from_directory(self, directory_path: str) -> List[str]:
         """
@@ -50,14 +291,6 @@ class CBZConverter:
                     image_files.append(file_path)
 
         # Sort files naturally (1, 2, 10 instead of 1, 10, 2)
-        def natural_sort_key(path):
-            import re
-
-            filename = os.path.basename(path)
-            # Extract numbers from filename for natural sorting
-            numbers = re.findall(r"\d+", filename)
-            return [int(num) if num.isdigit() else num for num in numbers] + [filename]
-
         image_files.sort(key=natural_sort_key)
         return image_files
 
@@ -96,21 +329,18 @@ class CBZConverter:
             shutil.rmtree(temp_dir, ignore_errors=True)
             raise e
 
-    def create_cbz_metadata(
-        self, manga: Manga, chapter: Chapter, image_files: List[str]
-    ) -> Dict:
+    def describe_chapter(self, manga: Manga, chapter: Chapter) -> Dict:
         """
-        Create metadata for the CBZ file.
+        Create the manga and chapter part of a CBZ's metadata.
 
         Args:
             manga: The manga object
             chapter: The chapter object
-            image_files: List of image file paths
 
         Returns:
-            Metadata dictionary
+            Metadata dictionary without page information
         """
-        metadata = {
+        return {
             "manga": {
                 "title": manga.title,
                 "id": str(manga.id),
@@ -126,7 +356,6 @@ class CBZConverter:
                 "volume": chapter.volume,
                 "language": chapter.language,
                 "id": str(chapter.id),
-                "pages_count": len(image_files),
                 "source": chapter.source,
             },
             "pages": [],
@@ -134,6 +363,23 @@ class CBZConverter:
             "created_at": None,  # Will be set when creating CBZ
         }
 
+    def create_cbz_metadata(
+        self, manga: Manga, chapter: Chapter, image_files: List[str]
+    ) -> Dict:
+        """
+        Create metadata for the CBZ file.
+
+        Args:
+            manga: The manga object
+            chapter: The chapter object
+            image_files: List of image file paths
+
+        Returns:
+            Metadata dictionary
+        """
+        metadata = self.describe_chapter(manga, chapter)
+        metadata["chapter"]["pages_count"] = len(image_files)
+
         # Add page information
         for i, image_file in enumerate(image_files):
             try:
@@ -183,7 +429,9 @@ class CBZConverter:
             # Ensure output directory exists
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-            with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as cbz_file:
+            sink = CBZPageSink(output_path)
+            sink.open()
+            try:
                 # Add image files
                 for i, image_file in enumerate(image_files):
                     if not os.path.exists(image_file):
@@ -192,17 +440,21 @@ class CBZConverter:
 
                     # Generate a standardized filename for the image in the CBZ
                     file_ext = os.path.splitext(image_file)[1]
-                    cbz_filename = f"{i + 1:04d}{file_ext}"
-
-                    cbz_file.write(image_file, cbz_filename)
+                    with open(image_file, "rb") as f:
+                        sink.add_page(
+                            i + 1, file_ext, f.read(), member_compress_type(image_file)
+                        )
 
                 # Add metadata if requested
+                metadata = None
                 if include_metadata:
                     metadata = self.create_cbz_metadata(manga, chapter, image_files)
                     metadata["created_at"] = None  # Could add timestamp here
 
-                    metadata_json = json.dumps(metadata, indent=2)
-                    cbz_file.writestr("metadata.json", metadata_json)
+                sink.finalize(metadata)
+            except BaseException:
+                sink.discard()
+                raise
 
             logger.info(f"Created CBZ file: {output_path}")
             return True
@@ -268,8 +520,6 @@ class CBZConverter:
         Returns:
             True if conversion was successful
         """
-        temp_dir = None
-
         try:
             # If source is already a CBZ and we don't need metadata, just copy
             if (
@@ -280,29 +530,17 @@ class CBZConverter:
                 shutil.copy2(archive_path, output_path)
                 return True
 
-            # Extract archive to temporary directory
-            temp_dir, image_files = self.extract_archive_to_temp(archive_path)
-
-            if not image_files:
-                logger.error(f"No image files found in archive: {archive_path}")
-                return False
-
-            # Create CBZ from extracted images
-            success = self.create_cbz_from_images(
-                image_files, output_path, manga, chapter, include_metadata
+            # Copy pages across without extracting the archive
+            metadata = (
+                self.describe_chapter(manga, chapter) if include_metadata else None
             )
-
-            return success
+            repack_to_cbz(archive_path, output_path, metadata)
+            return True
 
         except Exception as e:
             logger.error(f"Failed to convert archive {archive_path} to CBZ: {e}")
             return False
 
-        finally:
-            # Clean up temporary directory
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
     def convert_chapter_to_cbz(
         self,
         chapter: Chapter,
@@ -342,6 +580,75 @@ class CBZConverter:
             logger.error(f"Failed to convert chapter {chapter.id} to CBZ: {e}")
             return False
 
+    async def convert_chapters(
+        self,
+        conversions: List[Tuple[Manga, Chapter, str]],
+        include_metadata: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Convert many chapters to CBZ at once, across the worker processes.
+
+        Args:
+            conversions: (manga, chapter, output_path) for every chapter
+            include_metadata: Whether to include metadata
+
+        Returns:
+            Summary with converted and failed counts, errors and throughput
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        # Keep every worker busy without queueing the whole library at once
+        slots = asyncio.Semaphore(self.max_workers * 2)
+        summary: Dict[str, Any] = {
+            "converted": 0,
+            "failed": 0,
+            "pages": 0,
+            "bytes": 0,
+            "errors": [],
+        }
+        started_at = time.monotonic()
+
+        async def convert(manga: Manga, chapter: Chapter, output_path: str) -> None:
+            if not chapter.file_path or not os.path.exists(chapter.file_path):
+                raise FileNotFoundError(f"Chapter file not found: {chapter.file_path}")
+            metadata = (
+                self.describe_chapter(manga, chapter) if include_metadata else None
+            )
+            async with slots:
+                result = await loop.run_in_executor(
+                    executor, repack_to_cbz, chapter.file_path, output_path, metadata
+                )
+            summary["converted"] += 1
+            summary["pages"] += result["pages"]
+            summary["bytes"] += result["bytes"]
+
+        async def convert_logged(manga: Manga, chapter: Chapter, output_path: str):
+            try:
+                await convert(manga, chapter, output_path)
+            except Exception as e:
+                summary["failed"] += 1
+                summary["errors"].append(f"Chapter {chapter.id}: {e}")
+                logger.error(f"Failed to convert chapter {chapter.id} to CBZ: {e}")
+
+        await asyncio.gather(*(convert_logged(*item) for item in conversions))
+
+        elapsed = time.monotonic() - started_at
+        summary["elapsed_seconds"] = round(elapsed, 3)
+        summary["chapters_per_second"] = (
+            round(summary["converted"] / elapsed, 2) if elapsed > 0 else 0.0
+        )
+        logger.info(
+            f"Converted {summary['converted']} chapters to CBZ "
+            f"({summary['failed']} failed) at {summary['chapters_per_second']} chapters/s"
+        )
+        return summary
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
 
 # Global instance
 cbz_converter = CBZConverter()
@@ -0,0 +1,173 @@
+"""
+Write downloaded pages straight into a chapter's CBZ.
+
+Pages used to be saved as loose images and copied into a CBZ afterwards, so
+every byte was written twice, and the converter spent CPU deflating images
+that are already compressed. The sink appends each page to the archive as it
+arrives, as a stored member; only metadata.json is deflated.
+
+Pages go into ``<name>.cbz.part``. Its central directory is written
+whenever a download stops, so an interrupted download can be resumed from
+it. ``finalize`` renames it over the CBZ in one step, so readers only ever
+see a complete archive. The archive comment records the source the pages
+came from, so a retry from the same source only fetches missing pages.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import zipfile
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PAGE_MEMBER = re.compile(r"^(\d+)\.\w+$")
+
+
+class CBZPageSink:
+    """Appends pages to a chapter archive as they are downloaded."""
+
+    def __init__(
+        self, cbz_path: str, source: str = "", part_path: Optional[str] = None
+    ):
+        self.cbz_path = cbz_path
+        self.part_path = part_path or f"{cbz_path}.part"
+        self.source = source
+        self.pages: Dict[int, str] = {}
+        self.bytes_written = 0
+        self._zip: Optional[zipfile.ZipFile] = None
+
+    def open(self) -> Dict[int, str]:
+        """
+        Open the partial archive for writing.
+
+        Pages of an earlier attempt at the same source are kept: from a
+        partial archive left by an interrupted download, or from a CBZ that
+        was finalized with pages missing. Anything else, including any
+        partial archive of a sink without a source, is started over.
+
+        Blocking; run it in a thread.
+
+        Returns:
+            Member names of the pages already in the archive, by page number
+        """
+        os.makedirs(os.path.dirname(self.part_path) or ".", exist_ok=True)
+
+        if self.source and not os.path.exists(self.part_path):
+            if _archive_source(self.cbz_path) == self.source:
+                shutil.copyfile(self.cbz_path, self.part_path)
+
+        if self.source and os.path.exists(self.part_path):
+            self._resume()
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.part_path, "w")
+
+        self._zip.comment = self.source.encode()
+        return dict(self.pages)
+
+    def add_page(
+        self,
+        number: int,
+        file_ext: str,
+        data: bytes,
+        compress_type: int = zipfile.ZIP_STORED,
+    ) -> str:
+        """
+        Append a page, as a stored member unless told otherwise.
+
+        Args:
+            number: Page number
+            file_ext: File extension including the dot
+            data: Image bytes
+            compress_type: Compression for formats that are not compressed yet
+
+        Returns:
+            The member name
+        """
+        name = f"{number:04d}{file_ext}"
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = compress_type
+        self._zip.writestr(info, data)
+        self.pages[number] = name
+        self.bytes_written += len(data)
+        return name
+
+    def close(self) -> None:
+        """Write the central directory, leaving the partial archive to resume."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def finalize(
+        self, metadata: Optional[Dict[str, Any]] = None, complete: bool = True
+    ) -> str:
+        """
+        Finish the archive and move it into place.
+
+        Args:
+            metadata: Written as a deflated metadata.json, if given
+            complete: Whether every page is in; an incomplete archive keeps
+                its source so a later attempt can add the missing pages
+
+        Returns:
+            The CBZ path
+        """
+        if metadata is not None:
+            self._zip.writestr(
+                "metadata.json",
+                json.dumps(metadata, indent=2),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+        if complete:
+            self._zip.comment = b""
+        self.close()
+
+        with open(self.part_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(self.part_path, self.cbz_path)
+        return self.cbz_path
+
+    def discard(self) -> None:
+        """Drop the partial archive."""
+        self.close()
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+
+    def page_rows(self, chapter_id: Any) -> List[Any]:
+        """Archived pages are read from the CBZ and need no Page rows."""
+        return []
+
+    def _resume(self) -> None:
+        try:
+            self._zip = zipfile.ZipFile(self.part_path, "a")
+            if self._zip.comment.decode() != self.source:
+                raise ValueError("pages are from another source")
+            damaged = self._zip.testzip()
+            if damaged:
+                raise ValueError(f"{damaged} is damaged")
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            logger.info(f"Starting {self.part_path} over: {e}")
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            os.remove(self.part_path)
+            return
+
+        for name in self._zip.namelist():
+            match = _PAGE_MEMBER.match(name)
+            if match:
+                self.pages[int(match.group(1))] = name
+
+
+def _archive_source(path: str) -> Optional[str]:
+    """The source recorded in a finalized but incomplete archive."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return archive.comment.decode() or None
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
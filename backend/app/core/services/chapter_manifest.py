@@ -0,0 +1,272 @@
+"""
+Per-chapter page manifests for the reader.
+
+Every page image request used to look up the manga, the chapter and the page
+row, then stat the file and guess its type. A manifest resolves all of that
+once per chapter: page number to file (or CBZ member), media type, size and
+ETag. Manifests are kept in an in-process LRU and in Valkey, so a page
+request is a dictionary lookup followed by the file send. Code that changes
+a chapter's files or pages calls ``invalidate``; local entries also expire
+after a few minutes to bound staleness from writers in other processes.
+"""
+
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import deps
+from app.core.services.archive_pages import archive_page_reader, is_page_archive
+from app.models.manga import Chapter, Page
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageEntry:
+    """Where one page lives and how to serve it."""
+
+    media_type: str
+    size: int
+    etag: str
+    file_path: Optional[str] = None
+    # Set instead of file_path when the page is served out of a CBZ
+    archive_path: Optional[str] = None
+
+
+@dataclass
+class ChapterManifest:
+    """Every servable page of a chapter, keyed by page number."""
+
+    manga_id: str
+    chapter_id: str
+    pages: Dict[int, PageEntry]
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "manga_id": self.manga_id,
+                "chapter_id": self.chapter_id,
+                "pages": {
+                    str(number): asdict(entry) for number, entry in self.pages.items()
+                },
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "ChapterManifest":
+        raw = json.loads(data)
+        return cls(
+            manga_id=raw["manga_id"],
+            chapter_id=raw["chapter_id"],
+            pages={
+                int(number): PageEntry(**entry)
+                for number, entry in raw["pages"].items()
+            },
+        )
+
+
+def describe_pages(
+    page_files: List[Tuple[int, str]], archive_path: Optional[str]
+) -> Dict[int, PageEntry]:
+    """
+    Stat a chapter's page files and fill gaps from its archive.
+
+    Blocking; run it in a thread.
+
+    Args:
+        page_files: (page number, file path) for each page row
+        archive_path: The chapter's CBZ, if it has one
+
+    Returns:
+        Page entries keyed by page number
+    """
+    pages: Dict[int, PageEntry] = {}
+    for number, file_path in page_files:
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError):
+            continue
+        pages[number] = PageEntry(
+            media_type=mimetypes.guess_type(file_path)[0] or "image/jpeg",
+            size=stat.st_size,
+            etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+            file_path=file_path,
+        )
+
+    if archive_path and os.path.isfile(archive_path):
+        try:
+            archive_pages = archive_page_reader.get_pages(archive_path)
+            mtime_ns = os.stat(archive_path).st_mtime_ns
+        except Exception as e:
+            logger.warning(f"Could not read chapter archive {archive_path}: {e}")
+            archive_pages = []
+
+        for number, member in enumerate(archive_pages, 1):
+            if number in pages:
+                continue
+            pages[number] = PageEntry(
+                media_type=member.media_type,
+                size=member.size,
+                etag=f'"{mtime_ns:x}-{number}-{member.size:x}"',
+                archive_path=archive_path,
+            )
+
+    return pages
+
+
+class ChapterManifestCache:
+    """Two-level (in-process LRU, then Valkey) cache of chapter manifests."""
+
+    KEY_PREFIX = "chapter_manifest:"
+    LOCAL_TTL_SECONDS = 300
+    VALKEY_TTL_SECONDS = 24 * 3600
+    MAX_ENTRIES = 256
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._manifests: "OrderedDict[str, Tuple[ChapterManifest, float]]" = (
+            OrderedDict()
+        )
+        self._stats = {"hits": 0, "valkey_hits": 0, "builds": 0, "invalidations": 0}
+        self._invalidation_listeners: List[Callable[[str], None]] = []
+
+    async def get(
+        self, db: AsyncSession, manga_id: UUID, chapter_id: UUID
+    ) -> Optional[ChapterManifest]:
+        """
+        Get a chapter's manifest, building it on a miss.
+
+        Args:
+            db: Database session used to build the manifest
+            manga_id: The manga the chapter must belong to
+            chapter_id: The ID of the chapter
+
+        Returns:
+            The manifest, or None if the chapter does not exist in that manga
+        """
+        key = str(chapter_id)
+        manifest = self._get_local(key)
+        if manifest is None:
+            manifest = await self._get_valkey(key)
+            if manifest:
+                self._stats["valkey_hits"] += 1
+                self._store_local(key, manifest)
+
+        if manifest is None:
+            manifest = await self._build(db, chapter_id)
+            if manifest is None:
+                return None
+            self._store_local(key, manifest)
+            await self._set_valkey(key, manifest)
+        else:
+            self._stats["hits"] += 1
+
+        if manifest.manga_id != str(manga_id):
+            return None
+        return manifest
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        """
+        Register a callback run with the chapter ID on every invalidation.
+
+        Caches holding data derived from a manifest use this to drop it.
+        """
+        self._invalidation_listeners.append(listener)
+
+    async def invalidate(self, chapter_id: UUID) -> None:
+        """Forget a chapter's manifest after its files or pages changed."""
+        key = str(chapter_id)
+        self._stats["invalidations"] += 1
+        self._manifests.pop(key, None)
+        for listener in self._invalidation_listeners:
+            listener(key)
+
+        redis = deps.redis_client
+        if redis:
+            try:
+                await redis.delete(f"{self.KEY_PREFIX}{key}")
+            except Exception as e:
+                logger.warning(f"Could not drop chapter manifest {key} in Valkey: {e}")
+
+    def clear(self) -> None:
+        """Drop every in-process manifest."""
+        self._manifests.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {**self._stats, "entries": len(self._manifests)}
+
+    async def _build(
+        self, db: AsyncSession, chapter_id: UUID
+    ) -> Optional[ChapterManifest]:
+        chapter = await db.get(Chapter, chapter_id)
+        if not chapter:
+            return None
+
+        result = await db.execute(
+            select(Page.number, Page.file_path).where(Page.chapter_id == chapter_id)
+        )
+        archive_path = chapter.file_path if is_page_archive(chapter.file_path) else None
+        pages = await asyncio.to_thread(
+            describe_pages, [tuple(row) for row in result.all()], archive_path
+        )
+
+        self._stats["builds"] += 1
+        return ChapterManifest(
+            manga_id=str(chapter.manga_id), chapter_id=str(chapter.id), pages=pages
+        )
+
+    def _get_local(self, key: str) -> Optional[ChapterManifest]:
+        cached = self._manifests.get(key)
+        if not cached:
+            return None
+
+        manifest, expires_at = cached
+        if time.monotonic() >= expires_at:
+            del self._manifests[key]
+            return None
+
+        self._manifests.move_to_end(key)
+        return manifest
+
+    def _store_local(self, key: str, manifest: ChapterManifest) -> None:
+        self._manifests[key] = (manifest, time.monotonic() + self.LOCAL_TTL_SECONDS)
+        self._manifests.move_to_end(key)
+        while len(self._manifests) > self.max_entries:
+            self._manifests.popitem(last=False)
+
+    async def _get_valkey(self, key: str) -> Optional[ChapterManifest]:
+        redis = deps.redis_client
+        if not redis:
+            return None
+        try:
+            data = await redis.get(f"{self.KEY_PREFIX}{key}")
+            return ChapterManifest.from_json(data) if data else None
+        except Exception as e:
+            logger.warning(f"Could not read chapter manifest {key} from Valkey: {e}")
+            return None
+
+    async def _set_valkey(self, key: str, manifest: ChapterManifest) -> None:
+        redis = deps.redis_client
+        if not redis:
+            return
+        try:
+            await redis.setex(
+                f"{self.KEY_PREFIX}{key}", self.VALKEY_TTL_SECONDS, manifest.to_json()
+            )
+        except Exception as e:
+            logger.warning(f"Could not store chapter manifest {key} in Valkey: {e}")
+
+
+# Global instance
+chapter_manifest_cache = ChapterManifestCache()
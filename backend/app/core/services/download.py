@@ -1,12 +1,16 @@
+import asyncio
 import logging
 import os
+import shutil
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.providers.base import (
     AntiBotError,
     ContentError,
@@ -14,16 +18,29 @@ from app.core.providers.base import (
     ProviderError,
     RateLimitError,
 )
+from app.core.providers.page_manifest import (
+    is_expired_page_error,
+    page_manifest_cache,
+)
 from app.core.providers.registry import provider_registry
+from app.core.services.cbz_sink import CBZPageSink
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.download_checkpoint import LoosePageSink
+from app.core.services.download_coordinator import (
+    chapter_optimize_key,
+    download_coordinator,
+)
+from app.core.services.page_filter import ChapterFilter, page_filter
+from app.core.services.page_store import PageStoreSink, page_store
 from app.core.services.provider_matching import provider_matching_service
+from app.core.services.series_matcher import series_matcher
+from app.core.services.thumbnails import thumbnail_service
 from app.core.utils import (
-    create_cbz_from_directory,
     get_chapter_storage_path,
     get_cover_storage_path,
     get_manga_storage_path,
-    get_page_storage_path,
 )
-from app.models.library import MangaUserLibrary
+from app.models.library import MangaUserLibrary, ReadingProgress
 from app.models.manga import Chapter, Manga, Page
 
 logger = logging.getLogger(__name__)
@@ -57,7 +74,10 @@ async def send_download_progress_update(
     try:
         # Import here to avoid circular imports
         from app.core.progress.websocket import websocket_manager
-        from app.core.services.background import download_tasks
+        from app.core.services.background import (
+            download_tasks,
+            publish_download_task,
+        )
 
         # Update background task if it exists
         if task_id in download_tasks:
@@ -90,6 +110,8 @@ async def send_download_progress_update(
             if error:
                 download_tasks[task_id]["error"] = error
 
+            await publish_download_task(task_id)
+
         # Prepare WebSocket message
         message = {
             "type": event_type,
@@ -152,6 +174,8 @@ async def download_manga_cover(
     with open(cover_path, "wb") as f:
         f.write(cover_data)
 
+    await thumbnail_service.generate_cover_thumbnails(manga_id)
+
     # Update manga in database
     manga = await db.get(Manga, manga_id)
     if manga:
@@ -161,6 +185,124 @@ async def download_manga_cover(
     return cover_path
 
 
+# Provider-specific page download delays (much faster than API calls)
+PAGE_DELAYS = {
+    "MangaDx": 0.5,  # 500ms for MangaDx pages (vs 5s for API)
+    "MangaPill": 0.3,  # 300ms for MangaPill pages
+    "Toonily": 0.4,  # 400ms for Toonily pages
+    "MangaTown": 0.5,  # 500ms for MangaTown pages
+    "ManhuaFast": 0.6,  # 600ms for ManhuaFast pages
+    "ArcaneScans": 0.5,  # 500ms for ArcaneScans pages
+    "Manga18FX": 0.7,  # 700ms for NSFW providers
+    "MangaFreak": 0.5,  # 500ms for MangaFreak pages
+    "MangaSail": 0.4,  # 400ms for MangaSail pages
+    "MangaKakalotFun": 0.3,  # 300ms for MangaKakalotFun pages
+    "MangaDNA": 0.5,  # 500ms for MangaDNA pages
+}
+
+
+def get_chapter_referer(
+    provider: Any, external_manga_id: str, external_chapter_id: str
+) -> Optional[str]:
+    """Get the chapter URL to send as referer with page requests."""
+    try:
+        return provider.get_chapter_url(external_manga_id, external_chapter_id)
+    except Exception:
+        # If provider doesn't support get_chapter_url, use base URL
+        return provider.url
+
+
+def get_page_file_extension(page_url: str) -> str:
+    """Determine a page's file extension from its URL, defaulting to .jpg."""
+    if "." in page_url:
+        url_ext = page_url.split(".")[-1].lower()
+        if url_ext in ["jpg", "jpeg", "png", "gif", "webp"]:
+            return f".{url_ext}"
+    return ".jpg"
+
+
+def new_page_sink(
+    chapter_path: str, source: str = "", staging_path: Optional[str] = None
+) -> Union[CBZPageSink, LoosePageSink]:
+    """
+    Create the sink a chapter's pages are downloaded into.
+
+    Chapters are kept as loose pages with Page rows, which the reader, the
+    optimizer, the page store and storage recovery all work from, unless
+    DOWNLOAD_CHAPTERS_AS_CBZ stores them only as a CBZ.
+
+    Args:
+        chapter_path: The chapter's storage directory
+        source: Where the pages come from, so a retry can resume
+        staging_path: Separate location to write to until finalized
+
+    Returns:
+        The sink, not opened yet
+    """
+    if settings.DOWNLOAD_CHAPTERS_AS_CBZ:
+        return CBZPageSink(
+            f"{chapter_path}.cbz",
+            source,
+            part_path=f"{staging_path}.cbz.part" if staging_path else None,
+        )
+    return LoosePageSink(chapter_path, source, staging_path)
+
+
+async def store_chapter_pages(
+    db: AsyncSession,
+    chapter_id: UUID,
+    file_path: str,
+    page_count: int,
+    pages: Optional[List[Page]] = None,
+    missing_pages: int = 0,
+) -> None:
+    """
+    Point a chapter at its downloaded pages.
+
+    Args:
+        db: The database session
+        chapter_id: The ID of the chapter
+        file_path: The chapter's CBZ, or its directory of linked pages
+        page_count: Number of pages downloaded
+        pages: Page rows for loose pages or pages kept in the page store
+        missing_pages: Pages that could not be downloaded
+    """
+    chapter = await db.get(Chapter, chapter_id)
+    if not chapter:
+        return
+
+    chapter.pages_count = page_count
+    chapter.file_path = file_path
+    chapter.images_optimized_at = None  # New files for the optimizer
+    if missing_pages:
+        chapter.download_status = "error"
+        chapter.download_error = f"{missing_pages} pages could not be downloaded"
+    else:
+        chapter.download_status = "downloaded"
+        chapter.download_error = None
+
+    # Replace rows of an earlier download; archived pages need none
+    result = await db.execute(
+        delete(Page).where(Page.chapter_id == chapter_id).returning(Page.file_path)
+    )
+    replaced = result.scalars().all()
+    if pages:
+        db.add_all(pages)
+
+    await db.commit()
+    await chapter_manifest_cache.invalidate(chapter_id)
+    await page_store.collect_unreferenced(db, replaced)
+
+    # Drop whichever form an earlier download of the chapter took
+    chapter_path = get_chapter_storage_path(chapter.manga_id, chapter_id)
+    if file_path == chapter_path:
+        for stale in (f"{chapter_path}.cbz", f"{chapter_path}.cbz.part"):
+            if os.path.exists(stale):
+                await asyncio.to_thread(os.remove, stale)
+    else:
+        await asyncio.to_thread(shutil.rmtree, chapter_path, True)
+
+
 async def download_chapter(
     manga_id: UUID,
     chapter_id: UUID,
@@ -170,6 +312,7 @@ async def download_chapter(
     db: AsyncSession,
     task_id: Optional[str] = None,
     progress_callback: Optional[callable] = None,
+    budget: Optional[Any] = None,
 ) -> str:
     """
     Download a chapter with progress tracking.
@@ -183,6 +326,7 @@ async def download_chapter(
         db: The database session
         task_id: Optional task ID for progress tracking
         progress_callback: Optional callback function for progress updates
+        budget: Optional DownloadBudget shared with concurrent downloads
 
     Returns:
         The path to the downloaded chapter
@@ -192,96 +336,162 @@ async def download_chapter(
     if not provider:
         raise ValueError(f"Provider '{provider_name}' not found")
 
-    # Create chapter storage directory
-    chapter_path = get_chapter_storage_path(manga_id, chapter_id)
-    os.makedirs(chapter_path, exist_ok=True)
+    # The optimizer rewrites the chapter's files in place; let it finish
+    await download_coordinator.wait_for(chapter_optimize_key(chapter_id))
 
-    # Get pages
-    page_urls = await provider.get_pages(external_manga_id, external_chapter_id)
+    chapter_path = get_chapter_storage_path(manga_id, chapter_id)
+    source = f"{provider_name}:{external_chapter_id}"
+    if page_store.enabled:
+        # Pages go to the shared page store, linked into the chapter directory
+        sink = PageStoreSink(chapter_path, source)
+    else:
+        sink = new_page_sink(chapter_path, source)
+
+    # Get pages (reused from an earlier attempt while still valid)
+    page_urls = await page_manifest_cache.get_pages(
+        provider, external_manga_id, external_chapter_id
+    )
     total_pages = len(page_urls)
 
+    # Pages an earlier attempt from this source already saved intact
+    resumed_pages = await asyncio.to_thread(sink.open)
+    if resumed_pages:
+        logger.info(
+            f"Resuming chapter {chapter_id}: {len(resumed_pages)} of {total_pages} pages already downloaded"
+        )
+
     # Send download started event if we have a task_id
     if task_id and total_pages > 0:
         await send_download_progress_update(
             task_id=task_id,
             event_type="download_started",
-            progress=0,
+            progress=(len(resumed_pages) / total_pages) * 100,
             total_pages=total_pages,
-            downloaded_pages=0,
+            downloaded_pages=len(resumed_pages),
             manga_id=str(manga_id),
             chapter_id=str(chapter_id),
         )
 
-    # Download pages with optimized rate limiting for page downloads
-    import asyncio
-
-    # Provider-specific page download delays (much faster than API calls)
-    page_delays = {
-        "MangaDx": 0.5,  # 500ms for MangaDx pages (vs 5s for API)
-        "MangaPill": 0.3,  # 300ms for MangaPill pages
-        "Toonily": 0.4,  # 400ms for Toonily pages
-        "MangaTown": 0.5,  # 500ms for MangaTown pages
-        "ManhuaFast": 0.6,  # 600ms for ManhuaFast pages
-        "ArcaneScans": 0.5,  # 500ms for ArcaneScans pages
-        "Manga18FX": 0.7,  # 700ms for NSFW providers
-        "MangaFreak": 0.5,  # 500ms for MangaFreak pages
-        "MangaSail": 0.4,  # 400ms for MangaSail pages
-        "MangaKakalotFun": 0.3,  # 300ms for MangaKakalotFun pages
-        "MangaDNA": 0.5,  # 500ms for MangaDNA pages
-    }
-
-    page_delay = page_delays.get(provider_name, 0.5)  # Default 500ms
-
-    # Get chapter URL for referer (if provider supports it)
-    chapter_url = None
+    chapter_url = get_chapter_referer(provider, external_manga_id, external_chapter_id)
+    chapter_filter = await page_filter.for_chapter(
+        db, provider_name, manga_id, total_pages
+    )
+
     try:
-        chapter_url = provider.get_chapter_url(external_manga_id, external_chapter_id)
-    except Exception:
-        # If provider doesn't support get_chapter_url, use base URL
-        chapter_url = provider.url
+        failed_pages = await _download_pages(
+            provider,
+            provider_name,
+            page_urls,
+            resumed_pages,
+            sink,
+            chapter_url,
+            task_id,
+            progress_callback,
+            budget,
+            chapter_filter,
+        )
+    except BaseException:
+        # Keep what arrived so a retry or resumed download carries on from it
+        sink.close()
+        raise
+
+    page_count = len(sink.pages)
+    file_path = await asyncio.to_thread(sink.finalize, complete=not failed_pages)
+
+    # Update chapter in database
+    await store_chapter_pages(
+        db,
+        chapter_id,
+        file_path,
+        page_count,
+        pages=sink.page_rows(chapter_id),
+        missing_pages=len(failed_pages),
+    )
+    if chapter_filter:
+        await page_filter.learn(db, chapter_filter, chapter_id)
+
+    # Send download completed event
+    if task_id:
+        await send_download_progress_update(
+            task_id=task_id,
+            event_type="download_completed",
+            progress=100,
+            total_pages=total_pages,
+            downloaded_pages=page_count,
+            downloaded_bytes=sink.bytes_written,
+        )
+
+    return file_path
+
+
+async def _download_pages(
+    provider: Any,
+    provider_name: str,
+    page_urls: List[str],
+    resumed_pages: Dict[int, str],
+    sink: Union[CBZPageSink, LoosePageSink, PageStoreSink],
+    chapter_url: Optional[str],
+    task_id: Optional[str],
+    progress_callback: Optional[callable],
+    budget: Optional[Any],
+    chapter_filter: Optional[ChapterFilter] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Download a chapter's pages into a page sink.
+
+    Recurring credit and ad pages are left out when a chapter filter says
+    so.
 
-    pages = []
-    downloaded_bytes = 0
+    Returns:
+        The pages that could not be downloaded
+    """
+    total_pages = len(page_urls)
+    page_delay = PAGE_DELAYS.get(provider_name, 0.5)  # Default 500ms
     failed_pages = []
+    first_request = True
 
     for i, page_url in enumerate(page_urls):
+        page_number = i + 1
+
+        if page_number in resumed_pages:
+            continue
+        if chapter_filter and chapter_filter.skip_url(page_number, page_url):
+            logger.info(f"Skipping recurring page {page_number}: {page_url}")
+            continue
+
         # Add delay between page downloads (much shorter than API delays)
-        if i > 0:
+        if not first_request:
             await asyncio.sleep(page_delay)
-
-        page_number = i + 1
+        first_request = False
 
         try:
             # Download page with proper referer
-            page_data = await provider.download_page(page_url, referer=chapter_url)
-
-            # Save page
-            # Determine file extension from URL or default to .jpg
-            file_ext = ".jpg"
-            if "." in page_url:
-                url_ext = page_url.split(".")[-1].lower()
-                if url_ext in ["jpg", "jpeg", "png", "gif", "webp"]:
-                    file_ext = f".{url_ext}"
-
-            page_path = get_page_storage_path(
-                manga_id, chapter_id, page_number, file_ext
-            )
+            try:
+                request_slot = (
+                    budget.request(provider_name) if budget else nullcontext()
+                )
+                async with request_slot:
+                    page_data = await provider.download_page(
+                        page_url, referer=chapter_url
+                    )
+            except Exception as e:
+                # Make the next attempt resolve fresh page URLs
+                if is_expired_page_error(e):
+                    page_manifest_cache.invalidate_url(page_url)
+                raise
+            if budget and page_data:
+                await budget.consume(len(page_data))
 
             # Only save if we got actual data
             if page_data and len(page_data) > 0:
-                os.makedirs(os.path.dirname(page_path), exist_ok=True)
-                with open(page_path, "wb") as f:
-                    f.write(page_data)
-                downloaded_bytes += len(page_data)
-
-                # Create page object
-                page = Page(
-                    chapter_id=chapter_id,
-                    number=page_number,
-                    file_path=page_path,
-                )
-                pages.append(page)
-
+                if chapter_filter and await chapter_filter.skip_page(
+                    page_number, page_url, page_data
+                ):
+                    logger.info(f"Not storing recurring page {page_number}")
+                else:
+                    sink.add_page(
+                        page_number, get_page_file_extension(page_url), page_data
+                    )
             else:
                 # Empty content - log and track as failed
                 logger.warning(f"Empty content for page {page_number}: {page_url}")
@@ -302,7 +512,7 @@ async def download_chapter(
                     progress=progress_percentage,
                     total_pages=total_pages,
                     downloaded_pages=downloaded_pages,
-                    downloaded_bytes=downloaded_bytes,
+                    downloaded_bytes=sink.bytes_written,
                 )
 
             # Call progress callback if provided
@@ -411,35 +621,7 @@ async def download_chapter(
         for failed in failed_pages:
             logger.warning(f"  - Page {failed['page']}: {failed['error']}")
 
-    # Update chapter in database
-    chapter = await db.get(Chapter, chapter_id)
-    if chapter:
-        # Update chapter
-        chapter.pages_count = len(pages)
-        chapter.file_path = chapter_path
-
-        # Add pages to database
-        db.add_all(pages)
-
-        # Commit changes
-        await db.commit()
-
-    # Create CBZ file
-    cbz_path = f"{chapter_path}.cbz"
-    create_cbz_from_directory(chapter_path, cbz_path)
-
-    # Send download completed event
-    if task_id:
-        await send_download_progress_update(
-            task_id=task_id,
-            event_type="download_completed",
-            progress=100,
-            total_pages=total_pages,
-            downloaded_pages=len(pages),
-            downloaded_bytes=downloaded_bytes,
-        )
-
-    return cbz_path
+    return failed_pages
 
 
 async def download_chapter_with_fallback(
@@ -479,8 +661,52 @@ async def download_chapter_with_fallback(
     if not manga or not chapter:
         raise ValueError(f"Manga or chapter not found: {manga_id}, {chapter_id}")
 
+    # The optimizer rewrites the chapter's files in place; let it finish
+    await download_coordinator.wait_for(chapter_optimize_key(chapter_id))
+
+    # Race a second known source of the chapter if the primary is slow
+    hedge_source = None
+    if settings.DOWNLOAD_HEDGING_ENABLED:
+        from app.core.services.hedged_download import (
+            ChapterSource,
+            find_hedge_source,
+            hedged_chapter_downloader,
+        )
+
+        hedge_source = await find_hedge_source(
+            db, manga, chapter, primary_provider, fallback_providers
+        )
+
     # Try primary provider first
     try:
+        if hedge_source:
+            logger.info(
+                f"Attempting hedged download from {primary_provider}, "
+                f"backed by {hedge_source.provider_name}"
+            )
+            source, result = await hedged_chapter_downloader.download(
+                manga_id,
+                chapter_id,
+                ChapterSource(primary_provider, external_manga_id, external_chapter_id),
+                hedge_source,
+                db,
+                task_id=task_id,
+            )
+
+            # store_chapter_pages already recorded any missing pages
+            chapter.source = source.provider_name
+            if not chapter.provider_external_ids:
+                chapter.provider_external_ids = {}
+            chapter.provider_external_ids[source.provider_name.lower()] = (
+                source.external_chapter_id
+            )
+            await db.commit()
+
+            logger.info(
+                f"Successfully downloaded chapter from {source.provider_name} (hedged)"
+            )
+            return result
+
         logger.info(f"Attempting download from primary provider: {primary_provider}")
         result = await download_chapter(
             manga_id,
@@ -513,12 +739,27 @@ async def download_chapter_with_fallback(
 
         # Try fallback providers
         if fallback_providers:
+            # Series IDs on other providers come from the precomputed match table
+            matched_manga_ids = {
+                match.provider.lower(): match.external_id
+                for match in await series_matcher.get_matches(db, manga.id)
+            }
+
             for fallback_provider in fallback_providers:
+                # Already raced against the primary
+                if (
+                    hedge_source
+                    and fallback_provider.lower() == hedge_source.provider_name.lower()
+                ):
+                    continue
+
                 try:
                     logger.info(f"Trying fallback provider: {fallback_provider}")
 
                     # Check if we have external IDs for this provider
-                    fallback_external_manga_id = external_manga_id
+                    fallback_external_manga_id = matched_manga_ids.get(
+                        fallback_provider.lower(), external_manga_id
+                    )
                     fallback_external_chapter_id = external_chapter_id
 
                     # If we have provider-specific external IDs, use them
@@ -542,7 +783,6 @@ async def download_chapter_with_fallback(
 
                     # Update chapter with successful fallback provider info
                     chapter.source = fallback_provider
-                    chapter.download_error = None
                     if not chapter.provider_external_ids:
                         chapter.provider_external_ids = {}
                     chapter.provider_external_ids[fallback_provider.lower()] = (
@@ -565,15 +805,26 @@ async def download_chapter_with_fallback(
         if auto_discover_alternatives:
             try:
                 logger.info("Attempting auto-discovery of alternative sources")
-                alternatives = (
-                    await provider_matching_service.find_chapter_alternatives(
-                        manga_title=manga.title,
-                        chapter_number=chapter.number,
-                        original_provider=primary_provider,
-                        exclude_providers=fallback_providers or [],
-                        max_alternatives=3,
-                    )
+                tried_providers = [primary_provider] + (fallback_providers or [])
+                if hedge_source:
+                    tried_providers.append(hedge_source.provider_name)
+                alternatives = await series_matcher.get_known_alternatives(
+                    db,
+                    manga,
+                    chapter,
+                    exclude_providers=tried_providers,
+                    max_alternatives=3,
                 )
+                if not alternatives:
+                    alternatives = (
+                        await provider_matching_service.find_chapter_alternatives(
+                            manga_title=manga.title,
+                            chapter_number=chapter.number,
+                            original_provider=primary_provider,
+                            exclude_providers=fallback_providers or [],
+                            max_alternatives=3,
+                        )
+                    )
 
                 for alternative in alternatives:
                     try:
@@ -593,7 +844,6 @@ async def download_chapter_with_fallback(
 
                         # Update chapter with successful alternative provider info
                         chapter.source = alternative.provider_name
-                        chapter.download_error = None
                         if not chapter.provider_external_ids:
                             chapter.provider_external_ids = {}
                         chapter.provider_external_ids[
@@ -642,13 +892,24 @@ async def download_manga(
     """
     Download a manga.
 
+    Chapters are downloaded several at a time by the series download
+    orchestrator, unread chapters first.
+
     Args:
         manga_id: The ID of the manga
         user_id: The ID of the user
         provider_name: The name of the provider
         external_id: The external ID of the manga
         db: The database session
+
+    Raises:
+        RuntimeError: If any chapter could not be downloaded
     """
+    from app.core.services.download_orchestrator import (
+        ChapterDownload,
+        series_download_orchestrator,
+    )
+
     # Get provider
     provider = provider_registry.get_provider(provider_name)
     if not provider:
@@ -658,14 +919,16 @@ async def download_manga(
     manga = await db.get(Manga, manga_id)
     if not manga:
         raise ValueError(f"Manga with ID '{manga_id}' not found")
+    manga_title = manga.title
 
     # Download cover
     await download_manga_cover(manga_id, provider_name, external_id, db)
 
     # Get chapters
-    chapters, _, _ = await provider.get_chapters(external_id)
+    chapters = await provider.get_all_chapters(external_id)
 
-    # Download chapters
+    # Create missing chapters first; they are downloaded in their own sessions
+    downloads = []
     for chapter_data in chapters:
         # Check if chapter already exists
         result = await db.execute(
@@ -691,14 +954,40 @@ async def download_manga(
             db.add(chapter)
             await db.flush()
 
-        # Download chapter (no task_id for bulk downloads to avoid conflicts)
-        await download_chapter(
-            manga_id=manga_id,
-            chapter_id=chapter.id,
-            provider_name=provider_name,
-            external_manga_id=external_id,
-            external_chapter_id=chapter_data["id"],
-            db=db,
+        downloads.append(
+            ChapterDownload(
+                chapter_id=chapter.id,
+                number=chapter.number,
+                external_chapter_id=chapter_data["id"],
+            )
+        )
+
+    await db.commit()
+
+    # Chapters the user has finished reading come last
+    result = await db.execute(
+        select(ReadingProgress.chapter_id).where(
+            (ReadingProgress.user_id == user_id)
+            & (ReadingProgress.manga_id == manga_id)
+            & (ReadingProgress.is_completed.is_(True))
+        )
+    )
+    read_chapter_ids = set(result.scalars().all())
+    for download in downloads:
+        download.is_read = download.chapter_id in read_chapter_ids
+
+    results = await series_download_orchestrator.download_series(
+        manga_id=manga_id,
+        user_id=user_id,
+        manga_title=manga_title,
+        provider_name=provider_name,
+        external_manga_id=external_id,
+        chapters=downloads,
+    )
+    if results["failed"]:
+        raise RuntimeError(
+            f"{results['failed']} of {len(downloads)} chapters of "
+            f"'{manga_title}' could not be downloaded"
         )
 
     # Update user library
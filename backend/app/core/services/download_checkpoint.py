@@ -0,0 +1,260 @@
+"""
+Per-page checkpoints for chapter downloads.
+
+A small manifest in the chapter directory records every page that was
+written, with its size and SHA-256. When a download of the same chapter
+from the same source runs again (a retry, a restarted or resumed task, a
+fallback pass back through the provider) pages that are still on disk and
+match their recorded size and hash are kept instead of downloaded again.
+Pages from a different source are discarded, since another provider's page
+N is not necessarily the same image.
+
+LoosePageSink writes a chapter's pages this way, as loose files with Page
+rows, with the same interface as CBZPageSink.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.models.manga import Page
+
+logger = logging.getLogger(__name__)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ChapterCheckpoint:
+    """Completed pages of one chapter download."""
+
+    FILENAME = ".download.json"
+
+    def __init__(self, chapter_path: str, source: str):
+        self.chapter_path = chapter_path
+        self.source = source
+        self.pages: Dict[int, Dict[str, object]] = {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.chapter_path, self.FILENAME)
+
+    @classmethod
+    def load(cls, chapter_path: str, source: str) -> "ChapterCheckpoint":
+        """
+        Load the checkpoint of a chapter directory.
+
+        Args:
+            chapter_path: Directory the chapter's pages are written to
+            source: Identifies where pages come from (provider and chapter)
+
+        Returns:
+            The checkpoint; empty if there was none or it was for another
+            source, in which case the other source's pages are removed
+        """
+        checkpoint = cls(chapter_path, source)
+        try:
+            with open(checkpoint.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return checkpoint
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable download checkpoint: {e}")
+            return checkpoint
+
+        pages = {int(number): page for number, page in data.get("pages", {}).items()}
+        if data.get("source") == source:
+            checkpoint.pages = pages
+            return checkpoint
+
+        # Pages from another provider must not be mixed into this download
+        for page in pages.values():
+            try:
+                os.remove(os.path.join(chapter_path, page["file"]))
+            except OSError:
+                pass
+        checkpoint.clear()
+        return checkpoint
+
+    def completed_page(self, page_number: int) -> Optional[str]:
+        """
+        Get the file of a page that was already downloaded intact.
+
+        Returns:
+            The page's path, or None if it has to be downloaded
+        """
+        page = self.pages.get(page_number)
+        if not page:
+            return None
+
+        path = os.path.join(self.chapter_path, page["file"])
+        try:
+            if os.path.getsize(path) == page["size"] and (
+                _file_sha256(path) == page["sha256"]
+            ):
+                return path
+        except OSError:
+            pass
+
+        logger.info(f"Checkpointed page {page_number} is missing or damaged")
+        del self.pages[page_number]
+        return None
+
+    def completed_pages(self, page_count: int) -> Dict[int, str]:
+        """
+        Verify every checkpointed page of a chapter.
+
+        Blocking (pages are hashed); run it in a thread.
+
+        Args:
+            page_count: Number of pages the chapter has now
+
+        Returns:
+            Paths of the pages that can be reused, keyed by page number
+        """
+        completed = {}
+        for page_number in range(1, page_count + 1):
+            path = self.completed_page(page_number)
+            if path:
+                completed[page_number] = path
+        return completed
+
+    def record(self, page_number: int, path: str, data: bytes) -> None:
+        """Record a page that was just written."""
+        self.pages[page_number] = {
+            "file": os.path.relpath(path, self.chapter_path),
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "source": self.source,
+                        "pages": {
+                            str(number): page for number, page in self.pages.items()
+                        },
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save download checkpoint: {e}")
+
+    def clear(self) -> None:
+        """Forget every page, e.g. once the chapter is complete."""
+        self.pages = {}
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove download checkpoint: {e}")
+
+
+class LoosePageSink:
+    """
+    Writes pages as loose files in the chapter directory, checkpointing each.
+
+    A sink with a staging path writes there instead, starting empty, and
+    moves its pages into the chapter directory when finalized.
+    """
+
+    def __init__(
+        self, chapter_path: str, source: str = "", staging_path: Optional[str] = None
+    ):
+        self.chapter_path = chapter_path
+        self.staging_path = staging_path or chapter_path
+        self.source = source
+        self.pages: Dict[int, str] = {}
+        self.bytes_written = 0
+        self._checkpoint: Optional[ChapterCheckpoint] = None
+
+    def open(self) -> Dict[int, str]:
+        """
+        Prepare the directory, keeping pages an earlier attempt at the same
+        source saved intact.
+
+        Blocking (pages are hashed); run it in a thread.
+
+        Returns:
+            File names of the pages already there, by page number
+        """
+        if self.staging_path != self.chapter_path:
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+        os.makedirs(self.staging_path, exist_ok=True)
+
+        self._checkpoint = ChapterCheckpoint.load(self.staging_path, self.source)
+        for number in sorted(self._checkpoint.pages):
+            path = self._checkpoint.completed_page(number)
+            if path:
+                self.pages[number] = os.path.basename(path)
+        return dict(self.pages)
+
+    def add_page(self, number: int, file_ext: str, data: bytes, *args) -> str:
+        """
+        Write a page and record it in the checkpoint.
+
+        Returns:
+            The page's file name
+        """
+        name = f"{number:04d}{file_ext}"
+        path = os.path.join(self.staging_path, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._checkpoint.record(number, path, data)
+        self.pages[number] = name
+        self.bytes_written += len(data)
+        return name
+
+    def close(self) -> None:
+        """Nothing to flush; the checkpoint is saved with every page."""
+
+    def finalize(
+        self, metadata: Optional[Dict[str, Any]] = None, complete: bool = True
+    ) -> str:
+        """
+        Finish the chapter.
+
+        Args:
+            metadata: Not stored for loose pages
+            complete: Whether every page is in; an incomplete chapter keeps
+                its checkpoint so a later attempt can add the missing pages
+
+        Returns:
+            The chapter directory
+        """
+        if complete:
+            self._checkpoint.clear()
+        if self.staging_path != self.chapter_path:
+            shutil.rmtree(self.chapter_path, ignore_errors=True)
+            os.replace(self.staging_path, self.chapter_path)
+        return self.chapter_path
+
+    def discard(self) -> None:
+        """Drop the pages written so far."""
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+
+    def page_rows(self, chapter_id: uuid.UUID) -> List[Page]:
+        """Page rows for the pages in the chapter directory."""
+        return [
+            Page(
+                chapter_id=chapter_id,
+                number=number,
+                file_path=os.path.join(self.chapter_path, self.pages[number]),
+            )
+            for number in sorted(self.pages)
+        ]
@@ -0,0 +1,304 @@
+"""
+Single-flight coordination of chapter downloads.
+
+Two users, or one double-click, could start two downloads of the same
+chapter, doubling upstream traffic and racing on the chapter's files. Every
+chapter download first claims the chapter; whoever asks while a download is
+in flight gets the task ID already downloading it and follows that task's
+progress instead of starting another.
+
+Claims are held in process and, when Valkey is available, as a lock key
+holding the owning task ID, so every worker process of a deployment sees
+them. Claims expire on their own if the task never runs or its process
+dies, and are refreshed while the download runs.
+
+The task a claim points to may run in another worker process. Its state is
+published to Valkey as it changes, and followers are recorded there too, so
+any worker can answer status requests for a task it does not run.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+from app.core import deps
+
+logger = logging.getLogger(__name__)
+
+# Delete or extend the lock only while it still belongs to the task
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+REFRESH_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def chapter_download_key(chapter_id: UUID) -> str:
+    """Key under which a chapter's download is coordinated."""
+    return f"chapter:{chapter_id}"
+
+
+def chapter_optimize_key(chapter_id: UUID) -> str:
+    """
+    Key held while a chapter's images are re-encoded.
+
+    Separate from the download key, so a download requested meanwhile is
+    never handed the optimizer's task; downloads wait for it instead.
+    """
+    return f"optimize:{chapter_id}"
+
+
+def pending_chapter_id(manga_id: UUID, provider: str, external_chapter_id: str) -> UUID:
+    """
+    Stable ID for a chapter that has no row yet.
+
+    Every request for the same provider chapter gets the same ID, so
+    duplicate downloads of it are coordinated under one key.
+    """
+    return uuid5(
+        NAMESPACE_URL,
+        f"chapter:{manga_id}:{provider.lower()}:{external_chapter_id}",
+    )
+
+
+class DownloadCoordinator:
+    """Makes sure only one task downloads a chapter at a time."""
+
+    KEY_PREFIX = "download:lock:"
+    TASK_PREFIX = "download:task:"
+    SUBSCRIBERS_PREFIX = "download:subscribers:"
+    FOLLOWED_PREFIX = "download:followed:"
+    LOCK_TTL_SECONDS = 120  # Outlives a stalled worker only briefly
+    TASK_TTL_SECONDS = 24 * 3600  # Finished tasks stay visible for a day
+    REFRESH_SECONDS = 30
+    POLL_SECONDS = 1.0
+
+    def __init__(self):
+        # Task holding each download, and when its claim runs out
+        self._owners: Dict[str, Tuple[str, float]] = {}
+        self._stats = {"claimed": 0, "attached": 0}
+
+    async def claim(self, key: str, task_id: str) -> Optional[str]:
+        """
+        Claim a download for a task.
+
+        Claiming again with the task that already holds the claim succeeds.
+
+        Args:
+            key: The download key, see chapter_download_key
+            task_id: The task that would run the download
+
+        Returns:
+            None if the task now holds the claim, otherwise the ID of the
+            task already running the download
+        """
+        owner = self._get_local(key)
+        if owner is None:
+            owner = await self._claim_valkey(key, task_id)
+
+        if owner is not None and owner != task_id:
+            self._stats["attached"] += 1
+            logger.info(f"Download {key} is already running as task {owner}")
+            return owner
+
+        if owner is None:
+            self._stats["claimed"] += 1
+        self._set_local(key, task_id)
+        return None
+
+    async def release(self, key: str, task_id: str) -> None:
+        """Give up a task's claim on a download."""
+        if self._get_local(key) == task_id:
+            del self._owners[key]
+
+        redis = deps.redis_client
+        if redis:
+            try:
+                await redis.eval(RELEASE_SCRIPT, 1, self._lock_key(key), task_id)
+            except Exception as e:
+                logger.warning(f"Could not release download lock {key}: {e}")
+
+    async def get_owner(self, key: str) -> Optional[str]:
+        """Get the task running a download, if any."""
+        owner = self._get_local(key)
+        if owner is not None:
+            return owner
+
+        redis = deps.redis_client
+        if redis:
+            try:
+                return await redis.get(self._lock_key(key))
+            except Exception as e:
+                logger.warning(f"Could not read download lock {key}: {e}")
+        return None
+
+    async def wait_for(self, key: str) -> None:
+        """Wait until nobody is running a download."""
+        while await self.get_owner(key) is not None:
+            await asyncio.sleep(self.POLL_SECONDS)
+
+    @asynccontextmanager
+    async def hold(self, key: str, task_id: str) -> AsyncIterator[None]:
+        """
+        Keep a claimed download locked while it runs, then release it.
+
+        Args:
+            key: The download key
+            task_id: The task holding the claim
+        """
+        refresher = asyncio.create_task(self._keep_alive(key, task_id))
+        try:
+            yield
+        finally:
+            refresher.cancel()
+            await self.release(key, task_id)
+
+    async def publish_task(self, task: Dict[str, Any]) -> None:
+        """
+        Share a task's current state with the other worker processes.
+
+        Args:
+            task: The task, as kept in the owning process
+        """
+        redis = deps.redis_client
+        if not redis:
+            return
+
+        try:
+            await redis.set(
+                f"{self.TASK_PREFIX}{task['task_id']}",
+                json.dumps(task, default=str),
+                ex=self.TASK_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"Could not publish download task {task['task_id']}: {e}")
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a task's state as last published by the process running it."""
+        redis = deps.redis_client
+        if not redis:
+            return None
+
+        try:
+            data = await redis.get(f"{self.TASK_PREFIX}{task_id}")
+        except Exception as e:
+            logger.warning(f"Could not read download task {task_id}: {e}")
+            return None
+        return json.loads(data) if data else None
+
+    async def add_subscriber(self, task_id: str, user_id: str) -> None:
+        """
+        Record that a user follows a task, wherever the task runs.
+
+        Args:
+            task_id: The ID of the followed task
+            user_id: The ID of the following user
+        """
+        redis = deps.redis_client
+        if not redis:
+            return
+
+        subscribers_key = f"{self.SUBSCRIBERS_PREFIX}{task_id}"
+        followed_key = f"{self.FOLLOWED_PREFIX}{user_id}"
+        try:
+            await redis.sadd(subscribers_key, user_id)
+            await redis.expire(subscribers_key, self.TASK_TTL_SECONDS)
+            await redis.sadd(followed_key, task_id)
+            await redis.expire(followed_key, self.TASK_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Could not subscribe to download task {task_id}: {e}")
+
+    async def get_subscribers(self, task_id: str) -> List[str]:
+        """Get the users following a task."""
+        return await self._members(f"{self.SUBSCRIBERS_PREFIX}{task_id}")
+
+    async def get_followed_tasks(self, user_id: str) -> List[str]:
+        """Get the IDs of the tasks a user follows."""
+        return await self._members(f"{self.FOLLOWED_PREFIX}{user_id}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get coordination statistics."""
+        return {**self._stats, "in_flight": len(self._owners)}
+
+    async def _members(self, key: str) -> List[str]:
+        redis = deps.redis_client
+        if not redis:
+            return []
+
+        try:
+            return sorted(await redis.smembers(key))
+        except Exception as e:
+            logger.warning(f"Could not read {key}: {e}")
+            return []
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}{key}"
+
+    def _get_local(self, key: str) -> Optional[str]:
+        claim = self._owners.get(key)
+        if claim is None:
+            return None
+        task_id, expires_at = claim
+        if time.monotonic() >= expires_at:
+            del self._owners[key]
+            return None
+        return task_id
+
+    def _set_local(self, key: str, task_id: str) -> None:
+        self._owners[key] = (task_id, time.monotonic() + self.LOCK_TTL_SECONDS)
+
+    async def _claim_valkey(self, key: str, task_id: str) -> Optional[str]:
+        """Take the Valkey lock; returns the owner if someone else has it."""
+        redis = deps.redis_client
+        if not redis:
+            return None
+
+        lock_key = self._lock_key(key)
+        try:
+            # The lock may expire between a failed set and the read
+            for _ in range(2):
+                if await redis.set(
+                    lock_key, task_id, nx=True, ex=self.LOCK_TTL_SECONDS
+                ):
+                    return None
+                owner = await redis.get(lock_key)
+                if owner is not None:
+                    return owner
+        except Exception as e:
+            logger.warning(f"Could not take download lock {key}: {e}")
+        return None
+
+    async def _keep_alive(self, key: str, task_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.REFRESH_SECONDS)
+            if self._get_local(key) == task_id:
+                self._set_local(key, task_id)
+
+            redis = deps.redis_client
+            if not redis:
+                continue
+            try:
+                await redis.eval(
+                    REFRESH_SCRIPT,
+                    1,
+                    self._lock_key(key),
+                    task_id,
+                    self.LOCK_TTL_SECONDS,
+                )
+            except Exception as e:
+                logger.warning(f"Could not refresh download lock {key}: {e}")
+
+
+# Global instance
+download_coordinator = DownloadCoordinator()
@@ -0,0 +1,284 @@
+"""
+Parallel series downloads under a shared request budget.
+
+A series used to be downloaded one chapter at a time, each one page at a
+time, so adding a long series took hours even when neither this machine nor
+the provider was busy. The orchestrator downloads several chapters of a
+series at once, unread chapters first and lowest numbers first. A single
+``DownloadBudget`` shared by every series download bounds the page requests
+in flight, in total and per provider, and optionally the bytes per second.
+Progress is reported as a ProgressTracker bulk operation with one child
+operation per chapter.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.progress.events import OperationType
+from app.core.progress.tracker import ProgressTracker, progress_tracker
+from app.core.services.download import download_chapter
+from app.core.services.download_coordinator import (
+    DownloadCoordinator,
+    chapter_download_key,
+    download_coordinator,
+)
+from app.core.services.read_ahead import chapter_sort_key
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadBudget:
+    """Limits on page requests shared by concurrent downloads."""
+
+    # How far the byte budget may run ahead after an idle period
+    BURST_SECONDS = 1.0
+
+    def __init__(
+        self,
+        max_requests: int,
+        max_requests_per_provider: int,
+        bytes_per_second: int = 0,
+    ):
+        self.max_requests_per_provider = max_requests_per_provider
+        self.bytes_per_second = bytes_per_second
+        self._requests = asyncio.Semaphore(max_requests)
+        self._provider_requests: Dict[str, asyncio.Semaphore] = {}
+        self._clock = 0.0
+        self._in_flight = 0
+        self._stats = {"requests": 0, "bytes": 0, "throttled_seconds": 0.0}
+
+    @asynccontextmanager
+    async def request(self, provider_name: str) -> AsyncIterator[None]:
+        """Hold a request slot, both for the provider and overall."""
+        provider_requests = self._provider_requests.setdefault(
+            provider_name, asyncio.Semaphore(self.max_requests_per_provider)
+        )
+        # Wait on the provider first so a busy provider does not hold
+        # global slots other providers could use
+        async with provider_requests:
+            async with self._requests:
+                self._in_flight += 1
+                self._stats["requests"] += 1
+                try:
+                    yield
+                finally:
+                    self._in_flight -= 1
+
+    async def consume(self, size: int) -> None:
+        """
+        Account for downloaded bytes, waiting while over the byte budget.
+
+        Args:
+            size: Number of bytes just downloaded
+        """
+        self._stats["bytes"] += size
+        if self.bytes_per_second <= 0:
+            return
+
+        now = time.monotonic()
+        self._clock = (
+            max(self._clock, now - self.BURST_SECONDS) + size / self.bytes_per_second
+        )
+        delay = self._clock - now
+        if delay > 0:
+            self._stats["throttled_seconds"] += delay
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get budget statistics."""
+        return {**self._stats, "in_flight": self._in_flight}
+
+
+@dataclass
+class ChapterDownload:
+    """A chapter queued as part of a series download."""
+
+    chapter_id: UUID
+    number: str
+    external_chapter_id: str
+    is_read: bool = False
+
+
+class SeriesDownloadOrchestrator:
+    """Downloads the chapters of a series concurrently."""
+
+    # Page progress is persisted and broadcast, so report it sparingly
+    PROGRESS_INTERVAL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        budget: DownloadBudget,
+        max_chapters: int,
+        session_factory: Callable = AsyncSessionLocal,
+        tracker: ProgressTracker = progress_tracker,
+        coordinator: DownloadCoordinator = download_coordinator,
+    ):
+        self.budget = budget
+        self.max_chapters = max(1, max_chapters)
+        self.session_factory = session_factory
+        self.tracker = tracker
+        self.coordinator = coordinator
+
+    async def download_series(
+        self,
+        manga_id: UUID,
+        user_id: UUID,
+        manga_title: str,
+        provider_name: str,
+        external_manga_id: str,
+        chapters: List[ChapterDownload],
+        progress_callback: Optional[Callable] = None,
+    ) -> Dict[str, int]:
+        """
+        Download chapters of a series, several at a time.
+
+        Each chapter is downloaded in its own database session; a chapter
+        that fails is reported and does not stop the others.
+
+        Args:
+            manga_id: The ID of the manga
+            user_id: The ID of the user the download is for
+            manga_title: Title shown in progress updates
+            provider_name: The name of the provider
+            external_manga_id: The external ID of the manga
+            chapters: Chapters to download; they must already exist
+            progress_callback: Optional callback receiving (finished chapters,
+                total chapters) after each chapter
+
+        Returns:
+            Counts of completed and failed chapters
+        """
+        results = {"completed": 0, "failed": 0}
+        if not chapters:
+            return results
+
+        ordered = sorted(
+            chapters,
+            key=lambda chapter: (chapter.is_read, chapter_sort_key(chapter.number)),
+        )
+
+        bulk_operation_id = await self.tracker.start_bulk_operation(
+            operation_type=OperationType.BULK_DOWNLOAD,
+            title=f"Downloading {manga_title}",
+            description=f"{len(ordered)} chapters from {provider_name}",
+            user_id=str(user_id),
+            total_items=len(ordered),
+            metadata={"manga_id": str(manga_id), "provider": provider_name},
+        )
+        # Every child is registered up front, otherwise the bulk operation
+        # counts as finished whenever the chapters started so far are done
+        queue = []
+        for chapter in ordered:
+            child_operation_id = await self.tracker.add_child_operation(
+                bulk_operation_id,
+                OperationType.DOWNLOAD_CHAPTER,
+                f"{manga_title} - Chapter {chapter.number}",
+                metadata={"chapter_id": str(chapter.chapter_id)},
+            )
+            queue.append((chapter, child_operation_id))
+
+        pending = iter(queue)
+
+        async def worker() -> None:
+            for chapter, child_operation_id in pending:
+                succeeded = await self._download_chapter(
+                    manga_id,
+                    provider_name,
+                    external_manga_id,
+                    chapter,
+                    bulk_operation_id,
+                    child_operation_id,
+                )
+                results["completed" if succeeded else "failed"] += 1
+                if progress_callback:
+                    await progress_callback(
+                        results["completed"] + results["failed"], len(ordered)
+                    )
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.max_chapters, len(ordered))))
+        )
+
+        logger.info(
+            f"Series download of {manga_title} finished: "
+            f"{results['completed']} chapters downloaded, {results['failed']} failed"
+        )
+        return results
+
+    async def _download_chapter(
+        self,
+        manga_id: UUID,
+        provider_name: str,
+        external_manga_id: str,
+        chapter: ChapterDownload,
+        bulk_operation_id: str,
+        child_operation_id: str,
+    ) -> bool:
+        last_report = 0.0
+
+        async def report_progress(downloaded_pages, total_pages, percentage):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report < self.PROGRESS_INTERVAL_SECONDS:
+                return
+            last_report = now
+            await self.tracker.update_progress(
+                child_operation_id,
+                progress=percentage,
+                current_step=f"Page {downloaded_pages}/{total_pages}",
+            )
+            await self.tracker.update_bulk_progress(bulk_operation_id)
+
+        key = chapter_download_key(chapter.chapter_id)
+        if await self.coordinator.claim(key, child_operation_id):
+            # Another download has the chapter; it is done once that one is
+            await self.coordinator.wait_for(key)
+            await self.tracker.complete_child_operation(
+                child_operation_id, f"Chapter {chapter.number} downloaded"
+            )
+            return True
+
+        try:
+            async with (
+                self.coordinator.hold(key, child_operation_id),
+                self.session_factory() as db,
+            ):
+                await download_chapter(
+                    manga_id=manga_id,
+                    chapter_id=chapter.chapter_id,
+                    provider_name=provider_name,
+                    external_manga_id=external_manga_id,
+                    external_chapter_id=chapter.external_chapter_id,
+                    db=db,
+                    progress_callback=report_progress,
+                    budget=self.budget,
+                )
+        except Exception as e:
+            logger.error(
+                f"Error downloading chapter {chapter.number} of manga {manga_id}: {e}"
+            )
+            await self.tracker.fail_child_operation(child_operation_id, str(e))
+            return False
+
+        await self.tracker.complete_child_operation(
+            child_operation_id, f"Chapter {chapter.number} downloaded"
+        )
+        return True
+
+
+# Global instance
+series_download_orchestrator = SeriesDownloadOrchestrator(
+    DownloadBudget(
+        max_requests=settings.DOWNLOAD_MAX_REQUESTS,
+        max_requests_per_provider=settings.DOWNLOAD_MAX_REQUESTS_PER_PROVIDER,
+        bytes_per_second=settings.DOWNLOAD_BYTES_PER_SECOND,
+    ),
+    max_chapters=settings.DOWNLOAD_CONCURRENT_CHAPTERS,
+)
@@ -79,9 +79,28 @@ class ProviderMatcher:
         self.similarity_threshold = 0.7  # Minimum similarity for auto-matching
 
     async def find_provider_matches(
-        self, mu_entry: MangaUpdatesEntry, max_providers: int = 5
+        self,
+        mu_entry: MangaUpdatesEntry,
+        max_providers: int = 5,
+        db: Optional[AsyncSession] = None,
     ) -> List[Dict]:
-        """Find matching content across providers for a MangaUpdates entry."""
+        """Find matching content across providers for a MangaUpdates entry.
+
+        When a database session is given and the series has already been matched
+        by the background series matcher, the stored matches are returned
+        without searching any provider.
+        """
+        if db is not None and mu_entry.id is not None:
+            from app.core.services.series_matcher import match_to_dict, series_matcher
+
+            stored_matches = await series_matcher.get_matches_for_mu_entry(
+                db, mu_entry.id
+            )
+            if stored_matches:
+                return [
+                    match_to_dict(match) for match in stored_matches[:max_providers]
+                ]
+
         logger.info(f"[PROVIDER_MATCH] Starting provider matching for {mu_entry.title}")
         matches = []
 
@@ -250,7 +269,7 @@ class EnhancedSearchService:
                 if include_provider_matches:
                     enhanced_result.provider_matches = (
                         await self.provider_matcher.find_provider_matches(
-                            mu_entry, max_providers=3
+                            mu_entry, max_providers=3, db=db
                         )
                     )
 
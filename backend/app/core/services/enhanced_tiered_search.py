@@ -5,10 +5,12 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, cast, or_, select
+from sqlalchemy import cast, or_, select, tuple_
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.services.autocomplete import autocomplete_index
+from app.core.services.series_matcher import match_to_dict, series_matcher
 from app.core.services.tiered_indexing import (
     IndexerTier,
     UniversalMetadata,
@@ -96,16 +98,12 @@ class EnhancedTieredSearchService:
         stored_entries = await self._store_search_results(filtered_results, db)
 
         # Convert to search results
-        search_results = []
         start_idx = (page - 1) * limit
         end_idx = start_idx + limit
 
-        for entry in stored_entries[start_idx:end_idx]:
-            search_result = await self._convert_to_search_result(
-                entry, user_id, include_provider_matches, db
-            )
-            if search_result:
-                search_results.append(search_result)
+        search_results = await self._convert_to_search_results(
+            stored_entries[start_idx:end_idx], user_id, include_provider_matches, db
+        )
 
         return SearchResponse(
             results=search_results,
@@ -145,12 +143,16 @@ class EnhancedTieredSearchService:
         provider_matches = []
         if library_manga:
             # If in library, get provider matches from existing data
-            from app.core.services.enhanced_search import ProviderMatcher
+            stored_matches = await series_matcher.get_matches(db, library_manga.id)
+            if stored_matches:
+                provider_matches = [match_to_dict(match) for match in stored_matches]
+            else:
+                from app.core.services.enhanced_search import ProviderMatcher
 
-            matcher = ProviderMatcher()
-            provider_matches = await matcher.find_provider_matches(
-                self._convert_to_legacy_format(entry), max_providers=5
-            )
+                matcher = ProviderMatcher()
+                provider_matches = await matcher.find_provider_matches(
+                    self._convert_to_legacy_format(entry), max_providers=5
+                )
 
         return {
             "entry": self._entry_to_dict(entry),
@@ -337,13 +339,9 @@ class EnhancedTieredSearchService:
     ) -> SearchResponse:
         """Process cached results into search response."""
 
-        search_results = []
-        for entry in cached_entries:
-            search_result = await self._convert_to_search_result(
-                entry, user_id, include_provider_matches, db
-            )
-            if search_result:
-                search_results.append(search_result)
+        search_results = await self._convert_to_search_results(
+            cached_entries, user_id, include_provider_matches, db
+        )
 
         return SearchResponse(
             results=search_results,
@@ -356,37 +354,62 @@ class EnhancedTieredSearchService:
     async def _store_search_results(
         self, metadata_results: List[UniversalMetadata], db: AsyncSession
     ) -> List[UniversalMangaEntry]:
-        """Store search results in database and return stored entries."""
+        """
+        Store search results and return the stored entries in order.
 
-        stored_entries = []
+        Existing rows are loaded with one query and updated in place; new rows
+        are added, and both are written in a single flush.
+        """
 
-        for metadata in metadata_results:
-            # Check if entry already exists
-            result = await db.execute(
-                select(UniversalMangaEntry).where(
-                    and_(
-                        UniversalMangaEntry.source_indexer == metadata.source_indexer,
-                        UniversalMangaEntry.source_id == metadata.source_id,
-                    )
-                )
+        if not metadata_results:
+            return []
+
+        source_keys = {
+            (metadata.source_indexer, metadata.source_id)
+            for metadata in metadata_results
+        }
+
+        # Load every existing entry for this result set in a single query
+        result = await db.execute(
+            select(UniversalMangaEntry).where(
+                tuple_(
+                    UniversalMangaEntry.source_indexer, UniversalMangaEntry.source_id
+                ).in_(list(source_keys))
             )
+        )
+        entries_by_key = {
+            (entry.source_indexer, entry.source_id): entry
+            for entry in result.scalars().all()
+        }
 
-            existing_entry = result.scalars().first()
+        stored_entries = []
+        stored_keys = set()
+        new_entries = []
+
+        for metadata in metadata_results:
+            key = (metadata.source_indexer, metadata.source_id)
+            entry = entries_by_key.get(key)
 
-            if existing_entry:
+            if entry:
                 # Update existing entry if new data has higher confidence
-                if metadata.confidence_score > existing_entry.confidence_score:
-                    self._update_entry_from_metadata(existing_entry, metadata)
-                    await db.flush()
-                stored_entries.append(existing_entry)
+                if metadata.confidence_score > entry.confidence_score:
+                    self._update_entry_from_metadata(entry, metadata)
             else:
-                # Create new entry
-                new_entry = self._create_entry_from_metadata(metadata)
-                db.add(new_entry)
-                await db.flush()
-                stored_entries.append(new_entry)
+                entry = self._create_entry_from_metadata(metadata)
+                entries_by_key[key] = entry
+                new_entries.append(entry)
 
+            if key not in stored_keys:
+                stored_keys.add(key)
+                stored_entries.append(entry)
+
+        db.add_all(new_entries)
+        await db.flush()
         await db.commit()
+
+        for entry in stored_entries:
+            autocomplete_index.add_universal_entry(entry)
+
         return stored_entries
 
     def _create_entry_from_metadata(
@@ -510,40 +533,53 @@ class EnhancedTieredSearchService:
         ).total_seconds() / 3600
         return hours_since_refresh >= entry.refresh_interval_hours
 
-    async def _convert_to_search_result(
+    async def _convert_to_search_results(
         self,
-        entry: UniversalMangaEntry,
+        entries: List[UniversalMangaEntry],
         user_id: Optional[str],
         include_provider_matches: bool,
         db: AsyncSession,
-    ) -> Optional[SearchResult]:
-        """Convert universal entry to search result."""
+    ) -> List[SearchResult]:
+        """Convert universal entries to search results with batched enrichment."""
 
-        # Check library status
-        in_library, library_manga = await self._check_library_status(entry, user_id, db)
+        if not entries:
+            return []
 
-        # Get provider matches if requested
-        provider_matches = []
+        entry_ids = [entry.id for entry in entries]
+
+        library_manga = await self._get_library_manga_batch(entry_ids, user_id, db)
+
+        provider_matches: Dict = {}
         if include_provider_matches:
-            # This would integrate with the existing provider matching system
-            pass
-
-        # For MangaUpdates entries, we need to use the UUID from the database
-        if entry.source_indexer == "mangaupdates":
-            # Look up the UUID for this MangaUpdates entry in universal_manga_entries
-            from app.models.mangaupdates import UniversalMangaEntry
-
-            stmt = select(UniversalMangaEntry.id).where(
-                and_(
-                    UniversalMangaEntry.source_indexer == "mangaupdates",
-                    UniversalMangaEntry.source_id == entry.source_id,
-                )
+            stored_matches = await series_matcher.get_matches_for_universal_entries(
+                db, entry_ids
             )
-            result = await db.execute(stmt)
-            uuid_result = result.scalar_one_or_none()
-            entry_id = str(uuid_result) if uuid_result else entry.source_id
-        else:
-            entry_id = entry.source_id
+            provider_matches = {
+                entry_id: [match_to_dict(match) for match in matches]
+                for entry_id, matches in stored_matches.items()
+            }
+
+        return [
+            self._convert_to_search_result(
+                entry,
+                in_library=entry.id in library_manga,
+                provider_matches=provider_matches.get(entry.id, []),
+            )
+            for entry in entries
+        ]
+
+    def _convert_to_search_result(
+        self,
+        entry: UniversalMangaEntry,
+        in_library: bool = False,
+        provider_matches: Optional[List[Dict]] = None,
+    ) -> SearchResult:
+        """Convert universal entry to search result."""
+
+        # MangaUpdates entries are addressed by their universal entry UUID
+        entry_id = (
+            str(entry.id) if entry.source_indexer == "mangaupdates" else entry.source_id
+        )
 
         return SearchResult(
             id=entry_id,
@@ -578,43 +614,40 @@ class EnhancedTieredSearchService:
                 "demographic": entry.demographic,
                 "latest_chapter": entry.latest_chapter,
                 "total_chapters": entry.total_chapters,
-                "provider_matches": provider_matches,
+                "provider_matches": provider_matches or [],
             },
         )
 
-    async def _check_library_status(
-        self, entry: UniversalMangaEntry, user_id: Optional[str], db: AsyncSession
-    ) -> Tuple[bool, Optional[Manga]]:
-        """Check if universal entry is in user's library."""
+    async def _get_library_manga_batch(
+        self, entry_ids: List, user_id: Optional[str], db: AsyncSession
+    ) -> Dict:
+        """Map universal entry IDs to the user's library manga in one query."""
+
+        if not user_id or not entry_ids:
+            return {}
 
-        if not user_id:
-            return False, None
+        from app.models.library import MangaUserLibrary
 
-        # Look for existing mapping
         result = await db.execute(
-            select(UniversalMangaMapping, Manga)
+            select(UniversalMangaMapping.universal_entry_id, Manga)
             .join(Manga, UniversalMangaMapping.manga_id == Manga.id)
-            .where(UniversalMangaMapping.universal_entry_id == entry.id)
+            .join(MangaUserLibrary, MangaUserLibrary.manga_id == Manga.id)
+            .where(
+                UniversalMangaMapping.universal_entry_id.in_(entry_ids),
+                MangaUserLibrary.user_id == user_id,
+            )
         )
 
-        mapping_and_manga = result.first()
-        if mapping_and_manga:
-            mapping, manga = mapping_and_manga
-
-            # Check if manga is in user's library
-            from app.models.library import MangaUserLibrary
+        return {entry_id: manga for entry_id, manga in result.all()}
 
-            library_result = await db.execute(
-                select(MangaUserLibrary).where(
-                    (MangaUserLibrary.manga_id == manga.id)
-                    & (MangaUserLibrary.user_id == user_id)
-                )
-            )
-
-            if library_result.scalars().first():
-                return True, manga
+    async def _check_library_status(
+        self, entry: UniversalMangaEntry, user_id: Optional[str], db: AsyncSession
+    ) -> Tuple[bool, Optional[Manga]]:
+        """Check if universal entry is in user's library."""
 
-        return False, None
+        library_manga = await self._get_library_manga_batch([entry.id], user_id, db)
+        manga = library_manga.get(entry.id)
+        return manga is not None, manga
 
     async def _get_cross_references(
         self, entry: UniversalMangaEntry, db: AsyncSession
@@ -627,18 +660,22 @@ class EnhancedTieredSearchService:
             )
         )
 
-        cross_refs = {}
-        for ref in result.scalars().all():
-            cross_refs[ref.reference_indexer] = {
-                "reference_id": ref.reference_id,
-                "reference_url": ref.reference_url,
-                "confidence_score": ref.confidence_score,
-                "match_method": ref.match_method,
-                "verified_by_user": ref.verified_by_user,
-                "additional_metadata": ref.additional_metadata,
-            }
+        return {
+            ref.reference_indexer: self._cross_reference_to_dict(ref)
+            for ref in result.scalars().all()
+        }
+
+    def _cross_reference_to_dict(self, ref: CrossIndexerReference) -> Dict:
+        """Convert a cross-reference to dictionary."""
 
-        return cross_refs
+        return {
+            "reference_id": ref.reference_id,
+            "reference_url": ref.reference_url,
+            "confidence_score": ref.confidence_score,
+            "match_method": ref.match_method,
+            "verified_by_user": ref.verified_by_user,
+            "additional_metadata": ref.additional_metadata,
+        }
 
     def _entry_to_dict(self, entry: UniversalMangaEntry) -> Dict:
         """Convert entry to dictionary."""
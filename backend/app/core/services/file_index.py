@@ -0,0 +1,392 @@
+"""
+Persistent index of the files in storage.
+
+Recovery, migration and validation used to walk the storage tree with a
+stat per file on every request, which takes minutes on a multi-terabyte
+library. The index keeps each file's size, mtime and inode, and its
+SHA-256 once asked for, in a SQLite database at the storage root. It lives
+outside the main database on purpose: recovery is needed precisely when
+that database is gone.
+
+Scans are incremental. Every directory is stat'ed, but only directories
+whose mtime or inode changed since the last scan are listed again with
+os.scandir. Creating, removing or renaming a file changes its directory's
+mtime, and the app writes files by renaming them into place, so this
+catches its changes; a file rewritten in place needs a full rescan. Every
+query first refreshes the part of the tree it reads, unless the caller has
+just refreshed it, so answers are never staler than the directory stats.
+
+All of it is blocking file and SQLite work, meant to run in threads. The
+lock only guards the database for one directory at a time, so a cold build
+of a large tree never holds up queries for the rest of it.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import stat
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = ".file_index.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    mtime_ns INTEGER,
+    inode INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+class FileEntry(NamedTuple):
+    """An indexed file."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    hash: Optional[str]
+
+
+class FileIndex:
+    """Index of the files below a storage root."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._lock = threading.RLock()
+        self._db = self._connect()
+        self._stats = {"dirs_listed": 0, "dirs_unchanged": 0, "hashes": 0}
+
+    def refresh(self, path: Optional[str] = None, full: bool = False) -> int:
+        """
+        Bring the index up to date for a directory tree.
+
+        Blocking; run it in a thread from async code.
+
+        Args:
+            path: The tree to refresh, the whole storage root by default
+            full: List every directory again, even unchanged ones
+
+        Returns:
+            The number of directories that had to be listed
+        """
+        return self._refresh_tree(os.path.abspath(path or self.root), full)
+
+    def list_dir(
+        self, path: str, refresh: bool = True
+    ) -> Tuple[List[str], List[FileEntry]]:
+        """
+        List a directory from the index.
+
+        Blocking, like every query; run it in a thread from async code.
+
+        Args:
+            path: The directory
+            refresh: Revalidate the directory first; pass False right after
+                refreshing its tree
+
+        Returns:
+            Paths of its subdirectories and its files, sorted by path; both
+            empty if the directory does not exist
+        """
+        path = os.path.abspath(path)
+        if refresh and not self._refresh_dir(path):
+            return [], []
+        with self._lock:
+            subdirs = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT path FROM dirs WHERE parent = ? ORDER BY path", (path,)
+                )
+            ]
+            files = [
+                FileEntry(*row)
+                for row in self._db.execute(
+                    "SELECT path, size, mtime_ns, inode, hash FROM files "
+                    "WHERE dir = ? ORDER BY path",
+                    (path,),
+                )
+            ]
+        return subdirs, files
+
+    def files_under(self, path: str, refresh: bool = True) -> List[FileEntry]:
+        """All files in a directory tree, sorted by path."""
+        path = os.path.abspath(path)
+        if refresh:
+            self._refresh_tree(path, False)
+        with self._lock:
+            return [
+                FileEntry(*row)
+                for row in self._db.execute(
+                    "SELECT path, size, mtime_ns, inode, hash FROM files "
+                    "WHERE path > ? AND path < ? ORDER BY path",
+                    _subtree_range(path),
+                )
+            ]
+
+    def tree_size(self, path: str, refresh: bool = True) -> int:
+        """Total size in bytes of the files in a directory tree."""
+        path = os.path.abspath(path)
+        if refresh:
+            self._refresh_tree(path, False)
+        with self._lock:
+            (total,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM files WHERE path > ? AND path < ?",
+                _subtree_range(path),
+            ).fetchone()
+        return total
+
+    def get_hash(self, path: str) -> str:
+        """
+        Get a file's SHA-256, hashing it only if it changed since last time.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        path = os.path.abspath(path)
+        info = os.stat(path)
+        signature = (info.st_size, info.st_mtime_ns, info.st_ino)
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, inode, hash FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row and tuple(row[:3]) == signature and row[3]:
+            return row[3]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (path, os.path.dirname(path), *signature, file_hash),
+            )
+        self._stats["hashes"] += 1
+        return file_hash
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get index statistics."""
+        with self._lock:
+            (files,) = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+            (dirs,) = self._db.execute("SELECT COUNT(*) FROM dirs").fetchone()
+        return {**self._stats, "files": files, "dirs": dirs}
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        index_path = os.path.join(self.root, INDEX_NAME)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            db = sqlite3.connect(index_path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            # Losing the last writes on power loss only costs a rescan
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(
+                f"Could not open file index at {index_path}, keeping it in memory: {e}"
+            )
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.executescript(SCHEMA)
+        return db
+
+    def _refresh_tree(self, path: str, full: bool) -> int:
+        listed = 0
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            info = self._stat_dir(current)
+            if info is None:
+                continue
+
+            if not full:
+                with self._lock:
+                    unchanged = self._is_unchanged(current, info)
+                    subdirs = self._subdirs(current) if unchanged else []
+                if unchanged:
+                    self._stats["dirs_unchanged"] += 1
+                    pending.extend(subdirs)
+                    continue
+
+            pending.extend(self._list(current, info))
+            listed += 1
+        return listed
+
+    def _refresh_dir(self, path: str) -> bool:
+        """Refresh one directory's entries; whether it exists."""
+        info = self._stat_dir(path)
+        if info is None:
+            return False
+        with self._lock:
+            unchanged = self._is_unchanged(path, info)
+        if unchanged:
+            self._stats["dirs_unchanged"] += 1
+        else:
+            self._list(path, info)
+        return True
+
+    def _stat_dir(self, path: str) -> Optional[os.stat_result]:
+        """Stat a directory, dropping it from the index if it is gone."""
+        try:
+            info = os.stat(path)
+        except OSError:
+            info = None
+        if info is None or not stat.S_ISDIR(info.st_mode):
+            with self._lock, self._db:
+                self._forget(path)
+            return None
+        return info
+
+    def _is_unchanged(self, path: str, info: os.stat_result) -> bool:
+        row = self._db.execute(
+            "SELECT mtime_ns, inode FROM dirs WHERE path = ?", (path,)
+        ).fetchone()
+        return row is not None and row == (info.st_mtime_ns, info.st_ino)
+
+    def _subdirs(self, path: str) -> List[str]:
+        return [
+            row[0]
+            for row in self._db.execute(
+                "SELECT path FROM dirs WHERE parent = ?", (path,)
+            )
+        ]
+
+    def _list(self, path: str, info: os.stat_result) -> List[str]:
+        """List a directory again, updating its files; returns its subdirectories."""
+        self._stats["dirs_listed"] += 1
+        subdirs: List[str] = []
+        files: Dict[str, Tuple[int, int, int]] = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith(INDEX_NAME):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        # Symlinked pages count with their target's size
+                        entry_info = entry.stat()
+                    except OSError:
+                        continue
+                    files[entry.path] = (
+                        entry_info.st_size,
+                        entry_info.st_mtime_ns,
+                        entry_info.st_ino,
+                    )
+        except OSError as e:
+            logger.warning(f"Could not list {path}: {e}")
+            return []
+
+        with self._lock, self._db:
+            self._store_listing(path, info, subdirs, files)
+        return subdirs
+
+    def _store_listing(
+        self,
+        path: str,
+        info: os.stat_result,
+        subdirs: List[str],
+        files: Dict[str, Tuple[int, int, int]],
+    ) -> None:
+        known = {
+            row[0]: row[1:]
+            for row in self._db.execute(
+                "SELECT path, size, mtime_ns, inode, hash FROM files WHERE dir = ?",
+                (path,),
+            )
+        }
+        self._db.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (file_path, path, *signature, None)
+                for file_path, signature in files.items()
+                if file_path not in known or tuple(known[file_path][:3]) != signature
+            ],
+        )
+        self._db.executemany(
+            "DELETE FROM files WHERE path = ?",
+            [(file_path,) for file_path in known if file_path not in files],
+        )
+
+        known_dirs = set(self._subdirs(path))
+        for gone in known_dirs.difference(subdirs):
+            self._forget(gone)
+        # New subdirectories are listed when they are visited
+        self._db.executemany(
+            "INSERT INTO dirs VALUES (?, ?, NULL, NULL)",
+            [(subdir, path) for subdir in subdirs if subdir not in known_dirs],
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+            (path, os.path.dirname(path), info.st_mtime_ns, info.st_ino),
+        )
+
+    def _forget(self, path: str) -> None:
+        """Drop a directory and everything below it from the index."""
+        low, high = _subtree_range(path)
+        for table in ("dirs", "files"):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE path = ? OR (path > ? AND path < ?)",
+                (path, low, high),
+            )
+
+
+def _subtree_range(path: str) -> Tuple[str, str]:
+    """Bounds between which the paths below a directory sort."""
+    return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+_indexes: Dict[str, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(root: Optional[str] = None) -> FileIndex:
+    """
+    Get the index of a storage root.
+
+    Args:
+        root: The storage root, STORAGE_PATH by default
+
+    Returns:
+        The index, shared by every caller using the same root
+    """
+    root = os.path.abspath(root or settings.STORAGE_PATH)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = FileIndex(root)
+        return index
+
+
+def close_file_indexes() -> None:
+    """Close every open index."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+        _indexes.clear()
+    for index in indexes:
+        index.close()
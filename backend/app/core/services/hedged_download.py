@@ -0,0 +1,458 @@
+"""
+Hedged chapter downloads across two sources.
+
+Falling back to another provider only once the primary failed meant a
+primary that was slow, but still answering, could hold a chapter for
+minutes. When the primary has not resolved its page list and first few
+pages within its usual time (the p90 of its earlier runs), a second known
+source of the chapter starts as well; the first to finish wins and the
+other is cancelled.
+
+Sources reporting the same page count share one page board: each takes
+pages nobody has taken yet, then re-requests pages the other is still
+waiting on, so a single stuck page cannot stall the chapter. Every board
+writes its own staging copy of the chapter (a directory, or a partial
+archive when chapters are stored as CBZ), which replaces the chapter once
+the board wins. When no board completes, the fullest one is kept as an
+incomplete archive and the chapter records its missing pages.
+
+A cancelled source's elapsed time counts as a latency sample too, so a
+provider that keeps losing races pushes its hedge delay up rather than
+leaving only its fast runs on record.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.providers.page_manifest import (
+    is_expired_page_error,
+    page_manifest_cache,
+)
+from app.core.providers.registry import provider_registry
+from app.core.providers.search_planner import ProviderLatencyStats
+from app.core.services.cbz_sink import CBZPageSink
+from app.core.services.download import (
+    PAGE_DELAYS,
+    get_chapter_referer,
+    get_page_file_extension,
+    new_page_sink,
+    send_download_progress_update,
+    store_chapter_pages,
+)
+from app.core.services.download_checkpoint import LoosePageSink
+from app.core.services.series_matcher import series_matcher
+from app.core.utils import get_chapter_storage_path
+from app.models.manga import Chapter, Manga
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChapterSource:
+    """Where a chapter can be downloaded from."""
+
+    provider_name: str
+    external_manga_id: str
+    external_chapter_id: str
+
+
+class PageBoard:
+    """Pages of one chapter attempt, shared by the sources fetching them."""
+
+    def __init__(self, page_count: int, sink: Union[CBZPageSink, LoosePageSink]):
+        self.page_count = page_count
+        self.sink = sink
+        self.files: Dict[int, str] = {}
+        self.contributors: Counter = Counter()
+        self._fetching: Dict[int, int] = {}
+        self._failed: Dict[int, Set[str]] = {}
+
+    @property
+    def is_complete(self) -> bool:
+        return len(self.files) == self.page_count
+
+    def claim(self, source: str) -> Optional[int]:
+        """
+        Pick the next page for a source to fetch.
+
+        Pages nobody is fetching come first; after that a page one other
+        source is still waiting on is fetched a second time.
+
+        Returns:
+            A page number, or None if the source has nothing left to do
+        """
+        candidates = [
+            number
+            for number in range(1, self.page_count + 1)
+            if number not in self.files and source not in self._failed.get(number, ())
+        ]
+        for fetching in (0, 1):
+            for number in candidates:
+                if self._fetching.get(number, 0) == fetching:
+                    self._fetching[number] = fetching + 1
+                    return number
+        return None
+
+    def add(self, number: int, source: str, file_ext: str, data: bytes) -> bool:
+        """
+        Store a fetched page unless another source already delivered it.
+
+        Returns:
+            Whether the page was kept
+        """
+        self._fetching[number] -= 1
+        if number in self.files:
+            return False
+
+        self.files[number] = self.sink.add_page(number, file_ext, data)
+        self.contributors[source] += 1
+        return True
+
+    def fail(self, number: int, source: str) -> None:
+        """Leave a page the source could not fetch to the other source."""
+        self._fetching[number] -= 1
+        self._failed.setdefault(number, set()).add(source)
+
+
+class HedgedChapterDownloader:
+    """Downloads a chapter from a primary source, hedged by a second one."""
+
+    MIN_SAMPLES = 5  # Runs observed before a provider's latency is trusted
+    HEDGE_PERCENTILE = 90
+
+    def __init__(self):
+        self._latency: Dict[str, ProviderLatencyStats] = {}
+        self._stats = {"downloads": 0, "hedged": 0, "hedge_wins": 0}
+
+    def record_latency(
+        self, provider_name: str, elapsed: float, delivered: bool = True
+    ) -> None:
+        """
+        Record how long a provider took to deliver its first pages.
+
+        Args:
+            provider_name: The provider
+            elapsed: Seconds until its first pages arrived, or until it was
+                cancelled without them
+            delivered: Whether the first pages arrived
+        """
+        stats = self._latency.setdefault(provider_name, ProviderLatencyStats())
+        stats.record(delivered, elapsed)
+
+    def get_hedge_delay(self, provider_name: str) -> float:
+        """How long to give a provider before starting a second source."""
+        stats = self._latency.get(provider_name)
+        if not stats or len(stats.samples) < self.MIN_SAMPLES:
+            return settings.DOWNLOAD_HEDGE_DEFAULT_SECONDS
+        return stats.percentile(self.HEDGE_PERCENTILE)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hedging statistics."""
+        return dict(self._stats)
+
+    async def download(
+        self,
+        manga_id: UUID,
+        chapter_id: UUID,
+        primary: ChapterSource,
+        secondary: ChapterSource,
+        db: AsyncSession,
+        task_id: Optional[str] = None,
+    ) -> Tuple[ChapterSource, str]:
+        """
+        Download a chapter, starting the secondary source if the primary is slow.
+
+        Args:
+            manga_id: The ID of the manga
+            chapter_id: The ID of the chapter
+            primary: The source to download from
+            secondary: The source to race against a slow primary
+            db: The database session
+            task_id: Optional task ID for progress tracking
+
+        Returns:
+            The source that delivered most of the chapter, and the chapter's path;
+            pages neither source delivered are recorded on the chapter
+
+        Raises:
+            RuntimeError: If neither source delivered any page
+        """
+        self._stats["downloads"] += 1
+        chapter_path = get_chapter_storage_path(manga_id, chapter_id)
+        boards: Dict[int, PageBoard] = {}
+        first_pages = asyncio.Event()
+
+        def board_for(page_count: int) -> PageBoard:
+            board = boards.get(page_count)
+            if board is None:
+                sink = new_page_sink(
+                    chapter_path, staging_path=f"{chapter_path}.hedge-{len(boards)}"
+                )
+                sink.open()
+                board = boards[page_count] = PageBoard(page_count, sink)
+            return board
+
+        runs = [
+            asyncio.create_task(
+                self._run_source(primary, board_for, first_pages, task_id)
+            )
+        ]
+        first_pages_wait = asyncio.create_task(first_pages.wait())
+        try:
+            await asyncio.wait(
+                [runs[0], first_pages_wait],
+                timeout=self.get_hedge_delay(primary.provider_name),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            first_pages_wait.cancel()
+            if not first_pages.is_set() and not _delivered_chapter(runs[0]):
+                logger.info(
+                    f"{primary.provider_name} is slow on chapter {chapter_id}, "
+                    f"hedging with {secondary.provider_name}"
+                )
+                self._stats["hedged"] += 1
+                runs.append(
+                    asyncio.create_task(
+                        self._run_source(secondary, board_for, None, task_id)
+                    )
+                )
+
+            board = await self._first_complete_board(runs, boards)
+            if len(runs) == 1 and not (board and board.is_complete):
+                # The primary was quick but could not deliver every page
+                runs.append(
+                    asyncio.create_task(
+                        self._run_source(secondary, board_for, None, task_id)
+                    )
+                )
+                board = await self._first_complete_board(runs, boards)
+        finally:
+            first_pages_wait.cancel()
+            for run in runs:
+                run.cancel()
+            await asyncio.gather(*runs, return_exceptions=True)
+
+        try:
+            if board is None:
+                raise RuntimeError(
+                    f"Neither {primary.provider_name} nor "
+                    f"{secondary.provider_name} delivered chapter {chapter_id}"
+                )
+            file_path = await asyncio.to_thread(
+                board.sink.finalize, complete=board.is_complete
+            )
+        finally:
+            for other in boards.values():
+                if other is not board:
+                    await asyncio.to_thread(other.sink.discard)
+
+        missing_pages = board.page_count - len(board.files)
+        if missing_pages:
+            logger.warning(
+                f"Hedged download of chapter {chapter_id} is missing "
+                f"{missing_pages} of {board.page_count} pages"
+            )
+        await store_chapter_pages(
+            db,
+            chapter_id,
+            file_path,
+            len(board.files),
+            pages=board.sink.page_rows(chapter_id),
+            missing_pages=missing_pages,
+        )
+
+        winner_name = board.contributors.most_common(1)[0][0]
+        winner = primary if winner_name == primary.provider_name else secondary
+        if winner is secondary:
+            self._stats["hedge_wins"] += 1
+
+        if task_id:
+            await send_download_progress_update(
+                task_id=task_id,
+                event_type="download_completed",
+                progress=100,
+                total_pages=board.page_count,
+                downloaded_pages=len(board.files),
+            )
+        return winner, file_path
+
+    async def _first_complete_board(
+        self, runs: List[asyncio.Task], boards: Dict[int, PageBoard]
+    ) -> Optional[PageBoard]:
+        """Wait for a board to complete; else the fullest board once all stop."""
+        pending = set(runs)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for run in done:
+                if run.exception():
+                    logger.warning(f"Hedged chapter source failed: {run.exception()}")
+            for board in boards.values():
+                if board.is_complete:
+                    return board
+
+        partial = [board for board in boards.values() if board.files]
+        return max(partial, key=lambda board: len(board.files), default=None)
+
+    async def _run_source(
+        self,
+        source: ChapterSource,
+        board_for,
+        first_pages: Optional[asyncio.Event],
+        task_id: Optional[str],
+    ) -> PageBoard:
+        """Fetch pages from one source until its board has nothing left."""
+        provider = provider_registry.get_provider(source.provider_name)
+        if not provider:
+            raise ValueError(f"Provider '{source.provider_name}' not found")
+
+        started_at = time.monotonic()
+        delivered = 0
+        first_page_count = None
+        try:
+            page_urls = await page_manifest_cache.get_pages(
+                provider, source.external_manga_id, source.external_chapter_id
+            )
+            if not page_urls:
+                raise RuntimeError(f"{source.provider_name} returned no pages")
+
+            board = board_for(len(page_urls))
+            if task_id and first_pages:
+                await send_download_progress_update(
+                    task_id=task_id,
+                    event_type="download_started",
+                    progress=0,
+                    total_pages=len(page_urls),
+                )
+            referer = get_chapter_referer(
+                provider, source.external_manga_id, source.external_chapter_id
+            )
+            page_delay = PAGE_DELAYS.get(source.provider_name, 0.5)
+            first_page_count = min(settings.DOWNLOAD_HEDGE_FIRST_PAGES, len(page_urls))
+            requested = False
+
+            while True:
+                number = board.claim(source.provider_name)
+                if number is None:
+                    return board
+                if requested:
+                    await asyncio.sleep(page_delay)
+                requested = True
+
+                page_url = page_urls[number - 1]
+                try:
+                    data = await provider.download_page(page_url, referer=referer)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if is_expired_page_error(e):
+                        page_manifest_cache.invalidate_url(page_url)
+                    logger.warning(f"{source.provider_name} failed page {number}: {e}")
+                    board.fail(number, source.provider_name)
+                    continue
+
+                if not data:
+                    board.fail(number, source.provider_name)
+                    continue
+
+                if board.add(
+                    number,
+                    source.provider_name,
+                    get_page_file_extension(page_url),
+                    data,
+                ):
+                    delivered += 1
+                    if delivered == first_page_count:
+                        self.record_latency(
+                            source.provider_name, time.monotonic() - started_at
+                        )
+                        if first_pages:
+                            first_pages.set()
+                    if task_id:
+                        await send_download_progress_update(
+                            task_id=task_id,
+                            event_type="download_progress",
+                            progress=len(board.files) / board.page_count * 100,
+                            total_pages=board.page_count,
+                            downloaded_pages=len(board.files),
+                        )
+
+        except asyncio.CancelledError:
+            # Lost the race before its first pages arrived: still a sample
+            if first_page_count is None or delivered < first_page_count:
+                self.record_latency(
+                    source.provider_name,
+                    time.monotonic() - started_at,
+                    delivered=False,
+                )
+            raise
+
+
+def _delivered_chapter(run: asyncio.Task) -> bool:
+    """Whether a finished source run completed its board."""
+    return (
+        run.done()
+        and not run.cancelled()
+        and not run.exception()
+        and run.result().is_complete
+    )
+
+
+async def find_hedge_source(
+    db: AsyncSession,
+    manga: Manga,
+    chapter: Chapter,
+    primary_provider: str,
+    preferred_providers: Optional[List[str]] = None,
+) -> Optional[ChapterSource]:
+    """
+    Find a second source for a chapter among its known provider IDs.
+
+    Only providers with both a stored series match and the chapter's ID on
+    that provider qualify. Preferred providers come first, then matches by
+    confidence.
+
+    Args:
+        db: The database session
+        manga: The manga the chapter belongs to
+        chapter: The chapter to download
+        primary_provider: The provider already being used
+        preferred_providers: Providers to try first, e.g. the fallbacks
+
+    Returns:
+        The source, or None if the chapter has no other known source
+    """
+    chapter_ids = {
+        provider.lower(): external_id
+        for provider, external_id in (chapter.provider_external_ids or {}).items()
+    }
+    preferred = [provider.lower() for provider in preferred_providers or []]
+
+    candidates = []
+    for match in await series_matcher.get_matches(db, manga.id):
+        key = match.provider.lower()
+        if key == primary_provider.lower() or key not in chapter_ids:
+            continue
+        if not provider_registry.get_provider(match.provider):
+            continue
+        rank = preferred.index(key) if key in preferred else len(preferred)
+        candidates.append(
+            (rank, ChapterSource(match.provider, match.external_id, chapter_ids[key]))
+        )
+
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: candidate[0])[1]
+
+
+# Global instance
+hedged_chapter_downloader = HedgedChapterDownloader()
@@ -0,0 +1,476 @@
+"""
+Background re-encoding of stored page images.
+
+Pages are stored in whatever format the provider served, often oversized
+PNGs for webtoons, and those dominate storage and reader bandwidth. When
+IMAGE_OPTIMIZATION_ENABLED is set, a background loop works through
+downloaded chapters and re-encodes their pages in low-priority worker
+processes:
+
+- "lossless": JPEGs are optimised with jpegtran when it is installed, and
+  PNG, BMP, GIF and TIFF pages become lossless WebP
+- "webp" / "avif": pages are re-encoded lossily at
+  IMAGE_OPTIMIZATION_QUALITY; WebP and AVIF pages are left alone
+
+A re-encode is kept only if it is at least IMAGE_OPTIMIZATION_MIN_SAVING
+smaller. CBZ chapters are rewritten into a new archive that replaces the
+old one in a single rename. Loose pages are written next to the originals,
+the Page rows are pointed at them in one commit, and only then are the
+originals removed. Chapters are marked when done, so the queue picks up
+where it left off after a restart. It yields to other work by pausing
+while the load average is above IMAGE_OPTIMIZATION_MAX_LOAD per CPU.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, features
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.services.archive_pages import archive_page_reader, is_page_archive
+from app.core.services.cbz_converter import is_page_name, member_compress_type
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.download_coordinator import (
+    chapter_download_key,
+    chapter_optimize_key,
+    download_coordinator,
+)
+from app.core.services.page_store import page_store
+from app.db.session import AsyncSessionLocal
+from app.models.manga import Chapter, Page
+
+logger = logging.getLogger(__name__)
+
+JPEGTRAN = shutil.which("jpegtran")
+
+# Formats worth turning into lossless WebP
+LOSSLESS_SOURCES = (".png", ".bmp", ".gif", ".tif", ".tiff")
+
+# Formats a second lossy pass would only degrade
+LOSSY_FORMATS = (".webp", ".avif")
+
+WEBP_MAX_DIMENSION = 16383
+
+
+def lower_priority() -> None:
+    """Worker initializer: only take CPU time nothing else wants."""
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+
+
+def optimize_image(
+    data: bytes, file_ext: str, mode: str, quality: int, min_saving: float
+) -> Optional[Tuple[bytes, str]]:
+    """
+    Re-encode one page image.
+
+    Runs in a worker process.
+
+    Args:
+        data: The stored image
+        file_ext: Its file extension, including the dot
+        mode: "lossless", "webp" or "avif"
+        quality: Quality of lossy re-encodes
+        min_saving: Fraction the image has to shrink by to be worth it
+
+    Returns:
+        The new image and its file extension, or None to keep the page
+    """
+    file_ext = file_ext.lower()
+    if mode == "lossless" and file_ext in (".jpg", ".jpeg"):
+        optimized, target = _jpegtran(data), file_ext
+    elif mode == "lossless" and file_ext not in LOSSLESS_SOURCES:
+        return None
+    elif mode != "lossless" and file_ext in LOSSY_FORMATS:
+        return None
+    else:
+        target = ".avif" if mode == "avif" else ".webp"
+        options = {"quality": quality}
+        if mode == "lossless":
+            options = {"lossless": True, "quality": 80, "method": 4}
+        optimized = _encode(data, target, options)
+
+    if not optimized or len(optimized) > len(data) * (1 - min_saving):
+        return None
+    return optimized, target
+
+
+def optimize_archive(
+    cbz_path: str, mode: str, quality: int, min_saving: float
+) -> Dict[str, int]:
+    """
+    Re-encode the pages of a CBZ and swap the result in.
+
+    Runs in a worker process. Members keep their order, names (apart from
+    the extension) and dates, and the archive keeps its comment.
+
+    Returns:
+        Counts of pages and optimized pages, and sizes before and after
+    """
+    part_path = f"{cbz_path}.optimize.part"
+    stats = {
+        "pages": 0,
+        "optimized": 0,
+        "bytes_before": os.path.getsize(cbz_path),
+        "bytes_after": 0,
+    }
+
+    try:
+        with (
+            zipfile.ZipFile(cbz_path) as source,
+            zipfile.ZipFile(part_path, "w") as target,
+        ):
+            target.comment = source.comment
+            for info in source.infolist():
+                name, data = info.filename, source.read(info)
+                if is_page_name(name):
+                    stats["pages"] += 1
+                    stem, file_ext = os.path.splitext(name)
+                    result = optimize_image(data, file_ext, mode, quality, min_saving)
+                    if result:
+                        data, name = result[0], f"{stem}{result[1]}"
+                        stats["optimized"] += 1
+                target.writestr(
+                    zipfile.ZipInfo(name, date_time=info.date_time),
+                    data,
+                    compress_type=member_compress_type(name),
+                )
+
+        if not stats["optimized"]:
+            os.remove(part_path)
+            stats["bytes_after"] = stats["bytes_before"]
+            return stats
+
+        with open(part_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(part_path, cbz_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    stats["bytes_after"] = os.path.getsize(cbz_path)
+    return stats
+
+
+def _encode(data: bytes, target: str, options: Dict[str, Any]) -> Optional[bytes]:
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if getattr(image, "is_animated", False):
+                return None
+            if target == ".webp" and max(image.size) > WEBP_MAX_DIMENSION:
+                return None
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP" if target == ".webp" else "AVIF", **options)
+            return buffer.getvalue()
+    except Exception:
+        return None
+
+
+def _jpegtran(data: bytes) -> Optional[bytes]:
+    """Rewrite a JPEG with optimised Huffman tables, without decoding it."""
+    if not JPEGTRAN:
+        return None
+    try:
+        result = subprocess.run(
+            [JPEGTRAN, "-copy", "none", "-optimize", "-progressive"],
+            input=data,
+            capture_output=True,
+            timeout=60,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+class ImageOptimizer:
+    """Works through downloaded chapters, re-encoding their pages."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.IMAGE_OPTIMIZATION_WORKERS
+        self.cycle_interval = 600  # Seconds between cycles once caught up
+        self.idle_poll_seconds = 30
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._is_running = False
+        self._stats = {"chapters": 0, "pages": 0, "bytes_saved": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop or open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=lower_priority,
+            )
+        return self._executor
+
+    def get_encoding(self) -> Tuple[str, int, float]:
+        """Mode, quality and minimum saving, as the workers take them."""
+        mode = settings.IMAGE_OPTIMIZATION_MODE
+        if mode == "avif" and not features.check("avif"):
+            logger.warning("Pillow has no AVIF support; re-encoding to WebP")
+            mode = "webp"
+        return (
+            mode,
+            settings.IMAGE_OPTIMIZATION_QUALITY,
+            settings.IMAGE_OPTIMIZATION_MIN_SAVING,
+        )
+
+    async def get_chapters_due(self, db: AsyncSession, limit: int) -> List[Chapter]:
+        """Get downloaded chapters whose pages have not been optimized yet."""
+        result = await db.execute(
+            select(Chapter)
+            .where(
+                Chapter.download_status == "downloaded",
+                Chapter.file_path.isnot(None),
+                Chapter.images_optimized_at.is_(None),
+            )
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def optimize_chapter(self, db: AsyncSession, chapter: Chapter) -> bool:
+        """
+        Re-encode a chapter's pages.
+
+        Chapters being downloaded are left for a later cycle. The optimizer
+        holds its own claim rather than the download's, and downloads of the
+        chapter wait for it to be released.
+
+        Returns:
+            Whether the chapter was processed
+        """
+        chapter_id = chapter.id
+        key = chapter_optimize_key(chapter_id)
+        task_id = f"optimize-{chapter_id}"
+        if await download_coordinator.claim(key, task_id) is not None:
+            return False
+
+        async with download_coordinator.hold(key, task_id):
+            # Checked after claiming, so a download starting now waits for us
+            download_key = chapter_download_key(chapter_id)
+            if await download_coordinator.get_owner(download_key) is not None:
+                return False
+
+            try:
+                if is_page_archive(chapter.file_path):
+                    stats = await self._optimize_archive(chapter)
+                else:
+                    stats = await self._optimize_pages(db, chapter)
+            except Exception as e:
+                # Marked done all the same, so a broken chapter is not retried
+                # every cycle
+                logger.error(f"Error optimizing chapter {chapter_id}: {e}")
+                await db.rollback()
+                chapter = await db.get(Chapter, chapter_id)
+                stats = None
+
+            chapter.images_optimized_at = datetime.now(timezone.utc)
+            await db.commit()
+            await chapter_manifest_cache.invalidate(chapter_id)
+
+        if stats and stats["optimized"]:
+            saved = stats["bytes_before"] - stats["bytes_after"]
+            self._stats["pages"] += stats["optimized"]
+            self._stats["bytes_saved"] += saved
+            logger.info(
+                f"Optimized {stats['optimized']} of {stats['pages']} pages of "
+                f"chapter {chapter_id}, saving {saved} bytes"
+            )
+        self._stats["chapters"] += 1
+        return True
+
+    async def run_optimization_cycle(self) -> int:
+        """Optimize one batch of chapters. Returns the number processed."""
+        async with AsyncSessionLocal() as db:
+            chapters = await self.get_chapters_due(
+                db, settings.IMAGE_OPTIMIZATION_BATCH_SIZE
+            )
+            chapter_ids = [chapter.id for chapter in chapters]
+
+            processed = 0
+            for chapter_id in chapter_ids:
+                await self._wait_for_idle()
+                # Reloaded, since a failed chapter rolls the session back
+                chapter = await db.get(Chapter, chapter_id)
+                if chapter and await self.optimize_chapter(db, chapter):
+                    processed += 1
+            return processed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get optimization statistics."""
+        return dict(self._stats)
+
+    async def start(self) -> None:
+        """Start the background optimization loop."""
+        if self._is_running:
+            logger.warning("Image optimizer is already running")
+            return
+
+        self._is_running = True
+        logger.info("Starting image optimizer")
+        self._task = asyncio.create_task(self._optimization_loop())
+
+    async def stop(self) -> None:
+        """Stop the loop and the worker processes."""
+        self._is_running = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                logger.debug("Cancelled image optimizer task")
+        self._task = None
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _optimize_archive(self, chapter: Chapter) -> Dict[str, int]:
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(
+            self._get_executor(),
+            optimize_archive,
+            chapter.file_path,
+            *self.get_encoding(),
+        )
+        if stats["optimized"]:
+            archive_page_reader.invalidate(chapter.file_path)
+            chapter.file_size = stats["bytes_after"]
+        return stats
+
+    async def _optimize_pages(
+        self, db: AsyncSession, chapter: Chapter
+    ) -> Dict[str, int]:
+        result = await db.execute(select(Page).where(Page.chapter_id == chapter.id))
+        pages = result.scalars().all()
+        stats = {
+            "pages": len(pages),
+            "optimized": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+        }
+        loop = asyncio.get_running_loop()
+        encoding = self.get_encoding()
+        replaced: List[str] = []
+
+        for page in pages:
+            try:
+                data = await asyncio.to_thread(_read_file, page.file_path)
+            except OSError:
+                continue
+            stem, file_ext = os.path.splitext(page.file_path)
+            optimized = await loop.run_in_executor(
+                self._get_executor(), optimize_image, data, file_ext, *encoding
+            )
+            stats["bytes_before"] += len(data)
+            if not optimized:
+                stats["bytes_after"] += len(data)
+                continue
+
+            new_data, new_ext = optimized
+            if page_store.is_blob(page.file_path):
+                new_path = await asyncio.to_thread(page_store.put, new_data, new_ext)
+                await asyncio.to_thread(
+                    _relink_page, chapter.file_path, page.number, new_path
+                )
+            else:
+                new_path = f"{stem}{new_ext}"
+                await asyncio.to_thread(_write_file, new_path, new_data)
+
+            if new_path != page.file_path:
+                replaced.append(page.file_path)
+                page.file_path = new_path
+            stats["optimized"] += 1
+            stats["bytes_after"] += len(new_data)
+
+        if stats["optimized"]:
+            chapter.file_size = stats["bytes_after"]
+        await db.commit()
+
+        # The rows point at the new files; the originals can go
+        for path in replaced:
+            if not page_store.is_blob(path):
+                await asyncio.to_thread(_remove_file, path)
+        await page_store.collect_unreferenced(db, replaced)
+        return stats
+
+    async def _wait_for_idle(self) -> None:
+        """Wait until the machine has CPU time to spare."""
+        while _load_per_cpu() > settings.IMAGE_OPTIMIZATION_MAX_LOAD:
+            await asyncio.sleep(self.idle_poll_seconds)
+
+    async def _optimization_loop(self) -> None:
+        """Main loop working through the chapters."""
+        while self._is_running:
+            try:
+                processed = await self.run_optimization_cycle()
+                if processed:
+                    logger.info(f"Image optimizer processed {processed} chapters")
+                if processed < settings.IMAGE_OPTIMIZATION_BATCH_SIZE:
+                    await asyncio.sleep(self.cycle_interval)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in image optimizer loop: {e}")
+                await asyncio.sleep(60)  # Wait a minute before retrying
+
+
+def _load_per_cpu() -> float:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _relink_page(chapter_path: str, page_number: int, blob_path: str) -> None:
+    """Point a chapter directory's link for a page at a new blob."""
+    prefix = f"{page_number:04d}."
+    if os.path.isdir(chapter_path):
+        for name in os.listdir(chapter_path):
+            if name.startswith(prefix):
+                os.remove(os.path.join(chapter_path, name))
+    page_store.link(
+        blob_path,
+        os.path.join(chapter_path, f"{prefix[:-1]}{os.path.splitext(blob_path)[1]}"),
+    )
+
+
+# Global instance
+image_optimizer = ImageOptimizer()
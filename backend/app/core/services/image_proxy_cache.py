@@ -0,0 +1,407 @@
+"""
+Disk cache for images served through the provider image proxy.
+
+Images are stored by the SHA-256 of their content, so the same cover reached
+through different URLs is kept once, and the content hash doubles as a
+strong ``ETag``. A small per-URL record points at the content blob. Misses
+are fetched once per URL: the first request streams the image to its client
+while the bytes are written to disk, and concurrent requests for the same URL
+wait for that fetch and are then served from the file. Blobs are evicted
+least recently used first once the cache exceeds its size cap.
+
+File reads, writes and the directory scan run in worker threads, and the
+size/recency index is only updated from the event loop. At most
+STREAM_QUEUE_CHUNKS chunks wait for the streaming client; a client that
+stops reading for STREAM_STALL_SECONDS is dropped and the image is still
+written to disk.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_QUEUE_CHUNKS = 16
+STREAM_STALL_SECONDS = 30
+
+
+@dataclass
+class CachedImage:
+    """An image stored in the proxy cache."""
+
+    path: str
+    content_type: str
+    content_hash: str
+    size: int
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash}"'
+
+
+class ImageFetch:
+    """
+    One upstream fetch shared by every request for the same URL.
+
+    ``ready`` resolves to (status_code, content_type) once the upstream
+    response headers arrive; ``done`` resolves to the stored image, or None
+    if nothing was stored.
+    """
+
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.ready: asyncio.Future = loop.create_future()
+        self.done: asyncio.Future = loop.create_future()
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+        self._chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        self._abandoned = False
+
+    async def push(self, chunk: Optional[bytes]) -> None:
+        """Hand a chunk (None at the end) to the streaming client."""
+        if self._abandoned:
+            return
+        try:
+            await asyncio.wait_for(self._chunks.put(chunk), STREAM_STALL_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Image proxy client stopped reading; dropping its stream")
+            self._abandon()
+
+    async def finish(self) -> None:
+        await self.push(None)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yield the image bytes as they arrive from upstream."""
+        try:
+            while True:
+                chunk = await self._chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # A disconnected client must not hold up the fetch
+            self._abandon()
+
+        if self.error:
+            raise self.error
+
+    def _abandon(self) -> None:
+        self._abandoned = True
+        while not self._chunks.empty():
+            self._chunks.get_nowait()
+
+
+class ImageProxyCache:
+    """Content-addressed, size-capped disk cache in front of the image proxy."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, ImageFetch] = {}
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self._stats = {"hits": 0, "misses": 0, "collapsed": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def lookup(self, url: str) -> Optional[CachedImage]:
+        """Get the cached image for a URL, if any."""
+        if not self.enabled:
+            return None
+
+        await self._ensure_index()
+        image = await asyncio.to_thread(self._read_record, self._url_key(url))
+        if not image:
+            return None
+
+        self._stats["hits"] += 1
+        self._index[image.content_hash] = (image.size, time.time())
+        return image
+
+    def fetch(self, url: str, headers: Dict[str, str]) -> Tuple[ImageFetch, bool]:
+        """
+        Start fetching a URL, or join the fetch already running for it.
+
+        Returns:
+            The shared fetch, and whether the caller started it (and so
+            should stream it to its client)
+        """
+        key = self._url_key(url)
+        inflight = self._inflight.get(key)
+        if inflight:
+            self._stats["collapsed"] += 1
+            return inflight, False
+
+        self._stats["misses"] += 1
+        inflight = ImageFetch()
+        self._inflight[key] = inflight
+        inflight.task = asyncio.create_task(
+            self._run_fetch(key, url, headers, inflight)
+        )
+        return inflight, True
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        index = self._load_index()
+        return {
+            **self._stats,
+            "blobs": len(index),
+            "size_bytes": sum(size for size, _ in index.values()),
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+        }
+
+    async def close(self) -> None:
+        """Close the shared upstream client."""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0, limits=httpx.Limits(max_connections=50)
+            )
+        return self._client
+
+    async def _run_fetch(
+        self, key: str, url: str, headers: Dict[str, str], inflight: ImageFetch
+    ) -> None:
+        """Download an image, feeding it to the streaming client and to disk."""
+        image = None
+        tmp_path = os.path.join(self.cache_dir, "tmp", uuid.uuid4().hex)
+
+        try:
+            async with self._get_client().stream(
+                "GET", url, headers=headers, follow_redirects=False
+            ) as response:
+                content_type = response.headers.get("content-type", "image/jpeg")
+                inflight.ready.set_result((response.status_code, content_type))
+                if response.status_code != 200 or not content_type.startswith("image/"):
+                    return
+
+                digest = hashlib.sha256()
+                size = 0
+                tmp_file = await asyncio.to_thread(self._open_tmp, tmp_path)
+                try:
+                    async for chunk in response.aiter_bytes():
+                        await inflight.push(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        if tmp_file:
+                            await asyncio.to_thread(tmp_file.write, chunk)
+                finally:
+                    if tmp_file:
+                        await asyncio.to_thread(tmp_file.close)
+
+                if tmp_file:
+                    image = await self._store(
+                        key, url, tmp_path, digest.hexdigest(), content_type, size
+                    )
+
+        except Exception as e:
+            inflight.error = e
+            if not inflight.ready.done():
+                inflight.ready.set_exception(e)
+            else:
+                logger.warning(f"Image proxy fetch for {url} failed midway: {e}")
+
+        finally:
+            await inflight.finish()
+            await asyncio.to_thread(self._remove_file, tmp_path)
+            self._inflight.pop(key, None)
+            inflight.done.set_result(image)
+
+    def _open_tmp(self, tmp_path: str):
+        if not self.enabled:
+            return None
+        try:
+            os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+            return open(tmp_path, "wb")
+        except OSError as e:
+            logger.warning(f"Image proxy cache is not writable: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _record_path(self, url_key: str) -> str:
+        return os.path.join(self.cache_dir, "urls", url_key[:2], f"{url_key}.json")
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", content_hash[:2], content_hash)
+
+    def _read_record(self, url_key: str) -> Optional[CachedImage]:
+        """Read a URL's record, dropping it if unreadable or dangling; blocking."""
+        record_path = self._record_path(url_key)
+        try:
+            with open(record_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._remove_file(record_path)
+            return None
+
+        blob_path = self._blob_path(record["content_hash"])
+        if not os.path.exists(blob_path):
+            # The blob was evicted; the record is dangling
+            self._remove_file(record_path)
+            return None
+
+        return CachedImage(
+            path=blob_path,
+            content_type=record["content_type"],
+            content_hash=record["content_hash"],
+            size=record["size"],
+        )
+
+    async def _store(
+        self,
+        url_key: str,
+        url: str,
+        tmp_path: str,
+        content_hash: str,
+        content_type: str,
+        size: int,
+    ) -> Optional[CachedImage]:
+        await self._ensure_index()
+        stored = await asyncio.to_thread(
+            self._write_blob, url_key, url, tmp_path, content_hash, content_type, size
+        )
+        if not stored:
+            return None
+
+        self._index[content_hash] = (size, time.time())
+        await self._evict()
+        return CachedImage(
+            self._blob_path(content_hash), content_type, content_hash, size
+        )
+
+    def _write_blob(
+        self,
+        url_key: str,
+        url: str,
+        tmp_path: str,
+        content_hash: str,
+        content_type: str,
+        size: int,
+    ) -> bool:
+        """Move a fetched image into place and record its URL; blocking."""
+        blob_path = self._blob_path(content_hash)
+        record_path = self._record_path(url_key)
+
+        try:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            if os.path.exists(blob_path):
+                os.remove(tmp_path)  # Same image already stored for another URL
+            else:
+                os.replace(tmp_path, blob_path)
+
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            with open(f"{record_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "url": url,
+                        "content_hash": content_hash,
+                        "content_type": content_type,
+                        "size": size,
+                    },
+                    f,
+                )
+            os.replace(f"{record_path}.tmp", record_path)
+        except OSError as e:
+            logger.warning(f"Could not cache proxied image {url}: {e}")
+            return False
+        return True
+
+    async def _ensure_index(self) -> None:
+        """Scan the blob directory in a thread on first use."""
+        if self._index is None:
+            index = await asyncio.to_thread(self._scan_index)
+            if self._index is None:
+                self._index = index
+
+    def _load_index(self) -> Dict[str, Tuple[int, float]]:
+        """Build the blob size/recency index from disk on first use; blocking."""
+        if self._index is None:
+            self._index = self._scan_index()
+        return self._index
+
+    def _scan_index(self) -> Dict[str, Tuple[int, float]]:
+        index: Dict[str, Tuple[int, float]] = {}
+        blobs_dir = os.path.join(self.cache_dir, "blobs")
+        if os.path.isdir(blobs_dir):
+            for root, _, files in os.walk(blobs_dir):
+                for name in files:
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    index[name] = (stat.st_size, stat.st_atime)
+        return index
+
+    async def _evict(self) -> None:
+        """Remove least recently used blobs until the cache fits its cap."""
+        index = self._index
+        total = sum(size for size, _ in index.values())
+        if total <= self.max_bytes:
+            return
+
+        evicted: List[str] = []
+        for content_hash, (size, _) in sorted(
+            index.items(), key=lambda item: item[1][1]
+        ):
+            if total <= self.max_bytes * 0.9:
+                break
+            evicted.append(self._blob_path(content_hash))
+            del index[content_hash]
+            total -= size
+            self._stats["evictions"] += 1
+
+        await asyncio.to_thread(self._remove_files, evicted)
+
+    @classmethod
+    def _remove_files(cls, paths: List[str]) -> None:
+        for path in paths:
+            cls._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.debug(f"Could not remove {path}: {e}")
+
+
+# Global instance
+image_proxy_cache = ImageProxyCache(
+    os.path.join(settings.STORAGE_PATH, "cache", "images"),
+    settings.IMAGE_PROXY_CACHE_MAX_MB * 1024 * 1024,
+    enabled=settings.IMAGE_PROXY_CACHE_ENABLED,
+)
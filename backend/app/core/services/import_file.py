@@ -10,6 +10,9 @@ from pyunpack import Archive
 from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.page_store import page_store
+from app.core.services.thumbnails import thumbnail_service
 from app.core.utils import (
     get_chapter_storage_path,
     get_cover_storage_path,
@@ -92,6 +95,7 @@ async def import_archive(
             )
         )
         existing_chapter = existing_chapter_result.scalars().first()
+        replaced_pages = []
 
         if existing_chapter:
             if not replace_existing:
@@ -101,6 +105,10 @@ async def import_archive(
                 )
             else:
                 # Delete existing chapter and its files
+                replaced_result = await db.execute(
+                    select(Page.file_path).where(Page.chapter_id == existing_chapter.id)
+                )
+                replaced_pages = replaced_result.scalars().all()
                 await _delete_chapter_files(existing_chapter)
                 await db.delete(existing_chapter)
                 await db.flush()
@@ -136,14 +144,14 @@ async def import_archive(
             # Get destination path
             dest_path = get_page_storage_path(manga_id, chapter.id, page_number)
 
-            # Copy image
-            shutil.copy2(image_file, dest_path)
+            # Copy image, or link it from the page store
+            file_path = page_store.store_file(image_file, dest_path)
 
             # Create page
             page = Page(
                 chapter_id=chapter.id,
                 number=page_number,
-                file_path=dest_path,
+                file_path=file_path,
                 width=width,
                 height=height,
             )
@@ -159,6 +167,8 @@ async def import_archive(
         # Commit changes
         await db.commit()
         await db.refresh(chapter)
+        await chapter_manifest_cache.invalidate(chapter.id)
+        await page_store.collect_unreferenced(db, replaced_pages)
 
         return chapter
 
@@ -231,14 +241,14 @@ async def import_directory(
         # Get destination path
         dest_path = get_page_storage_path(manga_id, chapter.id, page_number)
 
-        # Copy image
-        shutil.copy2(image_file, dest_path)
+        # Copy image, or link it from the page store
+        file_path = page_store.store_file(image_file, dest_path)
 
         # Create page
         page = Page(
             chapter_id=chapter.id,
             number=page_number,
-            file_path=dest_path,
+            file_path=file_path,
             width=width,
             height=height,
         )
@@ -254,6 +264,7 @@ async def import_directory(
     # Commit changes
     await db.commit()
     await db.refresh(chapter)
+    await chapter_manifest_cache.invalidate(chapter.id)
 
     return chapter
 
@@ -314,6 +325,7 @@ async def create_manga_from_import(
         dest_path = get_cover_storage_path(manga.id)
         shutil.copy2(cover_path, dest_path)
         manga.cover_image = dest_path
+        await thumbnail_service.generate_cover_thumbnails(manga.id)
 
     # Add genres
     if genres:
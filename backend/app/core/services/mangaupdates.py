@@ -9,6 +9,7 @@ import aiohttp
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.services.autocomplete import autocomplete_index
 from app.models.manga import Manga
 from app.models.mangaupdates import MangaUpdatesEntry, MangaUpdatesMapping
 
@@ -215,6 +216,7 @@ class MangaUpdatesService:
             logger.info("Committing to database")
             await db.commit()
             await db.refresh(entry)
+            autocomplete_index.add_mangaupdates_entry(entry)
 
             logger.info(
                 f"Successfully created MangaUpdates entry for series {series_id}: {entry.title}"
@@ -247,6 +249,7 @@ class MangaUpdatesService:
         entry.raw_data = details
 
         await db.commit()
+        autocomplete_index.add_mangaupdates_entry(entry)
         logger.info(
             f"Updated MangaUpdates entry for series {entry.mu_series_id}: {entry.title}"
         )
@@ -6,7 +6,7 @@ structure and validate file integrity. Enhanced with smart pattern detection
 and structure migration capabilities.
 """
 
-import hashlib
+import asyncio
 import logging
 import os
 import shutil
@@ -17,8 +17,12 @@ from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.services.archive_pages import count_archive_pages, is_page_archive
+from app.core.services.cbz_converter import is_page_name
+from app.core.services.chapter_manifest import chapter_manifest_cache
+from app.core.services.file_index import FileIndex, get_file_index
 from app.core.services.naming import naming_engine
-from app.core.utils import get_manga_storage_path, is_image_file
+from app.core.utils import get_manga_storage_path
 from app.models.manga import Chapter, Manga
 from app.models.organization import MangaMetadata
 from app.models.user import User
@@ -91,10 +95,18 @@ class MigrationTool:
         """Initialize the migration tool."""
         self.naming_engine = naming_engine
 
+    @property
+    def file_index(self) -> FileIndex:
+        """Index of the files in storage."""
+        return get_file_index()
+
     def calculate_file_hash(self, file_path: str) -> Optional[str]:
         """
         Calculate SHA-256 hash of a file.
 
+        The hash is kept in the file index and only recalculated once the
+        file's size, mtime or inode change.
+
         Args:
             file_path: Path to the file
 
@@ -102,11 +114,7 @@ class MigrationTool:
             SHA-256 hash string or None if error
         """
         try:
-            hash_sha256 = hashlib.sha256()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
+            return self.file_index.get_hash(file_path)
         except Exception as e:
             logger.error(f"Error calculating hash for {file_path}: {e}")
             return None
@@ -115,6 +123,9 @@ class MigrationTool:
         """
         Validate the integrity of a chapter's files.
 
+        Blocking; directory chapters are listed through the file index, so
+        only directories that changed since the last validation are read.
+
         Args:
             chapter: Chapter object to validate
 
@@ -146,35 +157,32 @@ class MigrationTool:
         try:
             if os.path.isdir(chapter.file_path):
                 # Validate directory of images
-                image_files = []
-                for root, _, files in os.walk(chapter.file_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        if is_image_file(file_path):
-                            image_files.append(file_path)
-                            result["total_size"] += os.path.getsize(file_path)
-
+                image_files = [
+                    entry
+                    for entry in self.file_index.files_under(chapter.file_path)
+                    if is_page_name(os.path.basename(entry.path))
+                ]
+                result["total_size"] = sum(entry.size for entry in image_files)
                 result["file_count"] = len(image_files)
 
                 if result["file_count"] == 0:
                     result["valid"] = False
                     result["errors"].append("No image files found in chapter directory")
 
-                # Check for common image file issues
-                for img_file in image_files:
-                    try:
-                        # Try to get file size (basic corruption check)
-                        size = os.path.getsize(img_file)
-                        if size == 0:
-                            result["corrupted_files"].append(img_file)
-                            result["warnings"].append(
-                                f"Zero-size image file: {img_file}"
-                            )
-                    except Exception as e:
-                        result["corrupted_files"].append(img_file)
-                        result["errors"].append(
-                            f"Cannot access image file {img_file}: {e}"
-                        )
+                # Check for common image file issues (basic corruption check)
+                for entry in image_files:
+                    if entry.size == 0:
+                        result["corrupted_files"].append(entry.path)
+                        result["warnings"].append(f"Zero-size image file: {entry.path}")
+
+            elif is_page_archive(chapter.file_path):
+                # Validate page archive from its member list
+                result["file_count"] = count_archive_pages(chapter.file_path)
+                result["total_size"] = os.path.getsize(chapter.file_path)
+
+                if result["file_count"] == 0:
+                    result["valid"] = False
+                    result["errors"].append("No image files found in chapter archive")
 
             else:
                 # Validate archive file
@@ -245,8 +253,10 @@ class MigrationTool:
                     organized_base = os.path.join(
                         get_manga_storage_path(manga.id), "organized"
                     )
-                    has_organized_files = os.path.exists(organized_base) and os.listdir(
-                        organized_base
+                    has_organized_files = any(
+                        await asyncio.to_thread(
+                            self.file_index.list_dir, organized_base
+                        )
                     )
 
                     manga_info = {
@@ -261,7 +271,9 @@ class MigrationTool:
 
                     # Validate each chapter
                     for chapter in chapters:
-                        validation = self.validate_chapter_integrity(chapter)
+                        validation = await asyncio.to_thread(
+                            self.validate_chapter_integrity, chapter
+                        )
                         chapter_info = {
                             "chapter_id": chapter.id,
                             "number": chapter.number,
@@ -321,7 +333,9 @@ class MigrationTool:
 
             # Plan operations for each chapter
             for chapter in chapters:
-                validation = self.validate_chapter_integrity(chapter)
+                validation = await asyncio.to_thread(
+                    self.validate_chapter_integrity, chapter
+                )
 
                 if not validation["valid"]:
                     plan["errors"].extend(
@@ -424,6 +438,12 @@ class MigrationTool:
             )
             chapters = chapters_result.scalars().all()
 
+            organized_files = {
+                entry.path
+                for entry in await asyncio.to_thread(
+                    self.file_index.files_under, organized_base
+                )
+            }
             expected_files = set()
 
             # Check each chapter
@@ -434,12 +454,12 @@ class MigrationTool:
                 chapter_filename = self.naming_engine.generate_chapter_filename(
                     manga, chapter, user.naming_format_chapter, include_extension=True
                 )
-                expected_file = os.path.join(
-                    organized_base, relative_path, chapter_filename
+                expected_file = os.path.abspath(
+                    os.path.join(organized_base, relative_path, chapter_filename)
                 )
                 expected_files.add(expected_file)
 
-                if os.path.exists(expected_file):
+                if expected_file in organized_files:
                     result["organized_chapters"] += 1
                 else:
                     result["missing_chapters"].append(
@@ -451,11 +471,9 @@ class MigrationTool:
                     )
 
             # Check for extra files
-            for root, _, files in os.walk(organized_base):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if file_path not in expected_files and not file.startswith("."):
-                        result["extra_files"].append(file_path)
+            for file_path in sorted(organized_files - expected_files):
+                if not os.path.basename(file_path).startswith("."):
+                    result["extra_files"].append(file_path)
 
             if result["missing_chapters"]:
                 result["valid"] = False
@@ -676,6 +694,7 @@ class MigrationTool:
                         if chapter:
                             chapter.file_path = operation["target"]
                             await db.commit()
+                            await chapter_manifest_cache.invalidate(chapter.id)
 
                     result["completed_operations"] += 1
 
@@ -775,6 +794,7 @@ class MigrationTool:
 
                             if chapter:
                                 chapter.file_path = operation["source"]
+                                await chapter_manifest_cache.invalidate(chapter.id)
 
                             result["restored_files"] += 1
 
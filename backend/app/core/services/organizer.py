@@ -11,6 +11,8 @@ import shutil
 from typing import List, Optional
 from uuid import UUID
 
+from app.core.services.archive_pages import count_archive_pages, is_page_archive
+from app.core.services.chapter_manifest import chapter_manifest_cache
 from app.core.services.naming import naming_engine
 from app.core.utils import create_cbz_from_directory, get_manga_storage_path
 from app.models.manga import Chapter, Manga
@@ -171,6 +173,7 @@ class MangaOrganizer:
         chapter: Chapter,
         user: User,
         preserve_original: Optional[bool] = None,
+        converted_path: Optional[str] = None,
     ) -> OrganizationResult:
         """
         Organize a single chapter according to user's naming preferences.
@@ -180,6 +183,8 @@ class MangaOrganizer:
             chapter: The chapter object
             user: The user object with naming preferences
             preserve_original: Whether to preserve original files (overrides user setting)
+            converted_path: A CBZ already repacked from the chapter directory,
+                moved into place instead of packing the directory again
 
         Returns:
             OrganizationResult with operation details
@@ -226,7 +231,12 @@ class MangaOrganizer:
                 # Create CBZ file in organized location
                 if os.path.isdir(chapter.file_path):
                     # Source is a directory, create CBZ from it
-                    create_cbz_from_directory(chapter.file_path, organized_file_path)
+                    if converted_path and os.path.exists(converted_path):
+                        os.replace(converted_path, organized_file_path)
+                    else:
+                        create_cbz_from_directory(
+                            chapter.file_path, organized_file_path
+                        )
                     result.add_organized_file(organized_file_path)
 
                     # Handle original directory
@@ -253,6 +263,15 @@ class MangaOrganizer:
                     (".cbz", ".cbr", ".zip", ".rar", ".7z")
                 ):
                     # Source is already an archive
+                    if (
+                        is_page_archive(chapter.file_path)
+                        and count_archive_pages(chapter.file_path) == 0
+                    ):
+                        result.add_error(
+                            f"Chapter archive contains no images: {chapter.file_path}"
+                        )
+                        return result
+
                     if should_preserve:
                         # Copy to organized location
                         if self.safe_copy_file(chapter.file_path, organized_file_path):
@@ -277,6 +296,7 @@ class MangaOrganizer:
 
             # Update chapter file path in database
             chapter.file_path = organized_file_path
+            await chapter_manifest_cache.invalidate(chapter.id)
 
             logger.info(
                 f"Successfully organized chapter {chapter.number} for manga {manga.title}"
@@ -0,0 +1,364 @@
+"""
+Filtering of recurring scanlator credit and ad pages.
+
+Many providers put the same credit or ad images at the start and end of
+every chapter. The first and last few pages of each downloaded chapter are
+fingerprinted with a 64-bit difference hash (dHash) of a 9x8 grayscale
+thumbnail, computed in a process pool. A fingerprint recurring in
+PAGE_FILTER_SERIES_REPEATS chapters of a series is blocked for that series;
+one recurring in PAGE_FILTER_PROVIDER_REPEATS series of a provider is
+blocked for everything downloaded from it.
+
+Fingerprints are kept in the page_fingerprints table, and the chapters
+and series each was seen in in page_fingerprint_sightings; a fingerprint's
+count is the number of distinct ones, so a page seen again in a chapter
+that is downloaded a second time does not count twice. The blocklists of a
+chapter are loaded once when its download starts, so checking a page is a
+set lookup. In "skip" mode, URLs known to serve a blocked image are not
+downloaded at all and other pages matching a blocked fingerprint are not
+stored. In "learn" mode fingerprints are collected but nothing is skipped.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.manga import PageFingerprint, PageFingerprintSighting
+
+logger = logging.getLogger(__name__)
+
+# Plain pages (blank, solid fills) hash to almost no set bits and would
+# match each other; they are never fingerprinted
+MIN_DETAIL_BITS = 8
+
+_HASH_RANGE = 1 << 64
+
+
+def difference_hash(data: bytes) -> Optional[int]:
+    """
+    Compute the 64-bit dHash of an image.
+
+    Runs in a worker process. Each bit tells whether a pixel of a 9x8
+    grayscale thumbnail is brighter than its right-hand neighbour, so the
+    hash survives re-encoding and resizing.
+
+    Returns:
+        The hash, or None for undecodable or featureless images
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            pixels = (
+                image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+            )
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+
+    if not MIN_DETAIL_BITS <= value.bit_count() <= 64 - MIN_DETAIL_BITS:
+        return None
+    return value
+
+
+def series_scope(manga_id: uuid.UUID) -> str:
+    """Fingerprint scope of a series."""
+    return f"series:{manga_id}"
+
+
+def provider_scope(provider_name: str) -> str:
+    """Fingerprint scope of a provider."""
+    return f"provider:{provider_name}"
+
+
+def _to_signed(value: int) -> int:
+    return value - _HASH_RANGE if value >= _HASH_RANGE // 2 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value % _HASH_RANGE
+
+
+def _distinct_sightings():
+    """Chapters or series a fingerprint row was seen in, as a subquery."""
+    return (
+        select(func.count(PageFingerprintSighting.seen_in.distinct()))
+        .where(
+            PageFingerprintSighting.scope == PageFingerprint.scope,
+            PageFingerprintSighting.hash == PageFingerprint.hash,
+        )
+        .scalar_subquery()
+    )
+
+
+class ChapterFilter:
+    """Blocklists and collected fingerprints of one chapter download."""
+
+    def __init__(
+        self,
+        service: "PageFilterService",
+        provider_name: str,
+        manga_id: uuid.UUID,
+        total_pages: int,
+        blocked_hashes: Set[int],
+        blocked_urls: Dict[str, int],
+        skipping: bool,
+    ):
+        self.service = service
+        self.provider_name = provider_name
+        self.manga_id = manga_id
+        self.total_pages = total_pages
+        self.blocked_hashes = blocked_hashes
+        self.blocked_urls = blocked_urls
+        self.skipping = skipping
+        # Fingerprint and URL of each checked page, by page number
+        self.seen: Dict[int, Tuple[int, str]] = {}
+        self.skipped: List[int] = []
+
+    def is_edge_page(self, page_number: int) -> bool:
+        """Whether a page is near enough to either end to be checked."""
+        edge = settings.PAGE_FILTER_EDGE_PAGES
+        return page_number <= edge or page_number > self.total_pages - edge
+
+    def skip_url(self, page_number: int, page_url: str) -> bool:
+        """Whether a page can be skipped without downloading it."""
+        fingerprint = self.blocked_urls.get(page_url)
+        if fingerprint is None or not self.is_edge_page(page_number):
+            return False
+
+        self.seen[page_number] = (fingerprint, page_url)
+        if not self.skipping:
+            return False
+        self.skipped.append(page_number)
+        return True
+
+    async def skip_page(self, page_number: int, page_url: str, data: bytes) -> bool:
+        """Fingerprint a downloaded page; whether it should not be stored."""
+        if not self.is_edge_page(page_number):
+            return False
+
+        fingerprint = await self.service.fingerprint(data)
+        if fingerprint is None:
+            return False
+
+        self.seen[page_number] = (fingerprint, page_url)
+        if not self.skipping or fingerprint not in self.blocked_hashes:
+            return False
+        self.skipped.append(page_number)
+        return True
+
+
+class PageFilterService:
+    """Learns recurring pages and filters them out of downloads."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.PAGE_FILTER_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PAGE_FILTER_MODE in ("learn", "skip")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop or open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def fingerprint(self, data: bytes) -> Optional[int]:
+        """Compute a page's dHash in a worker process."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), difference_hash, data
+            )
+        except Exception as e:
+            logger.warning(f"Could not fingerprint page: {e}")
+            return None
+
+    async def for_chapter(
+        self,
+        db: AsyncSession,
+        provider_name: str,
+        manga_id: uuid.UUID,
+        total_pages: int,
+    ) -> Optional[ChapterFilter]:
+        """
+        Load the blocklists that apply to a chapter download.
+
+        Args:
+            db: The database session
+            provider_name: The provider the chapter comes from
+            manga_id: The series the chapter belongs to
+            total_pages: Number of pages in the chapter
+
+        Returns:
+            The chapter's filter, or None when filtering is off
+        """
+        if not self.enabled:
+            return None
+
+        result = await db.execute(
+            select(PageFingerprint.hash, PageFingerprint.url).where(
+                PageFingerprint.scope.in_(
+                    [series_scope(manga_id), provider_scope(provider_name)]
+                ),
+                PageFingerprint.blocked.is_(True),
+            )
+        )
+        blocked_hashes: Set[int] = set()
+        blocked_urls: Dict[str, int] = {}
+        for value, url in result.all():
+            blocked_hashes.add(_to_unsigned(value))
+            if url:
+                blocked_urls[url] = _to_unsigned(value)
+
+        return ChapterFilter(
+            self,
+            provider_name,
+            manga_id,
+            total_pages,
+            blocked_hashes,
+            blocked_urls,
+            skipping=settings.PAGE_FILTER_MODE == "skip",
+        )
+
+    async def learn(
+        self, db: AsyncSession, chapter_filter: ChapterFilter, chapter_id: uuid.UUID
+    ) -> int:
+        """
+        Record the fingerprints seen in a chapter and block recurring ones.
+
+        A fingerprint counts once per distinct chapter for its series and
+        once per distinct series for its provider.
+
+        Args:
+            db: The database session
+            chapter_filter: The filter the chapter was downloaded with
+            chapter_id: The ID of the chapter
+
+        Returns:
+            The number of fingerprints newly blocked
+        """
+        # One sighting per distinct image, however often the chapter has it
+        urls = {value: url for value, url in chapter_filter.seen.values()}
+        if not urls:
+            return 0
+
+        scopes = (
+            (
+                series_scope(chapter_filter.manga_id),
+                str(chapter_id),
+                settings.PAGE_FILTER_SERIES_REPEATS,
+            ),
+            (
+                provider_scope(chapter_filter.provider_name),
+                str(chapter_filter.manga_id),
+                settings.PAGE_FILTER_PROVIDER_REPEATS,
+            ),
+        )
+        hashes = [_to_signed(value) for value in urls]
+        newly_blocked = 0
+
+        try:
+            for scope, seen_in, repeats in scopes:
+                # Seeing it again in the same chapter or series does not count
+                await db.execute(
+                    insert(PageFingerprintSighting)
+                    .values(
+                        [
+                            {
+                                "id": uuid.uuid4(),
+                                "scope": scope,
+                                "hash": value,
+                                "seen_in": seen_in,
+                            }
+                            for value in hashes
+                        ]
+                    )
+                    .on_conflict_do_nothing(constraint="uq_page_fingerprint_sighting")
+                )
+
+                statement = insert(PageFingerprint).values(
+                    [
+                        {
+                            "id": uuid.uuid4(),
+                            "scope": scope,
+                            "hash": _to_signed(value),
+                            "sightings": 1,
+                            "url": url[:1000],
+                            "blocked": False,
+                        }
+                        for value, url in urls.items()
+                    ]
+                )
+                await db.execute(
+                    statement.on_conflict_do_update(
+                        constraint="uq_page_fingerprint",
+                        set_={
+                            "url": statement.excluded.url,
+                            "updated_at": func.now(),
+                        },
+                    )
+                )
+
+                await db.execute(
+                    update(PageFingerprint)
+                    .where(
+                        PageFingerprint.scope == scope,
+                        PageFingerprint.hash.in_(hashes),
+                    )
+                    .values(sightings=_distinct_sightings())
+                )
+
+                result = await db.execute(
+                    update(PageFingerprint)
+                    .where(
+                        PageFingerprint.scope == scope,
+                        PageFingerprint.hash.in_(hashes),
+                        PageFingerprint.sightings >= repeats,
+                        PageFingerprint.blocked.is_(False),
+                    )
+                    .values(blocked=True)
+                )
+                newly_blocked += result.rowcount or 0
+
+            await db.commit()
+        except Exception as e:
+            # Learning is best effort; the download itself succeeded
+            logger.warning(f"Could not record page fingerprints: {e}")
+            await db.rollback()
+            return 0
+
+        if newly_blocked:
+            logger.info(
+                f"Blocked {newly_blocked} recurring page fingerprints for "
+                f"{chapter_filter.provider_name} / {chapter_filter.manga_id}"
+            )
+        return newly_blocked
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+page_filter = PageFilterService()
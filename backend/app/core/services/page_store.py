@@ -0,0 +1,374 @@
+"""
+Content-addressed storage of page images.
+
+The same images turn up again and again: scanlator credit pages,
+recruitment banners, and whole chapters fetched from a second provider or
+imported again. With PAGE_DEDUP_ENABLED, page bytes are written once under
+their SHA-256 in ``blobs/`` and Page.file_path points at the blob. A
+chapter's directory holds hard links to its pages (symlinks where the
+filesystem has no hard links), so it still reads as a folder of images to
+the organizer and other tools.
+
+A blob is referenced by the Page rows pointing at it. When chapters are
+deleted or their pages replaced, blobs nothing refers to any more are
+removed. Blobs written or reused within the grace period are kept, since a
+download may not have committed its rows yet. A periodic sweep checks every
+blob past its grace period against the Page rows, which picks up blobs
+skipped that way and blobs of downloads that failed before committing.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.manga import Page
+
+logger = logging.getLogger(__name__)
+
+
+class PageStore:
+    """Stores page images once, by content."""
+
+    GRACE_SECONDS = 3600
+    SWEEP_BATCH_SIZE = 500  # Blobs checked against the pages per query
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self.sweep_interval = 6 * 3600  # Seconds between sweeps of blobs/
+        self._task: Optional[asyncio.Task] = None
+        self._is_running = False
+        self._stats = {"stored": 0, "deduplicated": 0, "bytes_saved": 0, "collected": 0}
+
+    @property
+    def root(self) -> str:
+        return self._root or os.path.join(settings.STORAGE_PATH, "blobs")
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PAGE_DEDUP_ENABLED
+
+    def blob_path(self, digest: str, file_ext: str) -> str:
+        """Get where the blob with a given SHA-256 is stored."""
+        return os.path.join(
+            self.root, digest[:2], digest[2:4], f"{digest}{file_ext.lower()}"
+        )
+
+    def is_blob(self, path: Optional[str]) -> bool:
+        """Whether a path points into the store."""
+        return bool(path) and path.startswith(self.root + os.sep)
+
+    def put(self, data: bytes, file_ext: str) -> str:
+        """
+        Store page bytes, unless the same bytes are stored already.
+
+        Args:
+            data: Image bytes
+            file_ext: File extension including the dot
+
+        Returns:
+            The blob path
+        """
+        path = self.blob_path(hashlib.sha256(data).hexdigest(), file_ext)
+        if os.path.exists(path):
+            # Restart the grace period so it is not collected before use
+            os.utime(path)
+            self._stats["deduplicated"] += 1
+            self._stats["bytes_saved"] += len(data)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._stats["stored"] += 1
+        return path
+
+    def link(self, blob_path: str, logical_path: str) -> None:
+        """Make a blob appear at a path inside a chapter directory."""
+        os.makedirs(os.path.dirname(logical_path), exist_ok=True)
+        if os.path.lexists(logical_path):
+            os.remove(logical_path)
+        try:
+            os.link(blob_path, logical_path)
+        except OSError:
+            os.symlink(blob_path, logical_path)
+
+    def store_file(self, source_path: str, logical_path: str) -> str:
+        """
+        Store a page file at its place in a chapter.
+
+        Without deduplication the file is simply copied there.
+
+        Args:
+            source_path: The image to store
+            logical_path: Where the page belongs in the chapter directory
+
+        Returns:
+            The path to record as the page's file path
+        """
+        if not self.enabled:
+            shutil.copy2(source_path, logical_path)
+            return logical_path
+
+        with open(source_path, "rb") as f:
+            blob_path = self.put(f.read(), os.path.splitext(logical_path)[1])
+        self.link(blob_path, logical_path)
+        return blob_path
+
+    async def collect_unreferenced(
+        self, db: AsyncSession, paths: Iterable[Optional[str]]
+    ) -> int:
+        """
+        Remove blobs that no page refers to any more.
+
+        Args:
+            db: The database session
+            paths: File paths of pages that were deleted or replaced
+
+        Returns:
+            The number of blobs removed
+        """
+        blobs = {path for path in paths if self.is_blob(path)}
+        if not blobs:
+            return 0
+
+        result = await db.execute(
+            select(Page.file_path).where(Page.file_path.in_(blobs))
+        )
+        referenced: Set[str] = set(result.scalars().all())
+        removed = await asyncio.to_thread(self._remove, blobs - referenced)
+        if removed:
+            logger.info(f"Removed {removed} unreferenced page blobs")
+        self._stats["collected"] += removed
+        return removed
+
+    async def sweep(self) -> int:
+        """
+        Check every blob past its grace period and remove unreferenced ones.
+
+        Leftover temporary files of interrupted writes are removed too.
+
+        Returns:
+            The number of blobs removed
+        """
+        blobs, stale_tmp = await asyncio.to_thread(self._list_expired)
+        await asyncio.to_thread(self._remove, set(stale_tmp))
+
+        removed = 0
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(blobs), self.SWEEP_BATCH_SIZE):
+                removed += await self.collect_unreferenced(
+                    db, blobs[start : start + self.SWEEP_BATCH_SIZE]
+                )
+        logger.info(f"Page store sweep checked {len(blobs)} blobs, removed {removed}")
+        return removed
+
+    async def start(self) -> None:
+        """Start sweeping the store periodically."""
+        if self._is_running:
+            logger.warning("Page store sweep is already running")
+            return
+
+        self._is_running = True
+        logger.info("Starting page store sweep")
+        self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """Stop the periodic sweep."""
+        if not self._is_running:
+            return
+
+        self._is_running = False
+        logger.info("Stopping page store sweep")
+
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                logger.debug("Cancelled page store sweep task")
+
+        self._task = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get storage statistics."""
+        return dict(self._stats)
+
+    async def _sweep_loop(self) -> None:
+        """Main loop that sweeps the store."""
+        while self._is_running:
+            try:
+                await asyncio.sleep(self.sweep_interval)
+                if self.enabled:
+                    await self.sweep()
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in page store sweep loop: {e}")
+                await asyncio.sleep(60)  # Wait a minute before retrying
+
+    def _list_expired(self) -> Tuple[List[str], List[str]]:
+        """Blobs and temporary files last written before the grace period."""
+        blobs: List[str] = []
+        stale_tmp: List[str] = []
+        cutoff = time.time() - self.GRACE_SECONDS
+        pending = [self.root]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.stat().st_mtime <= cutoff:
+                            is_tmp = entry.name.endswith(".tmp")
+                            (stale_tmp if is_tmp else blobs).append(entry.path)
+            except FileNotFoundError:
+                continue
+        return blobs, stale_tmp
+
+    def _remove(self, blobs: Set[str]) -> int:
+        removed = 0
+        cutoff = time.time() - self.GRACE_SECONDS
+        for path in blobs:
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class PageStoreSink:
+    """
+    Downloads pages into the page store, linking them into the chapter.
+
+    Offers the same interface as CBZPageSink. A manifest in the chapter
+    directory records the source and the blob of every page, so a retry
+    from the same source only fetches missing pages.
+    """
+
+    MANIFEST = ".pages.json"
+
+    def __init__(
+        self, chapter_path: str, source: str, store: Optional["PageStore"] = None
+    ):
+        self.chapter_path = chapter_path
+        self.source = source
+        self.store = store or page_store
+        self.pages: Dict[int, str] = {}
+        self.blobs: Dict[int, str] = {}
+        self.bytes_written = 0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.chapter_path, self.MANIFEST)
+
+    def open(self) -> Dict[int, str]:
+        """
+        Prepare the chapter directory, keeping pages of an earlier attempt
+        at the same source.
+
+        Blocking; run it in a thread.
+
+        Returns:
+            File names of the pages already there, by page number
+        """
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        if manifest.get("source") != self.source:
+            shutil.rmtree(self.chapter_path, ignore_errors=True)
+            manifest = {}
+        os.makedirs(self.chapter_path, exist_ok=True)
+
+        for number, blob_path in manifest.get("pages", {}).items():
+            name = f"{int(number):04d}{os.path.splitext(blob_path)[1]}"
+            if os.path.exists(blob_path) and os.path.exists(
+                os.path.join(self.chapter_path, name)
+            ):
+                self.pages[int(number)] = name
+                self.blobs[int(number)] = blob_path
+        return dict(self.pages)
+
+    def add_page(self, number: int, file_ext: str, data: bytes, *args) -> str:
+        """
+        Store a page and link it into the chapter directory.
+
+        Returns:
+            The page's file name in the chapter directory
+        """
+        blob_path = self.store.put(data, file_ext)
+        name = f"{number:04d}{file_ext}"
+        self.store.link(blob_path, os.path.join(self.chapter_path, name))
+        self.pages[number] = name
+        self.blobs[number] = blob_path
+        self.bytes_written += len(data)
+        self._save()
+        return name
+
+    def close(self) -> None:
+        """Nothing to flush; the manifest is saved with every page."""
+
+    def finalize(self, metadata: Optional[Dict] = None, complete: bool = True) -> str:
+        """
+        Finish the chapter.
+
+        Args:
+            metadata: Not stored for loose pages
+            complete: Whether every page is in; an incomplete chapter keeps
+                its manifest so a later attempt can add the missing pages
+
+        Returns:
+            The chapter directory
+        """
+        if complete:
+            try:
+                os.remove(self.manifest_path)
+            except FileNotFoundError:
+                pass
+        return self.chapter_path
+
+    def discard(self) -> None:
+        """Drop the chapter directory; blobs are left to garbage collection."""
+        shutil.rmtree(self.chapter_path, ignore_errors=True)
+
+    def page_rows(self, chapter_id: uuid.UUID) -> List[Page]:
+        """Page rows pointing at the stored blobs."""
+        return [
+            Page(chapter_id=chapter_id, number=number, file_path=self.blobs[number])
+            for number in sorted(self.blobs)
+        ]
+
+    def _save(self) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "source": self.source,
+                    "pages": {str(n): path for n, path in self.blobs.items()},
+                },
+                f,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+
+# Global instance
+page_store = PageStore()
@@ -2,15 +2,17 @@
 Provider matching service for finding chapters across multiple providers.
 """
 
+import asyncio
 import logging
 import re
 from difflib import SequenceMatcher
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.providers.base import BaseProvider
 from app.core.providers.registry import provider_registry
 from app.models.manga import Chapter, Manga
 
@@ -99,38 +101,11 @@ class ProviderMatchingService:
         # Partial match for similar numbers
         return SequenceMatcher(None, norm_chapter1, norm_chapter2).ratio()
 
-    async def find_chapter_alternatives(
-        self,
-        manga_title: str,
-        chapter_number: str,
-        original_provider: str,
-        exclude_providers: List[str] = None,
-        max_alternatives: int = 5,
-        timeout_per_provider: int = 10,
-        max_providers_to_search: int = 8,
-    ) -> List[ChapterAlternative]:
-        """
-        Find alternative sources for a chapter across multiple providers.
-
-        Args:
-            manga_title: Title of the manga
-            chapter_number: Chapter number to find
-            original_provider: Provider to exclude from search
-            exclude_providers: Additional providers to exclude
-            max_alternatives: Maximum number of alternatives to return
-            timeout_per_provider: Timeout in seconds per provider
-            max_providers_to_search: Maximum number of providers to search
-
-        Returns:
-            List of chapter alternatives sorted by confidence
-        """
-        import asyncio
-
-        if exclude_providers is None:
-            exclude_providers = []
-
-        exclude_providers.append(original_provider)
-        alternatives = []
+    def _get_providers_to_search(
+        self, exclude_providers: List[str], max_providers_to_search: int
+    ) -> List[BaseProvider]:
+        """Get providers to search for alternatives, most reliable first."""
+        excluded = {name.lower() for name in exclude_providers}
 
         # Get priority providers first (most reliable ones)
         priority_providers = [
@@ -142,15 +117,12 @@ class ProviderMatchingService:
             "ReadM",
         ]
 
-        # Get all available providers
-        all_providers = provider_registry.get_all_providers()
-
         # Sort providers: priority first, then others
         sorted_providers = []
         remaining_providers = []
 
-        for provider in all_providers:
-            if provider.name.lower() in [p.lower() for p in exclude_providers]:
+        for provider in provider_registry.get_all_providers():
+            if provider.name.lower() in excluded:
                 continue
 
             if provider.name in priority_providers:
@@ -161,117 +133,218 @@ class ProviderMatchingService:
         # Add remaining providers up to the limit
         sorted_providers.extend(remaining_providers)
 
-        # Limit the number of providers to search
-        providers_to_search = sorted_providers[:max_providers_to_search]
+        return sorted_providers[:max_providers_to_search]
+
+    async def _find_provider_alternative(
+        self,
+        provider: BaseProvider,
+        manga_title: str,
+        chapter_number: str,
+        timeout_per_provider: int,
+    ) -> Optional[ChapterAlternative]:
+        """
+        Find a chapter on one provider.
+
+        Searches the provider, picks the best matching series and looks the
+        chapter up in that series' chapter list.
+        """
+        try:
+            # Search for manga on this provider with timeout
+            search_results, _, _ = await asyncio.wait_for(
+                provider.search(manga_title, page=1, limit=5),  # Reduced for speed
+                timeout=timeout_per_provider,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout searching on {provider.name}")
+            return None
+        except Exception as e:
+            logger.warning(f"Error searching on {provider.name}: {e}")
+            return None
+
+        best_title_sim = 0.0
+        best_manga_id = None
+        for manga_result in search_results:
+            # Handle both dict and SearchResult object formats
+            if hasattr(manga_result, "title"):
+                manga_title_result = manga_result.title
+                manga_id_result = manga_result.id
+            else:
+                manga_title_result = manga_result.get("title", "")
+                manga_id_result = manga_result.get("id", "")
+
+            title_sim = self.calculate_title_similarity(manga_title, manga_title_result)
+            if title_sim > best_title_sim:
+                best_title_sim = title_sim
+                best_manga_id = manga_id_result
+
+        if best_manga_id is None or best_title_sim < 0.5:
+            return None
+
+        try:
+            # Get chapters for the best candidate with timeout
+            chapters, _, _ = await asyncio.wait_for(
+                provider.get_chapters(best_manga_id),
+                timeout=timeout_per_provider,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout getting chapters from {provider.name}")
+            return None
+        except Exception as e:
+            logger.warning(f"Error getting chapters from {provider.name}: {e}")
+            return None
+
+        best_alternative = None
+        for chapter_data in chapters:
+            # Handle both dict and object formats for chapters
+            if hasattr(chapter_data, "number"):
+                chapter_number_result = chapter_data.number
+                chapter_id_result = chapter_data.id
+                chapter_title_result = getattr(chapter_data, "title", None)
+            else:
+                chapter_number_result = chapter_data.get("number", "")
+                chapter_id_result = chapter_data.get("id", "")
+                chapter_title_result = chapter_data.get("title")
+
+            chapter_sim = self.calculate_chapter_similarity(
+                chapter_number, chapter_number_result
+            )
+            if chapter_sim < 0.8:  # Skip if chapter similarity is too low
+                continue
+
+            confidence = (
+                best_title_sim * self.title_similarity_weight
+                + chapter_sim * self.chapter_number_weight
+            )
+
+            if confidence >= self.min_confidence and (
+                not best_alternative or confidence > best_alternative.confidence
+            ):
+                best_alternative = ChapterAlternative(
+                    provider_name=provider.name,
+                    external_manga_id=best_manga_id,
+                    external_chapter_id=chapter_id_result,
+                    confidence=confidence,
+                    chapter_title=chapter_title_result,
+                    chapter_number=chapter_number_result,
+                )
+
+        return best_alternative
+
+    async def iter_chapter_alternatives(
+        self,
+        manga_title: str,
+        chapter_number: str,
+        original_provider: str,
+        exclude_providers: List[str] = None,
+        max_alternatives: int = 5,
+        timeout_per_provider: int = 10,
+        max_providers_to_search: int = 8,
+        total_timeout: float = 30,
+    ) -> AsyncIterator[ChapterAlternative]:
+        """
+        Yield alternative sources for a chapter as each provider confirms one.
+
+        All providers are searched concurrently. The search stops once
+        max_alternatives have been found or total_timeout seconds have passed,
+        and any provider still running is cancelled.
+
+        Args:
+            manga_title: Title of the manga
+            chapter_number: Chapter number to find
+            original_provider: Provider to exclude from search
+            exclude_providers: Additional providers to exclude
+            max_alternatives: Maximum number of alternatives to yield
+            timeout_per_provider: Timeout in seconds per provider call
+            max_providers_to_search: Maximum number of providers to search
+            total_timeout: Deadline in seconds for the whole search
+        """
+        providers_to_search = self._get_providers_to_search(
+            list(exclude_providers or []) + [original_provider],
+            max_providers_to_search,
+        )
 
         logger.info(
             f"Searching {len(providers_to_search)} providers for alternatives to '{manga_title}' chapter {chapter_number}"
         )
 
-        for i, provider in enumerate(providers_to_search):
-            logger.info(
-                f"Searching provider {i + 1}/{len(providers_to_search)}: {provider.name}"
-            )
-
-            try:
-                # Search for manga on this provider with timeout
-                search_results, _, _ = await asyncio.wait_for(
-                    provider.search(
-                        manga_title, page=1, limit=5
-                    ),  # Reduced limit for speed
-                    timeout=timeout_per_provider,
+        tasks = [
+            asyncio.create_task(
+                self._find_provider_alternative(
+                    provider, manga_title, chapter_number, timeout_per_provider
                 )
+            )
+            for provider in providers_to_search
+        ]
 
-                for manga_result in search_results:
-                    # Handle both dict and SearchResult object formats
-                    if hasattr(manga_result, "title"):
-                        # SearchResult object
-                        manga_title_result = manga_result.title
-                        manga_id_result = manga_result.id
-                    else:
-                        # Dictionary format
-                        manga_title_result = manga_result.get("title", "")
-                        manga_id_result = manga_result.get("id", "")
-
-                    # Calculate title similarity
-                    title_sim = self.calculate_title_similarity(
-                        manga_title, manga_title_result
+        found = 0
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=total_timeout):
+                try:
+                    alternative = await next_done
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Alternative search for '{manga_title}' hit the {total_timeout}s deadline"
                     )
+                    break
 
-                    if title_sim < 0.5:  # Skip if title similarity is too low
-                        continue
-
-                    try:
-                        # Get chapters for this manga with timeout
-                        chapters, _, _ = await asyncio.wait_for(
-                            provider.get_chapters(manga_id_result),
-                            timeout=timeout_per_provider,
-                        )
-
-                        for chapter_data in chapters:
-                            # Handle both dict and object formats for chapters
-                            if hasattr(chapter_data, "number"):
-                                chapter_number_result = chapter_data.number
-                                chapter_id_result = chapter_data.id
-                                chapter_title_result = getattr(
-                                    chapter_data, "title", None
-                                )
-                            else:
-                                chapter_number_result = chapter_data.get("number", "")
-                                chapter_id_result = chapter_data.get("id", "")
-                                chapter_title_result = chapter_data.get("title")
-
-                            # Calculate chapter similarity
-                            chapter_sim = self.calculate_chapter_similarity(
-                                chapter_number, chapter_number_result
-                            )
-
-                            if (
-                                chapter_sim < 0.8
-                            ):  # Skip if chapter similarity is too low
-                                continue
-
-                            # Calculate overall confidence
-                            confidence = (
-                                title_sim * self.title_similarity_weight
-                                + chapter_sim * self.chapter_number_weight
-                            )
-
-                            if confidence >= self.min_confidence:
-                                alternative = ChapterAlternative(
-                                    provider_name=provider.name,
-                                    external_manga_id=manga_id_result,
-                                    external_chapter_id=chapter_id_result,
-                                    confidence=confidence,
-                                    chapter_title=chapter_title_result,
-                                    chapter_number=chapter_number_result,
-                                )
-                                alternatives.append(alternative)
-
-                    except asyncio.TimeoutError:
-                        logger.warning(f"Timeout getting chapters from {provider.name}")
-                        continue
-                    except Exception as e:
-                        logger.warning(
-                            f"Error getting chapters from {provider.name}: {e}"
-                        )
-                        continue
-
-            except asyncio.TimeoutError:
-                logger.warning(f"Timeout searching on {provider.name}")
-                continue
-            except Exception as e:
-                logger.warning(f"Error searching on {provider.name}: {e}")
-                continue
+                if not alternative:
+                    continue
 
-            # Early exit if we have enough alternatives
-            if len(alternatives) >= max_alternatives:
-                logger.info(f"Found {len(alternatives)} alternatives, stopping search")
-                break
+                yield alternative
+                found += 1
+
+                # Early exit if we have enough alternatives
+                if found >= max_alternatives:
+                    logger.info(f"Found {found} alternatives, stopping search")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def find_chapter_alternatives(
+        self,
+        manga_title: str,
+        chapter_number: str,
+        original_provider: str,
+        exclude_providers: List[str] = None,
+        max_alternatives: int = 5,
+        timeout_per_provider: int = 10,
+        max_providers_to_search: int = 8,
+        total_timeout: float = 30,
+    ) -> List[ChapterAlternative]:
+        """
+        Find alternative sources for a chapter across multiple providers.
+
+        Args:
+            manga_title: Title of the manga
+            chapter_number: Chapter number to find
+            original_provider: Provider to exclude from search
+            exclude_providers: Additional providers to exclude
+            max_alternatives: Maximum number of alternatives to return
+            timeout_per_provider: Timeout in seconds per provider call
+            max_providers_to_search: Maximum number of providers to search
+            total_timeout: Deadline in seconds for the whole search
+
+        Returns:
+            List of chapter alternatives sorted by confidence
+        """
+        alternatives = [
+            alternative
+            async for alternative in self.iter_chapter_alternatives(
+                manga_title=manga_title,
+                chapter_number=chapter_number,
+                original_provider=original_provider,
+                exclude_providers=exclude_providers,
+                max_alternatives=max_alternatives,
+                timeout_per_provider=timeout_per_provider,
+                max_providers_to_search=max_providers_to_search,
+                total_timeout=total_timeout,
+            )
+        ]
 
         # Sort by confidence and return top alternatives
         alternatives.sort(key=lambda x: x.confidence, reverse=True)
-        return alternatives[:max_alternatives]
+        return alternatives
 
     async def get_fallback_providers_for_manga(
         self, manga: Manga, exclude_providers: List[str] = None
@@ -0,0 +1,431 @@
+"""
+Reader read-ahead and hot-page memory cache.
+
+Readers move forward one page at a time, so once page N of a chapter is
+requested, pages N+1..N+k are loaded into a byte-bounded in-memory LRU in
+the background. Near the end of a chapter, the first pages of the next
+chapter are warmed too. Local pages are read from disk (or the chapter CBZ)
+through the chapter manifest; external pages are downloaded through the
+provider. Concurrent loads of the same page share one task, so a page turn
+that catches up with its prefetch waits for it instead of loading again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import magic
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.providers.page_manifest import (
+    is_expired_page_error,
+    page_manifest_cache,
+)
+from app.core.services.archive_pages import archive_page_reader
+from app.core.services.chapter_manifest import (
+    ChapterManifest,
+    PageEntry,
+    chapter_manifest_cache,
+)
+from app.db.session import AsyncSessionLocal
+from app.models.manga import Chapter
+
+logger = logging.getLogger(__name__)
+
+
+def chapter_sort_key(number: Any) -> Tuple[float, str]:
+    """Order chapter numbers like "12", "12.5" and "Extra" numerically first."""
+    match = re.search(r"\d+(?:\.\d+)?", str(number or ""))
+    return (float(match.group()) if match else float("inf"), str(number or ""))
+
+
+@dataclass
+class HotPage:
+    """A page image held in memory."""
+
+    content: bytes
+    media_type: str
+    etag: str
+
+
+class HotPageCache:
+    """Least recently used page images, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._pages: "OrderedDict[str, HotPage]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[HotPage]:
+        page = self._pages.get(key)
+        if page:
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key: str, page: HotPage) -> None:
+        # One page should never push out most of the cache
+        if len(page.content) > self.max_bytes // 8:
+            return
+
+        self.discard(key)
+        self._pages[key] = page
+        self.size_bytes += len(page.content)
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._pages.popitem(last=False)
+            self.size_bytes -= len(evicted.content)
+
+    def discard(self, key: str) -> None:
+        page = self._pages.pop(key, None)
+        if page:
+            self.size_bytes -= len(page.content)
+
+    def discard_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._pages if key.startswith(prefix)]:
+            self.discard(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pages
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+
+class ReadAheadService:
+    """Prefetch the pages a reader is about to turn to."""
+
+    MAX_REMEMBERED_CHAPTERS = 1024
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        pages_ahead: Optional[int] = None,
+        next_chapter_pages: Optional[int] = None,
+    ):
+        self.cache = HotPageCache(
+            max_bytes or settings.READ_AHEAD_CACHE_MB * 1024 * 1024
+        )
+        self.pages_ahead = pages_ahead or settings.READ_AHEAD_PAGES
+        self.next_chapter_pages = (
+            next_chapter_pages or settings.READ_AHEAD_NEXT_CHAPTER_PAGES
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._next_chapters: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "prefetched": 0, "failed": 0}
+
+    # ------------------------------------------------------------------
+    # Local chapters
+    # ------------------------------------------------------------------
+
+    def get_local_page(
+        self, chapter_id: Any, page_number: int, etag: str
+    ) -> Optional[HotPage]:
+        """
+        Get a local page from memory, if it has been read ahead.
+
+        Args:
+            chapter_id: The chapter being read
+            page_number: 1-based page number
+            etag: The page's ETag in the current manifest; pages read ahead
+                from an older version of the chapter are not served
+
+        Returns:
+            The page, or None if it is not in memory
+        """
+        return self._get(self._local_key(chapter_id, page_number, etag))
+
+    def discard_chapter(self, chapter_id: Any) -> None:
+        """Drop a local chapter's pages from memory after its files changed."""
+        self.cache.discard_prefix(f"local:{chapter_id}:")
+
+    def read_ahead_local(self, manifest: ChapterManifest, page_number: int) -> None:
+        """
+        Warm the pages after page_number of a local chapter.
+
+        Args:
+            manifest: Manifest of the chapter being read
+            page_number: The page just requested
+        """
+        for number in range(page_number + 1, page_number + self.pages_ahead + 1):
+            entry = manifest.pages.get(number)
+            if entry:
+                self._warm(
+                    self._local_key(manifest.chapter_id, number, entry.etag),
+                    lambda entry=entry, number=number: self._read_local(entry, number),
+                )
+
+        last_page = max(manifest.pages, default=0)
+        if page_number + self.pages_ahead >= last_page:
+            self._spawn(self._warm_next_local_chapter(manifest))
+
+    async def _read_local(self, entry: PageEntry, page_number: int) -> HotPage:
+        if entry.file_path:
+            content = await asyncio.to_thread(_read_file, entry.file_path)
+        else:
+            content = await asyncio.to_thread(
+                _read_archive_page, entry.archive_path, page_number
+            )
+        return HotPage(content, entry.media_type, entry.etag)
+
+    async def _warm_next_local_chapter(self, manifest: ChapterManifest) -> None:
+        async with AsyncSessionLocal() as db:
+            next_id = await self._find_next_local_chapter(db, manifest)
+            if not next_id:
+                return
+            next_manifest = await chapter_manifest_cache.get(
+                db, UUID(manifest.manga_id), UUID(next_id)
+            )
+
+        if next_manifest:
+            for number in sorted(next_manifest.pages)[: self.next_chapter_pages]:
+                entry = next_manifest.pages[number]
+                self._warm(
+                    self._local_key(next_id, number, entry.etag),
+                    lambda entry=entry, number=number: self._read_local(entry, number),
+                )
+
+    async def _find_next_local_chapter(
+        self, db: AsyncSession, manifest: ChapterManifest
+    ) -> Optional[str]:
+        remembered_key = f"local:{manifest.chapter_id}"
+        if remembered_key in self._next_chapters:
+            return self._next_chapters[remembered_key]
+
+        result = await db.execute(
+            select(Chapter.id, Chapter.number).where(
+                Chapter.manga_id == UUID(manifest.manga_id)
+            )
+        )
+        chapters = [(str(row.id), row.number) for row in result.all()]
+        next_id = _next_in_order(chapters, manifest.chapter_id)
+        self._remember_next(remembered_key, next_id)
+        return next_id
+
+    # ------------------------------------------------------------------
+    # External chapters
+    # ------------------------------------------------------------------
+
+    async def get_external_page(
+        self, provider: Any, manga_id: str, chapter_id: str, page_number: int
+    ) -> Optional[HotPage]:
+        """
+        Get a page of an external chapter and read ahead of it.
+
+        Args:
+            provider: Provider the chapter is read from
+            manga_id: The provider's ID of the manga
+            chapter_id: The provider's ID of the chapter
+            page_number: 1-based page number
+
+        Returns:
+            The page, or None if the chapter has no such page
+        """
+        pages = await page_manifest_cache.get_pages(provider, manga_id, chapter_id)
+        if not 1 <= page_number <= len(pages):
+            return None
+
+        key = self._external_key(provider.name, chapter_id, page_number)
+        page = self._get(key)
+        if page is None:
+            page = await self._load(
+                key,
+                lambda: self._download_external(
+                    provider, manga_id, chapter_id, pages[page_number - 1]
+                ),
+            )
+
+        self.read_ahead_external(provider, manga_id, chapter_id, pages, page_number)
+        return page
+
+    def read_ahead_external(
+        self,
+        provider: Any,
+        manga_id: str,
+        chapter_id: str,
+        pages: List[str],
+        page_number: int,
+    ) -> None:
+        """Warm the pages after page_number of an external chapter."""
+        for number in range(page_number + 1, page_number + self.pages_ahead + 1):
+            if number > len(pages):
+                break
+            self._warm(
+                self._external_key(provider.name, chapter_id, number),
+                lambda url=pages[number - 1]: self._download_external(
+                    provider, manga_id, chapter_id, url
+                ),
+            )
+
+        if page_number + self.pages_ahead >= len(pages):
+            self._spawn(
+                self._warm_next_external_chapter(provider, manga_id, chapter_id)
+            )
+
+    async def _download_external(
+        self, provider: Any, manga_id: str, chapter_id: str, page_url: str
+    ) -> HotPage:
+        try:
+            content = await provider.download_page(
+                page_url, referer=provider.get_chapter_url(manga_id, chapter_id)
+            )
+        except Exception as e:
+            if is_expired_page_error(e):
+                page_manifest_cache.invalidate_url(page_url)
+            raise
+
+        return HotPage(
+            content=content,
+            media_type=_guess_media_type(page_url, content),
+            etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        )
+
+    async def _warm_next_external_chapter(
+        self, provider: Any, manga_id: str, chapter_id: str
+    ) -> None:
+        remembered_key = f"{provider.name}:{chapter_id}"
+        if remembered_key in self._next_chapters:
+            next_id = self._next_chapters[remembered_key]
+        else:
+            chapters = await provider.get_all_chapters(manga_id)
+            next_id = _next_in_order(
+                [
+                    (str(chapter.get("id")), chapter.get("number"))
+                    for chapter in chapters
+                ],
+                str(chapter_id),
+            )
+            self._remember_next(remembered_key, next_id)
+
+        if not next_id:
+            return
+
+        pages = await page_manifest_cache.get_pages(provider, manga_id, next_id)
+        for number, url in enumerate(pages[: self.next_chapter_pages], 1):
+            self._warm(
+                self._external_key(provider.name, next_id, number),
+                lambda url=url: self._download_external(
+                    provider, manga_id, next_id, url
+                ),
+            )
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get read-ahead statistics."""
+        return {
+            **self._stats,
+            "pages": len(self.cache),
+            "size_bytes": self.cache.size_bytes,
+            "max_bytes": self.cache.max_bytes,
+            "inflight": len(self._inflight),
+        }
+
+    async def close(self) -> None:
+        """Cancel outstanding prefetches."""
+        tasks = list(self._background) + list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _get(self, key: str) -> Optional[HotPage]:
+        page = self.cache.get(key)
+        self._stats["hits" if page else "misses"] += 1
+        return page
+
+    async def _load(
+        self, key: str, loader: Callable[[], Awaitable[HotPage]]
+    ) -> HotPage:
+        """Load a page into the cache, joining a load already in progress."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_load(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_load(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is None:
+            self.cache.put(key, task.result())
+
+    def _warm(self, key: str, loader: Callable[[], Awaitable[HotPage]]) -> None:
+        if key in self.cache or key in self._inflight:
+            return
+        self._stats["prefetched"] += 1
+        self._spawn(self._load(key, loader))
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._finish_background)
+
+    def _finish_background(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["failed"] += 1
+            logger.debug(f"Read-ahead failed: {task.exception()}")
+
+    def _remember_next(self, key: str, next_id: Optional[str]) -> None:
+        self._next_chapters[key] = next_id
+        while len(self._next_chapters) > self.MAX_REMEMBERED_CHAPTERS:
+            self._next_chapters.popitem(last=False)
+
+    @staticmethod
+    def _local_key(chapter_id: Any, page_number: int, etag: str) -> str:
+        return f"local:{chapter_id}:{page_number}:{etag}"
+
+    @staticmethod
+    def _external_key(provider_name: str, chapter_id: str, page_number: int) -> str:
+        return f"{provider_name.lower()}:{chapter_id}:{page_number}"
+
+
+def _next_in_order(chapters: List[Tuple[str, Any]], chapter_id: str) -> Optional[str]:
+    """Get the ID of the chapter after chapter_id, by chapter number."""
+    ordered = sorted(chapters, key=lambda chapter: chapter_sort_key(chapter[1]))
+    ids = [chapter[0] for chapter in ordered]
+    if chapter_id not in ids:
+        return None
+    index = ids.index(chapter_id)
+    return ids[index + 1] if index + 1 < len(ids) else None
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_archive_page(archive_path: str, page_number: int) -> bytes:
+    archive_page = archive_page_reader.open_page(archive_path, page_number)
+    if not archive_page:
+        raise FileNotFoundError(f"Page {page_number} not in {archive_path}")
+    _, content = archive_page
+    return b"".join(bytes(chunk) for chunk in content)
+
+
+def _guess_media_type(url: str, content: bytes) -> str:
+    media_type = mimetypes.guess_type(url.split("?")[0])[0]
+    if media_type and media_type.startswith("image/"):
+        return media_type
+    try:
+        media_type = magic.from_buffer(content[:2048], mime=True)
+    except Exception:
+        media_type = None
+    return (
+        media_type if media_type and media_type.startswith("image/") else "image/jpeg"
+    )
+
+
+# Global instance
+read_ahead_service = ReadAheadService()
+chapter_manifest_cache.add_invalidation_listener(read_ahead_service.discard_chapter)
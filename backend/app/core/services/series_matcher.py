@@ -0,0 +1,526 @@
+"""
+Background matcher that maintains the provider series match table.
+
+For every series in any user's library the matcher searches the registered
+providers once, records which providers carry the series (and under which
+external ID), and maps the provider's chapter IDs onto the local chapters.
+Request-time code reads these matches instead of scraping providers live.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import delete, exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.providers.base import BaseProvider
+from app.core.providers.registry import provider_registry
+from app.core.services.provider_matching import (
+    ChapterAlternative,
+    provider_matching_service,
+)
+from app.db.session import AsyncSessionLocal
+from app.models.library import MangaUserLibrary
+from app.models.manga import Chapter, Manga
+from app.models.mangaupdates import MangaUpdatesMapping, UniversalMangaMapping
+from app.models.provider import ProviderSeriesMatch, ProviderStatus
+
+logger = logging.getLogger(__name__)
+
+
+def match_to_dict(match: ProviderSeriesMatch) -> Dict[str, Any]:
+    """Convert a stored match to the provider match format used by the API."""
+    return {
+        "provider": match.provider,
+        "external_id": match.external_id,
+        "title": match.matched_title,
+        "url": match.external_url,
+        "confidence": match.confidence,
+        "match_method": match.match_method,
+        "chapter_count": match.chapter_count,
+        "last_verified": (
+            match.last_verified.isoformat() if match.last_verified else None
+        ),
+    }
+
+
+class SeriesMatcherService:
+    """Service that precomputes which providers carry each library series."""
+
+    def __init__(self):
+        self.min_confidence = 0.8  # Minimum title similarity to record a match
+        self.search_timeout = 20  # Seconds per provider search
+        self.chapters_timeout = 30  # Seconds per provider chapter list
+        self.max_concurrent_providers = 5
+        self.match_timeout = 300  # Seconds to match one series on all providers
+        self.inline_timeout = 20  # Seconds a request waits for matching
+        self.max_chapter_pages = 50  # Max 5000 chapters per provider
+        self.cycle_interval = 600  # Seconds between matching cycles
+        self._task: Optional[asyncio.Task] = None
+        self._is_running = False
+
+    # ------------------------------------------------------------------
+    # Request-time lookups
+    # ------------------------------------------------------------------
+
+    async def get_matches(
+        self, db: AsyncSession, manga_id, min_confidence: float = 0.0
+    ) -> List[ProviderSeriesMatch]:
+        """Get stored provider matches for a series, best first."""
+        result = await db.execute(
+            select(ProviderSeriesMatch)
+            .where(
+                ProviderSeriesMatch.manga_id == manga_id,
+                ProviderSeriesMatch.confidence >= min_confidence,
+            )
+            .order_by(ProviderSeriesMatch.confidence.desc())
+        )
+        return result.scalars().all()
+
+    async def get_matches_for_mu_entry(
+        self, db: AsyncSession, mu_entry_id
+    ) -> List[ProviderSeriesMatch]:
+        """Get stored provider matches for a MangaUpdates entry via its mapping."""
+        result = await db.execute(
+            select(ProviderSeriesMatch)
+            .join(
+                MangaUpdatesMapping,
+                MangaUpdatesMapping.manga_id == ProviderSeriesMatch.manga_id,
+            )
+            .where(MangaUpdatesMapping.mu_entry_id == mu_entry_id)
+            .order_by(ProviderSeriesMatch.confidence.desc())
+        )
+        return result.scalars().all()
+
+    async def get_matches_for_universal_entries(
+        self, db: AsyncSession, entry_ids: List
+    ) -> Dict[Any, List[ProviderSeriesMatch]]:
+        """Get stored provider matches for many universal entries in one query."""
+        if not entry_ids:
+            return {}
+
+        result = await db.execute(
+            select(UniversalMangaMapping.universal_entry_id, ProviderSeriesMatch)
+            .join(
+                ProviderSeriesMatch,
+                ProviderSeriesMatch.manga_id == UniversalMangaMapping.manga_id,
+            )
+            .where(UniversalMangaMapping.universal_entry_id.in_(entry_ids))
+            .order_by(ProviderSeriesMatch.confidence.desc())
+        )
+
+        matches: Dict[Any, List[ProviderSeriesMatch]] = {}
+        for entry_id, match in result.all():
+            matches.setdefault(entry_id, []).append(match)
+        return matches
+
+    async def get_known_alternatives(
+        self,
+        db: AsyncSession,
+        manga: Manga,
+        chapter: Chapter,
+        exclude_providers: Optional[List[str]] = None,
+        max_alternatives: int = 5,
+    ) -> List[ChapterAlternative]:
+        """
+        Get alternative sources for a chapter from the stored matches.
+
+        Only providers whose chapter ID was mapped by the matcher are returned,
+        so the result can be downloaded from directly.
+        """
+        excluded = {name.lower() for name in (exclude_providers or [])}
+        if chapter.source:
+            excluded.add(chapter.source.lower())
+
+        provider_ids = chapter.provider_external_ids or {}
+        alternatives = []
+
+        for match in await self.get_matches(db, manga.id):
+            if match.provider.lower() in excluded:
+                continue
+
+            external_chapter_id = provider_ids.get(match.provider.lower())
+            if not external_chapter_id:
+                continue
+
+            alternatives.append(
+                ChapterAlternative(
+                    provider_name=match.provider,
+                    external_manga_id=match.external_id,
+                    external_chapter_id=external_chapter_id,
+                    confidence=match.confidence,
+                    chapter_title=chapter.title,
+                    chapter_number=chapter.number,
+                )
+            )
+
+        return alternatives[:max_alternatives]
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    async def match_series(
+        self, db: AsyncSession, manga: Manga, timeout: Optional[float] = None
+    ) -> int:
+        """
+        Search all providers for a series and refresh its stored matches.
+
+        Providers still searching when the deadline passes are cancelled;
+        matches from the providers that answered are stored. Stored matches
+        of providers that failed or were cut off are kept until they answer.
+
+        Args:
+            db: Database session
+            manga: The library series to match
+            timeout: Total seconds for all providers, match_timeout by default
+
+        Returns:
+            Number of providers the series was matched on
+        """
+        providers = await self._get_candidate_providers(db, manga)
+        titles = self._get_series_titles(manga)
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_providers)
+
+        async def match_with_semaphore(provider: BaseProvider):
+            async with semaphore:
+                return await self._match_provider(provider, manga, titles)
+
+        tasks = [
+            asyncio.create_task(match_with_semaphore(provider))
+            for provider in providers
+        ]
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(
+                tasks, timeout=timeout or self.match_timeout
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        found: Dict[str, Dict[str, Any]] = {}
+        answered: Set[str] = set()
+        for provider, task in zip(providers, tasks):
+            if task in pending:
+                logger.warning(f"Timed out matching {manga.title} on {provider.name}")
+                continue
+            if task.exception():
+                logger.warning(
+                    f"Error matching {manga.title} on {provider.name}: "
+                    f"{task.exception()}"
+                )
+                continue
+            answered.add(provider.name)
+            if task.result():
+                found[provider.name] = task.result()
+
+        await self._store_matches(db, manga, found, answered)
+
+        logger.info(
+            f"Matched '{manga.title}' on {len(found)}/{len(providers)} providers"
+        )
+        return len(found)
+
+    async def _get_candidate_providers(
+        self, db: AsyncSession, manga: Manga
+    ) -> List[BaseProvider]:
+        """Get providers worth searching for this series."""
+        result = await db.execute(
+            select(ProviderStatus.provider_id).where(
+                ProviderStatus.is_enabled.is_(False)
+            )
+        )
+        disabled = {provider_id.lower() for provider_id in result.scalars().all()}
+
+        providers = []
+        for provider in provider_registry.get_all_providers():
+            if provider.name.lower() in disabled:
+                continue
+            if manga.is_nsfw and not getattr(provider, "supports_nsfw", False):
+                continue
+            providers.append(provider)
+
+        return providers
+
+    def _get_series_titles(self, manga: Manga) -> List[str]:
+        """Get the title and alternative titles to match against."""
+        titles = [manga.title]
+        alternative_titles = manga.alternative_titles or {}
+        if isinstance(alternative_titles, dict):
+            titles.extend(
+                title for title in alternative_titles.values() if isinstance(title, str)
+            )
+        return titles
+
+    async def _match_provider(
+        self, provider: BaseProvider, manga: Manga, titles: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Find the best match for a series on one provider and its chapters."""
+        if (
+            manga.provider
+            and manga.external_id
+            and manga.provider.lower() == provider.name.lower()
+        ):
+            # The series' own source needs no search
+            best = {
+                "external_id": manga.external_id,
+                "external_url": manga.external_url,
+                "matched_title": manga.title,
+                "confidence": 1.0,
+                "match_method": "source",
+            }
+        else:
+            best = await self._search_best_match(provider, titles)
+            if not best:
+                return None
+
+        best["chapters"] = await self._fetch_chapter_ids(provider, best["external_id"])
+        return best
+
+    async def _search_best_match(
+        self, provider: BaseProvider, titles: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Search a provider with the series' main title and keep the best hit."""
+        search_results, _, _ = await asyncio.wait_for(
+            provider.search(titles[0], page=1, limit=5),
+            timeout=self.search_timeout,
+        )
+
+        best = None
+        for search_result in search_results:
+            if hasattr(search_result, "title"):
+                result_title = search_result.title
+                result_id = search_result.id
+                result_url = getattr(search_result, "url", None)
+            else:
+                result_title = search_result.get("title", "")
+                result_id = search_result.get("id", "")
+                result_url = search_result.get("url")
+
+            confidence = max(
+                provider_matching_service.calculate_title_similarity(
+                    title, result_title
+                )
+                for title in titles
+            )
+            if confidence < self.min_confidence:
+                continue
+
+            if not best or confidence > best["confidence"]:
+                best = {
+                    "external_id": str(result_id),
+                    "external_url": result_url,
+                    "matched_title": result_title,
+                    "confidence": confidence,
+                    "match_method": (
+                        "title_exact" if confidence >= 0.999 else "title_fuzzy"
+                    ),
+                }
+
+        return best
+
+    async def _fetch_chapter_ids(
+        self, provider: BaseProvider, external_id: str
+    ) -> Dict[str, str]:
+        """Map normalized chapter numbers to the provider's chapter IDs."""
+        chapter_ids: Dict[str, str] = {}
+
+        try:
+            chapters = await asyncio.wait_for(
+                provider.get_all_chapters(
+                    external_id, max_pages=self.max_chapter_pages
+                ),
+                timeout=self.chapters_timeout,
+            )
+        except Exception as e:
+            logger.debug(f"Error getting chapters from {provider.name}: {e}")
+            return chapter_ids
+
+        for chapter_data in chapters:
+            if hasattr(chapter_data, "number"):
+                number, chapter_id = chapter_data.number, chapter_data.id
+            else:
+                number = chapter_data.get("number", "")
+                chapter_id = chapter_data.get("id", "")
+
+            key = provider_matching_service.normalize_chapter_number(number)
+            if key and chapter_id:
+                chapter_ids.setdefault(key, str(chapter_id))
+
+        return chapter_ids
+
+    async def _store_matches(
+        self,
+        db: AsyncSession,
+        manga: Manga,
+        found: Dict[str, Dict[str, Any]],
+        answered: Set[str],
+    ) -> None:
+        """
+        Refresh the stored matches for a series and map chapter IDs.
+
+        Args:
+            db: Database session
+            manga: The matched series
+            found: Match data by provider name
+            answered: Providers whose search completed, with or without a match
+        """
+        now = datetime.now(timezone.utc)
+        manga.provider_matched_at = now
+
+        result = await db.execute(
+            select(ProviderSeriesMatch).where(ProviderSeriesMatch.manga_id == manga.id)
+        )
+        existing = {match.provider: match for match in result.scalars().all()}
+
+        # Drop providers that answered without the series; a provider that
+        # failed or ran out of time says nothing about whether it carries it
+        stale = [name for name in existing if name in answered and name not in found]
+        if stale:
+            await db.execute(
+                delete(ProviderSeriesMatch).where(
+                    ProviderSeriesMatch.manga_id == manga.id,
+                    ProviderSeriesMatch.provider.in_(stale),
+                )
+            )
+
+        for provider_name, data in found.items():
+            match = existing.get(provider_name)
+            if not match:
+                match = ProviderSeriesMatch(manga_id=manga.id, provider=provider_name)
+                db.add(match)
+
+            match.external_id = data["external_id"]
+            match.external_url = data["external_url"]
+            match.matched_title = data["matched_title"]
+            match.confidence = data["confidence"]
+            match.match_method = data["match_method"]
+            match.chapter_count = len(data["chapters"])
+            match.last_verified = now
+
+        # Record per-chapter provider IDs so fallbacks need no lookup
+        result = await db.execute(select(Chapter).where(Chapter.manga_id == manga.id))
+        ranked_providers = sorted(
+            found, key=lambda name: found[name]["confidence"], reverse=True
+        )
+        for chapter in result.scalars().all():
+            key = provider_matching_service.normalize_chapter_number(chapter.number)
+            provider_ids = dict(chapter.provider_external_ids or {})
+            fallback_providers = list(chapter.fallback_providers or [])
+
+            for provider_name in ranked_providers:
+                chapter_id = found[provider_name]["chapters"].get(key)
+                if not chapter_id:
+                    continue
+                provider_ids[provider_name.lower()] = chapter_id
+                if (
+                    provider_name.lower() != (chapter.source or "").lower()
+                    and provider_name not in fallback_providers
+                ):
+                    fallback_providers.append(provider_name)
+
+            chapter.provider_external_ids = provider_ids
+            chapter.fallback_providers = fallback_providers
+
+        await db.commit()
+
+    # ------------------------------------------------------------------
+    # Background job
+    # ------------------------------------------------------------------
+
+    async def get_series_due_for_matching(
+        self, db: AsyncSession, limit: int
+    ) -> List[Manga]:
+        """
+        Get library series never matched or not matched within the interval.
+
+        Series are due by when they were last searched, whether or not any
+        provider carried them, and the longest waiting come first so series
+        without matches cannot take every batch.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            hours=settings.PROVIDER_MATCHING_REVERIFY_HOURS
+        )
+
+        in_library = exists().where(MangaUserLibrary.manga_id == Manga.id)
+        due = or_(
+            Manga.provider_matched_at.is_(None),
+            Manga.provider_matched_at < cutoff,
+        )
+
+        result = await db.execute(
+            select(Manga)
+            .where(in_library, due)
+            .order_by(Manga.provider_matched_at.asc().nulls_first())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def run_matching_cycle(self) -> int:
+        """Match one batch of due series. Returns the number of series processed."""
+        async with AsyncSessionLocal() as db:
+            due_series = await self.get_series_due_for_matching(
+                db, settings.PROVIDER_MATCHING_BATCH_SIZE
+            )
+
+            for manga in due_series:
+                try:
+                    await self.match_series(db, manga)
+                except Exception as e:
+                    logger.error(f"Error matching series {manga.id}: {e}")
+                    await db.rollback()
+
+            return len(due_series)
+
+    async def start(self) -> None:
+        """Start the background matching loop."""
+        if self._is_running:
+            logger.warning("Series matcher is already running")
+            return
+
+        self._is_running = True
+        logger.info("Starting series matcher")
+        self._task = asyncio.create_task(self._matching_loop())
+
+    async def stop(self) -> None:
+        """Stop the background matching loop."""
+        if not self._is_running:
+            return
+
+        self._is_running = False
+        logger.info("Stopping series matcher")
+
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                logger.debug("Cancelled series matcher task")
+
+        self._task = None
+
+    async def _matching_loop(self) -> None:
+        """Main loop that keeps the match table fresh."""
+        while self._is_running:
+            try:
+                # Let startup health checks settle before scraping providers
+                await asyncio.sleep(self.cycle_interval)
+
+                processed = await self.run_matching_cycle()
+                if processed:
+                    logger.info(f"Series matcher processed {processed} series")
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in series matcher loop: {e}")
+                await asyncio.sleep(60)  # Wait a minute before retrying
+
+
+# Global instance
+series_matcher = SeriesMatcherService()
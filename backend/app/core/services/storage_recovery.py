@@ -5,19 +5,21 @@ This module provides functionality to recover manga from existing storage
 when the database is lost or corrupted.
 """
 
+import asyncio
 import json
 import logging
 import os
 import re
 import shutil
 import zipfile
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.services.file_index import FileIndex, get_file_index
 from app.core.utils import get_manga_storage_path
 from app.models.library import MangaUserLibrary
 from app.models.manga import Chapter, Manga, MangaStatus, MangaType
@@ -34,6 +36,11 @@ class StorageRecoveryService:
         self.storage_path = settings.STORAGE_PATH
         self.manga_storage_path = os.path.join(self.storage_path, "manga")
 
+    @property
+    def file_index(self) -> FileIndex:
+        """Index of the files in storage, kept next to them."""
+        return get_file_index(self.storage_path)
+
     async def scan_storage_for_manga(
         self, user_id: UUID, db: AsyncSession
     ) -> List[Dict]:
@@ -64,11 +71,18 @@ class StorageRecoveryService:
         existing_uuids = {str(uuid) for uuid in result.scalars().all()}
 
         try:
-            for item in os.listdir(self.manga_storage_path):
-                manga_dir = os.path.join(self.manga_storage_path, item)
+            # Only directories changed since the last scan are listed again
+            # Index queries below skip revalidation, the tree was just refreshed
+            await asyncio.to_thread(self.file_index.refresh, self.manga_storage_path)
+            manga_dirs, _ = await asyncio.to_thread(
+                self.file_index.list_dir, self.manga_storage_path, False
+            )
+
+            for manga_dir in manga_dirs:
+                item = os.path.basename(manga_dir)
 
-                # Skip if not a directory or if it's already in database
-                if not os.path.isdir(manga_dir) or item in existing_uuids:
+                # Skip if it's already in database
+                if item in existing_uuids:
                     continue
 
                 # Check if this looks like a manga UUID directory
@@ -77,10 +91,14 @@ class StorageRecoveryService:
 
                 organized_path = os.path.join(manga_dir, "organized")
 
-                if os.path.exists(organized_path) and os.listdir(organized_path):
+                if any(
+                    await asyncio.to_thread(
+                        self.file_index.list_dir, organized_path, False
+                    )
+                ):
                     try:
                         manga_info = await self._extract_manga_info_from_structure(
-                            organized_path
+                            organized_path, refresh=False
                         )
 
                         if manga_info:
@@ -88,8 +106,10 @@ class StorageRecoveryService:
                                 {
                                     "storage_uuid": item,
                                     "organized_path": organized_path,
-                                    "storage_size": self._calculate_directory_size(
-                                        organized_path
+                                    "storage_size": await asyncio.to_thread(
+                                        self._calculate_directory_size,
+                                        organized_path,
+                                        False,
                                     ),
                                 }
                             )
@@ -112,75 +132,36 @@ class StorageRecoveryService:
         except ValueError:
             return False
 
-    def _calculate_directory_size(self, directory_path: str) -> int:
-        """Calculate total size of directory in bytes."""
-        total_size = 0
+    def _calculate_directory_size(
+        self, directory_path: str, refresh: bool = True
+    ) -> int:
+        """Calculate total size of directory in bytes from the file index."""
         try:
-            for dirpath, dirnames, filenames in os.walk(directory_path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    try:
-                        total_size += os.path.getsize(filepath)
-                    except (OSError, IOError):
-                        continue
+            return self.file_index.tree_size(directory_path, refresh)
         except Exception as e:
             logger.error(f"Error calculating directory size for {directory_path}: {e}")
-
-        return total_size
+            return 0
 
     async def _extract_manga_info_from_structure(
-        self, organized_path: str
+        self, organized_path: str, refresh: bool = True
     ) -> Optional[Dict]:
         """
         Extract manga metadata from organized folder structure.
 
         Args:
             organized_path: Path to organized manga directory
+            refresh: Revalidate the indexed directories before reading them
 
         Returns:
             Dictionary with extracted manga information
         """
         try:
-            # Get the first level directory (should be manga title)
-            manga_dirs = [
-                d
-                for d in os.listdir(organized_path)
-                if os.path.isdir(os.path.join(organized_path, d))
-            ]
-
-            if not manga_dirs:
+            structure = await asyncio.to_thread(
+                self._read_structure, organized_path, refresh
+            )
+            if not structure:
                 return None
-
-            # Use the first directory as manga title (there should only be one)
-            manga_title = manga_dirs[0]
-            manga_path = os.path.join(organized_path, manga_title)
-
-            # Scan for volumes and chapters
-            volumes = {}
-            total_chapters = 0
-
-            for item in os.listdir(manga_path):
-                item_path = os.path.join(manga_path, item)
-
-                if os.path.isdir(item_path):
-                    # This is a volume directory
-                    volume_name = item
-                    chapters = self._scan_volume_for_chapters(item_path)
-
-                    if chapters:
-                        volumes[volume_name] = chapters
-                        total_chapters += len(chapters)
-
-                elif item.endswith(".cbz"):
-                    # Direct chapter file (no volume structure)
-                    if "Direct" not in volumes:
-                        volumes["Direct"] = []
-
-                    chapter_info = self._extract_chapter_info_from_filename(item)
-                    if chapter_info:
-                        chapter_info["file_path"] = item_path
-                        volumes["Direct"].append(chapter_info)
-                        total_chapters += 1
+            manga_title, volumes, total_chapters = structure
 
             # Try to extract additional metadata from CBZ files
             additional_metadata = await self._extract_metadata_from_cbz_files(volumes)
@@ -201,16 +182,66 @@ class StorageRecoveryService:
             logger.error(f"Error extracting manga info from {organized_path}: {e}")
             return None
 
-    def _scan_volume_for_chapters(self, volume_path: str) -> List[Dict]:
+    def _read_structure(
+        self, organized_path: str, refresh: bool = True
+    ) -> Optional[Tuple[str, Dict, int]]:
+        """Read title, volumes and chapter count of an organized manga directory."""
+        # Get the first level directory (should be manga title)
+        manga_dirs, _ = self.file_index.list_dir(organized_path, refresh)
+
+        if not manga_dirs:
+            return None
+
+        # Use the first directory as manga title (there should only be one)
+        manga_path = manga_dirs[0]
+        manga_title = os.path.basename(manga_path)
+
+        # Scan for volumes and chapters
+        volumes = {}
+        total_chapters = 0
+
+        volume_dirs, files = self.file_index.list_dir(manga_path, refresh)
+
+        for item_path in volume_dirs:
+            # This is a volume directory
+            volume_name = os.path.basename(item_path)
+            chapters = self._scan_volume_for_chapters(item_path, refresh)
+
+            if chapters:
+                volumes[volume_name] = chapters
+                total_chapters += len(chapters)
+
+        for entry in files:
+            item_path = entry.path
+            item = os.path.basename(item_path)
+
+            if item.endswith(".cbz"):
+                # Direct chapter file (no volume structure)
+                if "Direct" not in volumes:
+                    volumes["Direct"] = []
+
+                chapter_info = self._extract_chapter_info_from_filename(item)
+                if chapter_info:
+                    chapter_info["file_path"] = item_path
+                    volumes["Direct"].append(chapter_info)
+                    total_chapters += 1
+
+        return manga_title, volumes, total_chapters
+
+    def _scan_volume_for_chapters(
+        self, volume_path: str, refresh: bool = True
+    ) -> List[Dict]:
         """Scan a volume directory for chapter files."""
         chapters = []
 
         try:
-            for item in os.listdir(volume_path):
+            _, files = self.file_index.list_dir(volume_path, refresh)
+            for entry in files:
+                item = os.path.basename(entry.path)
                 if item.endswith(".cbz"):
                     chapter_info = self._extract_chapter_info_from_filename(item)
                     if chapter_info:
-                        chapter_info["file_path"] = os.path.join(volume_path, item)
+                        chapter_info["file_path"] = entry.path
                         chapters.append(chapter_info)
 
         except Exception as e:
@@ -266,7 +297,9 @@ class StorageRecoveryService:
         for volume_chapters in volumes.values():
             if volume_chapters:
                 first_chapter = volume_chapters[0]
-                cbz_metadata = self._read_cbz_metadata(first_chapter.get("file_path"))
+                cbz_metadata = await asyncio.to_thread(
+                    self._read_cbz_metadata, first_chapter.get("file_path")
+                )
 
                 if cbz_metadata:
                     manga_meta = cbz_metadata.get("manga", {})
@@ -0,0 +1,159 @@
+"""
+Cover thumbnail generation.
+
+Library grids show covers at around 200 px, but the stored cover is the
+full-size original. When a cover is stored, a few fixed-width variants are
+rendered in WebP and JPEG next to it. Pillow work runs in a process pool so
+resizing never blocks the event loop. Variants older than the cover are
+treated as missing and rendered again.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.core.utils import get_cover_storage_path, get_manga_storage_path
+
+logger = logging.getLogger(__name__)
+
+# Named widths offered by the cover endpoint
+COVER_SIZES = {"small": 160, "medium": 320, "large": 640}
+
+# Formats rendered for every width, with the media type each is served as
+THUMBNAIL_FORMATS = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+def render_thumbnails(
+    source_path: str, output_dir: str, widths: List[int]
+) -> Dict[int, Dict[str, str]]:
+    """
+    Render WebP and JPEG variants of an image at the given widths.
+
+    Runs in a worker process. Images narrower than a width are not upscaled.
+
+    Returns:
+        Output paths keyed by width, then by format
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    variants: Dict[int, Dict[str, str]] = {}
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        for width in widths:
+            height = max(1, round(image.height * min(1.0, width / image.width)))
+            resized = image.resize(
+                (min(width, image.width), height), Image.Resampling.LANCZOS
+            )
+
+            paths = {}
+            for extension in THUMBNAIL_FORMATS:
+                path = os.path.join(output_dir, f"cover_{width}.{extension}")
+                tmp_path = f"{path}.tmp"
+                if extension == "webp":
+                    resized.save(tmp_path, "WEBP", quality=80, method=4)
+                else:
+                    resized.convert("RGB").save(
+                        tmp_path, "JPEG", quality=82, optimize=True, progressive=True
+                    )
+                os.replace(tmp_path, path)
+                paths[extension] = path
+            variants[width] = paths
+
+    return variants
+
+
+class ThumbnailService:
+    """Generate and locate cover thumbnail variants."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.THUMBNAIL_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the event loop or open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def get_thumbnail_dir(self, manga_id: uuid.UUID) -> str:
+        """Get the directory holding a manga's cover variants."""
+        return os.path.join(get_manga_storage_path(manga_id), "thumbnails")
+
+    def get_cover_variant_path(
+        self, manga_id: uuid.UUID, size: str, extension: str = "webp"
+    ) -> Optional[str]:
+        """
+        Get the path of a cover variant if it exists and is current.
+
+        Args:
+            manga_id: The ID of the manga
+            size: One of COVER_SIZES
+            extension: One of THUMBNAIL_FORMATS
+
+        Returns:
+            The variant path, or None if it has to be (re)generated
+        """
+        width = COVER_SIZES[size]
+        path = os.path.join(
+            self.get_thumbnail_dir(manga_id), f"cover_{width}.{extension}"
+        )
+        cover_path = get_cover_storage_path(manga_id)
+
+        try:
+            if os.path.getmtime(path) >= os.path.getmtime(cover_path):
+                return path
+        except OSError:
+            pass
+        return None
+
+    async def generate_cover_thumbnails(
+        self, manga_id: uuid.UUID
+    ) -> Dict[int, Dict[str, str]]:
+        """
+        Render every cover variant for a manga from its stored cover.
+
+        Failures are logged rather than raised, since the original cover can
+        always be served instead.
+
+        Returns:
+            Output paths keyed by width, then by format
+        """
+        cover_path = get_cover_storage_path(manga_id)
+        if not os.path.exists(cover_path):
+            return {}
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(),
+                render_thumbnails,
+                cover_path,
+                self.get_thumbnail_dir(manga_id),
+                sorted(COVER_SIZES.values()),
+            )
+        except Exception as e:
+            logger.warning(f"Could not generate cover thumbnails for {manga_id}: {e}")
+            return {}
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+thumbnail_service = ThumbnailService()
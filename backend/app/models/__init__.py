@@ -9,7 +9,7 @@ from app.models.library import (
     ReadingList,
     ReadingProgress,
 )
-from app.models.manga import Chapter, Manga
+from app.models.manga import Chapter, Manga, PageFingerprint, PageFingerprintSighting
 from app.models.mangaupdates import (
     CrossIndexerReference,
     UniversalMangaEntry,
@@ -21,7 +21,7 @@ from app.models.organization import (
     OrganizationHistory,
     OrganizationJob,
 )
-from app.models.provider import ProviderStatus
+from app.models.provider import ProviderSeriesMatch, ProviderStatus
 from app.models.user import User
 from app.models.user_provider_preference import UserProviderPreference
 
@@ -30,12 +30,15 @@ __all__ = [
     "User",
     "Manga",
     "Chapter",
+    "PageFingerprint",
+    "PageFingerprintSighting",
     "MangaUserLibrary",
     "LibraryCategory",
     "ReadingList",
     "ReadingProgress",
     "Bookmark",
     "ProviderStatus",
+    "ProviderSeriesMatch",
     "UserProviderPreference",
     "MangaMetadata",
     "ChapterMetadata",
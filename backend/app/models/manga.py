@@ -1,6 +1,7 @@
 import enum
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -10,6 +11,7 @@ from sqlalchemy import (
     String,
     Table,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
@@ -81,6 +83,9 @@ class Manga(BaseModel):
 
     # External IDs from different sources (for backward compatibility)
     external_ids = Column(JSONB, nullable=True)
+    provider_matched_at = Column(
+        DateTime(timezone=True), nullable=True, index=True
+    )  # When the series matcher last searched the providers
 
     # Relationships
     genres = relationship("Genre", secondary=manga_genre, back_populates="manga")
@@ -106,6 +111,9 @@ class Manga(BaseModel):
     user_libraries = relationship(
         "MangaUserLibrary", back_populates="manga", cascade="all, delete-orphan"
     )
+    provider_matches = relationship(
+        "ProviderSeriesMatch", back_populates="manga", cascade="all, delete-orphan"
+    )
 
 
 class Genre(BaseModel):
@@ -161,6 +169,9 @@ class Chapter(BaseModel):
         String(20), nullable=False, default="not_downloaded", index=True
     )  # Download status: not_downloaded, downloading, downloaded, error
     download_error = Column(Text, nullable=True)  # Error message if download failed
+    images_optimized_at = Column(
+        DateTime(timezone=True), nullable=True
+    )  # When the background optimizer last re-encoded the pages
     external_id = Column(
         String(255), nullable=True, index=True
     )  # External ID from the provider
@@ -204,3 +215,33 @@ class Page(BaseModel):
 
     # Relationships
     chapter = relationship("Chapter", back_populates="pages")
+
+
+class PageFingerprint(BaseModel):
+    """Perceptual hash of a page seen repeatedly by a provider or series."""
+
+    __tablename__ = "page_fingerprints"
+    __table_args__ = (UniqueConstraint("scope", "hash", name="uq_page_fingerprint"),)
+
+    # "provider:<name>" or "series:<manga id>"
+    scope = Column(String(150), nullable=False, index=True)
+    hash = Column(BigInteger, nullable=False)  # 64-bit dHash, stored signed
+    # Distinct chapters or series it was seen in, see PageFingerprintSighting
+    sightings = Column(Integer, default=1, nullable=False)
+    url = Column(String(1000), nullable=True)  # Where it was last fetched from
+    blocked = Column(Boolean, default=False, nullable=False)
+
+
+class PageFingerprintSighting(BaseModel):
+    """A chapter or series a page fingerprint was seen in."""
+
+    __tablename__ = "page_fingerprint_sightings"
+    __table_args__ = (
+        UniqueConstraint(
+            "scope", "hash", "seen_in", name="uq_page_fingerprint_sighting"
+        ),
+    )
+
+    scope = Column(String(150), nullable=False)
+    hash = Column(BigInteger, nullable=False)  # 64-bit dHash, stored signed
+    seen_in = Column(String(64), nullable=False)  # Chapter or series ID
@@ -1,6 +1,18 @@
 import enum
 
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.models.base import BaseModel
@@ -84,3 +96,34 @@ class ProviderStatus(BaseModel):
             self.uptime_percentage = int(
                 (self.successful_checks / self.total_checks) * 100
             )
+
+
+class ProviderSeriesMatch(BaseModel):
+    """Precomputed match between a library series and a provider's copy of it."""
+
+    __tablename__ = "provider_series_matches"
+
+    manga_id = Column(
+        UUID(as_uuid=True), ForeignKey("manga.id"), nullable=False, index=True
+    )
+    provider = Column(String(100), nullable=False, index=True)
+    external_id = Column(String(255), nullable=False)
+    external_url = Column(String(500), nullable=True)
+    matched_title = Column(String(500), nullable=True)
+
+    # Match quality
+    confidence = Column(Float, nullable=False, default=0.0)  # 0.0 - 1.0
+    match_method = Column(
+        String(50), nullable=False, default="title_fuzzy"
+    )  # "source", "title_exact", "title_fuzzy"
+    chapter_count = Column(Integer, nullable=True)
+
+    # Verification tracking
+    last_verified = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("manga_id", "provider", name="uq_provider_series_match"),
+    )
+
+    # Relationships
+    manga = relationship("Manga", back_populates="provider_matches")
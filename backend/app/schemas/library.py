@@ -244,6 +244,12 @@ class BulkUpdateMetadataRequest(BulkOperationRequest):
     metadata: Dict[str, Any] = Field(..., description="Metadata to update")
 
 
+class BulkRefreshRequest(BulkOperationRequest):
+    """Schema for bulk refresh from providers operation."""
+
+    pass
+
+
 class BulkOperationResponse(BaseModel):
     """Schema for bulk operation responses."""
 
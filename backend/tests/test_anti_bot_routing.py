@@ -0,0 +1,89 @@
+"""
+Tests for the per-domain anti-bot route memory.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core.providers.anti_bot_routing import AntiBotRoute, AntiBotRouteMemory
+from app.core.providers.base import AntiBotError
+from app.core.providers.generic import GenericProvider
+
+DOMAIN = "protected.example"
+
+
+@pytest.fixture
+def memory():
+    return AntiBotRouteMemory(half_life_seconds=60)
+
+
+def age(memory, domain, route, seconds):
+    memory._routes[(domain, route)].updated_at -= seconds
+
+
+class TestAntiBotRouteMemory:
+    def test_unknown_routes_are_tried(self, memory):
+        assert not memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+
+    def test_repeated_challenges_doom_a_route(self, memory):
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+        assert not memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+        assert memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+        assert not memory.is_doomed(DOMAIN, AntiBotRoute.CLEARANCE)
+        assert not memory.is_doomed("other.example", AntiBotRoute.DIRECT)
+
+    def test_mostly_successful_route_is_kept(self, memory):
+        for _ in range(5):
+            memory.record(DOMAIN, AntiBotRoute.DIRECT, True)
+        for _ in range(2):
+            memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+
+        assert not memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+
+    def test_failures_decay_so_route_is_probed_again(self, memory):
+        for _ in range(2):
+            memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+        assert memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+
+        age(memory, DOMAIN, AntiBotRoute.DIRECT, 60)  # One half-life
+
+        assert not memory.is_doomed(DOMAIN, AntiBotRoute.DIRECT)
+        routes = memory.get_domain_routes(DOMAIN)
+        assert routes["direct"]["failures"] == pytest.approx(1.0, abs=0.01)
+
+    def test_forget(self, memory):
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+
+        memory.forget(DOMAIN)
+
+        assert memory.get_domain_routes(DOMAIN) == {}
+        assert memory.get_stats()["tracked_routes"] == 0
+
+
+class TestGenericProviderRouting:
+    @pytest.mark.asyncio
+    async def test_doomed_direct_route_fails_fast(self, monkeypatch):
+        monkeypatch.delenv("FLARESOLVERR_URL", raising=False)
+        provider = GenericProvider(
+            base_url=f"https://{DOMAIN}",
+            search_url=f"https://{DOMAIN}/search",
+            manga_url_pattern=f"https://{DOMAIN}/manga/{{manga_id}}",
+            chapter_url_pattern=f"https://{DOMAIN}/chapter/{{chapter_id}}",
+            name="Protected",
+        )
+        memory = AntiBotRouteMemory()
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+        memory.record(DOMAIN, AntiBotRoute.DIRECT, False)
+
+        with (
+            patch("app.core.providers.generic.anti_bot_routes", memory),
+            patch("app.core.providers.generic.httpx.AsyncClient") as client,
+        ):
+            with pytest.raises(AntiBotError):
+                await provider._make_request_with_retry(f"https://{DOMAIN}/search")
+
+        client.assert_not_called()
@@ -0,0 +1,208 @@
+"""
+Tests for serving pages out of CBZ archives.
+"""
+
+import os
+import uuid
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.api_v1.endpoints.manga import sync_chapter_download_status
+from app.core.services.archive_pages import (
+    ArchivePageReader,
+    count_archive_pages,
+    is_page_archive,
+)
+from app.core.services.migration import MigrationTool
+
+PAGES = {
+    "page10.jpg": b"\xff\xd8" + b"j" * 200_000,
+    "page2.png": b"\x89PNG" + b"p" * 1000,
+    "page1.webp": b"RIFF" + b"w" * 500,
+}
+
+
+def write_cbz(path, compression=zipfile.ZIP_STORED, pages=PAGES):
+    with zipfile.ZipFile(path, "w", compression) as cbz:
+        for name, data in pages.items():
+            cbz.writestr(name, data)
+        cbz.writestr("metadata.json", "{}")
+    return str(path)
+
+
+def read_page(reader, path, number):
+    page, content = reader.open_page(path, number)
+    return page, b"".join(bytes(chunk) for chunk in content)
+
+
+@pytest.fixture
+def reader():
+    reader = ArchivePageReader(max_open=2)
+    yield reader
+    reader.close()
+
+
+class TestArchivePageReader:
+    def test_pages_are_images_in_natural_order(self, tmp_path, reader):
+        path = write_cbz(tmp_path / "chapter.cbz")
+
+        pages = reader.get_pages(path)
+
+        assert [page.name for page in pages] == [
+            "page1.webp",
+            "page2.png",
+            "page10.jpg",
+        ]
+        assert [page.media_type for page in pages] == [
+            "image/webp",
+            "image/png",
+            "image/jpeg",
+        ]
+
+    @pytest.mark.parametrize(
+        "compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2]
+    )
+    def test_reads_page_bytes(self, tmp_path, reader, compression):
+        path = write_cbz(tmp_path / "chapter.cbz", compression)
+
+        for number, name in enumerate(["page1.webp", "page2.png", "page10.jpg"], 1):
+            page, data = read_page(reader, path, number)
+            assert page.size == len(PAGES[name])
+            assert data == PAGES[name]
+
+    def test_stored_pages_are_slices_of_the_mapping(self, tmp_path, reader):
+        path = write_cbz(tmp_path / "chapter.cbz")
+
+        page, content = reader.open_page(path, 3)
+        chunks = list(content)
+
+        assert page.data_offset is not None
+        assert len(chunks) > 1
+        assert all(isinstance(chunk, memoryview) for chunk in chunks)
+
+    def test_missing_page_number(self, tmp_path, reader):
+        path = write_cbz(tmp_path / "chapter.cbz")
+
+        assert reader.open_page(path, 0) is None
+        assert reader.open_page(path, 4) is None
+
+    def test_archive_is_kept_open(self, tmp_path, reader):
+        path = write_cbz(tmp_path / "chapter.cbz")
+
+        reader.get_pages(path)
+        reader.get_pages(path)
+
+        stats = reader.get_stats()
+        assert stats["opens"] == 1
+        assert stats["hits"] == 1
+
+    def test_rewritten_archive_is_reopened(self, tmp_path, reader):
+        path = write_cbz(tmp_path / "chapter.cbz")
+        reader.get_pages(path)
+
+        write_cbz(path, pages={"only.jpg": b"new"})
+        os.utime(path, ns=(1, 1))
+
+        page, data = read_page(reader, path, 1)
+        assert page.name == "only.jpg"
+        assert data == b"new"
+
+    def test_least_recently_used_archive_is_closed(self, tmp_path, reader):
+        paths = [write_cbz(tmp_path / f"{i}.cbz") for i in range(3)]
+
+        for path in paths:
+            reader.get_pages(path)
+
+        assert reader.get_stats()["open_archives"] == 2
+        assert reader.get_stats()["evictions"] == 1
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+    def test_stream_survives_eviction(self, tmp_path, reader, compression):
+        path = write_cbz(tmp_path / "chapter.cbz", compression)
+
+        _, content = reader.open_page(path, 3)
+        first = bytes(next(content))
+        reader.invalidate(path)
+        rest = b"".join(bytes(chunk) for chunk in content)
+
+        assert first + rest == PAGES["page10.jpg"]
+
+    def test_corrupt_archive_raises(self, tmp_path, reader):
+        path = tmp_path / "broken.cbz"
+        path.write_bytes(b"not a zip file")
+
+        with pytest.raises(zipfile.BadZipFile):
+            reader.get_pages(str(path))
+
+
+def test_is_page_archive():
+    assert is_page_archive("/library/Chapter 1.CBZ")
+    assert is_page_archive("/library/chapter.zip")
+    assert not is_page_archive("/library/chapter.cbr")
+    assert not is_page_archive("/library/chapter")
+    assert not is_page_archive(None)
+
+
+def test_count_archive_pages(tmp_path):
+    assert count_archive_pages(write_cbz(tmp_path / "chapter.cbz")) == 3
+    assert count_archive_pages(write_cbz(tmp_path / "empty.cbz", pages={})) == 0
+    (tmp_path / "broken.cbz").write_bytes(b"not a zip file")
+    assert count_archive_pages(str(tmp_path / "broken.cbz")) == 0
+
+
+class FakeSession:
+    def __init__(self, manga, chapters):
+        self.manga = manga
+        self.chapters = chapters
+
+    async def get(self, model, ident):
+        return self.manga
+
+    async def execute(self, statement):
+        chapters = self.chapters
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: chapters))
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_cbz_chapters_count_as_downloaded(tmp_path):
+    downloaded = SimpleNamespace(
+        number=1,
+        file_path=write_cbz(tmp_path / "1.cbz"),
+        download_status="pending",
+        download_error=None,
+    )
+    empty = SimpleNamespace(
+        number=2,
+        file_path=write_cbz(tmp_path / "2.cbz", pages={}),
+        download_status="downloaded",
+        download_error=None,
+    )
+    manga = SimpleNamespace(title="Manga")
+
+    result = await sync_chapter_download_status(
+        str(uuid.uuid4()), SimpleNamespace(), FakeSession(manga, [downloaded, empty])
+    )
+
+    assert result["updated"] == 2
+    assert downloaded.download_status == "downloaded"
+    assert empty.download_status == "error"
+
+
+def test_cbz_chapter_validates_from_its_members(tmp_path):
+    tool = MigrationTool()
+
+    valid = tool.validate_chapter_integrity(
+        SimpleNamespace(file_path=write_cbz(tmp_path / "1.cbz"))
+    )
+    empty = tool.validate_chapter_integrity(
+        SimpleNamespace(file_path=write_cbz(tmp_path / "2.cbz", pages={}))
+    )
+
+    assert valid["valid"] and valid["file_count"] == 3
+    assert not empty["valid"]
+    assert empty["errors"] == ["No image files found in chapter archive"]
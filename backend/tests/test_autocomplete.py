@@ -0,0 +1,187 @@
+"""
+Tests for the local autocomplete prefix index.
+"""
+
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.services.autocomplete import AutocompleteIndex, normalize_title
+
+
+def make_mu_entry(title, alternative_titles=None, popularity_rank=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        title=title,
+        alternative_titles=alternative_titles,
+        year=2000,
+        type="manga",
+        cover_image_url=None,
+        popularity_rank=popularity_rank,
+        rating_count=None,
+    )
+
+
+def make_manga(title):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        title=title,
+        alternative_titles=None,
+        year=2010,
+        type="manhwa",
+        cover_image=None,
+    )
+
+
+class TestNormalizeTitle:
+    def test_case_accents_and_punctuation(self):
+        assert normalize_title("Pokémon: Adventures!") == "pokemon adventures"
+
+    def test_empty(self):
+        assert normalize_title(None) == ""
+        assert normalize_title("  ") == ""
+
+
+class TestAutocompleteIndex:
+    def test_prefix_match_on_title_and_alt_titles(self):
+        index = AutocompleteIndex()
+        index.add_mangaupdates_entry(
+            make_mu_entry("Shingeki no Kyojin", {"english": "Attack on Titan"})
+        )
+        index.add_mangaupdates_entry(make_mu_entry("One Piece"))
+
+        assert [s["title"] for s in index.suggest("shin")] == ["Shingeki no Kyojin"]
+        assert [s["title"] for s in index.suggest("attack o")] == ["Shingeki no Kyojin"]
+        assert index.suggest("naruto") == []
+
+    def test_ranking_by_popularity(self):
+        index = AutocompleteIndex()
+        index.add_mangaupdates_entry(make_mu_entry("Berserk Side", popularity_rank=900))
+        index.add_mangaupdates_entry(make_mu_entry("Berserk", popularity_rank=3))
+
+        titles = [s["title"] for s in index.suggest("bers")]
+        assert titles == ["Berserk", "Berserk Side"]
+
+    def test_library_membership_ranks_first_and_is_private(self):
+        index = AutocompleteIndex()
+        index.add_mangaupdates_entry(make_mu_entry("Solo Leveling", popularity_rank=1))
+        manga = make_manga("Solo Camping")
+        index.add_library_manga("user-a", manga)
+
+        own = index.suggest("solo", user_id="user-a")
+        assert own[0]["title"] == "Solo Camping"
+        assert own[0]["in_library"] is True
+
+        other = index.suggest("solo", user_id="user-b")
+        assert [s["title"] for s in other] == ["Solo Leveling"]
+
+        index.remove_library_manga("user-a", manga.id)
+        assert [s["title"] for s in index.suggest("solo", user_id="user-a")] == [
+            "Solo Leveling"
+        ]
+
+    def test_incremental_update_replaces_terms(self):
+        index = AutocompleteIndex()
+        entry = make_mu_entry("Old Name")
+        index.add_mangaupdates_entry(entry)
+
+        entry.title = "New Name"
+        index.add_mangaupdates_entry(entry)
+
+        assert index.suggest("old") == []
+        assert [s["title"] for s in index.suggest("new")] == ["New Name"]
+        assert len(index) == 1
+
+    def test_limit_and_duplicate_titles(self):
+        index = AutocompleteIndex()
+        for _ in range(3):
+            index.add_mangaupdates_entry(make_mu_entry("Same Title"))
+        for i in range(30):
+            index.add_mangaupdates_entry(make_mu_entry(f"Same Title {i}"))
+
+        suggestions = index.suggest("same", limit=5)
+        assert len(suggestions) == 5
+        assert [s["title"] for s in suggestions].count("Same Title") == 1
+
+    def test_lookup_is_fast_on_large_index(self):
+        index = AutocompleteIndex()
+        for i in range(20000):
+            index.add_mangaupdates_entry(make_mu_entry(f"Series {i:05d}"))
+
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            suggestions = index.suggest("series 1", limit=10)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        assert len(suggestions) == 10
+        assert min(timings) < 5
+
+
+class FakeSession:
+    """Answers the rebuild's three queries, calling back during the last."""
+
+    def __init__(self, mu_rows, universal_rows, library_rows, during_build=None):
+        self.results = [mu_rows, universal_rows, library_rows]
+        self.during_build = during_build
+
+    async def execute(self, statement):
+        rows = self.results.pop(0)
+        if not self.results and self.during_build:
+            self.during_build()
+        return SimpleNamespace(all=lambda: rows)
+
+
+class TestRebuild:
+    @pytest.mark.asyncio
+    async def test_rebuild_from_rows(self):
+        index = AutocompleteIndex()
+        owner = uuid.uuid4()
+        manga = make_manga("Solo Leveling")
+        library_row = SimpleNamespace(user_id=owner, **vars(manga))
+        db = FakeSession(
+            [make_mu_entry("One Piece", {"ja": "Wan Pisu"})], [], [library_row]
+        )
+
+        await index.rebuild(db)
+
+        assert [s["title"] for s in index.suggest("wan")] == ["One Piece"]
+        assert index.suggest("solo", user_id=str(owner))[0]["in_library"]
+        assert index._keys == sorted(index._keys)
+
+    @pytest.mark.asyncio
+    async def test_changes_during_rebuild_are_kept(self):
+        index = AutocompleteIndex()
+        stale = make_mu_entry("Stale Series")
+        index.add_mangaupdates_entry(stale)
+
+        def concurrent_changes():
+            index.add_mangaupdates_entry(make_mu_entry("Brand New Series"))
+            index.remove(f"mangaupdates:{stale.id}")
+
+        db = FakeSession([stale], [], [], during_build=concurrent_changes)
+
+        await index.rebuild(db)
+
+        assert [s["title"] for s in index.suggest("brand")] == ["Brand New Series"]
+        assert index.suggest("stale") == []
+        assert index._journal is None
+
+    @pytest.mark.asyncio
+    async def test_first_build_does_not_block(self, monkeypatch):
+        index = AutocompleteIndex()
+        started = []
+
+        async def background_rebuild():
+            started.append(True)
+
+        monkeypatch.setattr(index, "_background_rebuild", background_rebuild)
+
+        index.ensure_built()
+        index.ensure_built()
+        await index._rebuild_task
+
+        assert started == [True]
+        assert index.suggest("anything") == []
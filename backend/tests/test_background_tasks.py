@@ -1,14 +1,21 @@
+import asyncio
 import uuid
 from unittest.mock import patch
 
 import pytest
 
+from app.core import deps
+from app.core.services import background
 from app.core.services.background import (
     cancel_download_task,
     download_manga_task,
     get_download_task,
     get_user_download_tasks,
 )
+from app.core.services.download_coordinator import (
+    chapter_download_key,
+    download_coordinator,
+)
 
 
 @pytest.mark.asyncio
@@ -189,3 +196,53 @@ def test_cancel_download_task():
 
     # Check if result is False
     assert result is False
+
+
+class FakeSession:
+    async def get(self, model, ident):
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_paused_chapter_download_resumes(monkeypatch):
+    """Pausing stops the download, resuming runs it again under the same task."""
+    monkeypatch.setattr(deps, "redis_client", None)
+    monkeypatch.setattr(background, "AsyncSessionLocal", FakeSession)
+    started, runs = asyncio.Event(), []
+
+    async def fake_download(**kwargs):
+        runs.append(kwargs["task_id"])
+        if len(runs) == 1:
+            started.set()
+            await asyncio.sleep(60)
+
+    monkeypatch.setattr(background, "download_chapter_with_fallback", fake_download)
+    chapter_id = uuid.uuid4()
+    download = asyncio.create_task(
+        background.download_chapter_task(
+            uuid.uuid4(), chapter_id, "Provider", "m", "c", uuid.uuid4(), "paused"
+        )
+    )
+    await asyncio.wait_for(started.wait(), 1)
+
+    assert background.pause_download_task("paused")
+    assert await asyncio.wait_for(download, 1) == "paused"
+    assert get_download_task("paused")["status"] == "paused"
+    assert (
+        await download_coordinator.get_owner(chapter_download_key(chapter_id)) is None
+    )
+    assert not background.pause_download_task("paused")
+
+    assert await background.resume_download_task("paused") == "paused"
+    await asyncio.wait_for(asyncio.gather(*background._resumed_downloads), 1)
+
+    assert runs == ["paused", "paused"]
+    assert get_download_task("paused")["status"] == "completed"
+    assert await background.resume_download_task("paused") is None
+    del background.download_tasks["paused"]
@@ -0,0 +1,172 @@
+"""
+Tests for repacking chapters into CBZ files.
+"""
+
+import json
+import os
+import uuid
+import zipfile
+from types import SimpleNamespace
+
+import py7zr
+import pytest
+
+from app.core.services.batch_organizer import BatchOrganizer
+from app.core.services.cbz_converter import (
+    CBZConverter,
+    member_compress_type,
+    repack_to_cbz,
+)
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def read_cbz(path):
+    with zipfile.ZipFile(path) as archive:
+        return {
+            info.filename: (archive.read(info), info.compress_type)
+            for info in archive.infolist()
+        }
+
+
+MEMBERS = {
+    "chapter/10.jpg": b"ten",
+    "chapter/2.png": b"two",
+    "chapter/1.bmp": b"one",
+    "chapter/notes.txt": b"not a page",
+    "__MACOSX/chapter/._2.png": b"resource fork",
+}
+
+
+def test_compress_type_by_media_type():
+    assert member_compress_type("001.jpg") == zipfile.ZIP_STORED
+    assert member_compress_type("001.WEBP") == zipfile.ZIP_STORED
+    assert member_compress_type("001.bmp") == zipfile.ZIP_DEFLATED
+    assert member_compress_type("metadata.json") == zipfile.ZIP_DEFLATED
+
+
+def test_zip_is_repacked_in_reading_order(tmp_path):
+    source = make_zip(tmp_path / "source.cbz", MEMBERS)
+    output = str(tmp_path / "out" / "chapter.cbz")
+
+    result = repack_to_cbz(source, output, {"chapter": {"number": 1}})
+
+    assert result == {"pages": 3, "bytes": 9}
+    members = read_cbz(output)
+    assert members["0001.bmp"] == (b"one", zipfile.ZIP_DEFLATED)
+    assert members["0002.png"] == (b"two", zipfile.ZIP_STORED)
+    assert members["0003.jpg"] == (b"ten", zipfile.ZIP_STORED)
+    metadata = json.loads(members["metadata.json"][0])
+    assert metadata["chapter"] == {"number": 1, "pages_count": 3}
+    assert [page["filename"] for page in metadata["pages"]] == [
+        "1.bmp",
+        "2.png",
+        "10.jpg",
+    ]
+
+
+def test_7z_is_repacked_without_extraction(tmp_path):
+    source = str(tmp_path / "source.7z")
+    with py7zr.SevenZipFile(source, "w") as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(data, name)
+    output = str(tmp_path / "chapter.cbz")
+
+    repack_to_cbz(source, output)
+
+    assert sorted(read_cbz(output)) == ["0001.bmp", "0002.png", "0003.jpg"]
+    assert read_cbz(output)["0003.jpg"][0] == b"ten"
+
+
+def test_source_without_pages(tmp_path):
+    source = make_zip(tmp_path / "source.zip", {"readme.txt": b"hello"})
+
+    with pytest.raises(ValueError):
+        repack_to_cbz(source, str(tmp_path / "chapter.cbz"))
+    assert os.listdir(tmp_path) == ["source.zip"]
+
+
+@pytest.mark.asyncio
+async def test_convert_chapters_in_worker_processes(tmp_path):
+    manga = SimpleNamespace(
+        id=uuid.uuid4(),
+        title="Test Manga",
+        year=None,
+        status=None,
+        type=None,
+        provider=None,
+        external_id=None,
+    )
+    conversions = []
+    for number in range(1, 4):
+        source = make_zip(tmp_path / f"{number}.zip", {"1.jpg": b"page"})
+        chapter = SimpleNamespace(
+            id=uuid.uuid4(),
+            title=None,
+            number=str(number),
+            volume=None,
+            language="en",
+            source=None,
+            file_path=source,
+        )
+        conversions.append((manga, chapter, str(tmp_path / f"{number}.cbz")))
+    missing = SimpleNamespace(id=uuid.uuid4(), file_path=str(tmp_path / "gone.zip"))
+    conversions.append((manga, missing, str(tmp_path / "gone.cbz")))
+
+    converter = CBZConverter(max_workers=2)
+    try:
+        summary = await converter.convert_chapters(conversions)
+    finally:
+        converter.shutdown()
+
+    assert summary["converted"] == 3
+    assert summary["failed"] == 1
+    assert summary["pages"] == 3
+    assert summary["chapters_per_second"] > 0
+    metadata = json.loads(read_cbz(tmp_path / "2.cbz")["metadata.json"][0])
+    assert metadata["manga"]["title"] == "Test Manga"
+    assert metadata["chapter"]["number"] == "2"
+
+
+@pytest.mark.asyncio
+async def test_batch_repacks_chapter_directories_together(tmp_path):
+    chapters = []
+    for name in ("1", "2"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "1.jpg").write_bytes(b"page")
+        chapters.append(
+            SimpleNamespace(id=uuid.uuid4(), file_path=str(tmp_path / name))
+        )
+    archived = make_zip(tmp_path / "3.cbz", {"1.jpg": b"page"})
+    chapters.append(SimpleNamespace(id=uuid.uuid4(), file_path=archived))
+    batches = []
+
+    class FakeConverter:
+        async def convert_chapters(self, conversions):
+            batches.append([chapter.file_path for _, chapter, _ in conversions])
+            for _, _, output_path in conversions:
+                make_zip(output_path, {"1.jpg": b"page"})
+            return {"converted": len(conversions), "failed": 0}
+
+    organizer = BatchOrganizer()
+    organizer.cbz_converter = FakeConverter()
+    manga = SimpleNamespace(id=uuid.uuid4())
+
+    converted, summary = await organizer._convert_chapter_directories(
+        manga, chapters, SimpleNamespace(create_cbz_files=True)
+    )
+
+    assert batches == [[str(tmp_path / "1"), str(tmp_path / "2")]]
+    assert converted == {
+        chapters[0].id: str(tmp_path / "1.repacked.cbz"),
+        chapters[1].id: str(tmp_path / "2.repacked.cbz"),
+    }
+    assert summary["converted"] == 2
+    assert await organizer._convert_chapter_directories(
+        manga, chapters, SimpleNamespace(create_cbz_files=False)
+    ) == ({}, None)
@@ -0,0 +1,241 @@
+"""
+Tests for downloading chapters straight into their CBZ.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.providers.registry import provider_registry
+from app.core.services import download
+from app.core.services.cbz_sink import CBZPageSink
+
+SOURCE = "FakeProvider:chapter-1"
+
+
+class FakeProvider:
+    name = "FakeProvider"
+    url = "https://example"
+
+    def __init__(self, pages=5, fail_pages=(), stop_at=None, block_at=None):
+        self.pages = pages
+        self.fail_pages = set(fail_pages)
+        self.stop_at = stop_at
+        self.block_at = block_at
+        self.blocked = asyncio.Event()
+        self.downloads = []
+
+    async def get_pages(self, manga_id, chapter_id):
+        return [
+            f"https://cdn.example/{chapter_id}/{n}.png"
+            for n in range(1, self.pages + 1)
+        ]
+
+    def get_chapter_url(self, manga_id, chapter_id):
+        return f"https://example/{manga_id}/{chapter_id}"
+
+    async def download_page(self, page_url, referer=None):
+        self.downloads.append(page_url)
+        page_number = int(page_url.rsplit("/", 1)[1].split(".")[0])
+        if page_number == self.stop_at:
+            raise asyncio.CancelledError()
+        if page_number == self.block_at:
+            self.blocked.set()
+            await asyncio.Event().wait()  # Until the download is cancelled
+        if page_number in self.fail_pages:
+            raise RuntimeError("connection reset")
+        return b"page %d" % page_number
+
+
+class FakeSession:
+    def __init__(self, chapter):
+        self.chapter = chapter
+        self.deleted_pages = False
+
+    async def get(self, model, ident):
+        return self.chapter
+
+    async def execute(self, statement):
+        self.deleted_pages = True
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    def add_all(self, pages):
+        self.pages = list(pages)
+
+    async def commit(self):
+        pass
+
+
+class TestCBZPageSink:
+    def test_pages_are_stored_and_metadata_deflated(self, tmp_path):
+        cbz_path = str(tmp_path / "chapter.cbz")
+        sink = CBZPageSink(cbz_path, SOURCE)
+        sink.open()
+        sink.add_page(2, ".jpg", b"two")
+        sink.add_page(1, ".png", b"one")
+
+        assert not os.path.exists(cbz_path)
+        assert sink.finalize({"title": "Chapter 1"}) == cbz_path
+        assert not os.path.exists(sink.part_path)
+
+        with zipfile.ZipFile(cbz_path) as archive:
+            types = {info.filename: info.compress_type for info in archive.infolist()}
+            assert archive.read("0001.png") == b"one"
+            assert json.loads(archive.read("metadata.json")) == {"title": "Chapter 1"}
+            assert archive.comment == b""
+        assert types == {
+            "0002.jpg": zipfile.ZIP_STORED,
+            "0001.png": zipfile.ZIP_STORED,
+            "metadata.json": zipfile.ZIP_DEFLATED,
+        }
+
+    def test_closed_part_is_resumed(self, tmp_path):
+        cbz_path = str(tmp_path / "chapter.cbz")
+        sink = CBZPageSink(cbz_path, SOURCE)
+        sink.open()
+        sink.add_page(1, ".jpg", b"one")
+        sink.close()
+
+        resumed = CBZPageSink(cbz_path, SOURCE)
+
+        assert resumed.open() == {1: "0001.jpg"}
+        resumed.add_page(2, ".jpg", b"two")
+        resumed.finalize()
+        with zipfile.ZipFile(cbz_path) as archive:
+            assert archive.namelist() == ["0001.jpg", "0002.jpg"]
+
+    def test_other_source_starts_over(self, tmp_path):
+        cbz_path = str(tmp_path / "chapter.cbz")
+        sink = CBZPageSink(cbz_path, SOURCE)
+        sink.open()
+        sink.add_page(1, ".jpg", b"one")
+        sink.close()
+
+        assert CBZPageSink(cbz_path, "Other:chapter-9").open() == {}
+
+    def test_damaged_part_starts_over(self, tmp_path):
+        cbz_path = str(tmp_path / "chapter.cbz")
+        with open(f"{cbz_path}.part", "wb") as f:
+            f.write(b"PK\x03\x04 truncated")
+
+        sink = CBZPageSink(cbz_path, SOURCE)
+
+        assert sink.open() == {}
+        sink.add_page(1, ".jpg", b"one")
+        sink.finalize()
+        with zipfile.ZipFile(cbz_path) as archive:
+            assert archive.testzip() is None
+
+
+class TestStreamedDownload:
+    @pytest.fixture
+    def environment(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+        monkeypatch.setattr(settings, "DOWNLOAD_CHAPTERS_AS_CBZ", True)
+        sleep = asyncio.sleep
+        monkeypatch.setattr(download.asyncio, "sleep", lambda delay: sleep(0))
+        manga_id, chapter_id = uuid.uuid4(), uuid.uuid4()
+        cbz_path = f"{download.get_chapter_storage_path(manga_id, chapter_id)}.cbz"
+        return SimpleNamespace(
+            manga_id=manga_id, chapter_id=chapter_id, cbz_path=cbz_path
+        )
+
+    async def run(self, environment, provider, monkeypatch):
+        monkeypatch.setattr(provider_registry, "get_provider", lambda name: provider)
+        db = FakeSession(
+            SimpleNamespace(
+                manga_id=environment.manga_id, pages_count=0, file_path=None
+            )
+        )
+        await download.download_chapter(
+            environment.manga_id,
+            environment.chapter_id,
+            provider.name,
+            "manga-1",
+            f"chapter-{environment.chapter_id}",
+            db,
+        )
+        return db
+
+    @pytest.mark.asyncio
+    async def test_pages_go_straight_into_the_archive(self, environment, monkeypatch):
+        db = await self.run(environment, FakeProvider(), monkeypatch)
+
+        assert db.chapter.file_path == environment.cbz_path
+        assert db.chapter.pages_count == 5
+        assert db.deleted_pages
+        with zipfile.ZipFile(environment.cbz_path) as archive:
+            assert archive.read("0005.png") == b"page 5"
+        chapter_dir = os.path.dirname(environment.cbz_path)
+        assert os.listdir(chapter_dir) == [os.path.basename(environment.cbz_path)]
+
+    @pytest.mark.asyncio
+    async def test_retry_only_fetches_missing_pages(self, environment, monkeypatch):
+        flaky = FakeProvider(fail_pages={4, 5})
+        db = await self.run(environment, flaky, monkeypatch)
+        assert db.chapter.pages_count == 3
+        assert db.chapter.download_status == "error"
+
+        retry = FakeProvider()
+        db = await self.run(environment, retry, monkeypatch)
+
+        assert [url.rsplit("/", 1)[1] for url in retry.downloads] == ["4.png", "5.png"]
+        assert db.chapter.pages_count == 5
+        assert db.chapter.download_status == "downloaded"
+        assert db.chapter.download_error is None
+        with zipfile.ZipFile(environment.cbz_path) as archive:
+            assert sorted(archive.namelist()) == [f"000{n}.png" for n in range(1, 6)]
+
+    @pytest.mark.asyncio
+    async def test_interrupted_download_resumes(self, environment, monkeypatch):
+        with pytest.raises(asyncio.CancelledError):
+            await self.run(environment, FakeProvider(stop_at=3), monkeypatch)
+        assert not os.path.exists(environment.cbz_path)
+
+        retry = FakeProvider()
+        await self.run(environment, retry, monkeypatch)
+
+        assert len(retry.downloads) == 3
+        assert not os.path.exists(f"{environment.cbz_path}.part")
+
+    @pytest.mark.asyncio
+    async def test_paused_download_resumes_from_the_part(
+        self, environment, monkeypatch
+    ):
+        paused = FakeProvider(block_at=3)
+        download_task = asyncio.create_task(self.run(environment, paused, monkeypatch))
+        await asyncio.wait_for(paused.blocked.wait(), 1)
+
+        # Pausing cancels the running download
+        download_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await download_task
+        with zipfile.ZipFile(f"{environment.cbz_path}.part") as archive:
+            assert sorted(archive.namelist()) == ["0001.png", "0002.png"]
+
+        resumed = FakeProvider()
+        db = await self.run(environment, resumed, monkeypatch)
+
+        assert [url.rsplit("/", 1)[1] for url in resumed.downloads] == [
+            "3.png",
+            "4.png",
+            "5.png",
+        ]
+        assert db.chapter.pages_count == 5
+        with zipfile.ZipFile(environment.cbz_path) as archive:
+            assert archive.read("0001.png") == b"page 1"
+
+    @pytest.mark.asyncio
+    async def test_complete_download_is_not_resumed(self, environment, monkeypatch):
+        await self.run(environment, FakeProvider(), monkeypatch)
+
+        again = FakeProvider()
+        await self.run(environment, again, monkeypatch)
+
+        assert len(again.downloads) == 5
@@ -0,0 +1,199 @@
+"""
+Tests for the chapter page manifest cache.
+"""
+
+import uuid
+import zipfile
+
+import pytest
+
+from app.core import deps
+from app.core.services.chapter_manifest import (
+    ChapterManifest,
+    ChapterManifestCache,
+    PageEntry,
+    describe_pages,
+)
+
+MANGA_ID = uuid.uuid4()
+CHAPTER_ID = uuid.uuid4()
+
+
+class FakeValkey:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def make_manifest(manga_id=MANGA_ID):
+    return ChapterManifest(
+        manga_id=str(manga_id),
+        chapter_id=str(CHAPTER_ID),
+        pages={
+            1: PageEntry("image/jpeg", 10, '"a"', file_path="/pages/0001.jpg"),
+            2: PageEntry("image/png", 20, '"b"', archive_path="/chapter.cbz"),
+        },
+    )
+
+
+@pytest.fixture
+def valkey(monkeypatch):
+    valkey = FakeValkey()
+    monkeypatch.setattr(deps, "redis_client", valkey)
+    return valkey
+
+
+@pytest.fixture
+def cache():
+    cache = ChapterManifestCache()
+    cache.builds = 0
+
+    async def build(db, chapter_id):
+        cache.builds += 1
+        return make_manifest()
+
+    cache._build = build
+    return cache
+
+
+class TestDescribePages:
+    def test_loose_files(self, tmp_path):
+        jpg = tmp_path / "0001.jpg"
+        jpg.write_bytes(b"j" * 10)
+        png = tmp_path / "0002.png"
+        png.write_bytes(b"p" * 20)
+
+        pages = describe_pages([(1, str(jpg)), (2, str(png))], None)
+
+        assert pages[1].media_type == "image/jpeg"
+        assert pages[1].size == 10
+        assert pages[1].file_path == str(jpg)
+        assert pages[2].media_type == "image/png"
+        assert pages[1].etag != pages[2].etag
+
+    def test_missing_files_fall_back_to_the_archive(self, tmp_path):
+        archive = tmp_path / "chapter.cbz"
+        with zipfile.ZipFile(archive, "w") as cbz:
+            cbz.writestr("0001.jpg", b"a" * 5)
+            cbz.writestr("0002.webp", b"b" * 7)
+        loose = tmp_path / "0001.jpg"
+        loose.write_bytes(b"loose")
+
+        pages = describe_pages(
+            [(1, str(loose)), (2, str(tmp_path / "gone.webp"))], str(archive)
+        )
+
+        assert pages[1].file_path == str(loose)
+        assert pages[2].archive_path == str(archive)
+        assert pages[2].media_type == "image/webp"
+        assert pages[2].size == 7
+
+    def test_missing_files_without_archive_are_left_out(self, tmp_path):
+        assert describe_pages([(1, str(tmp_path / "gone.jpg"))], None) == {}
+
+
+class TestChapterManifest:
+    def test_json_round_trip(self):
+        manifest = make_manifest()
+
+        assert ChapterManifest.from_json(manifest.to_json()) == manifest
+
+
+class TestChapterManifestCache:
+    @pytest.mark.asyncio
+    async def test_built_once(self, cache, valkey):
+        first = await cache.get(None, MANGA_ID, CHAPTER_ID)
+        second = await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert first is second
+        assert cache.builds == 1
+        assert f"chapter_manifest:{CHAPTER_ID}" in valkey.data
+
+    @pytest.mark.asyncio
+    async def test_valkey_survives_a_local_miss(self, cache, valkey):
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+        cache.clear()
+
+        manifest = await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert manifest == make_manifest()
+        assert cache.builds == 1
+        assert cache.get_stats()["valkey_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_works_without_valkey(self, cache, monkeypatch):
+        monkeypatch.setattr(deps, "redis_client", None)
+
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert cache.builds == 1
+
+    @pytest.mark.asyncio
+    async def test_chapter_of_another_manga(self, cache, valkey):
+        assert await cache.get(None, uuid.uuid4(), CHAPTER_ID) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_both_levels(self, cache, valkey):
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        await cache.invalidate(CHAPTER_ID)
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert cache.builds == 2
+
+    @pytest.mark.asyncio
+    async def test_local_entries_expire(self, cache, monkeypatch):
+        monkeypatch.setattr(deps, "redis_client", None)
+        cache.LOCAL_TTL_SECONDS = 0
+
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert cache.builds == 2
+
+    @pytest.mark.asyncio
+    async def test_lru_bound(self, cache, monkeypatch):
+        monkeypatch.setattr(deps, "redis_client", None)
+        cache.max_entries = 2
+
+        for _ in range(3):
+            await cache.get(None, MANGA_ID, uuid.uuid4())
+
+        assert cache.get_stats()["entries"] == 2
+
+
+class TestPageEndpoint:
+    @pytest.fixture
+    def endpoint(self, cache, valkey, monkeypatch):
+        from app.api.api_v1.endpoints import manga
+
+        monkeypatch.setattr(manga, "chapter_manifest_cache", cache)
+        monkeypatch.setattr(
+            manga.read_ahead_service, "get_local_page", lambda *args: None
+        )
+        monkeypatch.setattr(
+            manga.read_ahead_service, "read_ahead_local", lambda *args: None
+        )
+        return manga
+
+    @pytest.mark.asyncio
+    async def test_missing_loose_file_invalidates_the_manifest(self, endpoint, cache):
+        request = type("FakeRequest", (), {"headers": {}})()
+
+        with pytest.raises(endpoint.HTTPException) as exc_info:
+            await endpoint.get_manga_page(
+                str(MANGA_ID), str(CHAPTER_ID), 1, request, None, None
+            )
+        await cache.get(None, MANGA_ID, CHAPTER_ID)
+
+        assert exc_info.value.status_code == 404
+        assert cache.builds == 2
@@ -0,0 +1,174 @@
+"""
+Tests for resumable chapter downloads.
+"""
+
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.providers.registry import provider_registry
+from app.core.services import download
+from app.core.services.download_checkpoint import ChapterCheckpoint, LoosePageSink
+from tests.test_cbz_sink import FakeProvider
+
+SOURCE = "FakeProvider:chapter-1"
+
+
+class FakeSession:
+    def __init__(self, chapter):
+        self.chapter = chapter
+        self.pages = []
+
+    async def get(self, model, ident):
+        return self.chapter
+
+    async def execute(self, statement):
+        self.pages = []
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    def add_all(self, pages):
+        self.pages.extend(pages)
+
+    async def commit(self):
+        pass
+
+
+class TestChapterCheckpoint:
+    def test_round_trip(self, tmp_path):
+        page = tmp_path / "0001.jpg"
+        page.write_bytes(b"data")
+        ChapterCheckpoint.load(str(tmp_path), SOURCE).record(1, str(page), b"data")
+
+        checkpoint = ChapterCheckpoint.load(str(tmp_path), SOURCE)
+
+        assert checkpoint.completed_pages(3) == {1: str(page)}
+
+    def test_damaged_pages_are_not_reused(self, tmp_path):
+        checkpoint = ChapterCheckpoint.load(str(tmp_path), SOURCE)
+        for number in (1, 2, 3):
+            page = tmp_path / f"000{number}.jpg"
+            page.write_bytes(b"data")
+            checkpoint.record(number, str(page), b"data")
+
+        (tmp_path / "0001.jpg").write_bytes(b"dat")
+        (tmp_path / "0002.jpg").write_bytes(b"DATA")
+        (tmp_path / "0003.jpg").unlink()
+
+        assert ChapterCheckpoint.load(str(tmp_path), SOURCE).completed_pages(3) == {}
+
+    def test_other_source_is_discarded(self, tmp_path):
+        page = tmp_path / "0001.jpg"
+        page.write_bytes(b"data")
+        ChapterCheckpoint.load(str(tmp_path), SOURCE).record(1, str(page), b"data")
+
+        checkpoint = ChapterCheckpoint.load(str(tmp_path), "Other:chapter-9")
+
+        assert checkpoint.completed_pages(1) == {}
+        assert not page.exists()
+        assert not (tmp_path / ChapterCheckpoint.FILENAME).exists()
+
+    def test_unreadable_checkpoint_is_ignored(self, tmp_path):
+        (tmp_path / ChapterCheckpoint.FILENAME).write_text("{not json")
+
+        assert ChapterCheckpoint.load(str(tmp_path), SOURCE).pages == {}
+
+
+class TestLoosePageSink:
+    def test_staged_pages_replace_the_chapter(self, tmp_path):
+        chapter_path = tmp_path / "chapter"
+        chapter_path.mkdir()
+        (chapter_path / "0001.png").write_bytes(b"old")
+        sink = LoosePageSink(str(chapter_path), staging_path=f"{chapter_path}.hedge-0")
+        sink.open()
+        sink.add_page(1, ".png", b"new")
+
+        assert sink.finalize() == str(chapter_path)
+
+        assert (chapter_path / "0001.png").read_bytes() == b"new"
+        assert not (tmp_path / "chapter.hedge-0").exists()
+        assert [page.file_path for page in sink.page_rows(uuid.uuid4())] == [
+            str(chapter_path / "0001.png")
+        ]
+
+
+class TestResumedDownload:
+    @pytest.fixture
+    def environment(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+        sleep = asyncio.sleep
+        monkeypatch.setattr(download.asyncio, "sleep", lambda delay: sleep(0))
+        return SimpleNamespace(manga_id=uuid.uuid4(), chapter_id=uuid.uuid4())
+
+    async def run(self, environment, provider, monkeypatch):
+        monkeypatch.setattr(provider_registry, "get_provider", lambda name: provider)
+        db = FakeSession(
+            SimpleNamespace(
+                manga_id=environment.manga_id, pages_count=0, file_path=None
+            )
+        )
+        await download.download_chapter(
+            environment.manga_id,
+            environment.chapter_id,
+            provider.name,
+            "manga-1",
+            f"chapter-{environment.chapter_id}",
+            db,
+        )
+        return db
+
+    @pytest.mark.asyncio
+    async def test_retry_only_fetches_missing_pages(self, environment, monkeypatch):
+        flaky = FakeProvider(fail_pages={4, 5})
+        await self.run(environment, flaky, monkeypatch)
+
+        retry = FakeProvider()
+        db = await self.run(environment, retry, monkeypatch)
+
+        assert [url.rsplit("/", 1)[1] for url in retry.downloads] == ["4.png", "5.png"]
+        assert sorted(page.number for page in db.pages) == [1, 2, 3, 4, 5]
+        assert db.chapter.pages_count == 5
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_kept_until_complete(self, environment, monkeypatch):
+        chapter_path = download.get_chapter_storage_path(
+            environment.manga_id, environment.chapter_id
+        )
+        checkpoint_path = f"{chapter_path}/{ChapterCheckpoint.FILENAME}"
+
+        await self.run(environment, FakeProvider(fail_pages={2}), monkeypatch)
+        with open(checkpoint_path) as f:
+            assert sorted(json.load(f)["pages"]) == ["1", "3", "4", "5"]
+
+        await self.run(environment, FakeProvider(), monkeypatch)
+        with pytest.raises(FileNotFoundError):
+            open(checkpoint_path)
+
+    @pytest.mark.asyncio
+    async def test_paused_download_resumes_from_the_checkpoint(
+        self, environment, monkeypatch
+    ):
+        paused = FakeProvider(block_at=3)
+        download_task = asyncio.create_task(self.run(environment, paused, monkeypatch))
+        await asyncio.wait_for(paused.blocked.wait(), 1)
+
+        # Pausing cancels the running download
+        download_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await download_task
+
+        resumed = FakeProvider()
+        db = await self.run(environment, resumed, monkeypatch)
+
+        assert [url.rsplit("/", 1)[1] for url in resumed.downloads] == [
+            "3.png",
+            "4.png",
+            "5.png",
+        ]
+        assert sorted(page.number for page in db.pages) == [1, 2, 3, 4, 5]
+        assert db.chapter.file_path == download.get_chapter_storage_path(
+            environment.manga_id, environment.chapter_id
+        )
@@ -0,0 +1,201 @@
+"""
+Tests for single-flight chapter downloads.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from app.core import deps
+from app.core.services import background
+from app.core.services.download_coordinator import (
+    REFRESH_SCRIPT,
+    RELEASE_SCRIPT,
+    DownloadCoordinator,
+    chapter_download_key,
+    download_coordinator,
+    pending_chapter_id,
+)
+
+
+class FakeValkey:
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def sadd(self, key, member):
+        self.values.setdefault(key, set()).add(member)
+
+    async def smembers(self, key):
+        return set(self.values.get(key, ()))
+
+    async def expire(self, key, seconds):
+        return key in self.values
+
+    async def eval(self, script, numkeys, key, task_id, *args):
+        if self.values.get(key) != task_id:
+            return 0
+        if script == RELEASE_SCRIPT:
+            del self.values[key]
+        assert script in (RELEASE_SCRIPT, REFRESH_SCRIPT)
+        return 1
+
+
+@pytest.fixture
+def valkey(monkeypatch):
+    fake = FakeValkey()
+    monkeypatch.setattr(deps, "redis_client", fake)
+    return fake
+
+
+@pytest.fixture
+def no_valkey(monkeypatch):
+    monkeypatch.setattr(deps, "redis_client", None)
+
+
+@pytest.mark.asyncio
+async def test_second_request_attaches_to_running_download(no_valkey):
+    coordinator = DownloadCoordinator()
+    key = chapter_download_key(uuid.uuid4())
+
+    assert await coordinator.claim(key, "first") is None
+    assert await coordinator.claim(key, "first") is None
+    assert await coordinator.claim(key, "second") == "first"
+
+    await coordinator.release(key, "first")
+    assert await coordinator.claim(key, "second") is None
+    assert coordinator.get_stats()["attached"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unused_claim_expires(no_valkey, monkeypatch):
+    coordinator = DownloadCoordinator()
+    monkeypatch.setattr(coordinator, "LOCK_TTL_SECONDS", 0)
+    key = chapter_download_key(uuid.uuid4())
+
+    await coordinator.claim(key, "never-started")
+
+    assert await coordinator.claim(key, "retry") is None
+
+
+@pytest.mark.asyncio
+async def test_claims_are_shared_through_valkey(valkey):
+    worker_a, worker_b = DownloadCoordinator(), DownloadCoordinator()
+    key = chapter_download_key(uuid.uuid4())
+
+    assert await worker_a.claim(key, "task-a") is None
+    assert await worker_b.claim(key, "task-b") == "task-a"
+
+    # Only the owner's release clears the lock
+    await worker_b.release(key, "task-b")
+    assert await worker_b.get_owner(key) == "task-a"
+    await worker_a.release(key, "task-a")
+    assert await worker_b.claim(key, "task-b") is None
+
+
+@pytest.mark.asyncio
+async def test_hold_releases_after_failure(valkey):
+    coordinator = DownloadCoordinator()
+    key = chapter_download_key(uuid.uuid4())
+    await coordinator.claim(key, "task")
+
+    with pytest.raises(RuntimeError):
+        async with coordinator.hold(key, "task"):
+            raise RuntimeError("download failed")
+
+    assert await coordinator.get_owner(key) is None
+    assert valkey.values == {}
+
+
+@pytest.mark.asyncio
+async def test_wait_for_running_download(no_valkey, monkeypatch):
+    coordinator = DownloadCoordinator()
+    monkeypatch.setattr(coordinator, "POLL_SECONDS", 0.01)
+    key = chapter_download_key(uuid.uuid4())
+    await coordinator.claim(key, "task")
+
+    waiter = asyncio.create_task(coordinator.wait_for(key))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    await coordinator.release(key, "task")
+    await asyncio.wait_for(waiter, 1)
+
+
+@pytest.mark.asyncio
+async def test_duplicate_chapter_task_follows_running_one(no_valkey):
+    manga_id, chapter_id = uuid.uuid4(), uuid.uuid4()
+    owner, other = uuid.uuid4(), uuid.uuid4()
+    key = chapter_download_key(chapter_id)
+    background.download_tasks["running"] = {
+        "task_id": "running",
+        "user_id": str(owner),
+        "status": "downloading",
+    }
+    await download_coordinator.claim(key, "running")
+
+    try:
+        task_id = await background.download_chapter_task(
+            manga_id, chapter_id, "Provider", "m", "c", other
+        )
+
+        assert task_id == "running"
+        assert list(background.get_user_download_tasks(other)) == ["running"]
+        assert background.can_view_download_task(
+            background.get_download_task("running"), other
+        )
+        assert not background.can_view_download_task(
+            background.get_download_task("running"), uuid.uuid4()
+        )
+    finally:
+        await download_coordinator.release(key, "running")
+        del background.download_tasks["running"]
+
+
+@pytest.mark.asyncio
+async def test_followers_see_tasks_run_by_other_workers(valkey):
+    chapter_id = uuid.uuid4()
+    owner, other = uuid.uuid4(), uuid.uuid4()
+    key = chapter_download_key(chapter_id)
+    task = {
+        "task_id": "remote",
+        "chapter_id": str(chapter_id),
+        "user_id": str(owner),
+        "status": "downloading",
+        "progress": 40,
+    }
+
+    # Another worker claimed the chapter and published its task
+    assert await DownloadCoordinator().claim(key, "remote") is None
+    await download_coordinator.publish_task(task)
+
+    task_id = await background.download_chapter_task(
+        uuid.uuid4(), chapter_id, "Provider", "m", "c", other
+    )
+
+    assert task_id == "remote"
+    assert "remote" not in background.download_tasks
+    shared = await background.find_download_task("remote")
+    assert shared["progress"] == 40
+    assert background.can_view_download_task(shared, other)
+    assert list(await background.find_user_download_tasks(other)) == ["remote"]
+    assert await background.find_user_download_tasks(uuid.uuid4()) == {}
+
+
+def test_chapters_without_a_row_share_a_key():
+    manga_id = uuid.uuid4()
+
+    first = pending_chapter_id(manga_id, "MangaDex", "c-1")
+
+    assert pending_chapter_id(manga_id, "mangadex", "c-1") == first
+    assert pending_chapter_id(manga_id, "MangaDex", "c-2") != first
+    assert pending_chapter_id(uuid.uuid4(), "MangaDex", "c-1") != first
@@ -0,0 +1,233 @@
+"""
+Tests for concurrent series downloads.
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core.progress.events import ProgressStatus
+from app.core.progress.tracker import ProgressTracker
+from app.core.services import download_orchestrator
+from app.core.services.download_coordinator import (
+    DownloadCoordinator,
+    chapter_download_key,
+)
+from app.core.services.download_orchestrator import (
+    ChapterDownload,
+    DownloadBudget,
+    SeriesDownloadOrchestrator,
+)
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+class FakeDownloads:
+    """Stands in for download_chapter and records how it was called."""
+
+    def __init__(self, fail_numbers=()):
+        self.fail_numbers = set(fail_numbers)
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, chapter_id, progress_callback, budget, **kwargs):
+        number = self.numbers[chapter_id]
+        self.started.append(number)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            async with budget.request("FakeProvider"):
+                await asyncio.sleep(0.01)
+            await progress_callback(1, 2, 50.0)
+            if number in self.fail_numbers:
+                raise RuntimeError("provider went away")
+        finally:
+            self.running -= 1
+
+
+def make_chapters(numbers, read=()):
+    return [
+        ChapterDownload(uuid.uuid4(), number, f"ext-{number}", is_read=number in read)
+        for number in numbers
+    ]
+
+
+@pytest.fixture
+def tracker():
+    return ProgressTracker()
+
+
+async def run_series(
+    monkeypatch,
+    chapters,
+    downloads,
+    tracker=None,
+    max_chapters=2,
+    coordinator=None,
+    **kwargs,
+):
+    downloads.numbers = {chapter.chapter_id: chapter.number for chapter in chapters}
+    monkeypatch.setattr(download_orchestrator, "download_chapter", downloads)
+    orchestrator = SeriesDownloadOrchestrator(
+        DownloadBudget(max_requests=4, max_requests_per_provider=4),
+        max_chapters=max_chapters,
+        session_factory=fake_session,
+        tracker=tracker or ProgressTracker(),
+        coordinator=coordinator or DownloadCoordinator(),
+    )
+    return await orchestrator.download_series(
+        uuid.uuid4(), uuid.uuid4(), "Series", "FakeProvider", "m", chapters, **kwargs
+    )
+
+
+def bulk_operation(tracker):
+    (operation,) = [
+        operation
+        for operation in tracker._operations.values()
+        if operation.metadata.get("is_bulk_operation")
+    ]
+    return operation
+
+
+class TestDownloadBudget:
+    @pytest.mark.asyncio
+    async def test_request_caps(self):
+        budget = DownloadBudget(max_requests=3, max_requests_per_provider=2)
+        peak = {"a": 0, "b": 0, "all": 0}
+        running = {"a": 0, "b": 0}
+
+        async def fetch(provider):
+            async with budget.request(provider):
+                running[provider] += 1
+                peak[provider] = max(peak[provider], running[provider])
+                peak["all"] = max(peak["all"], budget.get_stats()["in_flight"])
+                await asyncio.sleep(0.01)
+                running[provider] -= 1
+
+        await asyncio.gather(*(fetch(provider) for provider in "aaaabbbb"))
+
+        assert peak["a"] == 2
+        assert peak["b"] == 2
+        assert peak["all"] == 3
+        assert budget.get_stats()["requests"] == 8
+
+    @pytest.mark.asyncio
+    async def test_byte_budget(self, monkeypatch):
+        delays = []
+        sleep = asyncio.sleep
+
+        async def record_sleep(delay):
+            delays.append(delay)
+            await sleep(0)
+
+        monkeypatch.setattr(download_orchestrator.asyncio, "sleep", record_sleep)
+        budget = DownloadBudget(4, 4, bytes_per_second=1000)
+
+        for _ in range(3):
+            await budget.consume(500)
+
+        # One second of burst, then the rate applies
+        assert len(delays) == 1
+        assert delays[0] == pytest.approx(0.5, abs=0.05)
+        assert budget.get_stats()["bytes"] == 1500
+
+    @pytest.mark.asyncio
+    async def test_unlimited_bytes(self):
+        budget = DownloadBudget(4, 4)
+
+        await budget.consume(10**9)
+
+        assert budget.get_stats()["throttled_seconds"] == 0
+
+
+class TestSeriesDownloadOrchestrator:
+    @pytest.mark.asyncio
+    async def test_unread_lowest_chapters_first(self, monkeypatch):
+        downloads = FakeDownloads()
+        chapters = make_chapters(["10", "2", "1", "Extra", "3"], read={"1"})
+
+        await run_series(monkeypatch, chapters, downloads, max_chapters=1)
+
+        assert downloads.started == ["2", "3", "10", "Extra", "1"]
+
+    @pytest.mark.asyncio
+    async def test_chapters_run_concurrently(self, monkeypatch):
+        downloads = FakeDownloads()
+        finished = []
+
+        async def progress(done, total):
+            finished.append((done, total))
+
+        results = await run_series(
+            monkeypatch,
+            make_chapters([str(n) for n in range(1, 8)]),
+            downloads,
+            max_chapters=3,
+            progress_callback=progress,
+        )
+
+        assert downloads.max_running == 3
+        assert results == {"completed": 7, "failed": 0}
+        assert finished[-1] == (7, 7)
+
+    @pytest.mark.asyncio
+    async def test_failures_do_not_stop_the_series(self, monkeypatch, tracker):
+        downloads = FakeDownloads(fail_numbers={"2"})
+
+        results = await run_series(
+            monkeypatch, make_chapters(["1", "2", "3"]), downloads, tracker
+        )
+
+        assert results == {"completed": 2, "failed": 1}
+        bulk = bulk_operation(tracker)
+        assert bulk.successful_items == 2
+        assert bulk.failed_items == 1
+        assert bulk.status == ProgressStatus.COMPLETED
+
+    @pytest.mark.asyncio
+    async def test_bulk_operation_waits_for_every_chapter(self, monkeypatch, tracker):
+        downloads = FakeDownloads()
+
+        await run_series(
+            monkeypatch, make_chapters(["1", "2", "3", "4"]), downloads, tracker
+        )
+
+        bulk = bulk_operation(tracker)
+        assert len(bulk.child_operations) == 4
+        assert bulk.processed_items == 4
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_download(self, monkeypatch):
+        results = await run_series(monkeypatch, [], FakeDownloads())
+
+        assert results == {"completed": 0, "failed": 0}
+
+    @pytest.mark.asyncio
+    async def test_chapter_downloading_elsewhere_is_not_fetched_again(
+        self, monkeypatch
+    ):
+        downloads = FakeDownloads()
+        chapters = make_chapters(["1", "2"])
+        coordinator = DownloadCoordinator()
+        monkeypatch.setattr(coordinator, "POLL_SECONDS", 0.01)
+        key = chapter_download_key(chapters[0].chapter_id)
+        await coordinator.claim(key, "other-task")
+
+        async def finish_other_download():
+            await asyncio.sleep(0.05)
+            await coordinator.release(key, "other-task")
+
+        finishing = asyncio.create_task(finish_other_download())
+        results = await run_series(
+            monkeypatch, chapters, downloads, coordinator=coordinator
+        )
+        await finishing
+
+        assert downloads.started == ["2"]
+        assert results == {"completed": 2, "failed": 0}
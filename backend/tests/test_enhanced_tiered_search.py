@@ -1,7 +1,7 @@
 """Test suite for the enhanced tiered search service with database integration."""
 
 from datetime import datetime
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
@@ -22,6 +22,7 @@ from app.models.mangaupdates import (
     UniversalMangaEntry,
     UniversalMangaMapping,
 )
+from app.models.provider import ProviderSeriesMatch
 from app.schemas.search import SearchResponse, SearchResult
 
 
@@ -234,6 +235,52 @@ class TestEnhancedTieredSearchService:
             assert result_data["provider"] == sample_universal_entry.source_indexer
             assert result_data["is_nsfw"] == sample_universal_entry.is_nsfw
 
+    @pytest.mark.asyncio
+    async def test_batched_result_conversion(self, service, sample_universal_entry):
+        """Test enrichment uses a constant number of queries for a result page."""
+        entries = [sample_universal_entry]
+        for i in range(59):
+            entries.append(
+                UniversalMangaEntry(
+                    id=uuid4(),
+                    source_indexer="mangadex",
+                    source_id=f"md-{i}",
+                    title=f"Batch Manga {i}",
+                    is_nsfw=False,
+                    confidence_score=0.9,
+                    data_completeness=0.5,
+                )
+            )
+
+        library_manga = Manga(id=uuid4(), title="Test Manga")
+        provider_match = ProviderSeriesMatch(
+            manga_id=uuid4(),
+            provider="MangaPill",
+            external_id="mp-1",
+            external_url="https://mangapill.com/manga/mp-1",
+            confidence=0.8,
+            match_method="title_fuzzy",
+        )
+
+        library_result = MagicMock()
+        library_result.all.return_value = [(sample_universal_entry.id, library_manga)]
+        match_result = MagicMock()
+        match_result.all.return_value = [(entries[1].id, provider_match)]
+
+        db = AsyncMock()
+        db.execute.side_effect = [library_result, match_result]
+
+        results = await service._convert_to_search_results(entries, "user-id", True, db)
+
+        assert db.execute.await_count == 2
+        assert len(results) == 60
+        assert results[0].in_library is True
+        assert results[0].id == str(sample_universal_entry.id)
+        assert results[1].in_library is False
+        assert results[1].extra["provider_matches"][0]["provider"] == "MangaPill"
+        assert results[1].extra["provider_matches"][0]["external_id"] == "mp-1"
+        assert results[2].extra["provider_matches"] == []
+
     def test_confidence_scoring_logic(self, service):
         """Test confidence scoring between different metadata sources."""
         high_confidence = UniversalMetadata(
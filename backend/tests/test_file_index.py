@@ -0,0 +1,126 @@
+"""
+Tests for the incremental storage file index.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.services.file_index import INDEX_NAME, FileIndex
+
+
+def write(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def bump_mtime(path):
+    """Make a directory change visible even on coarse-grained filesystems."""
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FileIndex(str(tmp_path))
+    yield index
+    index.close()
+
+
+def test_sizes_are_answered_from_the_index(index, tmp_path):
+    write(tmp_path / "manga" / "a" / "0001.png", b"12345")
+    write(tmp_path / "manga" / "a" / "0002.png", b"123")
+    write(tmp_path / "manga" / "b" / "1 - One.cbz", b"1")
+
+    assert index.tree_size(str(tmp_path / "manga")) == 9
+    assert index.tree_size(str(tmp_path / "manga" / "a")) == 8
+    subdirs, files = index.list_dir(str(tmp_path / "manga"))
+    assert subdirs == [str(tmp_path / "manga" / "a"), str(tmp_path / "manga" / "b")]
+    assert files == []
+    assert not any(
+        INDEX_NAME in entry.path for entry in index.files_under(str(tmp_path))
+    )
+
+
+def test_only_changed_directories_are_listed_again(index, tmp_path):
+    for name in "abc":
+        write(tmp_path / name / "0001.png")
+
+    assert index.refresh() == 4
+    assert index.refresh() == 0
+
+    write(tmp_path / "b" / "0002.png", b"12")
+    bump_mtime(tmp_path / "b")
+
+    assert index.refresh() == 1
+    assert index.tree_size(str(tmp_path / "b")) == 3
+
+
+def test_removed_files_and_directories_are_forgotten(index, tmp_path):
+    write(tmp_path / "manga" / "a" / "v1" / "0001.png")
+    write(tmp_path / "manga" / "b" / "0001.png")
+    index.refresh()
+
+    (tmp_path / "manga" / "a" / "v1" / "0001.png").unlink()
+    (tmp_path / "manga" / "a" / "v1").rmdir()
+    (tmp_path / "manga" / "a").rmdir()
+    (tmp_path / "manga" / "b" / "0001.png").unlink()
+    bump_mtime(tmp_path / "manga")
+    bump_mtime(tmp_path / "manga" / "b")
+
+    assert index.files_under(str(tmp_path)) == []
+    assert index.get_stats()["dirs"] == 3
+
+
+def test_hashes_are_cached_until_the_file_changes(index, tmp_path):
+    page = tmp_path / "0001.png"
+    write(page, b"first")
+
+    first = index.get_hash(str(page))
+    assert index.get_hash(str(page)) == first
+    assert index.get_stats()["hashes"] == 1
+
+    write(page, b"second")
+    assert index.get_hash(str(page)) != first
+    assert index.get_stats()["hashes"] == 2
+
+
+def test_index_survives_reopening(tmp_path):
+    write(tmp_path / "a" / "0001.png")
+    FileIndex(str(tmp_path)).refresh()
+
+    reopened = FileIndex(str(tmp_path))
+    try:
+        assert reopened.refresh() == 0
+        assert len(reopened.files_under(str(tmp_path))) == 1
+    finally:
+        reopened.close()
+
+
+def test_queries_do_not_wait_for_a_running_refresh(index, tmp_path):
+    write(tmp_path / "a" / "0001.png")
+    write(tmp_path / "b" / "0001.png")
+    index.refresh()
+    write(tmp_path / "b" / "0002.png")
+    bump_mtime(tmp_path / "b")
+
+    listing, release = threading.Event(), threading.Event()
+    list_dir = index._list
+
+    def slow_list(path, info):
+        listing.set()
+        release.wait(5)
+        return list_dir(path, info)
+
+    index._list = slow_list
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        refresh = executor.submit(index.refresh)
+        assert listing.wait(5)
+        query = executor.submit(index.tree_size, str(tmp_path / "a"))
+        try:
+            assert query.result(timeout=5) == 1
+        finally:
+            release.set()
+        assert refresh.result(timeout=5) == 1
@@ -0,0 +1,176 @@
+"""
+Tests for the FlareSolverr session pool and clearance reuse.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.providers.anti_bot_routing import anti_bot_routes
+from app.core.providers.flaresolverr import (
+    FlareSolverrSessionPool,
+    is_challenge_response,
+)
+
+DOMAIN = "protected.example"
+SOLVED_UA = "Mozilla/5.0 (SolvedBrowser)"
+CHALLENGE_HTML = "<html><title>Just a moment...</title></html>"
+
+
+def protected_site(request: httpx.Request) -> httpx.Response:
+    """Serve a challenge unless the clearance cookie and solving UA are sent."""
+    cookies = request.headers.get("cookie", "")
+    if "cf_clearance=ok" in cookies and request.headers["user-agent"] == SOLVED_UA:
+        if request.url.path.endswith(".jpg"):
+            return httpx.Response(
+                200, content=b"\xff\xd8image", headers={"content-type": "image/jpeg"}
+            )
+        return httpx.Response(200, text="<html>chapter list</html>")
+
+    return httpx.Response(
+        403,
+        text=CHALLENGE_HTML,
+        headers={"content-type": "text/html", "cf-mitigated": "challenge"},
+    )
+
+
+@pytest.fixture
+def pool():
+    anti_bot_routes.forget(DOMAIN)
+    pool = FlareSolverrSessionPool("http://flaresolverr:8191")
+    pool._clients[DOMAIN] = httpx.AsyncClient(
+        transport=httpx.MockTransport(protected_site)
+    )
+    pool.solve_calls = 0
+
+    async def fake_solution(domain, url, headers):
+        pool.solve_calls += 1
+        await asyncio.sleep(0.01)
+        return {
+            "status": 200,
+            "response": "<html>solved in browser</html>",
+            "url": url,
+            "userAgent": SOLVED_UA,
+            "cookies": [
+                {
+                    "name": "cf_clearance",
+                    "value": "ok",
+                    "domain": DOMAIN,
+                    "path": "/",
+                    "expiry": time.time() + 3600,
+                }
+            ],
+        }
+
+    pool._request_solution = fake_solution
+    return pool
+
+
+class TestFlareSolverrSessionPool:
+    @pytest.mark.asyncio
+    async def test_challenge_solved_once_then_direct(self, pool):
+        first = await pool.fetch(f"https://{DOMAIN}/manga/1", {"User-Agent": "x"})
+        second = await pool.fetch(f"https://{DOMAIN}/manga/2", {"User-Agent": "x"})
+
+        assert first.from_flaresolverr
+        assert first.text == "<html>solved in browser</html>"
+        assert not second.from_flaresolverr
+        assert second.text == "<html>chapter list</html>"
+        assert pool.solve_calls == 1
+        assert pool.get_clearance(DOMAIN).user_agent == SOLVED_UA
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_solve(self, pool):
+        results = await asyncio.gather(
+            *(pool.fetch(f"https://{DOMAIN}/manga/{i}") for i in range(5))
+        )
+
+        assert all(result.status_code == 200 for result in results)
+        assert pool.solve_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_binary_get_retries_with_clearance(self, pool):
+        response = await pool.get(f"https://{DOMAIN}/pages/1.jpg")
+
+        assert response.status_code == 200
+        assert response.content == b"\xff\xd8image"
+        assert pool.solve_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_reappearing_challenge_is_solved_again(self, pool):
+        await pool.fetch(f"https://{DOMAIN}/manga/1")
+        pool._clients[DOMAIN].cookies.clear()  # Site revoked the clearance
+
+        result = await pool.fetch(f"https://{DOMAIN}/manga/1")
+
+        assert result.from_flaresolverr
+        assert pool.solve_calls == 2
+
+    @pytest.mark.asyncio
+    async def test_unprotected_site_never_uses_flaresolverr(self, pool):
+        pool._clients["open.example"] = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, text="ok")
+            )
+        )
+
+        result = await pool.fetch("https://open.example/")
+
+        assert result.text == "ok"
+        assert pool.solve_calls == 0
+
+
+class TestSessionPoolRouting:
+    @pytest.mark.asyncio
+    async def test_known_challenged_domain_skips_direct_attempt(self, pool):
+        # Learn that uncleared requests are challenged
+        await pool.fetch(f"https://{DOMAIN}/manga/1")
+        pool.invalidate(DOMAIN)
+        await pool.fetch(f"https://{DOMAIN}/manga/1")
+        pool.invalidate(DOMAIN)
+        challenges = pool.get_stats()["challenges"]
+
+        result = await pool.fetch(f"https://{DOMAIN}/manga/1")
+
+        assert result.from_flaresolverr
+        assert pool.get_stats()["challenges"] == challenges
+        assert pool.get_stats()["skipped"] == 1
+        assert pool.solve_calls == 3
+
+    @pytest.mark.asyncio
+    async def test_binary_get_solves_before_known_challenge(self, pool):
+        await pool.fetch(f"https://{DOMAIN}/manga/1")
+        pool.invalidate(DOMAIN)
+        await pool.fetch(f"https://{DOMAIN}/manga/1")
+        pool.invalidate(DOMAIN)
+        challenges = pool.get_stats()["challenges"]
+
+        response = await pool.get(f"https://{DOMAIN}/pages/1.jpg")
+
+        assert response.content == b"\xff\xd8image"
+        assert pool.get_stats()["challenges"] == challenges
+
+
+def test_is_challenge_response():
+    request = httpx.Request("GET", "https://x/")
+    assert is_challenge_response(
+        httpx.Response(
+            503,
+            text=CHALLENGE_HTML,
+            headers={"content-type": "text/html"},
+            request=request,
+        )
+    )
+    assert not is_challenge_response(
+        httpx.Response(404, text="Not found", request=request)
+    )
+    assert not is_challenge_response(
+        httpx.Response(
+            403,
+            content=b"\x89PNG",
+            headers={"content-type": "image/png"},
+            request=request,
+        )
+    )
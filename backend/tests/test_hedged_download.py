@@ -0,0 +1,308 @@
+"""
+Tests for hedged chapter downloads.
+"""
+
+import asyncio
+import os
+import uuid
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.providers.registry import provider_registry
+from app.core.services import hedged_download
+from app.core.services.cbz_sink import CBZPageSink
+from app.core.services.hedged_download import (
+    ChapterSource,
+    HedgedChapterDownloader,
+    PageBoard,
+    find_hedge_source,
+)
+
+
+class FakeProvider:
+    def __init__(
+        self, name, pages=4, list_delay=0, stuck_pages=(), fail=False, lost_pages=()
+    ):
+        self.name = name
+        self.url = f"https://{name}.example"
+        self.pages = pages
+        self.list_delay = list_delay
+        self.stuck_pages = set(stuck_pages)
+        self.fail = fail
+        self.lost_pages = set(lost_pages)
+        self.downloads = []
+
+    async def get_pages(self, manga_id, chapter_id):
+        await asyncio.sleep(self.list_delay)
+        if self.fail:
+            raise RuntimeError("source is down")
+        return [
+            f"https://{self.name}.example/{chapter_id}/{n}.png"
+            for n in range(1, self.pages + 1)
+        ]
+
+    def get_chapter_url(self, manga_id, chapter_id):
+        return f"{self.url}/{chapter_id}"
+
+    async def download_page(self, page_url, referer=None):
+        number = int(page_url.rsplit("/", 1)[1].split(".")[0])
+        self.downloads.append(number)
+        if number in self.stuck_pages:
+            await asyncio.sleep(3600)
+        if number in self.lost_pages:
+            raise RuntimeError("page is gone")
+        return f"{self.name} {number}".encode()
+
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "DOWNLOAD_HEDGE_DEFAULT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "DOWNLOAD_CHAPTERS_AS_CBZ", True)
+    stored = {}
+
+    async def store_chapter_pages(
+        db, chapter_id, cbz_path, page_count, pages, missing_pages
+    ):
+        stored["cbz_path"] = cbz_path
+        stored["page_count"] = page_count
+        stored["pages"] = pages
+        stored["missing_pages"] = missing_pages
+
+    monkeypatch.setattr(hedged_download, "store_chapter_pages", store_chapter_pages)
+    return SimpleNamespace(
+        manga_id=uuid.uuid4(), chapter_id=uuid.uuid4(), stored=stored, providers={}
+    )
+
+
+async def hedged(environment, monkeypatch, primary, secondary, downloader=None):
+    providers = {primary.name: primary, secondary.name: secondary}
+    monkeypatch.setattr(provider_registry, "get_provider", providers.get)
+    for name in providers:
+        monkeypatch.setitem(hedged_download.PAGE_DELAYS, name, 0)
+
+    chapter_key = str(environment.chapter_id)
+    return await (downloader or HedgedChapterDownloader()).download(
+        environment.manga_id,
+        environment.chapter_id,
+        ChapterSource(primary.name, "m", chapter_key),
+        ChapterSource(secondary.name, "m2", chapter_key),
+        db=None,
+    )
+
+
+def page_contents(environment):
+    with zipfile.ZipFile(environment.stored["cbz_path"]) as archive:
+        return {
+            int(name.split(".")[0]): archive.read(name) for name in archive.namelist()
+        }
+
+
+def board_sink(tmp_path):
+    sink = CBZPageSink(str(tmp_path / "chapter.cbz"))
+    sink.open()
+    return sink
+
+
+class TestPageBoard:
+    def test_claims_free_pages_then_hedges(self, tmp_path):
+        board = PageBoard(3, board_sink(tmp_path))
+
+        assert [board.claim("a"), board.claim("b")] == [1, 2]
+        board.add(2, "b", ".jpg", b"two")
+        assert board.claim("b") == 3
+        board.add(3, "b", ".jpg", b"three")
+
+        # Nothing is left untaken, so b doubles up on the page a is waiting on
+        assert board.claim("b") == 1
+        assert board.claim("c") is None
+
+    def test_first_delivery_wins(self, tmp_path):
+        board = PageBoard(1, board_sink(tmp_path))
+        board.claim("a")
+        board.claim("b")
+
+        assert board.add(1, "b", ".jpg", b"from b")
+        assert not board.add(1, "a", ".png", b"from a")
+        assert board.files == {1: "0001.jpg"}
+        assert board.is_complete
+
+    def test_failed_pages_go_to_the_other_source(self, tmp_path):
+        board = PageBoard(1, board_sink(tmp_path))
+        board.claim("a")
+
+        board.fail(1, "a")
+
+        assert board.claim("a") is None
+        assert board.claim("b") == 1
+
+
+class TestHedgeDelay:
+    def test_default_until_enough_samples(self):
+        downloader = HedgedChapterDownloader()
+        downloader.record_latency("p", 1.0)
+
+        assert (
+            downloader.get_hedge_delay("p") == settings.DOWNLOAD_HEDGE_DEFAULT_SECONDS
+        )
+
+    def test_observed_p90(self):
+        downloader = HedgedChapterDownloader()
+        for elapsed in range(1, 11):
+            downloader.record_latency("p", float(elapsed))
+
+        assert downloader.get_hedge_delay("p") == 9.0
+
+
+class TestHedgedDownload:
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, environment, monkeypatch):
+        monkeypatch.setattr(settings, "DOWNLOAD_HEDGE_DEFAULT_SECONDS", 5)
+        primary, secondary = FakeProvider("primary"), FakeProvider("secondary")
+
+        source, cbz_path = await hedged(environment, monkeypatch, primary, secondary)
+
+        assert source.provider_name == "primary"
+        assert secondary.downloads == []
+        assert os.path.exists(cbz_path)
+        assert page_contents(environment)[4] == b"primary 4"
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_loses_to_secondary(self, environment, monkeypatch):
+        primary = FakeProvider("primary", pages=5, list_delay=3600)
+        secondary = FakeProvider("secondary", pages=4)
+
+        source, _ = await hedged(environment, monkeypatch, primary, secondary)
+
+        assert source.provider_name == "secondary"
+        assert environment.stored["missing_pages"] == 0
+        assert page_contents(environment) == {
+            n: f"secondary {n}".encode() for n in range(1, 5)
+        }
+        chapters_dir = os.path.dirname(environment.stored["cbz_path"])
+        assert [name for name in os.listdir(chapters_dir) if "hedge" in name] == []
+
+    @pytest.mark.asyncio
+    async def test_loose_pages_keep_their_rows(self, environment, monkeypatch):
+        monkeypatch.setattr(settings, "DOWNLOAD_CHAPTERS_AS_CBZ", False)
+        primary = FakeProvider("primary", pages=5, list_delay=3600)
+        secondary = FakeProvider("secondary", pages=4)
+
+        _, chapter_path = await hedged(environment, monkeypatch, primary, secondary)
+
+        assert sorted(os.listdir(chapter_path)) == [f"000{n}.png" for n in range(1, 5)]
+        assert [page.file_path for page in environment.stored["pages"]] == [
+            os.path.join(chapter_path, f"000{n}.png") for n in range(1, 5)
+        ]
+        chapters_dir = os.path.dirname(chapter_path)
+        assert [name for name in os.listdir(chapters_dir) if "hedge" in name] == []
+
+    @pytest.mark.asyncio
+    async def test_stuck_page_is_fetched_from_the_other_source(
+        self, environment, monkeypatch
+    ):
+        primary = FakeProvider("primary", stuck_pages={2})
+        secondary = FakeProvider("secondary")
+
+        source, _ = await hedged(environment, monkeypatch, primary, secondary)
+
+        contents = page_contents(environment)
+        assert sorted(contents) == [1, 2, 3, 4]
+        assert contents[2] == b"secondary 2"
+        assert contents[1] == b"primary 1"
+        assert secondary.downloads.count(1) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_to_secondary(self, environment, monkeypatch):
+        monkeypatch.setattr(settings, "DOWNLOAD_HEDGE_DEFAULT_SECONDS", 5)
+        primary = FakeProvider("primary", fail=True)
+        secondary = FakeProvider("secondary")
+
+        source, _ = await hedged(environment, monkeypatch, primary, secondary)
+
+        assert source.provider_name == "secondary"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_primary_counts_as_a_latency_sample(
+        self, environment, monkeypatch
+    ):
+        downloader = HedgedChapterDownloader()
+        primary = FakeProvider("primary", list_delay=3600)
+        secondary = FakeProvider("secondary")
+
+        await hedged(environment, monkeypatch, primary, secondary, downloader)
+
+        primary_stats = downloader._latency["primary"]
+        assert list(primary_stats.outcomes) == [False]
+        assert primary_stats.samples[0] >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_pages_no_source_has_are_recorded_missing(
+        self, environment, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "DOWNLOAD_HEDGE_DEFAULT_SECONDS", 5)
+        primary = FakeProvider("primary", lost_pages={3})
+        secondary = FakeProvider("secondary", lost_pages={3})
+
+        await hedged(environment, monkeypatch, primary, secondary)
+
+        assert environment.stored["page_count"] == 3
+        assert environment.stored["missing_pages"] == 1
+        assert sorted(page_contents(environment)) == [1, 2, 4]
+
+    @pytest.mark.asyncio
+    async def test_both_sources_failing(self, environment, monkeypatch):
+        primary = FakeProvider("primary", fail=True)
+        secondary = FakeProvider("secondary", fail=True)
+
+        with pytest.raises(RuntimeError):
+            await hedged(environment, monkeypatch, primary, secondary)
+
+
+class TestFindHedgeSource:
+    @pytest.mark.asyncio
+    async def test_needs_series_match_and_chapter_id(self, monkeypatch):
+        matches = [
+            SimpleNamespace(provider="NoChapter", external_id="x"),
+            SimpleNamespace(provider="Known", external_id="known-manga"),
+            SimpleNamespace(provider="Preferred", external_id="preferred-manga"),
+            SimpleNamespace(provider="Primary", external_id="primary-manga"),
+        ]
+
+        async def get_matches(db, manga_id):
+            return matches
+
+        monkeypatch.setattr(hedged_download.series_matcher, "get_matches", get_matches)
+        monkeypatch.setattr(
+            provider_registry, "get_provider", lambda name: SimpleNamespace(name=name)
+        )
+        manga = SimpleNamespace(id=uuid.uuid4())
+        chapter = SimpleNamespace(
+            provider_external_ids={"known": "k1", "preferred": "p1", "primary": "x1"}
+        )
+
+        source = await find_hedge_source(None, manga, chapter, "Primary")
+        preferred = await find_hedge_source(
+            None, manga, chapter, "Primary", ["Preferred"]
+        )
+
+        assert source == ChapterSource("Known", "known-manga", "k1")
+        assert preferred == ChapterSource("Preferred", "preferred-manga", "p1")
+
+    @pytest.mark.asyncio
+    async def test_no_other_source(self, monkeypatch):
+        async def get_matches(db, manga_id):
+            return []
+
+        monkeypatch.setattr(hedged_download.series_matcher, "get_matches", get_matches)
+        chapter = SimpleNamespace(provider_external_ids=None)
+
+        assert (
+            await find_hedge_source(
+                None, SimpleNamespace(id=uuid.uuid4()), chapter, "Primary"
+            )
+            is None
+        )
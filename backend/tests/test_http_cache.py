@@ -0,0 +1,166 @@
+"""
+Tests for the provider HTTP cache and conditional revalidation.
+"""
+
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.providers.http_cache import ProviderHTTPCache
+from app.core.providers.mangadex import MangaDexProvider
+
+URL = "https://api.example/manga/1"
+
+
+class ConditionalServer:
+    """Serve a body with an ETag and answer 304 when it is sent back."""
+
+    def __init__(self, body=b'{"data": "details"}', headers=None):
+        self.body = body
+        self.headers = {"etag": '"v1"', **(headers or {})}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == self.headers["etag"]:
+            return httpx.Response(304, headers=self.headers)
+        return httpx.Response(200, content=self.body, headers=self.headers)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProviderHTTPCache(str(tmp_path), max_bytes=1024 * 1024)
+
+
+def client_for(server):
+    return httpx.AsyncClient(transport=httpx.MockTransport(server))
+
+
+class TestProviderHTTPCache:
+    @pytest.mark.asyncio
+    async def test_not_modified_is_answered_from_cache(self, cache):
+        server = ConditionalServer()
+        async with client_for(server) as client:
+            first = await cache.get(client, URL)
+            second = await cache.get(client, URL)
+
+        assert first.content == second.content == b'{"data": "details"}'
+        assert second.status_code == 200
+        assert second.json() == {"data": "details"}
+        assert server.requests[1].headers["if-none-match"] == '"v1"'
+        assert cache.get_stats()["revalidated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_last_modified_is_replayed(self, cache):
+        modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+        requests = []
+
+        def server(request):
+            requests.append(request)
+            if request.headers.get("if-modified-since") == modified:
+                return httpx.Response(304)
+            return httpx.Response(200, text="page", headers={"last-modified": modified})
+
+        async with client_for(server) as client:
+            await cache.get(client, URL)
+            response = await cache.get(client, URL)
+
+        assert response.text == "page"
+        assert requests[1].headers["if-modified-since"] == modified
+
+    @pytest.mark.asyncio
+    async def test_fresh_response_skips_the_network(self, cache):
+        server = ConditionalServer(headers={"cache-control": "max-age=300"})
+        async with client_for(server) as client:
+            await cache.get(client, URL)
+            response = await cache.get(client, URL)
+
+        assert response.content == server.body
+        assert len(server.requests) == 1
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_params_are_part_of_the_key(self, cache):
+        server = ConditionalServer()
+        async with client_for(server) as client:
+            await cache.get(client, URL, params={"offset": 0})
+            await cache.get(client, URL, params={"offset": 100})
+
+        assert "if-none-match" not in server.requests[1].headers
+
+    @pytest.mark.asyncio
+    async def test_no_store_is_not_cached(self, cache):
+        server = ConditionalServer(headers={"cache-control": "no-store"})
+        async with client_for(server) as client:
+            await cache.get(client, URL)
+            await cache.get(client, URL)
+
+        assert "if-none-match" not in server.requests[1].headers
+        assert cache.get_stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cache_persists_across_instances(self, cache, tmp_path):
+        server = ConditionalServer()
+        async with client_for(server) as client:
+            await cache.get(client, URL)
+            reopened = ProviderHTTPCache(str(tmp_path), max_bytes=1024 * 1024)
+            response = await reopened.get(client, URL)
+
+        assert response.content == server.body
+        assert server.requests[1].headers["if-none-match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = ProviderHTTPCache(str(tmp_path), max_bytes=250)
+        server = ConditionalServer(body=b"x" * 100)
+        async with client_for(server) as client:
+            await cache.get(client, f"{URL}/a")
+            await cache.get(client, f"{URL}/b")
+            await cache.get(client, f"{URL}/a")  # a is now more recent than b
+            await cache.get(client, f"{URL}/c")
+
+        assert await cache.lookup(f"{URL}/a") is not None
+        assert await cache.lookup(f"{URL}/b") is None
+        assert cache.get_stats()["size_bytes"] <= 250
+
+    @pytest.mark.asyncio
+    async def test_disk_work_runs_off_the_event_loop(self, cache):
+        loop_thread = threading.get_ident()
+        threads = set()
+        for name in ("_scan_index", "_read", "_write"):
+            method = getattr(cache, name)
+
+            def record(*args, _method=method):
+                threads.add(threading.get_ident())
+                return _method(*args)
+
+            setattr(cache, name, record)
+
+        async with client_for(ConditionalServer()) as client:
+            await cache.get(client, URL)
+            await cache.get(client, URL)
+
+        assert threads and loop_thread not in threads
+
+
+class TestMangaDexRevalidation:
+    @pytest.mark.asyncio
+    async def test_chapter_feed_is_revalidated(self, cache):
+        provider = MangaDexProvider()
+        provider._request_delay = 0
+        server = ConditionalServer(
+            body=b'{"data": [], "total": 0}', headers={"etag": '"feed"'}
+        )
+
+        with patch("app.core.providers.mangadex.provider_http_cache", cache):
+            async with client_for(server) as client:
+                for _ in range(2):
+                    response = await provider._make_request_with_retry(
+                        client, "GET", URL, use_cache=True, params={"limit": 100}
+                    )
+
+        assert response.json() == {"data": [], "total": 0}
+        assert server.requests[1].headers["if-none-match"] == '"feed"'
+        assert cache.get_stats()["revalidated"] == 1
@@ -0,0 +1,174 @@
+"""
+Tests for background re-encoding of stored pages.
+"""
+
+import io
+import os
+import random
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.core import deps
+from app.core.services.download_coordinator import (
+    chapter_download_key,
+    chapter_optimize_key,
+    download_coordinator,
+)
+from app.core.services.image_optimizer import (
+    ImageOptimizer,
+    optimize_archive,
+    optimize_image,
+)
+
+
+def make_page(image_format="PNG"):
+    image = Image.new("RGB", (300, 600), "white")
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(0)
+    for _ in range(200):
+        x, y = rng.randrange(300), rng.randrange(600)
+        draw.ellipse((x, y, x + 30, y + 20), fill=(rng.randrange(256), 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def pixels(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.convert("RGB").tobytes()
+
+
+class FakeSession:
+    def __init__(self, chapter, pages=()):
+        self.chapter = chapter
+        self.pages = list(pages)
+        self.commits = 0
+
+    async def get(self, model, ident):
+        return self.chapter
+
+    async def execute(self, statement):
+        pages = self.pages
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: pages))
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def optimizer(monkeypatch):
+    monkeypatch.setattr(deps, "redis_client", None)
+    optimizer = ImageOptimizer()
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(optimizer, "_get_executor", lambda: executor)
+    yield optimizer
+    executor.shutdown()
+
+
+def test_png_becomes_lossless_webp():
+    page = make_page()
+
+    data, file_ext = optimize_image(page, ".PNG", "lossless", 80, 0.1)
+
+    assert file_ext == ".webp"
+    assert len(data) < len(page)
+    assert pixels(data) == pixels(page)
+
+
+def test_pages_that_do_not_shrink_enough_are_kept():
+    page = make_page()
+
+    assert optimize_image(page, ".png", "lossless", 80, 0.99) is None
+    assert optimize_image(make_page("WEBP"), ".webp", "webp", 80, 0.1) is None
+    assert optimize_image(b"not an image", ".png", "lossless", 80, 0.1) is None
+
+
+def test_archive_is_rewritten_in_place(tmp_path):
+    cbz_path = str(tmp_path / "chapter.cbz")
+    with zipfile.ZipFile(cbz_path, "w") as archive:
+        archive.comment = b"Provider:chapter-1"
+        archive.writestr("0001.png", make_page())
+        archive.writestr("0002.webp", make_page("WEBP"))
+        archive.writestr("metadata.json", b"{}")
+
+    stats = optimize_archive(cbz_path, "lossless", 80, 0.1)
+
+    assert stats["pages"] == 2
+    assert stats["optimized"] == 1
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert not os.path.exists(f"{cbz_path}.optimize.part")
+    with zipfile.ZipFile(cbz_path) as archive:
+        assert archive.namelist() == ["0001.webp", "0002.webp", "metadata.json"]
+        assert archive.comment == b"Provider:chapter-1"
+        assert pixels(archive.read("0001.webp")) == pixels(make_page())
+
+
+@pytest.mark.asyncio
+async def test_loose_pages_are_replaced_after_commit(optimizer, tmp_path):
+    chapter = SimpleNamespace(
+        id=uuid.uuid4(), file_path=str(tmp_path), images_optimized_at=None
+    )
+    png_path, jpeg_path = tmp_path / "0001.png", tmp_path / "0002.jpg"
+    png_path.write_bytes(make_page())
+    jpeg_path.write_bytes(make_page("JPEG"))
+    pages = [
+        SimpleNamespace(number=1, file_path=str(png_path)),
+        SimpleNamespace(number=2, file_path=str(jpeg_path)),
+    ]
+    db = FakeSession(chapter, pages)
+
+    assert await optimizer.optimize_chapter(db, chapter)
+
+    assert pages[0].file_path == str(tmp_path / "0001.webp")
+    assert not png_path.exists()
+    assert os.path.exists(pages[0].file_path)
+    assert chapter.images_optimized_at is not None
+    assert optimizer.get_stats()["pages"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_chapter_being_downloaded_is_left_alone(optimizer, tmp_path):
+    chapter = SimpleNamespace(
+        id=uuid.uuid4(), file_path=str(tmp_path), images_optimized_at=None
+    )
+    key = chapter_download_key(chapter.id)
+    await download_coordinator.claim(key, "download")
+
+    try:
+        assert not await optimizer.optimize_chapter(FakeSession(chapter), chapter)
+    finally:
+        await download_coordinator.release(key, "download")
+    assert chapter.images_optimized_at is None
+
+
+@pytest.mark.asyncio
+async def test_downloads_are_not_handed_the_optimizer_task(optimizer, tmp_path):
+    chapter = SimpleNamespace(
+        id=uuid.uuid4(), file_path=str(tmp_path), images_optimized_at=None
+    )
+    owners = []
+
+    async def optimize_pages(db, chapter):
+        owners.append(
+            (
+                await download_coordinator.get_owner(chapter_download_key(chapter.id)),
+                await download_coordinator.get_owner(chapter_optimize_key(chapter.id)),
+            )
+        )
+        return None
+
+    optimizer._optimize_pages = optimize_pages
+
+    assert await optimizer.optimize_chapter(FakeSession(chapter), chapter)
+    assert owners == [(None, f"optimize-{chapter.id}")]
+    assert (
+        await download_coordinator.get_owner(chapter_optimize_key(chapter.id)) is None
+    )
@@ -0,0 +1,189 @@
+"""
+Tests for the image proxy disk cache.
+"""
+
+import asyncio
+import hashlib
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app.api.api_v1.endpoints.providers import _cached_image_response
+from app.core.services import image_proxy_cache as image_proxy_cache_module
+from app.core.services.image_proxy_cache import ImageProxyCache
+
+IMAGE = b"\x89PNG" + b"x" * 1000
+
+
+class ImageServer:
+    """Serve images slowly enough for concurrent requests to overlap."""
+
+    def __init__(self, content=IMAGE, status_code=200, content_type="image/png"):
+        self.content = content
+        self.status_code = status_code
+        self.content_type = content_type
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return httpx.Response(
+            self.status_code,
+            content=self.content,
+            headers={"content-type": self.content_type},
+        )
+
+
+def make_cache(tmp_path, server, max_bytes=1024 * 1024):
+    cache = ImageProxyCache(str(tmp_path), max_bytes)
+    cache._client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    return cache
+
+
+async def stream_all(fetch):
+    return b"".join([chunk async for chunk in fetch.stream()])
+
+
+def make_request(headers=None):
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "headers": raw_headers})
+
+
+class TestImageProxyCache:
+    @pytest.mark.asyncio
+    async def test_miss_is_streamed_and_stored(self, tmp_path):
+        server = ImageServer()
+        cache = make_cache(tmp_path, server)
+
+        fetch, is_leader = cache.fetch("https://cdn.example/a.png", {})
+        assert await fetch.ready == (200, "image/png")
+        assert await stream_all(fetch) == IMAGE
+        await fetch.done
+
+        cached = await cache.lookup("https://cdn.example/a.png")
+        assert is_leader
+        assert cached.content_hash == hashlib.sha256(IMAGE).hexdigest()
+        with open(cached.path, "rb") as f:
+            assert f.read() == IMAGE
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_fetch(self, tmp_path):
+        server = ImageServer()
+        cache = make_cache(tmp_path, server)
+
+        leader, leader_started = cache.fetch("https://cdn.example/a.png", {})
+        follower, follower_started = cache.fetch("https://cdn.example/a.png", {})
+        streamed, stored = await asyncio.gather(stream_all(leader), follower.done)
+
+        assert leader is follower
+        assert leader_started and not follower_started
+        assert streamed == IMAGE
+        assert stored.size == len(IMAGE)
+        assert server.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_images_are_stored_once(self, tmp_path):
+        cache = make_cache(tmp_path, ImageServer())
+
+        for url in ("https://a.example/cover.png", "https://b.example/cover.png"):
+            fetch, _ = cache.fetch(url, {})
+            await fetch.done
+
+        assert cache.get_stats()["blobs"] == 1
+        assert (await cache.lookup("https://a.example/cover.png")).path == (
+            await cache.lookup("https://b.example/cover.png")
+        ).path
+
+    @pytest.mark.asyncio
+    async def test_errors_and_non_images_are_not_stored(self, tmp_path):
+        for server in (
+            ImageServer(status_code=404),
+            ImageServer(content_type="text/html"),
+        ):
+            cache = make_cache(tmp_path, server)
+            fetch, _ = cache.fetch("https://cdn.example/a.png", {})
+
+            assert await fetch.done is None
+            assert await cache.lookup("https://cdn.example/a.png") is None
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_blobs_are_evicted(self, tmp_path):
+        server = ImageServer()
+        cache = make_cache(tmp_path, server, max_bytes=2500)
+
+        for name in ("a", "b", "c"):
+            server.content = name.encode() * 1000
+            fetch, _ = cache.fetch(f"https://cdn.example/{name}.png", {})
+            await fetch.done
+            if name == "b":
+                await cache.lookup("https://cdn.example/a.png")  # a is used again
+
+        assert await cache.lookup("https://cdn.example/a.png") is not None
+        assert await cache.lookup("https://cdn.example/b.png") is None
+        assert cache.get_stats()["size_bytes"] <= 2500
+
+    @pytest.mark.asyncio
+    async def test_disk_work_runs_off_the_event_loop(self, tmp_path):
+        cache = make_cache(tmp_path, ImageServer())
+        loop_thread = threading.get_ident()
+        threads = set()
+        for name in ("_scan_index", "_open_tmp", "_write_blob", "_read_record"):
+            method = getattr(cache, name)
+
+            def record(*args, _method=method):
+                threads.add(threading.get_ident())
+                return _method(*args)
+
+            setattr(cache, name, record)
+
+        fetch, _ = cache.fetch("https://cdn.example/a.png", {})
+        await stream_all(fetch)
+        assert await cache.lookup("https://cdn.example/a.png") is not None
+
+        assert threads and loop_thread not in threads
+
+    @pytest.mark.asyncio
+    async def test_stalled_client_does_not_buffer_the_image(self, tmp_path):
+        chunk_count = image_proxy_cache_module.STREAM_QUEUE_CHUNKS * 4
+
+        class ChunkedBody(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                for _ in range(chunk_count):
+                    yield b"x" * 1024
+
+        async def server(request):
+            return httpx.Response(
+                200, stream=ChunkedBody(), headers={"content-type": "image/png"}
+            )
+
+        cache = make_cache(tmp_path, server)
+        with patch.object(image_proxy_cache_module, "STREAM_STALL_SECONDS", 0.05):
+            fetch, _ = cache.fetch("https://cdn.example/a.png", {})
+            chunks = fetch.stream()
+            await chunks.__anext__()  # the client reads once, then stalls
+
+            image = await fetch.done
+
+        assert fetch._chunks.qsize() <= image_proxy_cache_module.STREAM_QUEUE_CHUNKS
+        assert image.size == chunk_count * 1024
+
+
+class TestCachedImageResponse:
+    @pytest.mark.asyncio
+    async def test_etag_and_not_modified(self, tmp_path):
+        cache = make_cache(tmp_path, ImageServer())
+        fetch, _ = cache.fetch("https://cdn.example/a.png", {})
+        image = await fetch.done
+
+        response = _cached_image_response(make_request(), image)
+        assert response.status_code == 200
+        assert response.headers["etag"] == image.etag
+        assert response.path == image.path
+
+        response = _cached_image_response(
+            make_request({"If-None-Match": image.etag}), image
+        )
+        assert response.status_code == 304
@@ -0,0 +1,182 @@
+"""
+Tests for MangaDex bulk feed paging and batched manga lookups.
+"""
+
+import time
+import uuid
+from functools import partial
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.core.providers.http_cache import ProviderHTTPCache
+from app.core.providers.mangadex import MangaDexProvider
+
+
+def make_manga(manga_id):
+    return {
+        "id": manga_id,
+        "attributes": {"title": {"en": f"Manga {manga_id}"}, "status": "ongoing"},
+        "relationships": [
+            {"type": "cover_art", "attributes": {"fileName": f"{manga_id}.jpg"}},
+            {"type": "author", "attributes": {"name": "Author"}},
+        ],
+    }
+
+
+class FakeMangaDex:
+    """Serve the chapter feed and /manga lookups from memory."""
+
+    def __init__(self, total_chapters=0):
+        self.total_chapters = total_chapters
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        params = request.url.params
+
+        if request.url.path.endswith("/feed"):
+            offset, limit = int(params["offset"]), int(params["limit"])
+            end = min(offset + limit, self.total_chapters)
+            data = [
+                {"id": f"c{i}", "attributes": {"chapter": str(i + 1)}}
+                for i in range(offset, end)
+            ]
+            return httpx.Response(
+                200, json={"data": data, "total": self.total_chapters}
+            )
+
+        ids = params.get_list("ids[]")
+        return httpx.Response(
+            200, json={"data": [make_manga(i) for i in ids], "total": len(ids)}
+        )
+
+
+@pytest.fixture
+def provider(tmp_path):
+    provider = MangaDexProvider()
+    provider._request_delay = 0
+    with patch(
+        "app.core.providers.mangadex.provider_http_cache",
+        ProviderHTTPCache(str(tmp_path), 0, enabled=False),
+    ):
+        yield provider
+
+
+def serve(server):
+    return patch(
+        "app.core.providers.mangadex.httpx.AsyncClient",
+        partial(httpx.AsyncClient, transport=httpx.MockTransport(server)),
+    )
+
+
+class TestMangaDexBulk:
+    @pytest.mark.asyncio
+    async def test_all_chapters_use_largest_pages(self, provider):
+        server = FakeMangaDex(total_chapters=1234)
+
+        with serve(server):
+            chapters = await provider.get_all_chapters("md-1")
+
+        assert [c["number"] for c in chapters] == [str(i + 1) for i in range(1234)]
+        assert sorted(int(r.url.params["offset"]) for r in server.requests) == [
+            0,
+            500,
+            1000,
+        ]
+        assert {r.url.params["limit"] for r in server.requests} == {"500"}
+
+    @pytest.mark.asyncio
+    async def test_feed_stops_at_the_offset_window(self, provider):
+        server = FakeMangaDex(total_chapters=12000)
+
+        with serve(server):
+            chapters = await provider.get_all_chapters("md-1")
+
+        assert len(chapters) == 10000
+        assert max(int(r.url.params["offset"]) for r in server.requests) == 9500
+
+    @pytest.mark.asyncio
+    async def test_get_chapters_clamps_page_size(self, provider):
+        server = FakeMangaDex(total_chapters=800)
+
+        with serve(server):
+            chapters, total, has_next = await provider.get_chapters("md-1", limit=1000)
+
+        assert len(chapters) == 500
+        assert total == 800
+        assert has_next
+
+    @pytest.mark.asyncio
+    async def test_details_batch_chunks_ids(self, provider):
+        server = FakeMangaDex()
+        ids = [f"m{i}" for i in range(150)]
+
+        with serve(server):
+            details = await provider.get_manga_details_batch(ids)
+
+        assert len(server.requests) == 2
+        assert [len(r.url.params.get_list("ids[]")) for r in server.requests] == [
+            100,
+            50,
+        ]
+        assert set(details) == set(ids)
+        assert details["m7"]["cover_image"] == (
+            "https://uploads.mangadex.org/covers/m7/m7.jpg"
+        )
+        assert details["m7"]["authors"] == ["Author"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_spaced_out(self, provider):
+        provider._request_delay = 0.05
+        server = FakeMangaDex(total_chapters=2500)
+
+        with serve(server):
+            start = time.monotonic()
+            await provider.get_all_chapters("md-1")
+            elapsed = time.monotonic() - start
+
+        # Five requests need at least four gaps between them
+        assert elapsed >= 0.2
+
+
+class TestLibraryRefresh:
+    @pytest.mark.asyncio
+    async def test_refresh_batches_series_per_provider(self, provider, monkeypatch):
+        from app.api.api_v1.endpoints.library import bulk_refresh
+        from app.core.providers.registry import provider_registry
+        from app.schemas.library import BulkRefreshRequest
+
+        user = SimpleNamespace(id=uuid.uuid4())
+        items = [
+            SimpleNamespace(
+                id=uuid.uuid4(),
+                manga=SimpleNamespace(
+                    provider="MangaDex", external_id=f"m{i}", title="Old"
+                ),
+            )
+            for i in range(120)
+        ]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = items
+        db = AsyncMock()
+        db.execute.return_value = result
+        monkeypatch.setattr(provider_registry, "get_provider", lambda name: provider)
+        server = FakeMangaDex()
+        missing = uuid.uuid4()
+
+        with serve(server):
+            response = await bulk_refresh(
+                BulkRefreshRequest(manga_ids=[item.id for item in items] + [missing]),
+                current_user=user,
+                db=db,
+            )
+
+        assert len(server.requests) == 2
+        assert response.updated_count == 120
+        assert response.failed_items == [str(missing)]
+        assert items[7].manga.title == "Manga m7"
+        assert items[7].manga.cover_image.endswith("/m7/m7.jpg")
+        db.commit.assert_awaited_once()
@@ -0,0 +1,178 @@
+"""
+Tests for filtering recurring credit and ad pages.
+"""
+
+import asyncio
+import io
+import random
+import uuid
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.core.providers.registry import provider_registry
+from app.core.services import download
+from app.core.services.page_filter import (
+    ChapterFilter,
+    PageFilterService,
+    difference_hash,
+)
+from tests.test_cbz_sink import FakeProvider, FakeSession
+
+
+def make_image(seed, size=(200, 300), image_format="PNG"):
+    rng = random.Random(seed)
+    image = Image.new("L", (9, 8))
+    image.putdata([rng.randrange(256) for _ in range(72)])
+    buffer = io.BytesIO()
+    image.resize(size, Image.Resampling.BILINEAR).convert("RGB").save(
+        buffer, image_format
+    )
+    return buffer.getvalue()
+
+
+class InlineFilterService(PageFilterService):
+    """Fingerprints in the test process instead of a worker pool."""
+
+    async def fingerprint(self, data):
+        return difference_hash(data)
+
+
+def chapter_filter(total_pages=10, blocked=(), blocked_urls=None, skipping=True):
+    return ChapterFilter(
+        InlineFilterService(),
+        "FakeProvider",
+        uuid.uuid4(),
+        total_pages,
+        set(blocked),
+        blocked_urls or {},
+        skipping,
+    )
+
+
+def test_hash_survives_reencoding_and_resizing():
+    original = difference_hash(make_image(1))
+
+    assert original is not None
+    assert difference_hash(make_image(1, (400, 600), "JPEG")) == original
+    assert difference_hash(make_image(2)) != original
+
+
+def test_plain_and_broken_pages_are_not_fingerprinted():
+    buffer = io.BytesIO()
+    Image.new("RGB", (200, 300), "white").save(buffer, "PNG")
+
+    assert difference_hash(buffer.getvalue()) is None
+    assert difference_hash(b"not an image") is None
+
+
+@pytest.mark.asyncio
+async def test_only_edge_pages_are_checked_and_skipped():
+    credits = make_image(1)
+    page_filter = chapter_filter(blocked={difference_hash(credits)})
+
+    assert await page_filter.skip_page(1, "https://cdn/1.png", credits)
+    assert await page_filter.skip_page(10, "https://cdn/10.png", credits)
+    assert not await page_filter.skip_page(5, "https://cdn/5.png", credits)
+    assert not await page_filter.skip_page(2, "https://cdn/2.png", make_image(2))
+
+    assert page_filter.skipped == [1, 10]
+    assert sorted(page_filter.seen) == [1, 2, 10]
+
+
+@pytest.mark.asyncio
+async def test_learn_mode_skips_nothing():
+    credits = make_image(1)
+    page_filter = chapter_filter(
+        blocked={difference_hash(credits)},
+        blocked_urls={"https://cdn/ad.png": difference_hash(credits)},
+        skipping=False,
+    )
+
+    assert not page_filter.skip_url(1, "https://cdn/ad.png")
+    assert not await page_filter.skip_page(1, "https://cdn/1.png", credits)
+    assert page_filter.seen[1][0] == difference_hash(credits)
+
+
+@pytest.mark.asyncio
+async def test_download_leaves_out_recurring_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "DOWNLOAD_CHAPTERS_AS_CBZ", True)
+    sleep = asyncio.sleep
+    monkeypatch.setattr(download.asyncio, "sleep", lambda delay: sleep(0))
+    credits, banner = make_image(1), make_image(2)
+
+    class ScanlatedProvider(FakeProvider):
+        async def download_page(self, page_url, referer=None):
+            await super().download_page(page_url, referer)
+            page_number = int(page_url.rsplit("/", 1)[1].split(".")[0])
+            return credits if page_number == 1 else make_image(page_number + 10)
+
+    provider = ScanlatedProvider(pages=6)
+    monkeypatch.setattr(provider_registry, "get_provider", lambda name: provider)
+    banner_url = "https://cdn.example/c/6.png"
+    page_filter = chapter_filter(
+        total_pages=6,
+        blocked={difference_hash(credits)},
+        blocked_urls={banner_url: difference_hash(banner)},
+    )
+    learned = []
+
+    async def for_chapter(db, provider_name, manga_id, total_pages):
+        return page_filter
+
+    async def learn(db, chapter_filter, chapter_id):
+        learned.append(dict(chapter_filter.seen))
+
+    monkeypatch.setattr(download.page_filter, "for_chapter", for_chapter)
+    monkeypatch.setattr(download.page_filter, "learn", learn)
+    manga_id, chapter_id = uuid.uuid4(), uuid.uuid4()
+    chapter = type("Chapter", (), {"manga_id": manga_id})()
+
+    cbz_path = await download.download_chapter(
+        manga_id, chapter_id, provider.name, "m", "c", FakeSession(chapter)
+    )
+
+    assert banner_url not in provider.downloads
+    assert chapter.pages_count == 4
+    with zipfile.ZipFile(cbz_path) as archive:
+        assert sorted(archive.namelist()) == [f"000{n}.png" for n in range(2, 6)]
+    assert sorted(learned[0]) == [1, 2, 3, 4, 5, 6]
+
+
+class RecordingSession:
+    """Collects the SQL that learning issues, compiled for PostgreSQL."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(rowcount=0)
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sightings_count_distinct_chapters_and_series():
+    learning = chapter_filter(skipping=False)
+    learning.seen = {1: (difference_hash(make_image(1)), "https://a/1.png")}
+    db = RecordingSession()
+
+    await learning.service.learn(db, learning, uuid.uuid4())
+
+    sightings = [sql for sql in db.statements if "page_fingerprint_sightings" in sql]
+    assert len(sightings) == 4  # A sighting and a recount per scope
+    assert all(
+        "ON CONFLICT ON CONSTRAINT uq_page_fingerprint_sighting DO NOTHING" in sql
+        for sql in sightings[::2]
+    )
+    assert all(
+        "count(DISTINCT page_fingerprint_sightings.seen_in)" in sql
+        for sql in sightings[1::2]
+    )
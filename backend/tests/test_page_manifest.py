@@ -0,0 +1,105 @@
+"""
+Tests for the resolved page-list cache.
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.core.providers.base import AntiBotError, ContentError
+from app.core.providers.page_manifest import PageManifestCache, is_expired_page_error
+
+PAGES = ["https://cdn.example/1.jpg", "https://cdn.example/2.jpg"]
+
+
+class FakeProvider:
+    def __init__(self, name="MangaPill", ttl=None):
+        self.name = name
+        self.get_pages = AsyncMock(return_value=list(PAGES))
+        if ttl is not None:
+            self.page_manifest_ttl = ttl
+
+
+class TestPageManifestCache:
+    @pytest.mark.asyncio
+    async def test_reopened_chapter_skips_resolution(self):
+        cache = PageManifestCache()
+        provider = FakeProvider()
+
+        first = await cache.get_pages(provider, "m1", "c1")
+        second = await cache.get_pages(provider, "m1", "c1")
+
+        assert first == second == PAGES
+        provider.get_pages.assert_awaited_once_with("m1", "c1")
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_provider_ttl_expires_manifest(self):
+        cache = PageManifestCache()
+        provider = FakeProvider(ttl=600)
+
+        await cache.get_pages(provider, "m1", "c1")
+        manifest = next(iter(cache._manifests.values()))
+        assert manifest.expires_at - time.monotonic() == pytest.approx(600, abs=5)
+
+        manifest.expires_at = time.monotonic() - 1
+        await cache.get_pages(provider, "m1", "c1")
+
+        assert provider.get_pages.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_page_url_invalidates_manifest(self):
+        cache = PageManifestCache()
+        provider = FakeProvider()
+        await cache.get_pages(provider, "m1", "c1")
+
+        assert cache.invalidate_url(PAGES[1])
+        assert not cache.invalidate_url(PAGES[1])
+        await cache.get_pages(provider, "m1", "c1")
+
+        assert provider.get_pages.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_empty_page_lists_are_not_cached(self):
+        cache = PageManifestCache()
+        provider = FakeProvider()
+        provider.get_pages.return_value = []
+
+        await cache.get_pages(provider, "m1", "c1")
+        await cache.get_pages(provider, "m1", "c1")
+
+        assert provider.get_pages.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_oldest_manifest_is_evicted(self):
+        cache = PageManifestCache(max_entries=2)
+        provider = FakeProvider()
+        for chapter_id in ("c1", "c2", "c3"):
+            provider.get_pages.return_value = [f"https://cdn/{chapter_id}.jpg"]
+            await cache.get_pages(provider, "m1", chapter_id)
+
+        assert cache.get_stats()["entries"] == 2
+        assert not cache.invalidate_url("https://cdn/c1.jpg")
+        assert cache.invalidate_url("https://cdn/c3.jpg")
+
+
+def test_is_expired_page_error():
+    request = httpx.Request("GET", PAGES[0])
+
+    def status_error(code):
+        return httpx.HTTPStatusError(
+            "error", request=request, response=httpx.Response(code, request=request)
+        )
+
+    assert is_expired_page_error(status_error(403))
+    assert is_expired_page_error(status_error(404))
+    assert not is_expired_page_error(status_error(500))
+    assert is_expired_page_error(
+        ContentError("gone", "MangaPill", error_type="not_found")
+    )
+    assert is_expired_page_error(
+        AntiBotError("forbidden", "MangaPill", context={"status_code": 403})
+    )
+    assert not is_expired_page_error(ValueError("boom"))
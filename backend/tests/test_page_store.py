@@ -0,0 +1,203 @@
+"""
+Tests for the content-addressed page store.
+"""
+
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.providers.registry import provider_registry
+from app.core.services import download
+from app.core.services import page_store as page_store_module
+from app.core.services.page_store import PageStore, PageStoreSink
+from tests.test_cbz_sink import FakeProvider
+
+
+class FakeSession:
+    """Keeps Page rows in memory for the statements the store issues."""
+
+    def __init__(self, chapters=(), referenced=()):
+        self.chapters = {chapter.id: chapter for chapter in chapters}
+        self.pages = [SimpleNamespace(file_path=path) for path in referenced]
+
+    async def get(self, model, ident):
+        return self.chapters[ident]
+
+    async def execute(self, statement):
+        if statement.is_delete:
+            chapter_id = statement.whereclause.right.value
+            replaced = [p for p in self.pages if p.chapter_id == chapter_id]
+            self.pages = [p for p in self.pages if p not in replaced]
+            paths = [p.file_path for p in replaced]
+        else:
+            paths = [p.file_path for p in self.pages]
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: paths))
+
+    def add_all(self, pages):
+        self.pages.extend(pages)
+
+    async def commit(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "PAGE_DEDUP_ENABLED", True)
+    store = PageStore()
+    monkeypatch.setattr(store, "GRACE_SECONDS", 0)
+    return store
+
+
+def test_identical_pages_are_stored_once(store):
+    first = store.put(b"credits page", ".PNG")
+    second = store.put(b"credits page", ".png")
+
+    assert first == second
+    assert store.is_blob(first)
+    assert first.endswith(".png")
+    assert store.get_stats()["deduplicated"] == 1
+    assert store.get_stats()["bytes_saved"] == len(b"credits page")
+
+
+def test_imported_file_is_linked_into_the_chapter(store, tmp_path):
+    source = tmp_path / "1.jpg"
+    source.write_bytes(b"page")
+    logical = str(tmp_path / "manga" / "chapter" / "0001.jpg")
+
+    blob = store.store_file(str(source), logical)
+
+    assert store.is_blob(blob)
+    assert os.path.samefile(blob, logical)
+
+
+def test_import_without_dedup_copies(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PAGE_DEDUP_ENABLED", False)
+    source = tmp_path / "1.jpg"
+    source.write_bytes(b"page")
+    logical = str(tmp_path / "0001.jpg")
+
+    assert store.store_file(str(source), logical) == logical
+    assert not os.path.exists(store.root)
+
+
+@pytest.mark.asyncio
+async def test_only_unreferenced_blobs_are_collected(store, monkeypatch):
+    shared = store.put(b"banner", ".png")
+    orphan = store.put(b"old page", ".png")
+    db = FakeSession(referenced=[shared])
+
+    removed = await store.collect_unreferenced(db, [shared, orphan, "/elsewhere.png"])
+
+    assert removed == 1
+    assert os.path.exists(shared)
+    assert not os.path.exists(orphan)
+
+    # Recently written blobs may belong to a download still in progress
+    monkeypatch.setattr(store, "GRACE_SECONDS", 3600)
+    fresh = store.put(b"new page", ".png")
+    assert await store.collect_unreferenced(db, [fresh]) == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_collects_blobs_skipped_earlier(store, monkeypatch):
+    shared = store.put(b"banner", ".png")
+    orphan = store.put(b"page of a failed download", ".png")
+    fresh = store.put(b"page being downloaded", ".png")
+    stale_tmp = f"{orphan}.{uuid.uuid4().hex}.tmp"
+    open(stale_tmp, "wb").close()
+    expired = os.stat(orphan).st_mtime - 7200
+    for path in (shared, orphan, stale_tmp):
+        os.utime(path, (expired, expired))
+    monkeypatch.setattr(store, "GRACE_SECONDS", 3600)
+    db = FakeSession(referenced=[shared])
+    monkeypatch.setattr(page_store_module, "AsyncSessionLocal", lambda: db)
+
+    assert await store.sweep() == 1
+    assert os.path.exists(shared)
+    assert os.path.exists(fresh)
+    assert not os.path.exists(orphan)
+    assert not os.path.exists(stale_tmp)
+
+
+class TestDeduplicatedDownload:
+    @pytest.fixture
+    def environment(self, store, monkeypatch):
+        monkeypatch.setattr(download, "page_store", store)
+        sleep = asyncio.sleep
+        monkeypatch.setattr(download.asyncio, "sleep", lambda delay: sleep(0))
+        manga_id = uuid.uuid4()
+        chapters = [
+            SimpleNamespace(id=uuid.uuid4(), manga_id=manga_id, file_path=None)
+            for _ in range(2)
+        ]
+        return SimpleNamespace(store=store, chapters=chapters, db=FakeSession(chapters))
+
+    async def run(self, environment, chapter, provider, monkeypatch, source="c"):
+        monkeypatch.setattr(provider_registry, "get_provider", lambda name: provider)
+        monkeypatch.setattr(
+            download,
+            "PageStoreSink",
+            lambda path, src: PageStoreSink(path, src, environment.store),
+        )
+        return await download.download_chapter(
+            chapter.manga_id,
+            chapter.id,
+            provider.name,
+            "manga-1",
+            source,
+            environment.db,
+        )
+
+    @pytest.mark.asyncio
+    async def test_same_pages_share_blobs(self, environment, monkeypatch):
+        first, second = environment.chapters
+        await self.run(environment, first, FakeProvider(), monkeypatch)
+        path = await self.run(environment, second, FakeProvider(), monkeypatch)
+
+        assert second.file_path == path
+        assert second.pages_count == 5
+        blobs = {page.file_path for page in environment.db.pages}
+        assert len(environment.db.pages) == 10
+        assert len(blobs) == 5
+        link = os.path.join(path, "0003.png")
+        assert any(os.path.samefile(link, blob) for blob in blobs)
+        assert sorted(os.listdir(path)) == [f"000{n}.png" for n in range(1, 6)]
+
+    @pytest.mark.asyncio
+    async def test_redownload_collects_replaced_blobs(self, environment, monkeypatch):
+        chapter = environment.chapters[0]
+        await self.run(environment, chapter, FakeProvider(pages=3), monkeypatch)
+        old_blobs = [page.file_path for page in environment.db.pages]
+
+        class OtherScan(FakeProvider):
+            async def download_page(self, page_url, referer=None):
+                return b"other " + await super().download_page(page_url, referer)
+
+        await self.run(environment, chapter, OtherScan(pages=3), monkeypatch, "d")
+
+        assert not any(os.path.exists(blob) for blob in old_blobs)
+        assert all(os.path.exists(page.file_path) for page in environment.db.pages)
+
+    @pytest.mark.asyncio
+    async def test_retry_only_fetches_missing_pages(self, environment, monkeypatch):
+        chapter = environment.chapters[0]
+        await self.run(environment, chapter, FakeProvider(fail_pages={2}), monkeypatch)
+        assert chapter.pages_count == 4
+
+        retry = FakeProvider()
+        path = await self.run(environment, chapter, retry, monkeypatch)
+
+        assert retry.downloads == ["https://cdn.example/c/2.png"]
+        assert chapter.pages_count == 5
+        assert not os.path.exists(os.path.join(path, PageStoreSink.MANIFEST))
@@ -0,0 +1,113 @@
+"""
+Tests for concurrent chapter-alternative discovery.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.core.services.provider_matching import ProviderMatchingService
+
+
+class SlowProvider:
+    """Provider stub that carries the chapter after a fixed delay."""
+
+    def __init__(self, name, delay, title="One Piece"):
+        self.name = name
+        self.delay = delay
+        self.title = title
+        self.cancelled = False
+
+    async def search(self, query, page=1, limit=20):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return [SimpleNamespace(id=f"{self.name}-op", title=self.title)], 1, False
+
+    async def get_chapters(self, manga_id, page=1, limit=100):
+        return (
+            [{"number": "1", "id": f"{self.name}-c1", "title": "Romance Dawn"}],
+            1,
+            False,
+        )
+
+
+def patch_providers(providers):
+    return patch(
+        "app.core.services.provider_matching.provider_registry.get_all_providers",
+        return_value=providers,
+    )
+
+
+class TestFindChapterAlternatives:
+    @pytest.mark.asyncio
+    async def test_providers_are_searched_concurrently(self):
+        service = ProviderMatchingService()
+        providers = [SlowProvider(f"P{i}", 0.2) for i in range(5)]
+
+        with patch_providers(providers):
+            start = time.monotonic()
+            alternatives = await service.find_chapter_alternatives(
+                "One Piece", "1", "MangaDex", max_alternatives=5
+            )
+            elapsed = time.monotonic() - start
+
+        assert len(alternatives) == 5
+        assert elapsed < 0.6  # Sequential search would take 1 second
+
+    @pytest.mark.asyncio
+    async def test_total_deadline_cancels_slow_providers(self):
+        service = ProviderMatchingService()
+        fast = SlowProvider("Fast", 0.01)
+        slow = SlowProvider("Slow", 5)
+
+        with patch_providers([fast, slow]):
+            start = time.monotonic()
+            alternatives = await service.find_chapter_alternatives(
+                "One Piece", "1", "MangaDex", total_timeout=0.2
+            )
+            elapsed = time.monotonic() - start
+            await asyncio.sleep(0.05)  # Let the cancellation propagate
+
+        assert [alt.provider_name for alt in alternatives] == ["Fast"]
+        assert elapsed < 1
+        assert slow.cancelled
+
+    @pytest.mark.asyncio
+    async def test_alternatives_stream_in_completion_order(self):
+        service = ProviderMatchingService()
+        providers = [
+            SlowProvider("Late", 0.15),
+            SlowProvider("Early", 0.01),
+            SlowProvider("Wrong", 0.01, title="Naruto"),
+        ]
+
+        with patch_providers(providers):
+            streamed = [
+                alt.provider_name
+                async for alt in service.iter_chapter_alternatives(
+                    "One Piece", "1", "MangaDex"
+                )
+            ]
+
+        assert streamed == ["Early", "Late"]
+
+    @pytest.mark.asyncio
+    async def test_original_and_excluded_providers_skipped(self):
+        service = ProviderMatchingService()
+        providers = [SlowProvider(name, 0) for name in ("MangaDex", "A", "B")]
+        exclude = ["b"]
+
+        with patch_providers(providers):
+            alternatives = await service.find_chapter_alternatives(
+                "One Piece", "1", "MangaDex", exclude_providers=exclude
+            )
+
+        assert [alt.provider_name for alt in alternatives] == ["A"]
+        assert alternatives[0].external_chapter_id == "A-c1"
+        assert exclude == ["b"]  # Caller's list is not modified
@@ -0,0 +1,261 @@
+"""
+Tests for reader read-ahead.
+"""
+
+import asyncio
+import uuid
+
+import httpx
+import pytest
+
+from app.core.providers.page_manifest import page_manifest_cache
+from app.core.services.chapter_manifest import (
+    ChapterManifest,
+    PageEntry,
+    chapter_manifest_cache,
+)
+from app.core.services.read_ahead import (
+    HotPage,
+    HotPageCache,
+    ReadAheadService,
+    _next_in_order,
+    chapter_sort_key,
+)
+
+
+class FakeProvider:
+    name = "FakeProvider"
+
+    def __init__(self, chapters=None, fail_urls=()):
+        self.chapters = chapters or {}
+        self.fail_urls = set(fail_urls)
+        self.downloads = []
+
+    async def get_pages(self, manga_id, chapter_id):
+        return [f"https://cdn.example/{chapter_id}/{n}.jpg" for n in range(1, 6)]
+
+    async def get_all_chapters(self, manga_id):
+        return [
+            {"id": chapter_id, "number": number}
+            for chapter_id, number in self.chapters.items()
+        ]
+
+    def get_chapter_url(self, manga_id, chapter_id):
+        return f"https://example/{manga_id}/{chapter_id}"
+
+    async def download_page(self, page_url, referer=None):
+        self.downloads.append(page_url)
+        await asyncio.sleep(0.01)
+        if page_url in self.fail_urls:
+            request = httpx.Request("GET", page_url)
+            raise httpx.HTTPStatusError(
+                "gone", request=request, response=httpx.Response(404, request=request)
+            )
+        return page_url.encode()
+
+
+async def settle(service):
+    """Wait for every background prefetch to finish."""
+    while service._background or service._inflight:
+        await asyncio.gather(
+            *service._background, *service._inflight.values(), return_exceptions=True
+        )
+
+
+def make_manifest(tmp_path, pages=6):
+    entries = {}
+    for number in range(1, pages + 1):
+        path = tmp_path / f"{number:04d}.jpg"
+        path.write_bytes(b"page %d" % number)
+        entries[number] = PageEntry("image/jpeg", 6, f'"{number}"', str(path))
+    return ChapterManifest(str(uuid.uuid4()), str(uuid.uuid4()), entries)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = ReadAheadService(
+        max_bytes=1024 * 1024, pages_ahead=2, next_chapter_pages=2
+    )
+    monkeypatch.setattr(
+        chapter_manifest_cache,
+        "_invalidation_listeners",
+        [*chapter_manifest_cache._invalidation_listeners, service.discard_chapter],
+    )
+    return service
+
+
+class TestHotPageCache:
+    def test_bounded_by_bytes(self):
+        cache = HotPageCache(max_bytes=100)
+
+        for key in "abcd":
+            cache.put(key, HotPage(b"x" * 12, "image/jpeg", '"x"'))
+        cache.get("a")
+        for key in "efghij":
+            cache.put(key, HotPage(b"x" * 12, "image/jpeg", '"x"'))
+
+        assert cache.size_bytes <= 100
+        assert "a" in cache
+        assert "b" not in cache
+
+    def test_oversized_pages_are_not_kept(self):
+        cache = HotPageCache(max_bytes=100)
+
+        cache.put("big", HotPage(b"x" * 50, "image/jpeg", '"x"'))
+
+        assert "big" not in cache
+        assert cache.size_bytes == 0
+
+
+class TestChapterOrder:
+    def test_sort_key(self):
+        numbers = ["10", "Extra", "2", "2.5", "1"]
+
+        assert sorted(numbers, key=chapter_sort_key) == [
+            "1",
+            "2",
+            "2.5",
+            "10",
+            "Extra",
+        ]
+
+    def test_next_in_order(self):
+        chapters = [("c", "10"), ("a", "1"), ("b", "2")]
+
+        assert _next_in_order(chapters, "b") == "c"
+        assert _next_in_order(chapters, "c") is None
+        assert _next_in_order(chapters, "missing") is None
+
+
+class TestLocalReadAhead:
+    @pytest.mark.asyncio
+    async def test_warms_following_pages(self, tmp_path, service):
+        manifest = make_manifest(tmp_path)
+
+        service.read_ahead_local(manifest, 1)
+        await settle(service)
+
+        assert service.get_local_page(manifest.chapter_id, 2, '"2"').content == (
+            b"page 2"
+        )
+        assert service.get_local_page(manifest.chapter_id, 3, '"3"').content == (
+            b"page 3"
+        )
+        assert service.get_local_page(manifest.chapter_id, 4, '"4"') is None
+
+    @pytest.mark.asyncio
+    async def test_pages_of_a_changed_chapter_are_not_served(self, tmp_path, service):
+        manifest = make_manifest(tmp_path)
+        service.read_ahead_local(manifest, 1)
+        await settle(service)
+
+        # A re-download or re-encode gives the pages new ETags
+        assert service.get_local_page(manifest.chapter_id, 2, '"new"') is None
+
+        await chapter_manifest_cache.invalidate(manifest.chapter_id)
+        assert service.get_local_page(manifest.chapter_id, 2, '"2"') is None
+        assert len(service.cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_next_chapter_warmed_near_the_end(self, tmp_path, service):
+        manifest = make_manifest(tmp_path)
+        warmed = []
+
+        async def warm_next(manifest):
+            warmed.append(manifest.chapter_id)
+
+        service._warm_next_local_chapter = warm_next
+
+        service.read_ahead_local(manifest, 1)
+        await settle(service)
+        assert warmed == []
+
+        service.read_ahead_local(manifest, 4)
+        await settle(service)
+        assert warmed == [manifest.chapter_id]
+
+    @pytest.mark.asyncio
+    async def test_archive_pages(self, tmp_path, service):
+        import zipfile
+
+        archive = tmp_path / "chapter.cbz"
+        with zipfile.ZipFile(archive, "w") as cbz:
+            cbz.writestr("0001.jpg", b"one")
+            cbz.writestr("0002.jpg", b"two")
+        manifest = ChapterManifest(
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            {
+                number: PageEntry("image/jpeg", 3, '"a"', archive_path=str(archive))
+                for number in (1, 2)
+            },
+        )
+        service._warm_next_local_chapter = lambda manifest: asyncio.sleep(0)
+
+        service.read_ahead_local(manifest, 1)
+        await settle(service)
+
+        assert service.get_local_page(manifest.chapter_id, 2, '"a"').content == b"two"
+
+
+class TestExternalReadAhead:
+    @pytest.mark.asyncio
+    async def test_page_turns_are_served_from_memory(self, service):
+        provider = FakeProvider()
+        chapter_id = str(uuid.uuid4())
+
+        page = await service.get_external_page(provider, "m", chapter_id, 1)
+        await settle(service)
+        downloads = len(provider.downloads)
+        second = await service.get_external_page(provider, "m", chapter_id, 2)
+
+        assert page.content.endswith(b"/1.jpg")
+        assert page.media_type == "image/jpeg"
+        assert second.content.endswith(b"/2.jpg")
+        assert downloads == 3
+        assert provider.downloads.count(f"https://cdn.example/{chapter_id}/2.jpg") == 1
+
+    @pytest.mark.asyncio
+    async def test_request_joins_prefetch_in_progress(self, service):
+        provider = FakeProvider()
+        chapter_id = str(uuid.uuid4())
+        pages = await provider.get_pages("m", chapter_id)
+
+        service.read_ahead_external(provider, "m", chapter_id, pages, 0)
+        page = await service.get_external_page(provider, "m", chapter_id, 1)
+        await settle(service)
+
+        assert page.content == pages[0].encode()
+        assert provider.downloads.count(pages[0]) == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_page(self, service):
+        provider = FakeProvider()
+
+        assert await service.get_external_page(provider, "m", "c", 9) is None
+
+    @pytest.mark.asyncio
+    async def test_next_chapter_warmed_near_the_end(self, service):
+        current, following = str(uuid.uuid4()), str(uuid.uuid4())
+        provider = FakeProvider(chapters={following: "2", current: "1"})
+
+        await service.get_external_page(provider, "m", current, 4)
+        await settle(service)
+
+        assert f"https://cdn.example/{following}/1.jpg" in provider.downloads
+        assert f"https://cdn.example/{following}/2.jpg" in provider.downloads
+        assert f"https://cdn.example/{following}/3.jpg" not in provider.downloads
+
+    @pytest.mark.asyncio
+    async def test_expired_page_drops_the_page_list(self, service):
+        chapter_id = str(uuid.uuid4())
+        expired = f"https://cdn.example/{chapter_id}/2.jpg"
+        provider = FakeProvider(fail_urls=[expired])
+
+        await service.get_external_page(provider, "m", chapter_id, 1)
+        await settle(service)
+
+        assert service.get_stats()["failed"] == 1
+        assert expired not in page_manifest_cache._url_index
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.get_external_page(provider, "m", chapter_id, 2)
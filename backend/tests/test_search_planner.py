@@ -0,0 +1,111 @@
+"""
+Tests for the deadline-aware multi-provider search planner.
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.agents.rate_limiting import (
+    AgentRateLimiter,
+    CircuitState,
+    RateLimitConfig,
+    rate_limiter_manager,
+)
+from app.core.providers.search_planner import ProviderSearchPlanner
+
+
+def make_provider(name):
+    return SimpleNamespace(name=name)
+
+
+@pytest.fixture
+def planner():
+    return ProviderSearchPlanner()
+
+
+def record(planner, name, latencies, success=True):
+    for latency in latencies:
+        planner.record_result(name, success, latency)
+
+
+class TestSearchPlanner:
+    def test_unknown_providers_get_full_budget(self, planner):
+        plan = planner.plan([], [make_provider("A")], budget=15)
+
+        assert [(p.provider.name, p.timeout) for p in plan] == [("A", 15)]
+
+    def test_timeout_follows_observed_p95(self, planner):
+        record(planner, "Fast", [0.5] * 9 + [2.0])
+
+        plan = planner.plan([], [make_provider("Fast")], budget=15)
+
+        assert plan[0].timeout == pytest.approx(3.0)  # p95 2.0s * 1.5
+
+    def test_timeout_has_a_floor(self, planner):
+        record(planner, "Instant", [0.1] * 10)
+
+        plan = planner.plan([], [make_provider("Instant")], budget=15)
+
+        assert plan[0].timeout == 3.0
+
+    def test_fast_reliable_providers_rank_first(self, planner):
+        record(planner, "Slow", [12.0] * 10)
+        record(planner, "Fast", [0.5] * 10)
+        record(planner, "Flaky", [0.5] * 5)
+        record(planner, "Flaky", [0.5] * 5, success=False)
+
+        plan = planner.plan(
+            [], [make_provider(n) for n in ("Slow", "Flaky", "Fast")], budget=15
+        )
+
+        assert [p.provider.name for p in plan] == ["Fast", "Flaky", "Slow"]
+
+    def test_providers_slower_than_budget_are_skipped(self, planner):
+        record(planner, "Hopeless", [20.0] * 10)
+        record(planner, "Tail", [1.0] * 8 + [30.0] * 2)
+
+        plan = planner.plan(
+            [],
+            [make_provider("Hopeless"), make_provider("Tail"), make_provider("New")],
+            budget=15,
+            max_other_providers=1,
+        )
+
+        # Tail's p95 exceeds the budget, so it goes behind the unknown provider
+        assert [p.provider.name for p in plan] == ["New"]
+
+    def test_favorites_are_never_dropped(self, planner):
+        record(planner, "Favorite", [20.0] * 10)
+
+        plan = planner.plan(
+            [make_provider("Favorite")], [make_provider("Other")], budget=15
+        )
+
+        assert [p.provider.name for p in plan] == ["Favorite", "Other"]
+        assert plan[0].is_favorite
+        assert plan[0].timeout == 15
+
+    def test_open_circuit_is_skipped(self, planner):
+        limiter = AgentRateLimiter("Broken", RateLimitConfig())
+        limiter.circuit_state = CircuitState.OPEN
+        limiter.circuit_opened_at = time.time()
+        rate_limiter_manager.limiters["Broken"] = limiter
+
+        try:
+            plan = planner.plan([], [make_provider("Broken")], budget=15)
+        finally:
+            del rate_limiter_manager.limiters["Broken"]
+
+        assert plan == []
+
+    def test_percentiles(self, planner):
+        record(planner, "A", [float(i) for i in range(1, 21)])
+
+        stats = planner.get_provider_stats("A")
+
+        assert stats["samples"] == 20
+        assert stats["p50"] == 10.0
+        assert stats["p95"] == 19.0
+        assert stats["success_rate"] == 1.0
@@ -0,0 +1,235 @@
+"""
+Tests for the background provider series matcher.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import Delete
+from sqlalchemy.dialects import postgresql
+
+from app.core.providers.base import BaseProvider
+from app.core.services.series_matcher import SeriesMatcherService, match_to_dict
+from app.models.provider import ProviderSeriesMatch
+
+
+class FakeProvider:
+    """Provider stub returning canned search results and paged chapter lists."""
+
+    def __init__(self, name, search_results, chapter_pages=None):
+        self.name = name
+        self.supports_nsfw = False
+        self._search_results = search_results
+        self._chapter_pages = chapter_pages or [[]]
+        self.search = AsyncMock(side_effect=self._search)
+        self.get_chapters = AsyncMock(side_effect=self._get_chapters)
+
+    get_all_chapters = BaseProvider.get_all_chapters
+
+    async def _search(self, query, page=1, limit=20):
+        return self._search_results, len(self._search_results), False
+
+    async def _get_chapters(self, manga_id, page=1, limit=100):
+        chapters = self._chapter_pages[page - 1]
+        return chapters, 0, page < len(self._chapter_pages)
+
+
+def make_manga(title, provider=None, external_id=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        title=title,
+        alternative_titles={"ja": "Wan Pisu"},
+        is_nsfw=False,
+        provider=provider,
+        external_id=external_id,
+        external_url=None,
+    )
+
+
+def make_match(manga_id, provider, external_id, confidence):
+    return ProviderSeriesMatch(
+        manga_id=manga_id,
+        provider=provider,
+        external_id=external_id,
+        confidence=confidence,
+        match_method="title_fuzzy",
+    )
+
+
+def mock_db_returning(rows):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    db = AsyncMock()
+    db.execute.return_value = result
+    return db
+
+
+class TestProviderMatching:
+    @pytest.mark.asyncio
+    async def test_best_match_and_chapter_ids(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece")
+        provider = FakeProvider(
+            "MangaPill",
+            [
+                SimpleNamespace(id="op-novel", title="One Piece Novel", url=None),
+                SimpleNamespace(id="op", title="One Piece", url="https://x/op"),
+            ],
+            chapter_pages=[
+                [{"number": "Chapter 1", "id": "c1"}, {"number": "2", "id": "c2"}],
+                [{"number": "2.5", "id": "c2-5"}],
+            ],
+        )
+
+        match = await matcher._match_provider(
+            provider, manga, matcher._get_series_titles(manga)
+        )
+
+        assert match["external_id"] == "op"
+        assert match["match_method"] == "title_exact"
+        assert match["chapters"] == {"1": "c1", "2": "c2", "2.5": "c2-5"}
+        assert provider.get_chapters.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_no_match_below_threshold(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece")
+        provider = FakeProvider(
+            "MangaPill", [SimpleNamespace(id="x", title="Naruto", url=None)]
+        )
+
+        match = await matcher._match_provider(
+            provider, manga, matcher._get_series_titles(manga)
+        )
+
+        assert match is None
+        provider.get_chapters.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_source_provider_is_not_searched(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece", provider="mangadex", external_id="md-1")
+        provider = FakeProvider("MangaDex", [])
+
+        match = await matcher._match_provider(
+            provider, manga, matcher._get_series_titles(manga)
+        )
+
+        assert match["external_id"] == "md-1"
+        assert match["confidence"] == 1.0
+        assert match["match_method"] == "source"
+        provider.search.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_slow_providers_are_cut_off_at_the_deadline(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece")
+        providers = [SimpleNamespace(name="Fast"), SimpleNamespace(name="Slow")]
+        stored = {}
+
+        async def candidates(db, manga):
+            return providers
+
+        async def match_provider(provider, manga, titles):
+            if provider.name == "Slow":
+                await asyncio.sleep(10)
+            return {"external_id": provider.name.lower()}
+
+        async def store_matches(db, manga, found, answered):
+            stored.update(found)
+
+        matcher._get_candidate_providers = candidates
+        matcher._match_provider = match_provider
+        matcher._store_matches = store_matches
+
+        assert await matcher.match_series(AsyncMock(), manga, timeout=0.05) == 1
+        assert list(stored) == ["Fast"]
+
+    @pytest.mark.asyncio
+    async def test_failed_providers_keep_their_matches(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece")
+        providers = [SimpleNamespace(name=name) for name in ("Gone", "Broken", "Slow")]
+        existing = [
+            make_match(manga.id, provider.name, "x", 0.9) for provider in providers
+        ]
+
+        async def candidates(db, manga):
+            return providers
+
+        async def match_provider(provider, manga, titles):
+            if provider.name == "Broken":
+                raise RuntimeError("provider down")
+            if provider.name == "Slow":
+                await asyncio.sleep(10)
+            return None
+
+        matcher._get_candidate_providers = candidates
+        matcher._match_provider = match_provider
+        db = mock_db_returning(existing)
+        chapters = MagicMock()
+        chapters.scalars.return_value.all.return_value = []
+        db.execute.side_effect = [db.execute.return_value, MagicMock(), chapters]
+
+        assert await matcher.match_series(db, manga, timeout=0.05) == 0
+
+        deletes = [
+            call.args[0]
+            for call in db.execute.await_args_list
+            if isinstance(call.args[0], Delete)
+        ]
+        assert len(deletes) == 1
+        assert ["Gone"] in deletes[0].compile().params.values()
+        assert manga.provider_matched_at is not None
+
+    @pytest.mark.asyncio
+    async def test_due_series_are_ordered_by_last_attempt(self):
+        matcher = SeriesMatcherService()
+        db = mock_db_returning([])
+
+        await matcher.get_series_due_for_matching(db, limit=10)
+
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "manga.provider_matched_at IS NULL" in sql
+        assert "ORDER BY manga.provider_matched_at ASC NULLS FIRST" in sql
+
+
+class TestRequestTimeLookups:
+    @pytest.mark.asyncio
+    async def test_known_alternatives_from_stored_matches(self):
+        matcher = SeriesMatcherService()
+        manga = make_manga("One Piece")
+        chapter = SimpleNamespace(
+            title="Romance Dawn",
+            number="1",
+            source="MangaDex",
+            provider_external_ids={"mangadex": "md-c1", "mangapill": "mp-c1"},
+        )
+        db = mock_db_returning(
+            [
+                make_match(manga.id, "MangaDex", "md-1", 1.0),
+                make_match(manga.id, "MangaPill", "mp-1", 0.95),
+                make_match(manga.id, "MangaSee", "ms-1", 0.9),  # No chapter mapped
+            ]
+        )
+
+        alternatives = await matcher.get_known_alternatives(db, manga, chapter)
+
+        assert db.execute.await_count == 1
+        assert [alt.provider_name for alt in alternatives] == ["MangaPill"]
+        assert alternatives[0].external_manga_id == "mp-1"
+        assert alternatives[0].external_chapter_id == "mp-c1"
+
+    def test_match_to_dict(self):
+        match = make_match(uuid.uuid4(), "MangaPill", "mp-1", 0.95)
+        match.matched_title = "One Piece"
+
+        data = match_to_dict(match)
+
+        assert data["provider"] == "MangaPill"
+        assert data["external_id"] == "mp-1"
+        assert data["title"] == "One Piece"
+        assert data["last_verified"] is None
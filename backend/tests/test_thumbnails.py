@@ -0,0 +1,250 @@
+"""
+Tests for cover thumbnail generation.
+"""
+
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+from starlette.requests import Request
+
+from app.api.api_v1.endpoints.manga import _cover_response
+from app.core.config import settings
+from app.core.services.thumbnails import (
+    COVER_SIZES,
+    ThumbnailService,
+    render_thumbnails,
+)
+from app.core.utils import get_cover_storage_path
+
+
+def write_cover(path, size=(1200, 1800)):
+    """Write a detailed JPEG cover, roughly the size of a real scan."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image = Image.effect_noise(size, 64).convert("RGB")
+    image.save(path, "JPEG", quality=95)
+    return path
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def service():
+    service = ThumbnailService(max_workers=1)
+    service._executor = ThreadPoolExecutor(max_workers=1)
+    yield service
+    service.shutdown()
+
+
+def make_request(accept="", etag=None):
+    headers = [(b"accept", accept.encode())]
+    if etag:
+        headers.append((b"if-none-match", etag.encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+class TestRenderThumbnails:
+    def test_renders_each_width_in_both_formats(self, tmp_path):
+        source = write_cover(str(tmp_path / "cover.jpg"))
+
+        variants = render_thumbnails(source, str(tmp_path / "thumbs"), [160, 320])
+
+        assert set(variants) == {160, 320}
+        for width, paths in variants.items():
+            assert set(paths) == {"webp", "jpg"}
+            with Image.open(paths["webp"]) as image:
+                assert image.format == "WEBP"
+                assert image.size == (width, width * 3 // 2)
+            with Image.open(paths["jpg"]) as image:
+                assert image.format == "JPEG"
+
+    def test_thumbnails_are_a_fraction_of_the_original(self, tmp_path):
+        source = write_cover(str(tmp_path / "cover.jpg"))
+
+        variants = render_thumbnails(source, str(tmp_path / "thumbs"), [160])
+
+        original_size = os.path.getsize(source)
+        assert os.path.getsize(variants[160]["webp"]) < original_size * 0.1
+        assert os.path.getsize(variants[160]["jpg"]) < original_size * 0.1
+
+    def test_small_images_are_not_upscaled(self, tmp_path):
+        source = write_cover(str(tmp_path / "cover.jpg"), size=(100, 150))
+
+        variants = render_thumbnails(source, str(tmp_path / "thumbs"), [320])
+
+        with Image.open(variants[320]["webp"]) as image:
+            assert image.size == (100, 150)
+
+    def test_palette_images_are_converted(self, tmp_path):
+        source = str(tmp_path / "cover.png")
+        Image.new("P", (400, 600)).save(source)
+
+        variants = render_thumbnails(source, str(tmp_path / "thumbs"), [160])
+
+        with Image.open(variants[160]["jpg"]) as image:
+            assert image.mode == "RGB"
+
+
+class TestThumbnailService:
+    @pytest.mark.asyncio
+    async def test_generates_variants_for_stored_cover(self, storage, service):
+        manga_id = uuid.uuid4()
+        write_cover(get_cover_storage_path(manga_id))
+
+        variants = await service.generate_cover_thumbnails(manga_id)
+
+        assert set(variants) == set(COVER_SIZES.values())
+        for size in COVER_SIZES:
+            assert service.get_cover_variant_path(manga_id, size, "webp")
+            assert service.get_cover_variant_path(manga_id, size, "jpg")
+
+    @pytest.mark.asyncio
+    async def test_missing_cover_generates_nothing(self, storage, service):
+        assert await service.generate_cover_thumbnails(uuid.uuid4()) == {}
+
+    @pytest.mark.asyncio
+    async def test_unreadable_cover_is_logged_not_raised(self, storage, service):
+        manga_id = uuid.uuid4()
+        cover_path = get_cover_storage_path(manga_id)
+        os.makedirs(os.path.dirname(cover_path))
+        with open(cover_path, "wb") as f:
+            f.write(b"not an image")
+
+        assert await service.generate_cover_thumbnails(manga_id) == {}
+        assert service.get_cover_variant_path(manga_id, "small") is None
+
+    @pytest.mark.asyncio
+    async def test_variants_older_than_the_cover_are_stale(self, storage, service):
+        manga_id = uuid.uuid4()
+        cover_path = write_cover(get_cover_storage_path(manga_id))
+        await service.generate_cover_thumbnails(manga_id)
+
+        later = time.time() + 60
+        os.utime(cover_path, (later, later))
+
+        assert service.get_cover_variant_path(manga_id, "medium") is None
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self, storage):
+        service = ThumbnailService(max_workers=1)
+        manga_id = uuid.uuid4()
+        write_cover(get_cover_storage_path(manga_id), size=(400, 600))
+
+        try:
+            variants = await service.generate_cover_thumbnails(manga_id)
+        finally:
+            service.shutdown()
+
+        assert set(variants) == set(COVER_SIZES.values())
+
+
+class TestCoverResponse:
+    @pytest.fixture(autouse=True)
+    def use_service(self, service, monkeypatch):
+        monkeypatch.setattr("app.api.api_v1.endpoints.manga.thumbnail_service", service)
+
+    @pytest.mark.asyncio
+    async def test_serves_webp_when_accepted(self, storage):
+        manga_id = uuid.uuid4()
+        cover_path = write_cover(get_cover_storage_path(manga_id))
+
+        response = await _cover_response(
+            make_request("image/avif,image/webp,*/*"),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            "small",
+        )
+
+        assert response.media_type == "image/webp"
+        assert response.path.endswith("cover_160.webp")
+        assert response.headers["vary"] == "Accept"
+
+    @pytest.mark.asyncio
+    async def test_serves_jpeg_otherwise(self, storage):
+        manga_id = uuid.uuid4()
+        cover_path = write_cover(get_cover_storage_path(manga_id))
+
+        response = await _cover_response(
+            make_request("image/*"),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            "large",
+        )
+
+        assert response.media_type == "image/jpeg"
+        assert response.path.endswith("cover_640.jpg")
+
+    @pytest.mark.asyncio
+    async def test_original_without_size(self, storage):
+        manga_id = uuid.uuid4()
+        cover_path = write_cover(get_cover_storage_path(manga_id))
+
+        response = await _cover_response(
+            make_request("image/webp"),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            None,
+        )
+
+        assert response.path == cover_path
+        assert "vary" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_rewritten_cover_is_revalidated(self, storage):
+        manga_id = uuid.uuid4()
+        cover_path = write_cover(get_cover_storage_path(manga_id))
+        first = await _cover_response(
+            make_request("image/webp"), manga_id, cover_path, "image/jpeg", "small"
+        )
+        etag = first.headers["etag"]
+
+        unchanged = await _cover_response(
+            make_request("image/webp", etag),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            "small",
+        )
+        write_cover(cover_path, size=(600, 900))
+        info = os.stat(cover_path)
+        os.utime(cover_path, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+        rewritten = await _cover_response(
+            make_request("image/webp", etag),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            "small",
+        )
+
+        assert "immutable" not in first.headers["cache-control"]
+        assert unchanged.status_code == 304
+        assert rewritten.status_code == 200
+        assert rewritten.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_original_when_resizing_fails(self, storage):
+        manga_id = uuid.uuid4()
+        cover_path = get_cover_storage_path(manga_id)
+        os.makedirs(os.path.dirname(cover_path))
+        with open(cover_path, "wb") as f:
+            f.write(b"not an image")
+
+        response = await _cover_response(
+            make_request("image/webp"),
+            manga_id,
+            cover_path,
+            "image/jpeg",
+            "small",
+        )
+
+        assert response.path == cover_path
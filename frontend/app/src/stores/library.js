@@ -592,6 +592,20 @@ export const useLibraryStore = defineStore("library", {
       }
     },
 
+    async bulkRefresh() {
+      if (this.selectedManga.size === 0) return;
+
+      try {
+        const mangaIds = Array.from(this.selectedManga);
+        await api.post("/v1/library/bulk/refresh", { manga_ids: mangaIds });
+        await this.fetchLibrary();
+        this.selectedManga.clear();
+      } catch (error) {
+        console.error("Bulk refresh error:", error);
+        throw error;
+      }
+    },
+
     async bulkDelete() {
       if (this.selectedManga.size === 0) return;
 
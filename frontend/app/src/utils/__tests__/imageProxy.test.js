@@ -0,0 +1,38 @@
+import { describe, it, expect, beforeEach, vi } from "vitest";
+import { getCoverUrl } from "../imageProxy";
+
+describe("Image Proxy", () => {
+  beforeEach(() => {
+    vi.spyOn(console, "log").mockImplementation(() => {});
+  });
+
+  describe("getCoverUrl", () => {
+    it("should request a sized, versioned cover for internal manga", () => {
+      const manga = { updated_at: "2026-01-01T00:00:00" };
+
+      expect(getCoverUrl(manga, "abc", "medium")).toBe(
+        "/api/v1/manga/abc/cover?size=medium&v=2026-01-01T00%3A00%3A00",
+      );
+    });
+
+    it("should size locally stored covers of provider manga", () => {
+      const manga = {
+        provider: "mangadex",
+        cover_image: "/app/storage/manga/abc/cover.jpg",
+      };
+
+      expect(getCoverUrl(manga, "abc", "small")).toBe(
+        "/api/v1/manga/abc/cover?size=small",
+      );
+    });
+
+    it("should link external covers directly", () => {
+      const manga = {
+        provider: "mangadex",
+        cover_image: "https://uploads.mangadex.org/covers/abc/cover.jpg",
+      };
+
+      expect(getCoverUrl(manga, "abc", "medium")).toBe(manga.cover_image);
+    });
+  });
+});
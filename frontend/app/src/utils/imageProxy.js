@@ -44,26 +44,53 @@ export function getProxiedImageUrl(originalUrl) {
   return `/api/v1/providers/image-proxy?url=${encodedUrl}`;
 }
 
+/**
+ * Check if a cover is stored by the backend rather than linked from elsewhere
+ * @param {string} url - Cover image path or URL
+ * @returns {boolean} - True if the cover endpoint serves it
+ */
+function isStoredCover(url) {
+  return Boolean(url) && !/^(https?:|data:|blob:)/i.test(url);
+}
+
+/**
+ * Get the cover endpoint URL, resized and versioned when possible
+ * @param {Object} manga - Manga object
+ * @param {string} mangaId - Manga ID
+ * @param {string} size - Thumbnail size: small, medium or large (optional)
+ * @returns {string} - Cover endpoint URL
+ */
+function getCoverEndpointUrl(manga, mangaId, size) {
+  const params = new URLSearchParams();
+  if (size) params.set("size", size);
+  // Changes the URL when the manga is updated; rewritten covers are revalidated
+  if (manga.updated_at) params.set("v", manga.updated_at);
+  const query = params.toString();
+  return `/api/v1/manga/${mangaId}/cover${query ? `?${query}` : ""}`;
+}
+
 /**
  * Get cover URL with proper handling for internal vs external manga
  * @param {Object} manga - Manga object
  * @param {string} mangaId - Manga ID (optional, for internal manga)
+ * @param {string} size - Thumbnail size for internal covers: small, medium or large (optional)
  * @returns {string} - Appropriate cover URL
  */
-export function getCoverUrl(manga, mangaId = null) {
+export function getCoverUrl(manga, mangaId = null, size = null) {
   // Priority 1: For external manga with cover_image that needs proxy
   if (manga.cover_image && needsProxy(manga.cover_image)) {
     console.log("Using proxy for external image:", manga.cover_image);
     return getProxiedImageUrl(manga.cover_image);
   }
 
-  // Priority 2: For internal manga, use the cover endpoint
-  if (mangaId && !manga.provider) {
+  // Priority 2: For internal manga and covers stored locally, use the
+  // cover endpoint, which serves resized thumbnails
+  if (mangaId && (!manga.provider || isStoredCover(manga.cover_image))) {
     console.log("Using internal cover endpoint for manga:", mangaId);
-    return `/api/v1/manga/${mangaId}/cover`;
+    return getCoverEndpointUrl(manga, mangaId, size);
   }
 
-  // Priority 3: For internal manga with cover_image (no proxy needed)
+  // Priority 3: For manga with an external cover_image (no proxy needed)
   if (manga.cover_image && !needsProxy(manga.cover_image)) {
     console.log("Using direct internal image:", manga.cover_image);
     return manga.cover_image;